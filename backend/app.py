@@ -1,34 +1,67 @@
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 import logging
 import os
 from config import Config
-from routes.verify_routes import verify_bp
-from routes.honeypot_routes import honeypot_bp
+from routes.verify_routes import verify_bp, user_sessions
+from routes.honeypot_routes import honeypot_bp, honeypot_sessions
+from routes.metrics_routes import metrics_bp
+from routes.admin_routes import admin_bp
+from services.metrics_service import metrics_service
+from services.admission_service import init_admission_control
+from services.audit_log import init_audit_log
+from services.rate_limiter import init_rate_limiter
+from services.service_container import init_services
+from services.static_assets import init_static_assets
+from utils.json_provider import install_json_provider
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_app():
-    app = Flask(__name__, static_folder='../frontend/build', static_url_path='')
+def create_app(config_overrides=None):
+    # The React build is served by services/static_assets.py, not Flask's static view
+    app = Flask(__name__, static_folder=None)
     app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
+    
+    # orjson-backed jsonify when installed
+    install_json_provider(app)
+    
+    # Background writer for the fraud audit log
+    init_audit_log(app)
+    
+    # Services are built on first use unless WARM_UP_SERVICES is set
+    services = init_services(app)
     
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
-    # Rate limiting
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        default_limits=["200 per day", "50 per hour"]
-    )
+    # Rate limiting (shared token buckets, keyed by the real client IP)
+    init_rate_limiter(app)
+    
+    # Priority-aware load shedding (after rate limiting, so rejected requests hold no slot)
+    admission = init_admission_control(app)
     
     # Register blueprints
     app.register_blueprint(verify_bp)
     app.register_blueprint(honeypot_bp)
+    app.register_blueprint(admin_bp)
+    
+    # Metrics (registered last so it can pre-create per-route series)
+    app.register_blueprint(metrics_bp)
+    metrics_service.gauge('honeykyc_verify_sessions', lambda: len(user_sessions),
+                          'Active verification sessions')
+    metrics_service.gauge('honeykyc_honeypot_sessions', lambda: len(honeypot_sessions),
+                          'Active honeypot sessions')
+    metrics_service.gauge('honeykyc_tracked_sessions',
+                          lambda: services.tracking_service.session_count()
+                          if services.is_loaded('tracking_service') else 0,
+                          'Sessions held in the tracking store')
+    if admission is not None:
+        metrics_service.gauge('honeykyc_requests_in_flight', lambda: admission.total_in_flight,
+                              'Requests admitted and not yet finished')
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -39,12 +72,8 @@ def create_app():
             'version': '1.0.0'
         })
     
-    # Serve React app
-    @app.route('/')
-    @app.route('/dashboard')
-    @app.route('/honeypot')
-    def serve():
-        return send_from_directory(app.static_folder, 'index.html')
+    # Serve React app (hashed bundles cached forever, index.html revalidated by ETag)
+    init_static_assets(app, app.config['STATIC_BUILD_DIR'])
     
     @app.errorhandler(404)
     def not_found(e):
@@ -52,7 +81,7 @@ def create_app():
     
     @app.errorhandler(500)
     def server_error(e):
-        logger.error(f"Server error: {e}")
+        logger.error("Server error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
     
     return app
@@ -0,0 +1,406 @@
+"""
+Load and benchmark harness for the KYC flow.
+
+Drives realistic verification flows (start, device, behavior events,
+name-check, risk, transactions, actions) plus honeypot sessions against
+the app, either in-process through the Flask test client or over HTTP
+against a local (or remote) server, and writes per-endpoint throughput,
+latency percentiles and the RSS growth of the run to a JSON file.
+
+Run from the backend directory:
+    python -m benchmarks.bench_kyc_flow --flows 200 --registry-size 50000
+    python -m benchmarks.bench_kyc_flow --mode http --concurrency 8
+    python -m benchmarks.bench_kyc_flow --compare results_old.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from utils.synthetic_data import generate_telecom_registry, generate_user_activity  # noqa: E402
+
+BEHAVIOR_EVENTS = ['mouse_movement', 'mouse_movement', 'mouse_movement', 'scroll_behavior',
+                   'page_view', 'tab_switch', 'copy_paste']
+HONEYPOT_ACTIONS = ['view_balance', 'view_balance', 'click_admin_link', 'page_scraping']
+
+
+def current_rss_kb():
+    """Current resident set size of this process in KB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        # Peak RSS is the best we can do without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# ============================================
+# CLIENTS
+# ============================================
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, payload=None):
+        response = self.client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Keep-alive HTTP client; use one instance per thread"""
+
+    def __init__(self, base_url):
+        parsed = urlparse(base_url)
+        self.conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+
+    def request(self, method, path, payload=None):
+        body = json.dumps(payload) if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        raw = response.read()
+        try:
+            return response.status, json.loads(raw) if raw else None
+        except ValueError:
+            return response.status, None
+
+
+# ============================================
+# RECORDING
+# ============================================
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, client, label, method, path, payload=None):
+        start = time.perf_counter()
+        status, body = client.request(method, path, payload)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[label].append(elapsed)
+            if status >= 500 or status == 429:
+                self.errors[label] += 1
+        return body or {}
+
+    def summary(self, wall_time):
+        # Rates are per second of wall-clock time: with concurrent workers the
+        # summed latencies of an endpoint overlap and say nothing about throughput
+        endpoints = {}
+        total_requests = 0
+        for label, values in sorted(self.latencies.items()):
+            values.sort()
+            total_requests += len(values)
+            endpoints[label] = {
+                'requests': len(values),
+                'errors': self.errors.get(label, 0),
+                'throughput_rps': round(len(values) / wall_time, 1) if wall_time else 0.0,
+                'mean_ms': round(sum(values) / len(values) * 1000, 3),
+                'p50_ms': round(percentile(values, 50) * 1000, 3),
+                'p99_ms': round(percentile(values, 99) * 1000, 3),
+                'max_ms': round(values[-1] * 1000, 3)
+            }
+        return {
+            'wall_time_s': round(wall_time, 3),
+            'total_requests': total_requests,
+            'throughput_rps': round(total_requests / wall_time, 1) if wall_time else 0.0,
+            'rss_kb': current_rss_kb(),
+            'endpoints': endpoints
+        }
+
+
+# ============================================
+# FLOWS
+# ============================================
+
+def run_kyc_flow(client, recorder, rng, mobiles, registry, args):
+    mobile = rng.choice(mobiles)
+    owner = registry[mobile]['owner_name']
+    # A share of flows submit someone else's name to exercise the mismatch path
+    name = owner if rng.random() > args.mismatch_rate else 'Fake Name'
+
+    body = recorder.call(client, 'verify/start', 'POST', '/api/verify/start',
+                         {'name': name, 'mobile': mobile})
+    session_id = body.get('session_id')
+    if not session_id:
+        return
+
+    recorder.call(client, 'verify/device', 'POST', '/api/verify/device', {
+        'session_id': session_id,
+        'fingerprint': f'fp-{rng.getrandbits(64):x}',
+        'userAgent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+        'platform': 'Win32',
+        'screenResolution': '1920x1080',
+        'language': 'en-IN',
+        'timezone': 'Asia/Kolkata'
+    })
+
+    recorder.call(client, 'verify/behavior', 'POST', '/api/verify/behavior',
+                  {'session_id': session_id, 'type': 'login_speed',
+                   'duration': rng.randint(500, 15000)})
+    for _ in range(args.behavior_events):
+        event = rng.choice(BEHAVIOR_EVENTS)
+        recorder.call(client, 'verify/behavior', 'POST', '/api/verify/behavior',
+                      {'session_id': session_id, 'type': event, 'page': 'login'})
+
+    recorder.call(client, 'verify/name-check', 'POST', '/api/verify/name-check',
+                  {'name': name, 'mobile': mobile})
+    recorder.call(client, 'verify/risk', 'POST', '/api/verify/risk', {'session_id': session_id})
+
+    for _ in range(args.transactions):
+        recorder.call(client, 'track/transaction', 'POST', '/api/track/transaction', {
+            'session_id': session_id,
+            'transaction': {
+                'type': 'debit',
+                'amount': rng.randint(100, 20000),
+                'recipient': f'user{rng.randint(1, 5000)}@okaxis'
+            }
+        })
+    for page in ('real_wallet', 'history', 'settings')[:args.actions]:
+        recorder.call(client, 'track/action', 'POST', '/api/track/action', {
+            'session_id': session_id,
+            'action': {'action': 'page_view', 'page': page}
+        })
+
+
+def run_honeypot_flow(client, recorder, rng, args):
+    body = recorder.call(client, 'honeypot/enter', 'POST', '/api/honeypot/enter', {})
+    session_id = body.get('session_id')
+    if not session_id:
+        return
+
+    for _ in range(args.honeypot_actions):
+        recorder.call(client, 'honeypot/track', 'POST', '/api/honeypot/track', {
+            'session_id': session_id,
+            'action_type': rng.choice(HONEYPOT_ACTIONS),
+            'page': 'fake_wallet'
+        })
+    recorder.call(client, 'honeypot/fake-balance', 'GET',
+                  f'/api/honeypot/fake-balance?session_id={session_id}')
+    recorder.call(client, 'honeypot/fake-transfer', 'POST', '/api/honeypot/fake-transfer', {
+        'session_id': session_id,
+        'amount': rng.randint(1000, 50000),
+        'to_account': f'mule{rng.randint(1, 200)}@okicici'
+    })
+    recorder.call(client, 'honeypot/fraud-report', 'POST', '/api/honeypot/fraud-report',
+                  {'session_id': session_id})
+
+
+def run_workload(client_factory, args, mobiles, registry):
+    recorder = Recorder()
+    flows_per_worker = [args.flows // args.concurrency] * args.concurrency
+    for i in range(args.flows % args.concurrency):
+        flows_per_worker[i] += 1
+
+    def worker(worker_id, flows):
+        client = client_factory()
+        rng = random.Random(args.seed * 1000 + worker_id)
+        for _ in range(flows):
+            run_kyc_flow(client, recorder, rng, mobiles, registry, args)
+            if rng.random() < args.honeypot_rate:
+                run_honeypot_flow(client, recorder, rng, args)
+
+    # Warm-up flows are not recorded
+    warm_client = client_factory()
+    warm_rng = random.Random(args.seed)
+    for _ in range(args.warmup):
+        run_kyc_flow(warm_client, Recorder(), warm_rng, mobiles, registry, args)
+
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(flows_per_worker)]
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    summary = recorder.summary(wall_time)
+    summary['flows_per_second'] = round(args.flows / wall_time, 1) if wall_time else 0.0
+    # Whole process, all threads: per-request deltas can't be attributed
+    summary['rss_growth_kb'] = summary['rss_kb'] - rss_before
+    return summary
+
+
+# ============================================
+# SETUP
+# ============================================
+
+def prepare_workdir(args):
+    """Write synthetic data files into a scratch directory the services load from"""
+    workdir = tempfile.mkdtemp(prefix='honeykyc-bench-')
+    os.makedirs(os.path.join(workdir, 'data'))
+
+    registry = generate_telecom_registry(args.registry_size, seed=args.seed)
+    activity = generate_user_activity(registry, args.history_users, seed=args.seed)
+    with open(os.path.join(workdir, 'data', 'telecom_mock_data.json'), 'w') as f:
+        json.dump(registry, f)
+    with open(os.path.join(workdir, 'data', 'user_activity.json'), 'w') as f:
+        json.dump(activity, f)
+
+    return workdir, registry
+
+
+def build_app(workdir):
+    """App whose every writable file lives in the scratch directory, never in backend/data"""
+    from app import create_app
+    data_dir = os.path.join(workdir, 'data')
+    return create_app({
+        'DATA_DIR': data_dir,
+        'TELECOM_DATA_PATH': os.path.join(data_dir, 'telecom_mock_data.json'),
+        'USER_ACTIVITY_PATH': os.path.join(data_dir, 'user_activity.json'),
+        'TRANSACTION_GRAPH_PATH': os.path.join(data_dir, 'transaction_graph.json'),
+        'REGISTRY_DELTA_DIR': os.path.join(data_dir, 'registry_deltas'),
+        'ARCHIVE_DIR': os.path.join(data_dir, 'archive'),
+        'SHADOW_LOG_PATH': os.path.join(data_dir, 'shadow_scores.jsonl'),
+        'AUDIT_LOG_PATH': os.path.join(data_dir, 'logs', 'fraud_audit.jsonl'),
+        'RATELIMIT_ENABLED': False,
+        'WARM_UP_SERVICES': True
+    })
+
+
+def start_local_server(app):
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    """Print per-endpoint latency changes against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    for mode, result in current['results'].items():
+        old = baseline.get('results', {}).get(mode)
+        if not old:
+            continue
+        print(f"\n[{mode}] vs {baseline.get('commit') or baseline_path}")
+        print(f"{'endpoint':<26}{'p50 ms':>18}{'p99 ms':>18}")
+        for label, stats in result['endpoints'].items():
+            before = old['endpoints'].get(label)
+            if not before:
+                continue
+            cells = []
+            for key in ('p50_ms', 'p99_ms'):
+                change = (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                cells.append(f"{stats[key]:>8.3f} ({change:+5.1f}%)")
+            print(f"{label:<26}{cells[0]:>18}{cells[1]:>18}")
+
+
+def print_summary(mode, result):
+    print(f"\n[{mode}] {result['total_requests']} requests in {result['wall_time_s']}s "
+          f"({result['throughput_rps']} req/s, {result['flows_per_second']} flows/s, "
+          f"RSS {result['rss_kb'] // 1024} MB, {result['rss_growth_kb']:+} KB during the run)")
+    print(f"{'endpoint':<26}{'reqs':>7}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, stats in result['endpoints'].items():
+        print(f"{label:<26}{stats['requests']:>7}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the KYC verification flow')
+    parser.add_argument('--mode', choices=['inprocess', 'http', 'both'], default='inprocess')
+    parser.add_argument('--url', help='Benchmark an already running server instead of a local one')
+    parser.add_argument('--flows', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--behavior-events', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=2)
+    parser.add_argument('--actions', type=int, default=2)
+    parser.add_argument('--honeypot-rate', type=float, default=0.2)
+    parser.add_argument('--honeypot-actions', type=int, default=5)
+    parser.add_argument('--mismatch-rate', type=float, default=0.3)
+    parser.add_argument('--registry-size', type=int, default=10000)
+    parser.add_argument('--history-users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Previous results file to diff against')
+    parser.add_argument('--keep-workdir', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.concurrency = max(1, args.concurrency)
+    output_path = os.path.abspath(args.output)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    workdir, registry = prepare_workdir(args)
+    mobiles = list(registry)
+    results = {}
+    try:
+        app = build_app(workdir)
+
+        if args.mode in ('inprocess', 'both'):
+            results['inprocess'] = run_workload(lambda: InProcessClient(app), args, mobiles, registry)
+            print_summary('inprocess', results['inprocess'])
+
+        if args.mode in ('http', 'both'):
+            server = None
+            base_url = args.url
+            if not base_url:
+                server, base_url = start_local_server(app)
+            try:
+                results['http'] = run_workload(lambda: HttpClient(base_url), args, mobiles, registry)
+                print_summary('http', results['http'])
+            finally:
+                if server:
+                    server.shutdown()
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'compare', 'keep_workdir')},
+        'results': results
+    }
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    if compare_path:
+        compare(report, compare_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Registry hot-reload benchmark: time and memory spike of applying deltas of
+various sizes to a synthetic registry, with and without compaction.
+
+Run from the backend directory:
+    python -m benchmarks.bench_registry_reload --registry-size 1000000 --delta-sizes 100 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.telecom_registry import TelecomRegistry  # noqa: E402
+from utils.synthetic_data import generate_telecom_registry, make_telecom_record, synthetic_mobile  # noqa: E402
+
+
+def make_operations(registry_size, delta_size, rng):
+    """Mix of KYC patches, port-outs (provider patch), new activations and deletes"""
+    operations = []
+    for i in range(delta_size):
+        roll = rng.random()
+        mobile = synthetic_mobile(rng.randrange(registry_size))
+        if roll < 0.5:
+            operations.append({'op': 'patch', 'mobile': mobile, 'fields': {'kyc_status': 'verified'}})
+        elif roll < 0.7:
+            operations.append({'op': 'patch', 'mobile': mobile, 'fields': {'provider': 'Airtel'}})
+        elif roll < 0.95:
+            new_index = registry_size + i
+            operations.append({'op': 'upsert', 'mobile': synthetic_mobile(new_index),
+                               'record': make_telecom_record(new_index)})
+        else:
+            operations.append({'op': 'delete', 'mobile': mobile})
+    return operations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark telecom registry hot reload')
+    parser.add_argument('--registry-size', type=int, default=200000)
+    parser.add_argument('--delta-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--compact-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results_reload.json')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    base = generate_telecom_registry(args.registry_size, seed=args.seed)
+    registry = TelecomRegistry(data=base, compact_ratio=args.compact_ratio)
+    results = []
+
+    for delta_size in args.delta_sizes:
+        operations = make_operations(args.registry_size, delta_size, rng)
+        probe = synthetic_mobile(0)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        stats = registry.apply_operations(operations, source=f'bench-{delta_size}')
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        snapshot = registry.current()
+        lookups = 200000
+        lookup_start = time.perf_counter()
+        for _ in range(lookups):
+            probe in snapshot
+        lookup_ns = (time.perf_counter() - lookup_start) / lookups * 1e9
+
+        results.append({
+            'delta_size': delta_size,
+            'version': stats['version'],
+            'compacted': stats['compacted'],
+            'overlay_size': stats['overlay_size'],
+            'reload_ms': round(elapsed * 1000, 2),
+            'peak_alloc_kb': peak // 1024,
+            'lookup_ns': round(lookup_ns, 1)
+        })
+        print(f"delta {delta_size:>8}: {results[-1]['reload_ms']:>9} ms, "
+              f"peak {results[-1]['peak_alloc_kb']:>8} KB, compacted={stats['compacted']}, "
+              f"overlay={stats['overlay_size']}, lookup {results[-1]['lookup_ns']} ns")
+
+    with open(args.output, 'w') as f:
+        json.dump({'registry_size': args.registry_size, 'compact_ratio': args.compact_ratio,
+                   'results': results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Serialization benchmark: cost of turning the admin dashboard, risk
+assessment and honeypot payloads into a JSON response with Flask's default
+provider, the stdlib provider and the orjson provider, plus the
+preserialized honeypot payload.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization --users 5000 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from routes.honeypot_routes import WELCOME_PAYLOAD  # noqa: E402
+from services.risk_service import RiskService  # noqa: E402
+from services.telecom_registry import TelecomRegistry  # noqa: E402
+from services.tracking_service import TrackingService  # noqa: E402
+from utils.json_provider import OrjsonProvider, StdlibProvider, orjson  # noqa: E402
+from utils.synthetic_data import generate_telecom_registry, generate_user_activity, synthetic_mobile  # noqa: E402
+
+
+def build_payloads(users, seed):
+    registry = generate_telecom_registry(users, seed)
+    with tempfile.TemporaryDirectory(prefix='honeykyc-serialization-') as workdir:
+        tracking = TrackingService(os.path.join(workdir, 'user_activity.json'))
+    tracking.data = generate_user_activity(registry, users, seed=seed)
+
+    risk_service = RiskService(registry=TelecomRegistry(data=registry))
+    risk = risk_service.calculate_risk_score(
+        {'name': 'Someone Else', 'mobile': synthetic_mobile(1)},
+        {'is_emulator': True, 'is_new_device': True, 'vpn_detected': True},
+        {'login_time_ms': 800, 'mouse_movements': 0, 'copied_pasted': True, 'honeypot_clicked': True}
+    )
+    risk.update({'session_id': str(uuid.uuid4()), 'verification_time': risk['timestamp']})
+
+    return {
+        'dashboard': tracking.get_admin_dashboard_data(),
+        'risk': risk,
+        'honeypot_enter': {
+            'session_id': str(uuid.uuid4()),
+            'message': 'Welcome to verification sandbox',
+            'fake_balance': '₹10,000',
+            'fake_accounts': ['Savings ****1234', 'Current ****5678']
+        }
+    }
+
+
+def time_per_call(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark JSON response serialization')
+    parser.add_argument('--users', type=int, default=2000, help='Users in the synthetic tracking store')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results_serialization.json')
+    args = parser.parse_args(argv)
+
+    payloads = build_payloads(args.users, args.seed)
+
+    providers = {'flask_default': DefaultJSONProvider, 'stdlib': StdlibProvider}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider
+    else:
+        print('orjson not installed, skipping the orjson provider')
+
+    results = {}
+    for provider_name, provider_class in providers.items():
+        app = Flask(__name__)
+        app.json = provider_class(app)
+        results[provider_name] = {}
+        with app.app_context():
+            for payload_name, payload in payloads.items():
+                # Scale repeats down for the large dashboard payload
+                repeat = max(10, args.repeat // 10) if payload_name == 'dashboard' else args.repeat * 10
+                us = time_per_call(lambda: app.json.response(payload), repeat)
+                size = len(app.json.response(payload).get_data())
+                results[provider_name][payload_name] = {'us_per_call': round(us, 2), 'bytes': size}
+                print(f"{provider_name:>14} {payload_name:>15}: {us:10.1f} us/call, {size:>9} bytes")
+
+    static_fields = {k: v for k, v in payloads['honeypot_enter'].items() if k != 'session_id'}
+    session_id = payloads['honeypot_enter']['session_id']
+    app = Flask(__name__)
+    with app.app_context():
+        us = time_per_call(lambda: WELCOME_PAYLOAD.response(session_id=session_id), args.repeat * 10)
+    assert json.loads(WELCOME_PAYLOAD.encode(session_id=session_id)) == dict(static_fields, session_id=session_id)
+    results['preserialized'] = {'honeypot_enter': {'us_per_call': round(us, 2)}}
+    print(f"{'preserialized':>14} {'honeypot_enter':>15}: {us:10.1f} us/call")
+
+    with open(args.output, 'w') as f:
+        json.dump({'users': args.users, 'repeat': args.repeat, 'results': results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Startup benchmark: import time, create_app time and first-request latency,
+with lazy services and with WARM_UP_SERVICES, against a synthetic registry.
+
+Each measurement runs in a fresh interpreter so import caches don't leak
+between runs.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup --registry-size 500000 --repeat 3
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from utils.synthetic_data import iter_telecom_registry, write_telecom_registry  # noqa: E402
+
+PROBE = r'''
+import json, logging, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+logging.disable(logging.CRITICAL)
+app = create_app({
+    'TELECOM_DATA_PATH': sys.argv[1],
+    'USER_ACTIVITY_PATH': sys.argv[2],
+    'WARM_UP_SERVICES': sys.argv[3] == 'warm',
+    'RATELIMIT_ENABLED': False,
+})
+created = time.perf_counter()
+response = app.test_client().post('/api/verify/name-check',
+                                  json={'name': 'Test User', 'mobile': '6000000000'})
+first = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - created) * 1000,
+    'status': response.status_code,
+}))
+'''
+
+
+def run_probe(registry_path, activity_path, mode):
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE, registry_path, activity_path, mode],
+        cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark app startup')
+    parser.add_argument('--registry-size', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results_startup.json')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='honeykyc-startup-')
+    try:
+        registry_path = os.path.join(workdir, 'telecom.json')
+        activity_path = os.path.join(workdir, 'user_activity.json')
+        write_telecom_registry(registry_path, iter_telecom_registry(args.registry_size, args.seed))
+
+        results = {}
+        for mode in ('lazy', 'warm'):
+            runs = [run_probe(registry_path, activity_path, mode) for _ in range(args.repeat)]
+            results[mode] = {
+                key: round(statistics.median(run[key] for run in runs), 2)
+                for key in ('import_ms', 'create_app_ms', 'first_request_ms')
+            }
+            print(f"{mode:>5}: import {results[mode]['import_ms']} ms, "
+                  f"create_app {results[mode]['create_app_ms']} ms, "
+                  f"first request {results[mode]['first_request_ms']} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump({'registry_size': args.registry_size, 'repeat': args.repeat, 'results': results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
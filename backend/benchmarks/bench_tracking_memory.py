@@ -0,0 +1,116 @@
+"""
+Tracking store memory benchmark: resident size of a synthetic store's
+transactions and suspicious activity as lists of dicts (the JSON layout)
+and as columnar tables (TRACKING_COLUMNAR), plus the cost of the reads and
+writes the app does on them: the dashboard's latest entries, a full scan
+and ledger appends.
+
+Run from the backend directory:
+    python -m benchmarks.bench_tracking_memory --users 20000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.columnar_table import to_columnar  # noqa: E402
+from utils.synthetic_data import generate_telecom_registry, generate_user_activity  # noqa: E402
+
+COLLECTIONS = ('transactions', 'suspicious_activity')
+
+
+def load(text, columnar):
+    """Tracking store parsed from JSON text; returns (store, bytes held, peak bytes while loading)"""
+    gc.collect()
+    tracemalloc.start()
+    data = json.loads(text)
+    # Drop everything but the two collections, so only their layout is measured
+    data = {name: data.get(name, []) for name in COLLECTIONS}
+    if columnar:
+        to_columnar(data)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, current, peak
+
+
+def time_call(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def latest(records, n):
+    if isinstance(records, list):
+        return sorted(records, key=lambda x: x['timestamp'], reverse=True)[:n]
+    return records.latest(n)
+
+
+def scan(records):
+    return sum(t.get('amount', 0) for t in records if t.get('type') == 'debit')
+
+
+def append_entries(records, count):
+    start = (records[-1]['id'] if len(records) else 0) + 1
+    for i in range(count):
+        records.append({'id': start + i, 'timestamp': '2026-01-01T00:00:00.000001', 'user': '9000000000',
+                        'user_name': 'Bench User', 'type': 'debit', 'amount': 100, 'recipient': 'bench',
+                        'status': 'completed', 'session_id': 'bench-session', 'balance_after': 49900})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark tracking store memory by layout')
+    parser.add_argument('--users', type=int, default=5000, help='Users in the synthetic tracking store')
+    parser.add_argument('--sessions-per-user', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--appends', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results_tracking_memory.json')
+    args = parser.parse_args(argv)
+
+    registry = generate_telecom_registry(args.users, args.seed)
+    text = json.dumps(generate_user_activity(registry, args.users, sessions_per_user=args.sessions_per_user,
+                                             seed=args.seed))
+    del registry
+
+    results = {}
+    for layout, columnar in (('dicts', False), ('columnar', True)):
+        data, held, peak = load(text, columnar)
+        transactions = data['transactions']
+        result = {
+            'rows': {name: len(data[name]) for name in COLLECTIONS},
+            'mb_held': round(held / 1e6, 2),
+            'mb_peak_loading': round(peak / 1e6, 2),
+            'latest_30_ms': round(time_call(lambda: latest(transactions, 30), args.repeat), 3),
+            'scan_ms': round(time_call(lambda: scan(transactions), args.repeat), 3),
+        }
+        start = time.perf_counter()
+        append_entries(transactions, args.appends)
+        result['append_us'] = round((time.perf_counter() - start) / args.appends * 1e6, 3)
+        if columnar:
+            result['mb_table_nbytes'] = round(sum(data[name].nbytes() for name in COLLECTIONS) / 1e6, 2)
+        results[layout] = result
+        print(f"{layout:>9}: {result['mb_held']:9.2f} MB held, {result['mb_peak_loading']:9.2f} MB peak, "
+              f"latest(30) {result['latest_30_ms']:8.3f} ms, scan {result['scan_ms']:8.3f} ms, "
+              f"append {result['append_us']:6.3f} us")
+        del data, transactions
+    ratio = results['dicts']['mb_held'] / max(results['columnar']['mb_held'], 0.01)
+    print(f"columnar store is {ratio:.1f}x smaller "
+          f"({results['dicts']['rows']['transactions']} transactions, "
+          f"{results['dicts']['rows']['suspicious_activity']} suspicious entries)")
+
+    with open(args.output, 'w') as f:
+        json.dump({'users': args.users, 'sessions_per_user': args.sessions_per_user, 'results': results}, f,
+                  indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import os
 from datetime import timedelta
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     # Flask settings
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -11,8 +13,146 @@ class Config:
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
     
     # Rate limiting
-    RATELIMIT_ENABLED = True
-    RATELIMIT_DEFAULT = "100 per day"
+    # Token buckets per endpoint class and client IP. Storage is shared by all
+    # workers: memory:// (one process), file:///path (one host), redis://host:port/db
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_DEFAULT = "120 per minute"
+    RATELIMIT_LIMITS = {
+        'behavior': "600 per minute",
+        'verify_start': "10 per minute",
+        'honeypot': "60 per minute",
+        'admin': "30 per minute",
+        'default': RATELIMIT_DEFAULT
+    }
+    RATELIMIT_ENDPOINT_CLASSES = {
+        'verify.track_behavior': 'behavior',
+        'verify.start_verification': 'verify_start',
+        'verify.check_name_match': 'verify_start',
+        'verify.get_admin_dashboard': 'admin',
+        'honeypot.*': 'honeypot',
+        'admin.*': 'admin'
+    }
+    RATELIMIT_EXEMPT = ['health_check', 'metrics.metrics', 'static', 'serve']
+    
+    # Admission control: requests in flight per worker process, split by route class.
+    # Low-priority work is shed first, the last ADMISSION_RESERVED_CRITICAL share of
+    # capacity is kept for critical routes. Queueing delay comes from the proxy's
+    # X-Request-Start header when present.
+    ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+    ADMISSION_CAPACITY = int(os.environ.get('ADMISSION_CAPACITY', 64))
+    ADMISSION_RESERVED_CRITICAL = 0.25
+    ADMISSION_LOW_SHARE = 0.5
+    ADMISSION_QUEUE_TARGET_MS = float(os.environ.get('ADMISSION_QUEUE_TARGET_MS', 50))
+    ADMISSION_ROUTE_CLASSES = {
+        'verify.get_risk_assessment': 'critical',
+        'verify.check_name_match': 'critical',
+        'honeypot.track_honeypot_action': 'low'
+    }
+    ADMISSION_EXEMPT = ['health_check', 'metrics.metrics', 'static', 'serve', 'admin.*']
+    # Sessions whose deferred behavior counts are kept until their next scoring
+    ADMISSION_DEFERRED_MAX_SESSIONS = int(os.environ.get('ADMISSION_DEFERRED_MAX_SESSIONS', 10000))
+    
+    # Reverse proxies whose X-Forwarded-For is trusted (comma-separated IPs/CIDRs)
+    TRUSTED_PROXIES = [p for p in os.environ.get('TRUSTED_PROXIES', '').split(',') if p.strip()]
+    
+    # JSON encoding: 'auto' uses orjson when installed, 'stdlib' forces the json module
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
+    
+    # Data files (resolved against the backend directory, not the CWD)
+    DATA_DIR = os.environ.get('DATA_DIR', os.path.join(BASE_DIR, 'data'))
+    TELECOM_DATA_PATH = os.environ.get('TELECOM_DATA_PATH', os.path.join(DATA_DIR, 'telecom_mock_data.json'))
+    USER_ACTIVITY_PATH = os.environ.get('USER_ACTIVITY_PATH', os.path.join(DATA_DIR, 'user_activity.json'))
+    
+    # IP intelligence sources: CSV (network or start_ip/end_ip, asn, as_org, country,
+    # location, is_vpn, is_hosting; optionally .gz) or .mmdb with maxminddb installed
+    IP_INTEL_PATHS = [p for p in os.environ.get('IP_INTEL_PATHS', os.path.join(DATA_DIR, 'ip_ranges.csv')).split(',')
+                      if p.strip()]
+    IP_INTEL_CACHE_SIZE = int(os.environ.get('IP_INTEL_CACHE_SIZE', 65536))
+    
+    # Streaming detection rules: JSON list of rule definitions (see services/rule_engine.py);
+    # unset uses the built-in rules. State is bounded to RULE_ENGINE_MAX_KEYS keys per rule.
+    DETECTION_RULES_PATH = os.environ.get('DETECTION_RULES_PATH')
+    RULE_ENGINE_MAX_KEYS = int(os.environ.get('RULE_ENGINE_MAX_KEYS', 10000))
+    
+    # Transaction graph snapshot written by python -m tools.rebuild_graph, and how many
+    # flagged sessions paying one recipient mark it as a likely mule account
+    TRANSACTION_GRAPH_PATH = os.environ.get('TRANSACTION_GRAPH_PATH', os.path.join(DATA_DIR, 'transaction_graph.json'))
+    MULE_FAN_IN_THRESHOLD = int(os.environ.get('MULE_FAN_IN_THRESHOLD', 3))
+    
+    # Keep transactions and suspicious activity in columnar tables (typed arrays, dictionary-
+    # encoded strings) instead of a dict per record; see benchmarks/bench_tracking_memory.py
+    TRACKING_COLUMNAR = os.environ.get('TRACKING_COLUMNAR', 'false').lower() == 'true'
+    
+    # Posted transactions are appended to <store>.journal and the store is rewritten every
+    # TRACKING_JOURNAL_COMPACT_EVERY posts (and on other writes); 0 rewrites it on every post
+    TRACKING_JOURNAL_COMPACT_EVERY = int(os.environ.get('TRACKING_JOURNAL_COMPACT_EVERY', 1000))
+    
+    # Tracking shards, comma-separated: name=host:port (a python -m tools.tracking_shard serve
+    # process) or name=path.json (a store in this process). Users are placed by consistent
+    # hashing of their mobile with TRACKING_SHARD_VNODES ring points per shard; unset keeps
+    # the single USER_ACTIVITY_PATH store. The dashboard merges each shard's top-K users.
+    # Shard processes authenticate routers with TRACKING_SHARD_AUTHKEY, which has no default:
+    # remote shards refuse to start or connect without it. A session no shard tracks is
+    # remembered for TRACKING_SESSION_MISS_TTL seconds instead of asking every shard again.
+    TRACKING_SHARDS = [s.strip() for s in os.environ.get('TRACKING_SHARDS', '').split(',') if s.strip()]
+    TRACKING_SHARD_VNODES = int(os.environ.get('TRACKING_SHARD_VNODES', 160))
+    TRACKING_SHARD_AUTHKEY = os.environ.get('TRACKING_SHARD_AUTHKEY')
+    TRACKING_SESSION_MISS_TTL = float(os.environ.get('TRACKING_SESSION_MISS_TTL', 5.0))
+    TRACKING_DASHBOARD_TOP_K = int(os.environ.get('TRACKING_DASHBOARD_TOP_K', 500))
+    
+    # Columnar archive of tracking history (parquet/arrow need pyarrow, npy needs only numpy)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', os.path.join(DATA_DIR, 'archive'))
+    ARCHIVE_FORMAT = os.environ.get('ARCHIVE_FORMAT')
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 30))
+    
+    # Telecom registry hot reload: JSONL delta files dropped into this directory
+    # are applied in name order (polled every REGISTRY_WATCH_INTERVAL seconds, 0 = off)
+    REGISTRY_DELTA_DIR = os.environ.get('REGISTRY_DELTA_DIR', os.path.join(DATA_DIR, 'registry_deltas'))
+    REGISTRY_WATCH_INTERVAL = float(os.environ.get('REGISTRY_WATCH_INTERVAL', 0))
+    REGISTRY_COMPACT_RATIO = 0.05
+    
+    # Where risk scoring and ownership checks run: 'inline' (request thread),
+    # 'thread' or 'process' (worker pool with a per-call deadline; late calls
+    # get a cheap name-match/device/honeypot score flagged as degraded)
+    SCORING_EXECUTOR = os.environ.get('SCORING_EXECUTOR', 'inline')
+    SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', 0)) or None
+    SCORING_DEADLINE_MS = float(os.environ.get('SCORING_DEADLINE_MS', 200))
+    
+    # Shadow scoring: a candidate risk rule set (JSON, same format as tools/backtest.py)
+    # scored off the request path next to the live result and logged to SHADOW_LOG_PATH.
+    # Work beyond SHADOW_SAMPLE_RATE, a full queue or SHADOW_CPU_BUDGET cores is dropped.
+    SHADOW_RULES_PATH = os.environ.get('SHADOW_RULES_PATH')
+    SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', 1.0))
+    SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 256))
+    SHADOW_CPU_BUDGET = float(os.environ.get('SHADOW_CPU_BUDGET', 0.25))
+    SHADOW_LOG_PATH = os.environ.get('SHADOW_LOG_PATH', os.path.join(DATA_DIR, 'shadow_scores.jsonl'))
+    
+    # React build served from a startup manifest with precompressed brotli/gzip variants
+    # (brotli needs the brotli package), written next to each file or under STATIC_CACHE_DIR.
+    # USE_X_SENDFILE hands file bodies to a front proxy that supports X-Sendfile.
+    STATIC_BUILD_DIR = os.environ.get('STATIC_BUILD_DIR', os.path.join(BASE_DIR, '..', 'frontend', 'build'))
+    STATIC_CACHE_DIR = os.environ.get('STATIC_CACHE_DIR')
+    STATIC_PRECOMPRESS = os.environ.get('STATIC_PRECOMPRESS', 'true').lower() == 'true'
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    
+    # Audit log of fraud-relevant events (JSON lines, PII masked, written by a background
+    # thread from a bounded queue; events are dropped rather than blocking when it is full).
+    # Rotates at AUDIT_LOG_MAX_BYTES or AUDIT_LOG_ROTATE_SECONDS, keeping gzipped backups.
+    # Each process writes its own file, named with its pid (fraud_audit.<pid>.jsonl).
+    AUDIT_LOG_PATH = os.environ.get('AUDIT_LOG_PATH', os.path.join(DATA_DIR, 'logs', 'fraud_audit.jsonl'))
+    AUDIT_LOG_MAX_BYTES = int(os.environ.get('AUDIT_LOG_MAX_BYTES', 50 * 1024 * 1024))
+    AUDIT_LOG_ROTATE_SECONDS = int(os.environ.get('AUDIT_LOG_ROTATE_SECONDS', 86400))
+    AUDIT_LOG_BACKUP_COUNT = int(os.environ.get('AUDIT_LOG_BACKUP_COUNT', 14))
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    # Fraction of events kept per high-volume event type (others are always kept)
+    AUDIT_SAMPLE_RATES = {
+        'behavior_event': float(os.environ.get('AUDIT_BEHAVIOR_SAMPLE_RATE', 0.05)),
+        'behavior_frame': float(os.environ.get('AUDIT_BEHAVIOR_SAMPLE_RATE', 0.05))
+    }
+    
+    # Load services at startup instead of on first use (use with pre-forking servers)
+    WARM_UP_SERVICES = os.environ.get('WARM_UP_SERVICES', 'false').lower() == 'true'
     
     # Database settings (for production)
     MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/honeykyc')
@@ -25,6 +165,20 @@ class Config:
         'CRITICAL': 100
     }
     
+    # Prometheus scrapes of /metrics send 'Authorization: Bearer <METRICS_TOKEN>';
+    # the endpoint is off while no token is set
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Admin API (/api/admin/*): the Authorization header must equal this token;
+    # the admin routes are off while it is unset
+    ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN')
+    
+    # Profiling (off by default, can be switched on at runtime)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.0))
+    PROFILING_THRESHOLD_MS = float(os.environ.get('PROFILING_THRESHOLD_MS', 200))
+    PROFILING_MAX_PROFILES = 50
+    
     # Honeypot settings
     HONEYPOT_ENABLED = True
     HONEYPOT_REDIRECT_URL = '/honeypot'
\ No newline at end of file
@@ -0,0 +1,424 @@
+from flask import Blueprint, Response, current_app, g, request, jsonify, stream_with_context
+from functools import wraps
+from services import audit_log
+from services.admission_service import get_admission_controller, get_deferred_behavior
+from services.profiling_service import profiling_service
+from services.service_container import get_services
+from services.archive_service import ArchiveService
+from services.batch_service import BatchVerificationService, decode_upload, iter_text_rows
+import hmac
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+def admin_required(view):
+    """
+    Reject requests without the admin token in the Authorization header.
+    Admin routes are disabled (404) while ADMIN_API_TOKEN is not set.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('ADMIN_API_TOKEN')
+        if not token:
+            return jsonify({'error': 'Resource not found'}), 404
+        provided = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8')):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.record_once
+def _configure_profiling(state):
+    config = state.app.config
+    profiling_service.configure(
+        enabled=config.get('PROFILING_ENABLED', False),
+        sample_rate=config.get('PROFILING_SAMPLE_RATE', 0.0),
+        threshold_ms=config.get('PROFILING_THRESHOLD_MS', 200),
+        max_profiles=config.get('PROFILING_MAX_PROFILES', 50)
+    )
+
+
+# ============================================
+# PROFILING HOOKS
+# ============================================
+
+@admin_bp.before_app_request
+def start_profiling():
+    # Single attribute check when profiling is off
+    if not profiling_service.enabled:
+        return
+    if profiling_service.should_profile(request.endpoint):
+        # None while another request holds the profiler
+        profiler = profiling_service.start()
+        if profiler is not None:
+            g._profiler = profiler
+            g._profile_start = time.perf_counter()
+
+
+@admin_bp.after_app_request
+def stop_profiling(response):
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        duration_ms = (time.perf_counter() - g.pop('_profile_start')) * 1000
+        profile_id = profiling_service.finish(
+            profiler, request.endpoint, request.method, request.path,
+            duration_ms, response.status_code
+        )
+        if profile_id is not None:
+            logger.info("Slow request profiled: %s %s (%.1f ms, profile %s)",
+                        request.method, request.path, duration_ms, profile_id)
+    return response
+
+
+@admin_bp.teardown_app_request
+def release_profiler(exc=None):
+    # after_request didn't run (the request failed before a response was made)
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiling_service.abandon(profiler)
+
+
+# ============================================
+# PROFILING ENDPOINTS
+# ============================================
+
+@admin_bp.route('/profiling', methods=['GET', 'POST'])
+@admin_required
+def profiling_config():
+    """Get or update profiling settings"""
+    if request.method == 'GET':
+        return jsonify(profiling_service.get_config())
+
+    data = request.json or {}
+    try:
+        config = profiling_service.configure(
+            enabled=data.get('enabled'),
+            routes=data.get('routes'),
+            sample_rate=data.get('sample_rate'),
+            threshold_ms=data.get('threshold_ms'),
+            max_profiles=data.get('max_profiles')
+        )
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid profiling settings'}), 400
+
+    logger.info("Profiling settings updated: %s", config)
+    return jsonify(config)
+
+
+@admin_bp.route('/profiles', methods=['GET', 'DELETE'])
+@admin_required
+def list_profiles():
+    """List stored slow-request profiles"""
+    if request.method == 'DELETE':
+        profiling_service.clear()
+        return jsonify({'success': True})
+    return jsonify({'profiles': profiling_service.list_profiles()})
+
+
+@admin_bp.route('/profiles/<int:profile_id>', methods=['GET'])
+@admin_required
+def download_profile(profile_id):
+    """Download a profile as pstats binary (default) or as a text report"""
+    profile = profiling_service.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+
+    if request.args.get('format') == 'text':
+        try:
+            report = profiling_service.render_text(profile, sort_by=request.args.get('sort', 'cumulative'))
+        except KeyError:
+            return jsonify({'error': 'Invalid sort key'}), 400
+        return Response(report, mimetype='text/plain')
+
+    # Loadable with pstats.Stats('<file>') or snakeviz
+    return Response(
+        profile['stats'],
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename=profile_{profile_id}.prof'}
+    )
+
+
+# ============================================
+# ADMISSION CONTROL
+# ============================================
+
+@admin_bp.route('/admission', methods=['GET'])
+@admin_required
+def get_admission_status():
+    """In-flight requests, queueing delay and shed counts per route class"""
+    admission = get_admission_controller()
+    if admission is None:
+        return jsonify({'enabled': False})
+    deferred = get_deferred_behavior()
+    return jsonify(dict(admission.get_status(), enabled=True,
+                        deferred_behavior={'sessions': len(deferred), 'dropped': deferred.dropped}))
+
+
+@admin_bp.route('/scoring', methods=['GET'])
+@admin_required
+def get_scoring_status():
+    """Scoring executor kind, pending calls, timeouts and fallbacks"""
+    return jsonify(get_services().scoring_executor.get_status())
+
+
+@admin_bp.route('/static-assets', methods=['GET'])
+@admin_required
+def static_assets_status():
+    """Files in the static asset manifest and their precompressed variants"""
+    return jsonify(current_app.extensions['honeykyc_static_assets'].get_status())
+
+
+@admin_bp.route('/audit', methods=['GET'])
+@admin_required
+def audit_status():
+    """Audit log writer queue depth, drops and sampling"""
+    return jsonify(audit_log.get_status())
+
+
+# ============================================
+# TELECOM REGISTRY RELOAD
+# ============================================
+
+@admin_bp.route('/registry', methods=['GET'])
+@admin_required
+def registry_status():
+    """Current registry version, size and delta status"""
+    return jsonify(get_services().telecom_registry.get_status())
+
+
+@admin_bp.route('/registry/reload', methods=['POST'])
+@admin_required
+def reload_registry():
+    """
+    Apply registry changes without restarting:
+    - {"full": true} re-reads the base file
+    - {"delta_files": ["20260301.jsonl"]} applies files from REGISTRY_DELTA_DIR
+    - {"operations": [...]} applies inline delta operations
+    - {} applies all pending delta files
+    """
+    registry = get_services().telecom_registry
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    try:
+        if data.get('full'):
+            results = [registry.reload_full()]
+        elif data.get('operations'):
+            if not isinstance(data['operations'], list):
+                return jsonify({'error': 'operations must be a list'}), 400
+            results = [registry.apply_operations(data['operations'])]
+        elif data.get('delta_files'):
+            results = []
+            for name in data['delta_files']:
+                # Only files inside the configured delta directory may be applied
+                path = os.path.join(registry.delta_dir or '', os.path.basename(name))
+                if not os.path.isfile(path):
+                    return jsonify({'error': f'Delta file not found: {name}'}), 404
+                results.append(registry.apply_delta_file(path))
+        else:
+            results = registry.apply_pending_deltas()
+    except (OSError, ValueError) as e:
+        logger.error("Registry reload failed: %s", e)
+        return jsonify({'error': f'Registry reload failed: {e}'}), 400
+
+    return jsonify({'version': registry.version, 'reloads': results})
+
+
+# ============================================
+# IP INTELLIGENCE
+# ============================================
+
+@admin_bp.route('/ip-intel', methods=['GET'])
+@admin_required
+def ip_intel_status():
+    """Index size, sources and cache stats, or the intel for ?ip="""
+    index = get_services().ip_intel
+    ip = request.args.get('ip')
+    if ip:
+        intel = index.lookup(ip)
+        if intel is None:
+            return jsonify({'error': 'No data for this address'}), 404
+        return jsonify(intel)
+    return jsonify(index.get_status())
+
+
+@admin_bp.route('/ip-intel/reload', methods=['POST'])
+@admin_required
+def reload_ip_intel():
+    """Re-read the IP intelligence sources and swap in the new index"""
+    try:
+        stats = get_services().ip_intel.reload()
+    except (OSError, ValueError) as e:
+        logger.error("IP intelligence reload failed: %s", e)
+        return jsonify({'error': f'IP intelligence reload failed: {e}'}), 400
+    return jsonify(stats)
+
+
+# ============================================
+# DETECTION RULES
+# ============================================
+
+@admin_bp.route('/rules', methods=['GET', 'PUT'])
+@admin_required
+def detection_rules():
+    """
+    GET: active rules with per-rule key counts and match stats.
+    PUT: replace the rule set with a JSON list of rule definitions
+    (compiled before the swap; pattern state starts empty).
+    """
+    engine = get_services().rule_engine
+    if request.method == 'PUT':
+        rules = request.json
+        if not isinstance(rules, list):
+            return jsonify({'error': 'Expected a JSON list of rules'}), 400
+        try:
+            engine.load_rules(rules)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        logger.info("Detection rules replaced (%d rules)", len(rules))
+    return jsonify(engine.get_status())
+
+
+# ============================================
+# SHADOW SCORING
+# ============================================
+
+@admin_bp.route('/shadow', methods=['GET', 'PUT', 'DELETE'])
+@admin_required
+def shadow_scoring():
+    """
+    GET: shadow scorer status, agreement with live decisions and recent comparisons (?recent=N).
+    PUT: start shadow scoring a candidate rule set (JSON object, see tools/backtest.py).
+    DELETE: stop shadow scoring.
+    """
+    scorer = get_services().shadow_scorer
+    if request.method == 'PUT':
+        rule_set = request.get_json(silent=True)
+        if not isinstance(rule_set, dict):
+            return jsonify({'error': 'Expected a JSON object rule set'}), 400
+        try:
+            scorer.set_rule_set(rule_set)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    elif request.method == 'DELETE':
+        scorer.set_rule_set(None)
+    return jsonify(scorer.get_status(recent=request.args.get('recent', 20, type=int)))
+
+
+# ============================================
+# BATCH VERIFICATION
+# ============================================
+
+@admin_bp.route('/batch/verify', methods=['POST'])
+@admin_required
+def batch_verify():
+    """
+    Verify an uploaded CSV (name,mobile header) or JSONL file and stream
+    one JSON result per line, followed by a summary line. For very large
+    nightly files use the process-pool CLI: python -m tools.batch_verify
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, filename = upload.stream, upload.filename or ''
+    else:
+        stream, filename = request.stream, ''
+
+    is_jsonl = filename.endswith('.jsonl') or 'ndjson' in (request.content_type or '')
+    rows = iter_text_rows(decode_upload(stream), 'jsonl' if is_jsonl else 'csv')
+
+    services = get_services()
+    batch_service = BatchVerificationService(services.ownership_service, services.telecom_service)
+
+    def generate():
+        counts = {'verified': 0, 'review': 0, 'failed': 0, 'invalid': 0}
+        start = time.perf_counter()
+        try:
+            for result in batch_service.verify_rows(rows):
+                counts[result['status']] += 1
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        except (ValueError, UnicodeDecodeError) as e:
+            logger.error("Batch verification aborted: %s", e)
+            yield json.dumps({'error': f'Invalid input: {e}'}) + '\n'
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        yield json.dumps({'summary': {
+            'rows': total,
+            'counts': counts,
+            'elapsed_s': round(elapsed, 3),
+            'rows_per_second': round(total / elapsed, 1) if elapsed else 0.0
+        }}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+# ============================================
+# TRACKING ARCHIVE
+# ============================================
+
+@admin_bp.route('/archive/compact', methods=['POST'])
+@admin_required
+def compact_tracking_history():
+    """Move closed sessions and old history into the columnar archive"""
+    config = current_app.config
+    data = request.json or {}
+    tracking = get_services().tracking_service
+    if tracking.graph is None:
+        return jsonify({'error': 'Tracking is sharded; run tools.archive_tracking against each shard store'}), 409
+    try:
+        archive = ArchiveService(config['ARCHIVE_DIR'], config.get('ARCHIVE_FORMAT'))
+        written = archive.compact(tracking,
+                                  older_than_days=int(data.get('older_than_days', config['ARCHIVE_AFTER_DAYS'])))
+    except (RuntimeError, OSError, ValueError) as e:
+        logger.error("Archive compaction failed: %s", e)
+        return jsonify({'error': f'Archive compaction failed: {e}'}), 500
+    return jsonify({'success': True, 'archived': written})
+
+
+# ============================================
+# TRACKING SHARDS
+# ============================================
+
+@admin_bp.route('/tracking/shards', methods=['GET'])
+@admin_required
+def tracking_shards():
+    """Tracking shards and their session counts (sharded tracking only)"""
+    tracking = get_services().tracking_service
+    if not hasattr(tracking, 'ring'):
+        return jsonify({'sharded': False, 'sessions': tracking.session_count()})
+    return jsonify(dict(tracking.get_status(), sharded=True))
+
+
+# ============================================
+# TRANSACTION GRAPH
+# ============================================
+
+@admin_bp.route('/graph', methods=['GET'])
+@admin_required
+def graph_status():
+    """Graph size and the recipients with the most flagged senders"""
+    graph = get_services().tracking_service.graph
+    if graph is None:
+        return jsonify({'error': 'Transaction graph is per shard when tracking is sharded'}), 409
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify(dict(graph.get_status(), top_recipients=graph.top_recipients(limit)))
+
+
+@admin_bp.route('/graph/recipients/<path:recipient>', methods=['GET'])
+@admin_required
+def recipient_fan_in(recipient):
+    """Distinct senders, flagged sessions and amount received by one account"""
+    graph = get_services().tracking_service.graph
+    if graph is None:
+        return jsonify({'error': 'Transaction graph is per shard when tracking is sharded'}), 409
+    fan_in = graph.recipient_fan_in(recipient)
+    if fan_in is None:
+        return jsonify({'error': 'Recipient not found'}), 404
+    return jsonify(fan_in)
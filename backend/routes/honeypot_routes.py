@@ -1,13 +1,45 @@
 from flask import Blueprint, request, jsonify, session
 from datetime import datetime
 import json
+import math
 import uuid
+from services.admission_service import get_admission_controller
+from services.service_container import get_services
+from utils.client_ip import get_client_ip
+from utils.json_provider import PreserializedPayload
 
 honeypot_bp = Blueprint('honeypot', __name__, url_prefix='/api/honeypot')
 
 # Store honeypot sessions
 honeypot_sessions = {}
 
+# Static parts of honeypot responses, encoded once
+WELCOME_PAYLOAD = PreserializedPayload({
+    'message': 'Welcome to verification sandbox',
+    'fake_balance': '₹10,000',
+    'fake_accounts': ['Savings ****1234', 'Current ****5678']
+})
+FRAUD_CONFIRMED_PAYLOAD = PreserializedPayload({
+    'status': 'fraud_confirmed',
+    'message': 'Suspicious activity detected',
+    'redirect': '/blocked'
+})
+TRANSFER_PAYLOAD = PreserializedPayload({
+    'status': 'processing',
+    'message': 'Transfer initiated (demo)',
+    'fake_success': True
+})
+
+def _transfer_amount(value):
+    """Submitted transfer amount as a number, or None if it isn't a finite, non-negative one"""
+    if isinstance(value, bool):
+        return None
+    try:
+        amount = float(value or 0)
+    except (TypeError, ValueError):
+        return None
+    return amount if math.isfinite(amount) and amount >= 0 else None
+
 @honeypot_bp.route('/enter', methods=['POST'])
 def enter_honeypot():
     """Log when user enters honeypot"""
@@ -16,18 +48,15 @@ def enter_honeypot():
     
     honeypot_sessions[session_id] = {
         'entry_time': datetime.now().isoformat(),
-        'ip_address': request.remote_addr,
+        'ip_address': get_client_ip(),
         'user_agent': request.headers.get('User-Agent'),
         'actions': [],
         'fraud_score': 0
     }
+    # Transfers this session made before being caught count towards recipient fan-in
+    get_services().tracking_service.flag_session(session_id)
     
-    return jsonify({
-        'session_id': session_id,
-        'message': 'Welcome to verification sandbox',
-        'fake_balance': '₹10,000',
-        'fake_accounts': ['Savings ****1234', 'Current ****5678']
-    })
+    return WELCOME_PAYLOAD.response(session_id=session_id)
 
 @honeypot_bp.route('/track', methods=['POST'])
 def track_honeypot_action():
@@ -46,18 +75,29 @@ def track_honeypot_action():
     }
     
     honeypot_sessions[session_id]['actions'].append(action)
+    # Streaming rules (sensitive-action bursts, automation) confirm fraud
+    matches = get_services().tracking_service.process_event(
+        'honeypot_action', session_id, action_type=action['type'], page=action['page'])
+    if any(m['severity'] == 'critical' for m in matches):
+        honeypot_sessions[session_id]['fraud_confirmed'] = True
+    
+    # Under overload only record the action; scoring catches up on the next call
+    admission = get_admission_controller()
+    if admission is not None and admission.overloaded():
+        admission.record_deferred()
+        honeypot_sessions[session_id]['score_stale'] = True
+        return jsonify({
+            'status': 'tracked',
+            'fraud_score': honeypot_sessions[session_id]['fraud_score']
+        })
     
     # Calculate fraud score based on actions
     fraud_score = calculate_fraud_score(honeypot_sessions[session_id]['actions'])
     honeypot_sessions[session_id]['fraud_score'] = fraud_score
     
     # Check if fraudster is trying to do suspicious things
-    if is_fraud_pattern_detected(honeypot_sessions[session_id]):
-        return jsonify({
-            'status': 'fraud_confirmed',
-            'message': 'Suspicious activity detected',
-            'redirect': '/blocked'
-        })
+    if honeypot_sessions[session_id].get('fraud_confirmed'):
+        return FRAUD_CONFIRMED_PAYLOAD.response()
     
     return jsonify({
         'status': 'tracked',
@@ -73,21 +113,30 @@ def fake_transfer():
     if session_id not in honeypot_sessions:
         return jsonify({'error': 'Invalid session'}), 400
     
+    # Checked before anything is recorded: a bad amount must not reach the graph or the store
+    amount = _transfer_amount(data.get('amount'))
+    to_account = data.get('to_account')
+    if amount is None:
+        return jsonify({'error': 'Invalid amount'}), 400
+    if to_account is not None and not isinstance(to_account, str):
+        return jsonify({'error': 'Invalid account'}), 400
+    
     # Log this as suspicious activity
     honeypot_sessions[session_id]['actions'].append({
         'type': 'transfer_attempt',
-        'amount': data.get('amount'),
-        'to_account': data.get('to_account'),
+        'amount': amount,
+        'to_account': to_account,
         'timestamp': datetime.now().isoformat()
     })
+    get_services().tracking_service.process_event(
+        'honeypot_action', session_id, action_type='transfer_attempt',
+        amount=amount, to_account=to_account)
+    if to_account:
+        get_services().tracking_service.track_honeypot_transfer(
+            session_id, to_account, amount, honeypot_sessions[session_id]['ip_address'])
     
     # This is highly suspicious - fraudster trying to steal money
-    return jsonify({
-        'status': 'processing',
-        'message': 'Transfer initiated (demo)',
-        'transaction_id': f'TXN{datetime.now().strftime("%Y%m%d%H%M%S")}',
-        'fake_success': True
-    })
+    return TRANSFER_PAYLOAD.response(transaction_id=f'TXN{datetime.now().strftime("%Y%m%d%H%M%S")}')
 
 @honeypot_bp.route('/fake-balance', methods=['GET'])
 def fake_balance():
@@ -119,6 +168,8 @@ def generate_fraud_report():
         return jsonify({'error': 'Invalid session'}), 400
     
     session_data = honeypot_sessions[session_id]
+    if session_data.pop('score_stale', False):
+        session_data['fraud_score'] = calculate_fraud_score(session_data['actions'])
     
     report = {
         'fraud_score': session_data['fraud_score'],
@@ -150,30 +201,6 @@ def calculate_fraud_score(actions):
     
     return min(score, 100)
 
-def is_fraud_pattern_detected(session):
-    """Detect fraud patterns"""
-    actions = session['actions']
-    
-    # Check for rapid succession of sensitive actions
-    sensitive_actions = [a for a in actions if a['type'] in ['transfer_attempt', 'view_balance', 'click_admin_link']]
-    
-    if len(sensitive_actions) > 3:
-        return True
-    
-    # Check for automation patterns
-    timestamps = [a['timestamp'] for a in actions]
-    if len(timestamps) > 5:
-        # Calculate average time between actions
-        from datetime import datetime
-        times = [datetime.fromisoformat(t) for t in timestamps]
-        intervals = [(times[i+1] - times[i]).total_seconds() for i in range(len(times)-1)]
-        avg_interval = sum(intervals) / len(intervals)
-        
-        if avg_interval < 0.5:  # Less than 0.5 seconds between actions
-            return True
-    
-    return False
-
 def identify_suspicious_patterns(actions):
     """Identify specific suspicious patterns"""
     patterns = []
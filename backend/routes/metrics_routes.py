@@ -0,0 +1,78 @@
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from services.metrics_service import metrics_service
+import hmac
+import time
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Blueprints whose endpoints get per-route request metrics
+INSTRUMENTED_BLUEPRINTS = ('verify', 'honeypot')
+
+# endpoint -> (latency histogram, {status_code: counter}), built at startup
+_route_metrics = {}
+
+
+def _register_route(endpoint):
+    histogram = metrics_service.histogram(
+        'honeykyc_request_duration_seconds',
+        'Request latency per endpoint',
+        endpoint=endpoint
+    )
+    _route_metrics[endpoint] = (histogram, {})
+    return _route_metrics[endpoint]
+
+
+@metrics_bp.record_once
+def _preregister_routes(state):
+    """Pre-create series for every instrumented endpoint so requests only do lookups"""
+    # Register this blueprint after the instrumented ones so their views exist
+    for endpoint in list(state.app.view_functions):
+        if endpoint.split('.', 1)[0] in INSTRUMENTED_BLUEPRINTS:
+            _register_route(endpoint)
+
+
+@metrics_bp.before_app_request
+def start_timer():
+    g._metrics_start = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def record_request(response):
+    start = g.pop('_metrics_start', None)
+    endpoint = request.endpoint
+    if start is None or endpoint is None:
+        return response
+
+    series = _route_metrics.get(endpoint)
+    if series is None:
+        if endpoint.split('.', 1)[0] not in INSTRUMENTED_BLUEPRINTS:
+            return response
+        series = _register_route(endpoint)
+
+    histogram, status_counters = series
+    histogram.observe(time.perf_counter() - start)
+
+    status = response.status_code
+    counter = status_counters.get(status)
+    if counter is None:
+        counter = status_counters.setdefault(status, metrics_service.counter(
+            'honeykyc_requests_total',
+            'Requests per endpoint and status code',
+            endpoint=endpoint,
+            status=str(status)
+        ))
+    counter.inc()
+    return response
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose metrics in Prometheus text format (bearer METRICS_TOKEN; off when unset)"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return jsonify({'error': 'Resource not found'}), 404
+    provided = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(provided.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics_service.render_prometheus(),
+                    mimetype='text/plain; version=0.0.4')
@@ -1,8 +1,15 @@
 from flask import Blueprint, request, jsonify
-from services.risk_service import RiskService
-from services.telecom_service import TelecomService
-from services.ownership_service import OwnershipService
-from services.tracking_service import tracking_service
+from services.admission_service import get_admission_controller, get_deferred_behavior
+from services.audit_log import audit_event
+from services.keystroke_dynamics import decode_keystrokes, new_session_stats, update_session_stats
+from services.ledger_service import IdempotencyConflict, InvalidTransaction
+from services.pointer_dynamics import decode_points, new_summary, update_summary
+from services.risk_service import masked_risk_factors, scoring_features
+from services.service_container import get_services
+from utils import behavior_frames
+from utils.client_ip import get_client_ip
+import secrets
+import time
 import uuid
 from datetime import datetime
 import logging
@@ -14,14 +21,161 @@ logger = logging.getLogger(__name__)
 # Create blueprint FIRST
 verify_bp = Blueprint('verify', __name__)
 
-# Initialize services
-risk_service = RiskService()
-telecom_service = TelecomService()
-ownership_service = OwnershipService()
+# Services are created lazily per app, see services/service_container.py
 
 # Store session data (in production, use database)
 user_sessions = {}
 
+# Numeric session handles for binary behavior frames -> session ID
+session_handles = {}
+
+# Behavior events that only bump a counter; under overload they are deferred
+DEFERRABLE_BEHAVIORS = {
+    'mouse_movement': 'mouse_movements',
+    'scroll_behavior': 'scroll_count'
+}
+
+
+def _degraded_fast_path(session_id):
+    """
+    Cheap response for sessions already flagged for the honeypot while the
+    server is overloaded: reuse their last risk result instead of doing
+    more work for them.
+    """
+    admission = get_admission_controller()
+    if admission is None or not admission.overloaded():
+        return None
+    risk_result = user_sessions[session_id].get('risk_result')
+    if not risk_result or not risk_result.get('needs_honeypot'):
+        return None
+    return risk_result
+
+
+def _apply_deferred_behavior(session_id, behavior):
+    """Fold behavior events deferred under load back in before scoring"""
+    deferred = get_deferred_behavior()
+    if deferred is not None:
+        deferred.apply(session_id, behavior)
+
+
+def _record_behavior(session_id, behavior, behavior_type, value=1, text=None, timestamp=None):
+    """
+    Apply one behavior event to the session's behavior data.
+    value is the duration for login_speed and the number of coalesced
+    events for counters. Returns False for unknown event types.
+    """
+    if behavior_type == 'login_speed':
+        behavior['login_time_ms'] = value or 0
+        
+    elif behavior_type == 'page_view':
+        timestamp = timestamp or datetime.now()
+        if 'pages_visited' not in behavior:
+            behavior['pages_visited'] = []
+        # Page times only move forward, whatever mix of frame (client) and JSON (server) times arrives
+        if behavior['pages_visited']:
+            timestamp = max(timestamp, datetime.fromisoformat(behavior['pages_visited'][-1]['timestamp']))
+        behavior['pages_visited'].append({
+            'page': text,
+            'timestamp': timestamp.isoformat()
+        })
+        
+        # Calculate pages per minute
+        if len(behavior['pages_visited']) > 1:
+            first_time = datetime.fromisoformat(behavior['pages_visited'][0]['timestamp'])
+            # Pages sent at the same instant count as a second apart, not as no rate at all
+            minutes = max((timestamp - first_time).total_seconds(), 1) / 60
+            behavior['pages_visited_per_minute'] = len(behavior['pages_visited']) / minutes
+        
+    elif behavior_type == 'honeypot_click':
+        behavior['honeypot_clicked'] = True
+        behavior['honeypot_element'] = text or 'unknown'
+        logger.warning("HONEYPOT TRIGGERED for session: %s", session_id)
+        audit_event('honeypot_triggered', level=logging.WARNING, session_id=session_id, element=behavior['honeypot_element'])
+        
+    elif behavior_type == 'mouse_movement':
+        behavior['mouse_movements'] = behavior.get('mouse_movements', 0) + max(1, value)
+        
+    elif behavior_type == 'pointer_trajectory':
+        # value is an (n, 3) array of x, y, t samples; only the summary is kept
+        summary = behavior.get('pointer_summary')
+        if summary is None:
+            summary = behavior['pointer_summary'] = new_summary()
+        update_summary(summary, value)
+        behavior['mouse_movements'] = behavior.get('mouse_movements', 0) + len(value)
+        
+    elif behavior_type == 'keystroke_timing':
+        # value is (dwell times, flight times) for one input field
+        stats = behavior.get('keystroke_stats')
+        if stats is None:
+            stats = behavior['keystroke_stats'] = new_session_stats()
+        update_session_stats(stats, (text or 'unknown')[:32], *value)
+        
+    elif behavior_type == 'copy_paste':
+        behavior['copied_pasted'] = True
+        
+    elif behavior_type == 'login_attempt':
+        behavior['login_attempts'] = behavior.get('login_attempts', 0) + max(1, value)
+        
+    elif behavior_type == 'tab_switch':
+        behavior['tab_switches'] = behavior.get('tab_switches', 0) + max(1, value)
+        
+    elif behavior_type == 'dev_tools_detected':
+        behavior['dev_tools_opened'] = True
+        logger.warning("Dev tools detected for session: %s", session_id)
+        audit_event('dev_tools_detected', level=logging.WARNING, session_id=session_id)
+        
+    elif behavior_type == 'automation_detected':
+        behavior['automation_detected'] = True
+        logger.warning("Automation tool detected for session: %s", session_id)
+        audit_event('automation_detected', level=logging.WARNING, session_id=session_id)
+        
+    elif behavior_type == 'scroll_behavior':
+        behavior['scroll_count'] = behavior.get('scroll_count', 0) + max(1, value)
+        
+    else:
+        return False
+    
+    # Only event types some detection rule looks at are forwarded
+    tracking = get_services().tracking_service
+    if tracking.wants_event(behavior_type):
+        session = user_sessions.get(session_id, {})
+        tracking.process_event(behavior_type, session_id, session.get('user_data', {}).get('mobile'),
+                               page=text if behavior_type == 'page_view' else None,
+                               element=text if behavior_type == 'honeypot_click' else None)
+    return True
+
+
+def _honeypot_response(session_id, behavior):
+    """IMMEDIATE FRAUD DETECTION once a honeypot element was touched"""
+    try:
+        _apply_deferred_behavior(session_id, behavior)
+        session_data = user_sessions[session_id]
+        keystroke_profile = get_services().tracking_service.get_keystroke_profile(
+            session_data['user_data'].get('mobile'))
+        risk_result = get_services().risk_service.calculate_risk_score(
+            session_data['user_data'],
+            session_data['device_data'],
+            behavior,
+            keystroke_profile=keystroke_profile
+        )
+        session_data['risk_result'] = risk_result
+        get_services().shadow_scorer.submit(
+            'honeypot', session_id, risk_result,
+            lambda: _scoring_inputs(session_data, keystroke_profile))
+        
+        return jsonify({
+            'status': 'fraud_detected',
+            'risk_result': risk_result,
+            'redirect': '/honeypot',
+            'message': 'Suspicious activity detected'
+        })
+    except Exception as e:
+        logger.error("Error calculating risk for honeypot: %s", e)
+        return jsonify({
+            'status': 'fraud_detected',
+            'redirect': '/honeypot'
+        })
+
 # ============================================
 # EXISTING ENDPOINTS (Keep all your existing ones)
 # ============================================
@@ -40,8 +194,13 @@ def start_verification():
             logger.error("Missing required fields")
             return jsonify({'error': 'Name and mobile number are required'}), 400
         
-        # Generate session ID
+        # Generate session ID (and a compact handle for binary telemetry;
+        # 52 bits so it survives a round trip through a JavaScript number)
         session_id = str(uuid.uuid4())
+        session_handle = secrets.randbits(52) + 1
+        while session_handle in session_handles:
+            session_handle = secrets.randbits(52) + 1
+        session_handles[session_handle] = session_id
         
         # Store initial data
         user_sessions[session_id] = {
@@ -56,22 +215,38 @@ def start_verification():
                 'login_start_time': datetime.now().isoformat()
             },
             'timestamp': datetime.now().isoformat(),
-            'ip_address': request.remote_addr,
-            'user_agent': request.headers.get('User-Agent')
+            'ip_address': get_client_ip(),
+            'user_agent': request.headers.get('User-Agent'),
+            'session_handle': session_handle
         }
         
-        logger.info(f"Session created: {session_id} for user: {data.get('name')}, mobile: {data.get('mobile')}")
+        # Personal data only goes to the audit log, masked
+        logger.info("Session created: %s", session_id)
+        audit_event('session_started', pii={'name': data.get('name'), 'mobile': data.get('mobile')},
+                    session_id=session_id, ip_address=user_sessions[session_id]['ip_address'])
         
         return jsonify({
             'success': True,
             'session_id': session_id,
+            'session_handle': session_handle,
             'message': 'Verification started successfully'
         })
         
     except Exception as e:
-        logger.error(f"Error in start_verification: {str(e)}")
+        logger.error("Error in start_verification: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
+def _ip_risk_fields(ip_address):
+    """VPN, hosting and geo fields for a client IP from the local IP intelligence index"""
+    intel = get_services().ip_intel.lookup(ip_address) or {}
+    return {
+        'vpn_detected': intel.get('is_vpn', False),
+        'ip_hosting': intel.get('is_hosting', False),
+        'ip_country': intel.get('country'),
+        'ip_asn': intel.get('asn'),
+        'ip_location': intel.get('location', 'Unknown Location')
+    }
+
 @verify_bp.route('/api/verify/device', methods=['POST'])
 def register_device():
     """Register device fingerprint"""
@@ -86,7 +261,7 @@ def register_device():
             return jsonify({'error': 'Session ID required'}), 400
             
         if session_id not in user_sessions:
-            logger.warning(f"Invalid session ID: {session_id}")
+            logger.warning("Invalid session ID: %s", session_id)
             return jsonify({'error': 'Invalid session'}), 400
         
         # Check if device is emulator
@@ -110,11 +285,13 @@ def register_device():
             'timezone': data.get('timezone'),
             'is_emulator': is_emulator,
             'is_new_device': is_new_device,
-            'vpn_detected': data.get('vpn_detected', False),
+            # Kept for reference only; VPN/geo risk comes from the server-side lookup
+            'client_reported_vpn': bool(data.get('vpn_detected', False)),
             'timestamp': datetime.now().isoformat()
         }
+        user_sessions[session_id]['device_data'].update(_ip_risk_fields(get_client_ip()))
         
-        logger.info(f"Device registered for session: {session_id}")
+        logger.info("Device registered for session: %s", session_id)
         
         return jsonify({
             'success': True,
@@ -122,12 +299,14 @@ def register_device():
         })
         
     except Exception as e:
-        logger.error(f"Error in register_device: {str(e)}")
+        logger.error("Error in register_device: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @verify_bp.route('/api/verify/behavior', methods=['POST'])
 def track_behavior():
-    """Track user behavior"""
+    """Track user behavior (JSON event, or a batch as a binary frame)"""
+    if request.mimetype == behavior_frames.MIMETYPE:
+        return _track_behavior_frame()
     try:
         data = request.json
         if not data:
@@ -141,7 +320,7 @@ def track_behavior():
             return jsonify({'error': 'Session ID required'}), 400
             
         if session_id not in user_sessions:
-            logger.warning(f"Invalid session ID in behavior tracking: {session_id}")
+            logger.warning("Invalid session ID in behavior tracking: %s", session_id)
             return jsonify({'error': 'Invalid session'}), 400
         
         # Get behavior data
@@ -151,82 +330,67 @@ def track_behavior():
         if not behavior_type:
             return jsonify({'error': 'Behavior type required'}), 400
         
-        logger.info(f"Tracking behavior: {behavior_type} for session: {session_id}")
-        
-        # Handle different behavior types
-        if behavior_type == 'login_speed':
-            behavior['login_time_ms'] = data.get('duration', 0)
-            
-        elif behavior_type == 'page_view':
-            if 'pages_visited' not in behavior:
-                behavior['pages_visited'] = []
-            behavior['pages_visited'].append({
-                'page': data.get('page'),
-                'timestamp': datetime.now().isoformat()
+        cached_risk = _degraded_fast_path(session_id)
+        if cached_risk is not None:
+            return jsonify({
+                'status': 'fraud_detected',
+                'risk_result': cached_risk,
+                'redirect': '/honeypot',
+                'degraded': True
             })
-            
-            # Calculate pages per minute
-            if len(behavior['pages_visited']) > 1:
-                first_time = datetime.fromisoformat(behavior['pages_visited'][0]['timestamp'])
-                last_time = datetime.now()
-                minutes = (last_time - first_time).total_seconds() / 60
-                if minutes > 0:
-                    behavior['pages_visited_per_minute'] = len(behavior['pages_visited']) / minutes
-            
-        elif behavior_type == 'honeypot_click':
-            behavior['honeypot_clicked'] = True
-            behavior['honeypot_element'] = data.get('element', 'unknown')
-            
-            logger.warning(f"HONEYPOT TRIGGERED for session: {session_id}")
-            
-            # IMMEDIATE FRAUD DETECTION
-            try:
-                risk_result = risk_service.calculate_risk_score(
-                    user_sessions[session_id]['user_data'],
-                    user_sessions[session_id]['device_data'],
-                    behavior
-                )
-                
+        
+        if behavior_type in DEFERRABLE_BEHAVIORS:
+            admission = get_admission_controller()
+            if admission is not None and admission.overloaded():
+                get_deferred_behavior().add(session_id, DEFERRABLE_BEHAVIORS[behavior_type])
+                admission.record_deferred()
                 return jsonify({
-                    'status': 'fraud_detected',
-                    'risk_result': risk_result,
-                    'redirect': '/honeypot',
-                    'message': 'Suspicious activity detected'
-                })
-            except Exception as e:
-                logger.error(f"Error calculating risk for honeypot: {str(e)}")
+                    'success': True,
+                    'status': 'deferred',
+                    'behavior_type': behavior_type
+                }), 202
+        
+        if behavior_type == 'pointer_trajectory':
+            try:
+                points = decode_points(data)
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': f'Invalid pointer trajectory: {e}'}), 400
+            admission = get_admission_controller()
+            if admission is not None and admission.overloaded():
+                # Keep the movement count, skip feature extraction for this batch
+                get_deferred_behavior().add(session_id, 'mouse_movements', len(points))
+                admission.record_deferred()
                 return jsonify({
-                    'status': 'fraud_detected',
-                    'redirect': '/honeypot'
-                })
-            
-        elif behavior_type == 'mouse_movement':
-            behavior['mouse_movements'] = behavior.get('mouse_movements', 0) + 1
-            
-        elif behavior_type == 'copy_paste':
-            behavior['copied_pasted'] = True
-            
-        elif behavior_type == 'login_attempt':
-            behavior['login_attempts'] = behavior.get('login_attempts', 0) + 1
-            
-        elif behavior_type == 'tab_switch':
-            behavior['tab_switches'] = behavior.get('tab_switches', 0) + 1
-            
-        elif behavior_type == 'dev_tools_detected':
-            behavior['dev_tools_opened'] = True
-            logger.warning(f"Dev tools detected for session: {session_id}")
-            
-        elif behavior_type == 'automation_detected':
-            behavior['automation_detected'] = True
-            logger.warning(f"Automation tool detected for session: {session_id}")
-            
-        elif behavior_type == 'scroll_behavior':
-            behavior['scroll_count'] = behavior.get('scroll_count', 0) + 1
-            
+                    'success': True,
+                    'status': 'deferred',
+                    'behavior_type': behavior_type
+                }), 202
+        
+        logger.debug("Tracking behavior: %s for session: %s", behavior_type, session_id)
+        audit_event('behavior_event', session_id=session_id, behavior_type=behavior_type)
+        
+        text = data.get('page')
+        if behavior_type == 'login_speed':
+            value = data.get('duration', 0)
+        elif behavior_type == 'pointer_trajectory':
+            value = points
+        elif behavior_type == 'keystroke_timing':
+            try:
+                value = decode_keystrokes(data)
+            except ValueError as e:
+                return jsonify({'error': f'Invalid keystroke timing: {e}'}), 400
+            text = str(data.get('field', 'unknown'))
         else:
-            logger.warning(f"Unknown behavior type: {behavior_type}")
+            value = 1
+        if behavior_type == 'honeypot_click':
+            text = data.get('element', 'unknown')
+        if not _record_behavior(session_id, behavior, behavior_type, value, text):
+            logger.warning("Unknown behavior type: %s", behavior_type)
             return jsonify({'error': 'Unknown behavior type'}), 400
         
+        if behavior_type == 'honeypot_click':
+            return _honeypot_response(session_id, behavior)
+        
         return jsonify({
             'success': True,
             'status': 'tracked',
@@ -234,9 +398,77 @@ def track_behavior():
         })
         
     except Exception as e:
-        logger.error(f"Error in track_behavior: {str(e)}")
+        logger.error("Error in track_behavior: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
+def _track_behavior_frame():
+    """Apply a batch of events from a binary frame (see utils/behavior_frames.py)"""
+    try:
+        if (request.content_length or 0) > behavior_frames.MAX_FRAME_BYTES:
+            return jsonify({'error': 'Frame too large'}), 413
+        try:
+            handle, events = behavior_frames.decode_frame(request.get_data(cache=False))
+        except behavior_frames.FrameError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        session_id = session_handles.get(handle)
+        if session_id is None or session_id not in user_sessions:
+            logger.warning("Invalid session handle in behavior frame: %s", handle)
+            return jsonify({'error': 'Invalid session'}), 400
+        
+        behavior = user_sessions[session_id]['behavior_data']
+        cached_risk = _degraded_fast_path(session_id)
+        if cached_risk is not None:
+            return jsonify({
+                'status': 'fraud_detected',
+                'risk_result': cached_risk,
+                'redirect': '/honeypot',
+                'degraded': True
+            })
+        
+        admission = get_admission_controller()
+        deferred = get_deferred_behavior() if admission is not None and admission.overloaded() else None
+        # Client clocks are only trusted within the session's lifetime
+        now_ms = time.time() * 1000
+        start_ms = datetime.fromisoformat(user_sessions[session_id]['timestamp']).timestamp() * 1000
+        tracked = deferred_count = 0
+        honeypot_clicked = False
+        for behavior_type, timestamp_ms, value, text in events:
+            if deferred is not None and behavior_type in DEFERRABLE_BEHAVIORS:
+                deferred.add(session_id, DEFERRABLE_BEHAVIORS[behavior_type], max(1, value))
+                deferred_count += 1
+                continue
+            timestamp = None
+            if behavior_type == 'page_view':
+                timestamp = datetime.fromtimestamp(min(max(timestamp_ms, start_ms), now_ms) / 1000)
+            _record_behavior(session_id, behavior, behavior_type, value, text, timestamp)
+            honeypot_clicked = honeypot_clicked or behavior_type == 'honeypot_click'
+            tracked += 1
+        if deferred_count:
+            admission.record_deferred()
+        
+        logger.debug("Tracked %d behavior events (%d deferred) for session: %s", tracked, deferred_count, session_id)
+        audit_event('behavior_frame', session_id=session_id, tracked=tracked, deferred=deferred_count)
+        
+        if honeypot_clicked:
+            return _honeypot_response(session_id, behavior)
+        
+        return jsonify({
+            'success': True,
+            'status': 'tracked',
+            'events': tracked,
+            'deferred': deferred_count
+        })
+        
+    except Exception as e:
+        logger.error("Error in track_behavior (frame): %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+def _scoring_inputs(session_data, keystroke_profile):
+    """Frozen, compact copy of what the session was scored on (for backtests and shadow scoring)"""
+    return scoring_features(session_data['user_data'], session_data['device_data'],
+                            session_data['behavior_data'], keystroke_profile)
+
 @verify_bp.route('/api/verify/risk', methods=['POST'])
 def get_risk_assessment():
     """Get final risk assessment"""
@@ -251,36 +483,60 @@ def get_risk_assessment():
             return jsonify({'error': 'Session ID required'}), 400
             
         if session_id not in user_sessions:
-            logger.warning(f"Invalid session ID for risk assessment: {session_id}")
+            logger.warning("Invalid session ID for risk assessment: %s", session_id)
             return jsonify({'error': 'Invalid session'}), 400
         
         session_data = user_sessions[session_id]
         
-        # Calculate risk
-        risk_result = risk_service.calculate_risk_score(
+        cached_risk = _degraded_fast_path(session_id)
+        if cached_risk is not None:
+            return jsonify(dict(cached_risk, session_id=session_id, degraded=True))
+        
+        # Calculate risk (typing is compared against the user's own baseline).
+        # IP risk is re-derived from this request's address in case it changed.
+        _apply_deferred_behavior(session_id, session_data['behavior_data'])
+        session_data['device_data'].update(_ip_risk_fields(get_client_ip()))
+        keystroke_profile = get_services().tracking_service.get_keystroke_profile(
+            session_data['user_data'].get('mobile'))
+        risk_result = get_services().risk_service.calculate_risk_score(
             session_data['user_data'],
             session_data['device_data'],
-            session_data['behavior_data']
+            session_data['behavior_data'],
+            keystroke_profile=keystroke_profile
         )
+        session_data['risk_result'] = risk_result
+        scoring_inputs = _scoring_inputs(session_data, keystroke_profile)
         
-        # Track login in tracking service
-        tracking_service.track_user_login(
+        # Track login in tracking service (anomalous typing never updates the baseline)
+        get_services().tracking_service.track_user_login(
             session_data['user_data'],
             risk_result['risk_score'],
             risk_result['risk_level'],
-            session_id
+            session_id,
+            keystroke_stats=None if risk_result['keystroke_anomaly']
+            else session_data['behavior_data'].get('keystroke_stats'),
+            device_fingerprint=session_data['device_data'].get('fingerprint'),
+            ip_address=session_data['ip_address'],
+            scoring_inputs=scoring_inputs
         )
+        # Candidate rules (if any) score the same inputs off the request path
+        get_services().shadow_scorer.submit('risk', session_id, risk_result, lambda: scoring_inputs)
         
         # Add session info
         risk_result['session_id'] = session_id
         risk_result['verification_time'] = datetime.now().isoformat()
         
-        logger.info(f"Risk assessment for session {session_id}: {risk_result['risk_level']} (score: {risk_result['risk_score']})")
+        logger.info("Risk assessment for session %s: %s (score: %s)", session_id, risk_result['risk_level'],
+                    risk_result['risk_score'])
+        audit_event('risk_assessment', level=logging.WARNING if risk_result['is_fraud'] else logging.INFO,
+                    session_id=session_id, risk_score=risk_result['risk_score'],
+                    risk_level=risk_result['risk_level'], is_fraud=risk_result['is_fraud'],
+                    risk_factors=masked_risk_factors(risk_result.get('risk_factors')))
         
         return jsonify(risk_result)
         
     except Exception as e:
-        logger.error(f"Error in get_risk_assessment: {str(e)}")
+        logger.error("Error in get_risk_assessment: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @verify_bp.route('/api/verify/name-check', methods=['POST'])
@@ -302,10 +558,10 @@ def check_name_match():
             return jsonify({'error': 'Invalid mobile number format'}), 400
         
         # Use ownership service for verification
-        result = ownership_service.verify_ownership(mobile, name)
+        result = get_services().ownership_service.verify_ownership(mobile, name)
         
         # Add telecom service result as backup
-        telecom_result = telecom_service.verify_owner(mobile, name)
+        telecom_result = get_services().telecom_service.verify_owner(mobile, name)
         
         # Combine results
         response = {
@@ -321,12 +577,13 @@ def check_name_match():
             'requires_manual_review': result.get('requires_manual_review', False)
         }
         
-        logger.info(f"Name check for {mobile}: {'Match' if response['match'] else 'Mismatch'}")
+        audit_event('name_check', pii={'name': name, 'mobile': mobile}, match=response['match'],
+                    confidence_score=response['confidence_score'])
         
         return jsonify(response)
         
     except Exception as e:
-        logger.error(f"Error in check_name_match: {str(e)}")
+        logger.error("Error in check_name_match: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 # ============================================
@@ -343,16 +600,26 @@ def track_transaction():
         if not session_id:
             return jsonify({'error': 'No session ID'}), 400
         
-        transaction = tracking_service.track_transaction(session_id, data['transaction'])
+        # Retries with the same key return the original transaction instead of posting twice
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        try:
+            transaction, replayed = get_services().tracking_service.track_transaction(
+                session_id, data.get('transaction'), idempotency_key=idempotency_key
+            )
+        except InvalidTransaction as e:
+            return jsonify({'error': f'Invalid transaction: {e}'}), 400
+        except IdempotencyConflict as e:
+            return jsonify({'error': str(e)}), 422
         
         return jsonify({
             'success': True,
             'transaction': transaction,
-            'blocked': transaction.get('status') == 'failed' if transaction else False
+            'blocked': transaction.get('status') == 'failed' if transaction else False,
+            'replayed': replayed
         })
         
     except Exception as e:
-        logger.error(f"Error tracking transaction: {e}")
+        logger.error("Error tracking transaction: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @verify_bp.route('/api/track/action', methods=['POST'])
@@ -365,12 +632,12 @@ def track_action():
         if not session_id:
             return jsonify({'error': 'No session ID'}), 400
         
-        tracking_service.track_action(session_id, data['action'])
+        get_services().tracking_service.track_action(session_id, data['action'])
         
         return jsonify({'success': True})
         
     except Exception as e:
-        logger.error(f"Error tracking action: {e}")
+        logger.error("Error tracking action: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @verify_bp.route('/api/admin/dashboard', methods=['GET'])
@@ -382,11 +649,11 @@ def get_admin_dashboard():
         if auth != 'admin-secret':
             return jsonify({'error': 'Unauthorized'}), 401
         
-        data = tracking_service.get_admin_dashboard_data()
+        data = get_services().tracking_service.get_admin_dashboard_data()
         return jsonify(data)
         
     except Exception as e:
-        logger.error(f"Error getting admin data: {e}")
+        logger.error("Error getting admin data: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @verify_bp.route('/api/verify/session/<session_id>', methods=['GET'])
@@ -408,7 +675,7 @@ def get_session_info(session_id):
         return jsonify(session_data)
         
     except Exception as e:
-        logger.error(f"Error in get_session_info: {str(e)}")
+        logger.error("Error in get_session_info: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @verify_bp.route('/api/verify/clear-session', methods=['POST'])
@@ -419,14 +686,18 @@ def clear_session():
         session_id = data.get('session_id')
         
         if session_id and session_id in user_sessions:
+            session_handles.pop(user_sessions[session_id].get('session_handle'), None)
             del user_sessions[session_id]
-            logger.info(f"Session cleared: {session_id}")
+            deferred = get_deferred_behavior()
+            if deferred is not None:
+                deferred.discard(session_id)
+            logger.info("Session cleared: %s", session_id)
             return jsonify({'success': True, 'message': 'Session cleared'})
         
         return jsonify({'success': False, 'message': 'Session not found'})
         
     except Exception as e:
-        logger.error(f"Error in clear_session: {str(e)}")
+        logger.error("Error in clear_session: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 # Error handlers
@@ -440,5 +711,5 @@ def method_not_allowed(error):
 
 @verify_bp.errorhandler(500)
 def internal_error(error):
-    logger.error(f"Internal server error: {str(error)}")
+    logger.error("Internal server error: %s", error)
     return jsonify({'error': 'Internal server error'}), 500
\ No newline at end of file
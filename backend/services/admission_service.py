@@ -0,0 +1,223 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+# Lower number = more important
+PRIORITIES = {'critical': 0, 'standard': 1, 'low': 2}
+
+
+def parse_request_start(header, now=None):
+    """
+    Queueing delay in ms from an X-Request-Start header set by the proxy
+    ('t=1700000000.123', seconds/ms/us since the epoch). None if unusable.
+    """
+    if not header:
+        return None
+    try:
+        value = float(header.strip().lstrip('t='))
+    except ValueError:
+        return None
+    # Normalise to seconds whatever unit the proxy used
+    while value > 1e11:
+        value /= 1000.0
+    delay_ms = ((now or time.time()) - value) * 1000
+    return max(0.0, delay_ms) if delay_ms < 60000 else None
+
+
+class AdmissionController:
+    """
+    Priority-aware admission for the request workers.
+    Every request is classified as critical (risk, name-check), standard or
+    low (honeypot tracking). The controller tracks in-flight requests and an
+    EWMA of proxy queueing delay per class; under load low-priority work is
+    rejected first, standard next, and the last reserved share of capacity
+    is only ever used by critical requests. Handlers ask overloaded() to take
+    cheaper degraded paths (deferring behavior events, cached risk results).
+    """
+
+    def __init__(self, capacity=64, reserved_critical=0.25, low_share=0.5, queue_target_ms=50.0,
+                 route_classes=None, default_class='standard', ewma_alpha=0.2, delay_stale_s=1.0):
+        self.capacity = capacity
+        self.standard_limit = max(1, int(capacity * (1 - reserved_critical)))
+        self.low_limit = max(1, int(capacity * low_share))
+        self.queue_target_ms = queue_target_ms
+        self.route_classes = dict(route_classes or {})
+        self.default_class = default_class
+        self.ewma_alpha = ewma_alpha
+        # Without a fresh X-Request-Start sample for this long, the delay estimate decays toward 0
+        self.delay_stale_s = delay_stale_s
+
+        self._lock = threading.Lock()
+        self.in_flight = {name: 0 for name in PRIORITIES}
+        self.total_in_flight = 0
+        self.queue_delay_ms = {name: 0.0 for name in PRIORITIES}
+        self.service_time_ms = {name: 0.0 for name in PRIORITIES}
+        self.admitted = {name: 0 for name in PRIORITIES}
+        self.rejected = {name: 0 for name in PRIORITIES}
+        self.deferred = 0
+        self._queue_delay = 0.0
+        self._last_delay_sample = 0.0
+
+    def classify(self, endpoint):
+        route_class = self.route_classes.get(endpoint)
+        if route_class is None and endpoint:
+            route_class = self.route_classes.get(endpoint.split('.', 1)[0] + '.*')
+        return route_class or self.default_class
+
+    def _limit(self, route_class):
+        if route_class == 'critical':
+            return self.capacity, self.queue_target_ms * 8
+        if route_class == 'standard':
+            return self.standard_limit, self.queue_target_ms * 2
+        return self.low_limit, self.queue_target_ms
+
+    def try_enter(self, route_class, queue_delay_ms=None):
+        """Admit a request of route_class; returns False if it should be shed"""
+        limit, max_delay = self._limit(route_class)
+        with self._lock:
+            a = self.ewma_alpha
+            if queue_delay_ms is not None:
+                # Updated on arrival, so the signal decays even while shedding
+                self._queue_delay = (1 - a) * self._queue_delay + a * queue_delay_ms
+                self.queue_delay_ms[route_class] = (1 - a) * self.queue_delay_ms[route_class] + a * queue_delay_ms
+                self._last_delay_sample = time.monotonic()
+            elif self._queue_delay and time.monotonic() - self._last_delay_sample > self.delay_stale_s:
+                # No recent header (proxy stopped sending it, or never did for
+                # this traffic): don't stay "overloaded" on an old reading
+                self._queue_delay *= 1 - a
+                self.queue_delay_ms[route_class] *= 1 - a
+
+            if self.total_in_flight >= limit or self._queue_delay > max_delay:
+                self.rejected[route_class] += 1
+                return False
+            self.in_flight[route_class] += 1
+            self.total_in_flight += 1
+            self.admitted[route_class] += 1
+            return True
+
+    def leave(self, route_class, elapsed_ms):
+        with self._lock:
+            self.in_flight[route_class] -= 1
+            self.total_in_flight -= 1
+            a = self.ewma_alpha
+            self.service_time_ms[route_class] = (1 - a) * self.service_time_ms[route_class] + a * elapsed_ms
+
+    def overloaded(self):
+        """True once low-priority work would no longer be admitted"""
+        return self.total_in_flight >= self.low_limit or self._queue_delay > self.queue_target_ms
+
+    def record_deferred(self):
+        with self._lock:
+            self.deferred += 1
+
+    def get_status(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'standard_limit': self.standard_limit,
+                'low_limit': self.low_limit,
+                'queue_target_ms': self.queue_target_ms,
+                'overloaded': self.overloaded(),
+                'total_in_flight': self.total_in_flight,
+                'queue_delay_ms': round(self._queue_delay, 2),
+                'classes': {name: {
+                    'in_flight': self.in_flight[name],
+                    'admitted': self.admitted[name],
+                    'rejected': self.rejected[name],
+                    'queue_delay_ms': round(self.queue_delay_ms[name], 2),
+                    'service_time_ms': round(self.service_time_ms[name], 2)
+                } for name in PRIORITIES},
+                'deferred': self.deferred
+            }
+
+
+class DeferredBehavior:
+    """
+    Counters for behavior events accepted while overloaded.
+    Recording is one dict update; the counts are folded into the session's
+    behavior data when it is next scored. At most max_sessions sessions
+    are held; beyond that the oldest session's counts are dropped.
+    """
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+
+    def add(self, session_id, field, count=1):
+        with self._lock:
+            counts = self._pending.get(session_id)
+            if counts is None:
+                while len(self._pending) >= self.max_sessions:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+                counts = self._pending[session_id] = {}
+            counts[field] = counts.get(field, 0) + count
+
+    def __len__(self):
+        return len(self._pending)
+
+    def apply(self, session_id, behavior):
+        with self._lock:
+            counts = self._pending.pop(session_id, None)
+        for field, count in (counts or {}).items():
+            behavior[field] = behavior.get(field, 0) + count
+
+    def discard(self, session_id):
+        with self._lock:
+            self._pending.pop(session_id, None)
+
+
+def init_admission_control(app):
+    """Shed low-priority requests before they reach a view when overloaded"""
+    if not app.config.get('ADMISSION_CONTROL_ENABLED', True):
+        return None
+
+    controller = AdmissionController(
+        capacity=app.config.get('ADMISSION_CAPACITY', 64),
+        reserved_critical=app.config.get('ADMISSION_RESERVED_CRITICAL', 0.25),
+        low_share=app.config.get('ADMISSION_LOW_SHARE', 0.5),
+        queue_target_ms=app.config.get('ADMISSION_QUEUE_TARGET_MS', 50.0),
+        route_classes=app.config.get('ADMISSION_ROUTE_CLASSES', {})
+    )
+    app.extensions['honeykyc_admission'] = controller
+    app.extensions['honeykyc_deferred_behavior'] = DeferredBehavior(
+        max_sessions=app.config.get('ADMISSION_DEFERRED_MAX_SESSIONS', 10000))
+    exempt = set(app.config.get('ADMISSION_EXEMPT', ()))
+
+    @app.before_request
+    def admit_request():
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in exempt or endpoint.split('.', 1)[0] + '.*' in exempt:
+            return None
+        route_class = controller.classify(endpoint)
+        queue_delay = parse_request_start(request.headers.get('X-Request-Start'))
+        if not controller.try_enter(route_class, queue_delay):
+            response = jsonify({'error': 'Server busy, please retry', 'retry_after': 1})
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+        g._admission = (route_class, time.perf_counter())
+        return None
+
+    @app.teardown_request
+    def release_request(exc=None):
+        state = g.pop('_admission', None)
+        if state is not None:
+            controller.leave(state[0], (time.perf_counter() - state[1]) * 1000)
+
+    return controller
+
+
+def get_admission_controller():
+    """Admission controller of the current app (None when disabled)"""
+    return current_app.extensions.get('honeykyc_admission')
+
+
+def get_deferred_behavior():
+    return current_app.extensions.get('honeykyc_deferred_behavior')
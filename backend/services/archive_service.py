@@ -0,0 +1,327 @@
+import itertools
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, numpy fallback below
+    pa = None
+
+from services.columnar_table import retain, to_builtin
+
+logger = logging.getLogger(__name__)
+
+# Column name -> kind ('int', 'float', 'time' = epoch ms, 'str', 'json')
+SCHEMAS = {
+    'transactions': {
+        'id': 'int', 'timestamp': 'time', 'user': 'str', 'user_name': 'str', 'type': 'str',
+        'amount': 'float', 'recipient': 'str', 'status': 'str', 'reason': 'str'
+    },
+    'suspicious_activity': {
+        'timestamp': 'time', 'user': 'str', 'user_name': 'str', 'reason': 'str', 'details': 'json'
+    },
+    'sessions': {
+        'session_id': 'str', 'login_time': 'time', 'user': 'str', 'user_name': 'str',
+        'risk_score': 'float', 'risk_level': 'str', 'balance': 'float',
+        'action_count': 'int', 'transaction_count': 'int', 'actions': 'json', 'scoring_inputs': 'json'
+    }
+}
+TIME_COLUMN = {'transactions': 'timestamp', 'suspicious_activity': 'timestamp', 'sessions': 'login_time'}
+
+# Per-process partition file counter
+_part_sequence = itertools.count()
+
+
+def _epoch_ms(iso):
+    try:
+        return int(datetime.fromisoformat(iso).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_epoch_ms(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, str):
+        return _epoch_ms(value)
+    return int(value)
+
+
+class ArchiveService:
+    """
+    Columnar archive of tracking history.
+    compact() moves closed sessions, old transactions and old suspicious
+    activity out of the live TrackingService store into date-partitioned
+    files: Parquet (zstd) or Arrow IPC when pyarrow is installed, otherwise
+    a directory of .npy columns with dictionary-encoded strings that is
+    memory-mapped on read. scan() prunes partitions by date and filters
+    rows by time with vectorized comparisons.
+    """
+
+    def __init__(self, archive_dir, file_format=None):
+        self.archive_dir = archive_dir
+        if file_format is None:
+            file_format = 'parquet' if pa is not None else 'npy'
+        if file_format in ('parquet', 'arrow') and pa is None:
+            raise RuntimeError(f"Archive format '{file_format}' requires pyarrow")
+        self.file_format = file_format
+
+    # ============================================
+    # COMPACTION
+    # ============================================
+
+    def compact(self, tracking_service, older_than_days=30, now=None):
+        """Move archivable records out of the live store; returns counts per table"""
+        # Hold the tracking lock so no transaction is posted mid-compaction
+        with tracking_service.lock:
+            return self._compact(tracking_service, older_than_days, now)
+
+    def _compact(self, tracking_service, older_than_days, now):
+        now = now or datetime.now()
+        cutoff = (now - timedelta(days=older_than_days)).isoformat()
+        data = tracking_service.data
+
+        closed_sessions = {}
+        for session_id, session in data['sessions'].items():
+            logged_out = any(a.get('action') == 'logout' for a in session.get('actions', []))
+            if logged_out or session.get('login_time', '') < cutoff:
+                closed_sessions[session_id] = session
+
+        old_transactions = [t for t in data['transactions'] if t.get('timestamp', '') < cutoff]
+        old_suspicious = [s for s in data['suspicious_activity'] if s.get('timestamp', '') < cutoff]
+
+        session_rows = [{
+            'session_id': session_id,
+            'login_time': session.get('login_time'),
+            'user': session.get('user'),
+            'user_name': session.get('user_name'),
+            'risk_score': session.get('risk_score', 0),
+            'risk_level': session.get('risk_level'),
+            'balance': session.get('balance', 0),
+            'action_count': len(session.get('actions', [])),
+            'transaction_count': len(session.get('transactions', [])),
+            'actions': session.get('actions', []),
+            'scoring_inputs': session.get('scoring_inputs')
+        } for session_id, session in closed_sessions.items()]
+
+        written = {
+            'sessions': self.write_rows('sessions', session_rows),
+            'transactions': self.write_rows('transactions', old_transactions),
+            'suspicious_activity': self.write_rows('suspicious_activity', old_suspicious)
+        }
+
+        # Only drop records from the live store once they are safely on disk
+        for session_id in closed_sessions:
+            del data['sessions'][session_id]
+        if old_transactions:
+            for user in data['users'].values():
+                kept = []
+                for t in user.get('transactions', []):
+                    if t.get('timestamp', '') < cutoff:
+                        # Keep per-user totals accurate for the dashboard
+                        user['archived_transaction_count'] = user.get('archived_transaction_count', 0) + 1
+                        if t.get('type') == 'debit':
+                            user['archived_total_spent'] = user.get('archived_total_spent', 0) + t.get('amount', 0)
+                    else:
+                        kept.append(t)
+                user['transactions'] = kept
+            tracking_service.ledger.retain(lambda t: t.get('timestamp', '') >= cutoff)
+        if old_suspicious:
+            data['suspicious_activity'] = retain(data['suspicious_activity'],
+                                                 lambda s: s.get('timestamp', '') >= cutoff)
+
+        tracking_service.save_data()
+        logger.info("Archived tracking history: %s", written)
+        return written
+
+    # ============================================
+    # WRITING
+    # ============================================
+
+    def write_rows(self, table, rows):
+        """Write rows (dicts) into date partitions of a table; returns row count"""
+        if not rows:
+            return 0
+        schema = SCHEMAS[table]
+        time_column = TIME_COLUMN[table]
+
+        partitions = defaultdict(list)
+        for row in rows:
+            partitions[(row.get(time_column) or '1970-01-01')[:10]].append(row)
+
+        # The sequence keeps two compactions within one millisecond from overwriting each other's parts
+        part_name = f"part-{int(time.time() * 1000)}-{os.getpid()}-{next(_part_sequence)}"
+        for day, day_rows in partitions.items():
+            directory = os.path.join(self.archive_dir, table, f"date={day}")
+            os.makedirs(directory, exist_ok=True)
+            columns = {name: self._column(kind, [r.get(name) for r in day_rows])
+                       for name, kind in schema.items()}
+            self._write_partition(os.path.join(directory, part_name), columns)
+        return len(rows)
+
+    def _column(self, kind, values):
+        if kind == 'time':
+            return np.array([_epoch_ms(v) for v in values], dtype=np.int64)
+        if kind == 'int':
+            return np.array([v or 0 for v in values], dtype=np.int64)
+        if kind == 'float':
+            return np.array([v or 0 for v in values], dtype=np.float64)
+        if kind == 'json':
+            return [json.dumps(v, ensure_ascii=False, default=to_builtin) if v is not None else '' for v in values]
+        return ['' if v is None else str(v) for v in values]
+
+    def _write_partition(self, path, columns):
+        if self.file_format in ('parquet', 'arrow'):
+            arrays = {}
+            for name, values in columns.items():
+                if isinstance(values, np.ndarray):
+                    arrays[name] = pa.array(values)
+                else:
+                    arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+            table = pa.table(arrays)
+            if self.file_format == 'parquet':
+                pq.write_table(table, path + '.parquet', compression='zstd')
+            else:
+                with pa_ipc.new_file(path + '.arrow', table.schema) as writer:
+                    writer.write_table(table)
+            return
+
+        # numpy fallback: one .npy per column, strings as int32 codes + dictionary
+        tmp_dir = path + '.tmp'
+        os.makedirs(tmp_dir)
+        for name, values in columns.items():
+            if isinstance(values, np.ndarray):
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+                continue
+            dictionary = {}
+            codes = np.fromiter((dictionary.setdefault(v, len(dictionary)) for v in values),
+                                dtype=np.int32, count=len(values))
+            np.save(os.path.join(tmp_dir, f"{name}.codes.npy"), codes)
+            with open(os.path.join(tmp_dir, f"{name}.dict.json"), 'w') as f:
+                json.dump(list(dictionary), f, ensure_ascii=False)
+        os.replace(tmp_dir, path + '.npy')
+
+    # ============================================
+    # QUERIES
+    # ============================================
+
+    def partitions(self, table, start=None, end=None):
+        """Partition files for a table whose date overlaps [start, end)"""
+        table_dir = os.path.join(self.archive_dir, table)
+        if not os.path.isdir(table_dir):
+            return []
+        start_day = datetime.fromtimestamp(start / 1000).strftime('%Y-%m-%d') if start is not None else None
+        end_day = datetime.fromtimestamp(end / 1000).strftime('%Y-%m-%d') if end is not None else None
+
+        files = []
+        for partition in sorted(os.listdir(table_dir)):
+            day = partition.split('=', 1)[-1]
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            directory = os.path.join(table_dir, partition)
+            files.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                         if not name.endswith('.tmp'))
+        return files
+
+    def scan(self, table, start=None, end=None, columns=None, user=None):
+        """
+        Time-range scan of an archived table.
+        start/end are datetimes, ISO strings or epoch ms. Returns a dict of
+        column name -> numpy array (strings decoded lazily per column).
+        """
+        wanted = list(columns or SCHEMAS[table])
+        chunks = defaultdict(list)
+        for part in self._scan_partitions(table, start, end, wanted, user):
+            for name in wanted:
+                chunks[name].append(part[name])
+
+        return {name: (np.concatenate(chunks[name]) if chunks[name] else np.array([]))
+                for name in wanted}
+
+    def _scan_partitions(self, table, start, end, wanted, user):
+        """Yield the matching rows of each partition in turn (column name -> array)"""
+        start, end = _to_epoch_ms(start), _to_epoch_ms(end)
+        time_column = TIME_COLUMN[table]
+        needed = set(wanted) | {time_column} | ({'user'} if user else set())
+        for path in self.partitions(table, start, end):
+            part = self._read_partition(path, needed)
+            mask = np.ones(len(part[time_column]), dtype=bool)
+            if start is not None:
+                mask &= part[time_column] >= start
+            if end is not None:
+                mask &= part[time_column] < end
+            if user:
+                mask &= part['user'] == user
+            if mask.any():
+                yield {name: part[name][mask] for name in wanted}
+
+    def scan_records(self, table, start=None, end=None, user=None):
+        """
+        Same as scan() but yields one dict per row. Reads one partition at
+        a time, so memory stays bounded however large the archive is.
+        """
+        schema = SCHEMAS[table]
+        names = list(schema)
+        for part in self._scan_partitions(table, start, end, names, user):
+            for values in zip(*(part[name] for name in names)):
+                record = {}
+                for name, value in zip(names, values):
+                    if schema[name] == 'json':
+                        record[name] = json.loads(value) if value else None
+                    elif isinstance(value, np.generic):
+                        record[name] = value.item()
+                    else:
+                        record[name] = value
+                yield record
+
+    def _read_partition(self, path, columns):
+        if path.endswith('.parquet'):
+            present = set(pq.read_schema(path).names)
+            table = pq.read_table(path, columns=[name for name in columns if name in present])
+            part = {name: self._arrow_to_numpy(table.column(name)) for name in columns if name in present}
+            return self._fill_missing(part, columns, table.num_rows)
+        if path.endswith('.arrow'):
+            # Memory-mapped: numeric columns are read without copying
+            table = pa_ipc.open_file(pa.memory_map(path, 'r')).read_all()
+            part = {name: self._arrow_to_numpy(table.column(name)) for name in columns
+                    if name in table.column_names}
+            return self._fill_missing(part, columns, table.num_rows)
+
+        part = {}
+        rows = None
+        for name in columns:
+            plain = os.path.join(path, f"{name}.npy")
+            if os.path.exists(plain):
+                part[name] = np.load(plain, mmap_mode='r')
+            elif os.path.exists(os.path.join(path, f"{name}.codes.npy")):
+                codes = np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode='r')
+                with open(os.path.join(path, f"{name}.dict.json")) as f:
+                    dictionary = np.array(json.load(f) or [''], dtype=object)
+                part[name] = dictionary[codes]
+            else:
+                continue
+            rows = len(part[name])
+        return self._fill_missing(part, columns, rows or 0)
+
+    @staticmethod
+    def _fill_missing(part, columns, rows):
+        """Columns added to a schema after a partition was written read as empty strings"""
+        for name in columns:
+            if name not in part:
+                part[name] = np.full(rows, '', dtype=object)
+        return part
+
+    def _arrow_to_numpy(self, column):
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        return column.to_numpy(zero_copy_only=False)
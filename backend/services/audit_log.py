@@ -0,0 +1,245 @@
+"""
+Structured, non-blocking audit log of fraud-relevant events.
+
+audit_event() runs on the request thread and only does a sampling check
+and a put_nowait of a LogRecord onto a bounded queue; if the queue is full
+the event is dropped and counted, the request never waits on the disk. A
+QueueListener thread does the rest: PII masking (once per record, via
+mask_sensitive_data), JSON formatting and writing to a file that rotates
+on size or age, with rotated files gzip-compressed and pruned to a fixed
+count. Each process writes its own file (see process_log_path).
+
+High-volume event types (behavior telemetry) can be sampled with
+AUDIT_SAMPLE_RATES; kept records carry their sample_rate so counts can be
+re-weighted.
+"""
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from datetime import datetime
+from services.metrics_service import metrics_service
+from utils.helpers import mask_sensitive_data
+
+AUDIT_LOGGER_NAME = 'honeykyc.audit'
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger(AUDIT_LOGGER_NAME)
+# Audit records only go to the audit file, never to the console log
+audit_logger.propagate = False
+audit_logger.setLevel(logging.INFO)
+
+_sample_rates = {}
+_settings = None
+_listener = None
+_handler = None
+_lock = threading.Lock()
+
+
+def audit_event(event_type, pii=None, level=logging.INFO, **fields):
+    """
+    Record an audit event. pii is a dict of raw personal data (name, mobile,
+    email), masked by the writer thread; fields must be JSON-serializable
+    and are not copied deeply, so don't mutate them afterwards.
+    Returns False if the event was sampled out or the log is not configured.
+    """
+    if _handler is None:
+        return False
+    rate = _sample_rates.get(event_type, 1.0)
+    if rate < 1.0:
+        if random.random() >= rate:
+            _handler.sampled_out += 1
+            return False
+        fields['sample_rate'] = rate
+    # The message is the event type, so nothing is formatted on this thread;
+    # building the record directly also skips logging's caller lookup
+    record = audit_logger.makeRecord(AUDIT_LOGGER_NAME, level, __name__, 0, event_type, None, None,
+                                     extra={'audit_fields': fields, 'audit_pii': pii})
+    audit_logger.handle(record)
+    return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+        self.sampled_out = 0
+
+    def prepare(self, record):
+        # The stock prepare() formats the message here; the writer thread does it instead
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics_service.counter('honeykyc_audit_dropped_total',
+                                    'Audit events dropped because the writer queue was full').inc()
+
+
+class AuditFormatter(logging.Formatter):
+    """One JSON object per line; PII is masked once and cached on the record"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'event': record.getMessage(),
+            'level': record.levelname
+        }
+        pii = getattr(record, 'audit_pii', None)
+        if pii:
+            masked = getattr(record, 'audit_masked', None)
+            if masked is None:
+                masked = record.audit_masked = mask_sensitive_data(pii)
+            entry['user'] = masked
+        entry.update(getattr(record, 'audit_fields', None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotates when the file reaches max_bytes or is older than interval
+    seconds, whichever comes first. Rotated files are gzip-compressed
+    (audit.jsonl.1.gz, .2.gz, ...) and only backup_count are kept.
+    """
+
+    def __init__(self, filename, max_bytes=50 * 1024 * 1024, interval=86400, backup_count=14):
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.interval = interval
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self):
+        try:
+            opened = os.path.getmtime(self.baseFilename) if os.path.getsize(self.baseFilename) else time.time()
+        except OSError:
+            opened = time.time()
+        return opened + self.interval if self.interval else float('inf')
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        # Checked against what was already written; the stock check formats every record twice
+        if self.stream is None:
+            self.stream = self._open()
+        written = self.stream.tell()
+        if not written:
+            return False
+        return (self.maxBytes > 0 and written >= self.maxBytes) or time.time() >= self.rollover_at
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval if self.interval else float('inf')
+
+
+def init_audit_log(app):
+    """Start the background audit writer (once per process) from the app config"""
+    global _settings, _sample_rates
+    path = app.config.get('AUDIT_LOG_PATH')
+    if not path:
+        return None
+    with _lock:
+        _sample_rates = dict(app.config.get('AUDIT_SAMPLE_RATES', {}))
+        if _listener is not None:
+            return _handler
+        _settings = {
+            'path': path,
+            'max_bytes': app.config.get('AUDIT_LOG_MAX_BYTES', 50 * 1024 * 1024),
+            'interval': app.config.get('AUDIT_LOG_ROTATE_SECONDS', 86400),
+            'backup_count': app.config.get('AUDIT_LOG_BACKUP_COUNT', 14),
+            'queue_size': app.config.get('AUDIT_QUEUE_SIZE', 10000)
+        }
+        _start()
+        atexit.register(stop_audit_log)
+
+        metrics_service.gauge('honeykyc_audit_queue_depth', lambda: _handler.queue.qsize() if _handler else 0,
+                              'Audit events waiting for the writer thread')
+        return _handler
+
+
+def process_log_path(path):
+    """
+    Audit file of the current process (fraud_audit.jsonl -> fraud_audit.<pid>.jsonl).
+    Every worker writes and rotates its own file: with a shared one, each
+    process would rename it under the others, which keep writing to the
+    rotated (and then compressed and deleted) file.
+    """
+    root, ext = os.path.splitext(path)
+    return f'{root}.{os.getpid()}{ext}'
+
+
+def _start():
+    global _listener, _handler
+    path = process_log_path(_settings['path'])
+    file_handler = CompressingRotatingFileHandler(path, max_bytes=_settings['max_bytes'],
+                                                  interval=_settings['interval'],
+                                                  backup_count=_settings['backup_count'])
+    file_handler.setFormatter(AuditFormatter())
+
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=_settings['queue_size']))
+    audit_logger.addHandler(_handler)
+    _listener = logging.handlers.QueueListener(_handler.queue, file_handler, respect_handler_level=False)
+    _listener.start()
+    logger.info("Audit log writing to %s", path)
+
+
+def _restart_after_fork():
+    # The writer thread doesn't survive a fork (e.g. workers of a preloading
+    # master); the child gets its own queue, thread and file
+    global _lock, _listener, _handler
+    _lock = threading.Lock()
+    if _handler is None:
+        return
+    audit_logger.removeHandler(_handler)
+    # The parent's handlers are only dropped: their locks may have been held mid-fork
+    _listener = _handler = None
+    _start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def stop_audit_log():
+    """Flush queued events and stop the writer thread"""
+    global _listener, _handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        audit_logger.removeHandler(_handler)
+        _listener = None
+        _handler = None
+
+
+def get_status():
+    handler = _handler
+    if handler is None:
+        return {'enabled': False}
+    return {
+        'enabled': True,
+        'queue_depth': handler.queue.qsize(),
+        'queue_size': handler.queue.maxsize,
+        'dropped': handler.dropped,
+        'sampled_out': handler.sampled_out,
+        'sample_rates': _sample_rates
+    }
@@ -0,0 +1,442 @@
+"""
+Backtesting of risk rule changes.
+
+Replays the scoring inputs kept with each tracked session (user_data,
+device_data, behavior_data and the typing baseline, see
+TrackingService.track_user_login) through two rule sets, the baseline
+(normally today's) and a candidate, and tallies how decisions shift.
+
+A rule set is JSON with any of:
+
+    {
+        "risk": {"weights": {"vpn": 20, "new_device": 0}, "thresholds": {"fraud": 55}},
+        "ownership": {"thresholds": {"verified": 65}}
+    }
+
+Weights and thresholds not mentioned keep their defaults
+(risk_service.DEFAULT_WEIGHTS / DEFAULT_THRESHOLDS,
+ownership_service.DEFAULT_THRESHOLDS). SIM age is computed as of the
+replay for both sides, so it shifts both equally.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from services.ownership_service import DEFAULT_THRESHOLDS as OWNERSHIP_THRESHOLDS, OwnershipService
+from services.risk_service import DEFAULT_THRESHOLDS as RISK_THRESHOLDS, DEFAULT_WEIGHTS as RISK_WEIGHTS, RiskService
+from services.telecom_registry import TelecomRegistry
+from utils.data_loader import open_text
+
+RISK_LEVELS = ('LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+OWNERSHIP_STATUSES = ('verified', 'review', 'failed')
+DECISIONS = ('is_fraud', 'needs_honeypot')
+SIDES = ('baseline', 'candidate')
+
+# Score histograms have one bin per point; higher scores share the last bin
+MAX_SCORE_BIN = 1000
+
+# Rule matches at these severities count as confirmed fraud for the session
+FRAUD_SEVERITIES = ('high', 'critical')
+
+_LABEL_TRUE = ('1', 'true', 'yes', 'fraud')
+
+
+def load_rule_set(path):
+    """Rule set from a JSON file (None or '' means the current defaults)"""
+    if not path:
+        return {}
+    with open(path) as f:
+        return validate_rule_set(json.load(f))
+
+
+def validate_rule_set(rule_set):
+    """Raise ValueError on unknown sections, weights or thresholds; returns rule_set"""
+    if not isinstance(rule_set, dict):
+        raise ValueError('A rule set must be a JSON object')
+    unknown = set(rule_set) - {'risk', 'ownership'}
+    if unknown:
+        raise ValueError(f"Unknown rule set sections: {', '.join(sorted(unknown))}")
+    # Fail on unknown weight/threshold names before any worker starts
+    risk, ownership = rule_set.get('risk') or {}, rule_set.get('ownership') or {}
+    for kind, overrides, defaults in (('risk weights', risk.get('weights'), RISK_WEIGHTS),
+                                      ('risk thresholds', risk.get('thresholds'), RISK_THRESHOLDS),
+                                      ('ownership thresholds', ownership.get('thresholds'), OWNERSHIP_THRESHOLDS)):
+        unknown = set(overrides or ()) - set(defaults)
+        if unknown:
+            raise ValueError(f"Unknown {kind}: {', '.join(sorted(unknown))}")
+        if any(not isinstance(value, (int, float)) for value in (overrides or {}).values()):
+            raise ValueError(f"{kind.capitalize()} must be numbers")
+    return rule_set
+
+
+class RuleSetScorer:
+    """Risk and ownership services configured with one rule set"""
+
+    def __init__(self, registry, rule_set):
+        risk = rule_set.get('risk') or {}
+        self.risk_service = RiskService(registry, weights=risk.get('weights'), thresholds=risk.get('thresholds'))
+        self.ownership_service = OwnershipService(registry, thresholds=(rule_set.get('ownership') or {}).get('thresholds'))
+
+    def score(self, inputs):
+        user_data = inputs.get('user_data') or {}
+        # The scoring internals directly: no executor, deadline or latency metrics in a replay
+        risk = self.risk_service._calculate_risk_score(user_data, inputs.get('device_data') or {},
+                                                       inputs.get('behavior_data') or {},
+                                                       inputs.get('keystroke_profile'))
+        # Same call as /api/verify/name-check (no device data)
+        ownership = self.ownership_service._verify_ownership(user_data.get('mobile', ''), user_data.get('name', ''))
+        if ownership['verified']:
+            status = 'verified'
+        elif ownership.get('requires_manual_review'):
+            status = 'review'
+        else:
+            status = 'failed'
+        return {
+            'risk_score': risk['risk_score'],
+            'risk_level': risk['risk_level'],
+            'is_fraud': risk['is_fraud'],
+            'needs_honeypot': risk['needs_honeypot'],
+            'ownership': status
+        }
+
+
+# ============================================
+# INPUT
+# ============================================
+
+def _inputs_of(record):
+    """Scoring inputs of a session record, or None if it predates input capture"""
+    inputs = record.get('scoring_inputs')
+    if inputs is None and 'user_data' in record:
+        inputs = record
+    return inputs or None
+
+
+def iter_sessions(data=None, archive=None, paths=(), stats=None):
+    """
+    Stream (session_id, scoring_inputs) from JSONL exports (optionally .gz),
+    the columnar archive (one partition at a time) and the live store.
+    Sessions without captured inputs are counted in stats['no_inputs'].
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('no_inputs', 0)
+
+    def records():
+        for path in paths:
+            with open_text(path) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        if archive is not None:
+            yield from archive.scan_records('sessions')
+        if data is not None:
+            for session_id, session in data.get('sessions', {}).items():
+                yield dict(session, session_id=session_id)
+
+    for record in records():
+        inputs = _inputs_of(record)
+        if inputs is None:
+            stats['no_inputs'] += 1
+            continue
+        yield record.get('session_id'), inputs
+
+
+def _session_ids(details):
+    if not isinstance(details, dict):
+        return []
+    ids = [details.get('session_id')]
+    ids.extend(event.get('session_id') for event in details.get('events') or [] if isinstance(event, dict))
+    return [session_id for session_id in ids if session_id]
+
+
+def collect_outcomes(data=None, archive=None, labels_path=None):
+    """
+    Session IDs with a confirmed fraud outcome: a transfer attempted inside
+    the honeypot, or a high/critical detection rule match. A labels CSV
+    (session_id,label) from e.g. chargeback review adds or clears labels.
+    Every other session counts as legitimate.
+    """
+    fraud = set()
+    suspicious = list(data.get('suspicious_activity', [])) if data is not None else []
+    if archive is not None:
+        suspicious = chain(archive.scan_records('suspicious_activity'), suspicious)
+    for record in suspicious:
+        details = record.get('details')
+        if isinstance(details, dict) and details.get('severity') in FRAUD_SEVERITIES:
+            fraud.update(_session_ids(details))
+    if data is not None:
+        fraud.update(h['session_id'] for h in data.get('honeypot_transfers', []) if h.get('session_id'))
+
+    if labels_path:
+        with open_text(labels_path) as f:
+            for row in csv.DictReader(f):
+                session_id = (row.get('session_id') or '').strip()
+                if not session_id:
+                    continue
+                if str(row.get('label', '')).strip().lower() in _LABEL_TRUE:
+                    fraud.add(session_id)
+                else:
+                    fraud.discard(session_id)
+    return fraud
+
+
+# ============================================
+# TALLIES
+# ============================================
+
+def new_tally():
+    """Mergeable counters for a chunk of sessions (plain dicts, cheap to pickle)"""
+    return {
+        'sessions': 0,
+        'positives': 0,
+        'sides': {side: {
+            'confusion': {'tp': 0, 'fp': 0, 'tn': 0, 'fn': 0},
+            'levels': dict.fromkeys(RISK_LEVELS, 0),
+            'ownership': dict.fromkeys(OWNERSHIP_STATUSES, 0),
+            'histogram': [0] * (MAX_SCORE_BIN + 1),
+            'score_sum': 0.0
+        } for side in SIDES},
+        'level_transitions': {},
+        'ownership_transitions': {},
+        'decision_flips': {'newly_flagged': {'fraud': 0, 'legit': 0}, 'unflagged': {'fraud': 0, 'legit': 0}}
+    }
+
+
+def add_to_tally(tally, results, is_fraud, decision):
+    tally['sessions'] += 1
+    tally['positives'] += is_fraud
+    for side, result in zip(SIDES, results):
+        counts = tally['sides'][side]
+        flagged = result[decision]
+        cell = ('tp' if is_fraud else 'fp') if flagged else ('fn' if is_fraud else 'tn')
+        counts['confusion'][cell] += 1
+        counts['levels'][result['risk_level']] += 1
+        counts['ownership'][result['ownership']] += 1
+        score = result['risk_score']
+        counts['histogram'][min(max(int(score), 0), MAX_SCORE_BIN)] += 1
+        counts['score_sum'] += score
+
+    baseline, candidate = results
+    label = 'fraud' if is_fraud else 'legit'
+    if baseline['risk_level'] != candidate['risk_level']:
+        key = f"{baseline['risk_level']}->{candidate['risk_level']}"
+        tally['level_transitions'][key] = tally['level_transitions'].get(key, 0) + 1
+    if baseline['ownership'] != candidate['ownership']:
+        key = f"{baseline['ownership']}->{candidate['ownership']}"
+        tally['ownership_transitions'][key] = tally['ownership_transitions'].get(key, 0) + 1
+    if baseline[decision] != candidate[decision]:
+        tally['decision_flips']['newly_flagged' if candidate[decision] else 'unflagged'][label] += 1
+
+
+def merge_tally(total, part):
+    total['sessions'] += part['sessions']
+    total['positives'] += part['positives']
+    for side in SIDES:
+        into, other = total['sides'][side], part['sides'][side]
+        for group in ('confusion', 'levels', 'ownership'):
+            for key, value in other[group].items():
+                into[group][key] += value
+        into['histogram'] = [a + b for a, b in zip(into['histogram'], other['histogram'])]
+        into['score_sum'] += other['score_sum']
+    for group in ('level_transitions', 'ownership_transitions'):
+        for key, value in part[group].items():
+            total[group][key] = total[group].get(key, 0) + value
+    for direction, counts in part['decision_flips'].items():
+        for label, value in counts.items():
+            total['decision_flips'][direction][label] += value
+    return total
+
+
+# ============================================
+# REPORT
+# ============================================
+
+def _rate(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def _percentile(histogram, total, q):
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for score, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            return score
+    return MAX_SCORE_BIN
+
+
+def _side_report(counts, sessions):
+    confusion = counts['confusion']
+    tp, fp, tn, fn = confusion['tp'], confusion['fp'], confusion['tn'], confusion['fn']
+    histogram = counts['histogram']
+    return {
+        'confusion': dict(confusion),
+        'flagged': tp + fp,
+        'precision': _rate(tp, tp + fp),
+        'recall': _rate(tp, tp + fn),
+        'false_positive_rate': _rate(fp, fp + tn),
+        'levels': dict(counts['levels']),
+        'ownership': dict(counts['ownership']),
+        'score': {
+            'mean': round(counts['score_sum'] / sessions, 2) if sessions else None,
+            'p50': _percentile(histogram, sessions, 0.5),
+            'p90': _percentile(histogram, sessions, 0.9),
+            'p99': _percentile(histogram, sessions, 0.99)
+        }
+    }
+
+
+def _delta(a, b):
+    return None if a is None or b is None else round(b - a, 4)
+
+
+def build_report(tally, decision):
+    """Confusion matrices per side, their deltas, and how the score distribution moved"""
+    sessions = tally['sessions']
+    baseline = _side_report(tally['sides']['baseline'], sessions)
+    candidate = _side_report(tally['sides']['candidate'], sessions)
+
+    # Largest gap between the two score CDFs (Kolmogorov-Smirnov statistic)
+    ks = 0.0
+    if sessions:
+        cdf_gap = 0
+        for b, c in zip(tally['sides']['baseline']['histogram'], tally['sides']['candidate']['histogram']):
+            cdf_gap += c - b
+            ks = max(ks, abs(cdf_gap) / sessions)
+
+    return {
+        'sessions': sessions,
+        'fraud_labels': tally['positives'],
+        'decision': decision,
+        'baseline': baseline,
+        'candidate': candidate,
+        'delta': {
+            'confusion': {cell: candidate['confusion'][cell] - baseline['confusion'][cell]
+                          for cell in baseline['confusion']},
+            'flagged': candidate['flagged'] - baseline['flagged'],
+            'precision': _delta(baseline['precision'], candidate['precision']),
+            'recall': _delta(baseline['recall'], candidate['recall']),
+            'false_positive_rate': _delta(baseline['false_positive_rate'], candidate['false_positive_rate']),
+            'levels': {level: candidate['levels'][level] - baseline['levels'][level] for level in RISK_LEVELS},
+            'ownership': {status: candidate['ownership'][status] - baseline['ownership'][status]
+                          for status in OWNERSHIP_STATUSES}
+        },
+        'score_shift': {
+            'mean': _delta(baseline['score']['mean'], candidate['score']['mean']),
+            'p50': _delta(baseline['score']['p50'], candidate['score']['p50']),
+            'p90': _delta(baseline['score']['p90'], candidate['score']['p90']),
+            'p99': _delta(baseline['score']['p99'], candidate['score']['p99']),
+            'ks_statistic': round(ks, 4)
+        },
+        'decision_flips': tally['decision_flips'],
+        'level_transitions': dict(sorted(tally['level_transitions'].items(), key=lambda item: -item[1])),
+        'ownership_transitions': dict(sorted(tally['ownership_transitions'].items(), key=lambda item: -item[1]))
+    }
+
+
+# ============================================
+# PROCESS POOL JOB
+# ============================================
+
+_worker_scorers = None
+
+
+def _init_worker(telecom_data_path, baseline, candidate, delta_dir=None, deltas=()):
+    """Build both scorers once per worker over one shared registry, with the parent's registry deltas"""
+    global _worker_scorers
+    if _worker_scorers is None:
+        registry = TelecomRegistry.load(telecom_data_path, delta_dir, list(deltas))
+        _worker_scorers = (RuleSetScorer(registry, baseline), RuleSetScorer(registry, candidate))
+
+
+def _score_chunk(chunk, decision, collect_changes):
+    tally = new_tally()
+    changes = []
+    for session_id, inputs, is_fraud in chunk:
+        results = [scorer.score(inputs) for scorer in _worker_scorers]
+        add_to_tally(tally, results, is_fraud, decision)
+        if collect_changes and (results[0][decision] != results[1][decision]
+                                or results[0]['risk_level'] != results[1]['risk_level']
+                                or results[0]['ownership'] != results[1]['ownership']):
+            changes.append({'session_id': session_id, 'fraud': is_fraud,
+                            'baseline': results[0], 'candidate': results[1]})
+    return tally, changes
+
+
+def _chunks(sessions, fraud, chunk_size):
+    chunk = []
+    for session_id, inputs in sessions:
+        chunk.append((session_id, inputs, session_id in fraud))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_backtest(sessions, fraud, telecom_data_path, baseline=None, candidate=None, decision='is_fraud',
+                 workers=None, chunk_size=2000, changes_path=None, progress=None, delta_dir=None):
+    """
+    Score every (session_id, scoring_inputs) from the sessions iterator with
+    both rule sets across a process pool. Only counters come back from the
+    workers (plus changed sessions when changes_path is set, written as
+    JSONL), and at most 2 chunks per worker are in flight, so memory stays
+    flat however many sessions stream through. Both sides score against the
+    registry with the delta files in delta_dir applied, like the live one.
+    """
+    if decision not in DECISIONS:
+        raise ValueError(f"decision must be one of {DECISIONS}")
+    workers = workers or os.cpu_count() or 1
+    baseline, candidate = baseline or {}, candidate or {}
+    # Fixed up front so every worker replays the same registry version
+    deltas = TelecomRegistry.load(telecom_data_path, delta_dir).applied_deltas if delta_dir else []
+
+    # Preload in the parent so forked workers share the registry pages
+    global _worker_scorers
+    _worker_scorers = None
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    if context.get_start_method() == 'fork':
+        _init_worker(telecom_data_path, baseline, candidate, delta_dir, deltas)
+
+    total = new_tally()
+    changes_file = open(changes_path, 'w', encoding='utf-8') if changes_path else None
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(telecom_data_path, baseline, candidate, delta_dir, deltas)) as pool:
+            pending = deque()
+
+            def drain_one():
+                tally, changes = pending.popleft().result()
+                merge_tally(total, tally)
+                for change in changes:
+                    changes_file.write(json.dumps(change, ensure_ascii=False) + '\n')
+                if progress:
+                    progress(total['sessions'], total['sessions'] / (time.perf_counter() - start))
+
+            for chunk in _chunks(sessions, fraud, chunk_size):
+                pending.append(pool.submit(_score_chunk, chunk, decision, changes_file is not None))
+                if len(pending) >= workers * 2:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        if changes_file:
+            changes_file.close()
+
+    elapsed = time.perf_counter() - start
+    report = build_report(total, decision)
+    report['run'] = {
+        'workers': workers,
+        'chunk_size': chunk_size,
+        'registry_deltas': deltas,
+        'elapsed_s': round(elapsed, 3),
+        'sessions_per_second': round(total['sessions'] / elapsed, 1) if elapsed else 0.0
+    }
+    return report
@@ -0,0 +1,260 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from services.ownership_service import OwnershipService
+from services.telecom_registry import TelecomRegistry
+from services.telecom_service import TelecomService
+from utils.data_loader import open_text
+from utils.helpers import validate_mobile_number
+
+RESULT_FIELDS = ['row', 'mobile', 'name', 'status', 'verified', 'confidence_score', 'telecom_owner',
+                 'provider', 'sim_age_days', 'sim_age_category', 'kyc_verified', 'identity_linked',
+                 'requires_manual_review', 'risk_factors']
+
+
+class BatchVerificationService:
+    """
+    Offline KYC re-verification of (name, mobile) pairs.
+    Runs the same ownership, SIM-age and KYC checks as /api/verify/name-check.
+    """
+
+    def __init__(self, ownership_service, telecom_service):
+        self.ownership_service = ownership_service
+        self.telecom_service = telecom_service
+
+    def verify_row(self, row_number, row):
+        if not isinstance(row, dict):
+            return {'row': row_number, 'mobile': '', 'name': '', 'status': 'invalid', 'verified': False,
+                    'confidence_score': 0, 'risk_factors': ['Row is not an object with name and mobile']}
+        name = str(row.get('name') or '').strip()
+        mobile = str(row.get('mobile') or '').strip()
+        result = {'row': row_number, 'mobile': mobile, 'name': name}
+
+        if not name or not validate_mobile_number(mobile):
+            result.update({'status': 'invalid', 'verified': False, 'confidence_score': 0,
+                           'risk_factors': ['Missing name or invalid mobile number']})
+            return result
+
+        ownership = self.ownership_service.verify_ownership(mobile, name)
+        telecom = self.telecom_service.verify_owner(mobile, name)
+        methods = {m['method']: m['status'] for m in ownership.get('verification_methods', [])}
+
+        result.update({
+            'status': 'verified' if ownership['verified'] else (
+                'review' if ownership.get('requires_manual_review') else 'failed'),
+            'verified': ownership['verified'],
+            'confidence_score': ownership['confidence_score'],
+            'telecom_owner': ownership.get('owner_name'),
+            'provider': telecom.get('provider'),
+            'sim_age_days': telecom.get('sim_age_days'),
+            'sim_age_category': telecom.get('sim_age_category'),
+            'kyc_verified': methods.get('kyc_status') == 'passed',
+            'identity_linked': methods.get('identity_linkage', 'failed'),
+            'requires_manual_review': ownership.get('requires_manual_review', False),
+            'risk_factors': ownership.get('risk_factors', [])
+        })
+        return result
+
+    def verify_rows(self, rows, start_row=1):
+        """Verify rows inline, yielding one result per input row"""
+        for row_number, row in enumerate(rows, start_row):
+            yield self.verify_row(row_number, row)
+
+
+# ============================================
+# INPUT / OUTPUT
+# ============================================
+
+def iter_input_rows(path, skip=0):
+    """Stream input rows from CSV (header with name,mobile) or JSONL"""
+    base = path[:-3] if path.endswith('.gz') else path
+    with open_text(path) as f:
+        if base.endswith('.jsonl'):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for i, row in enumerate(rows):
+            if i >= skip:
+                yield row
+
+
+def iter_text_rows(text_stream, fmt):
+    """Stream rows from an uploaded text stream ('csv' or 'jsonl')"""
+    if fmt == 'jsonl':
+        return (json.loads(line) for line in text_stream if line.strip())
+    return csv.DictReader(text_stream)
+
+
+class ResultWriter:
+    """Append results as JSONL or CSV, depending on the output extension"""
+
+    def __init__(self, path, resume_offset=None):
+        self.path = path
+        self.is_csv = path.endswith('.csv')
+        exists = resume_offset is not None and os.path.exists(path)
+        self.file = open(path, 'r+' if exists else 'w', newline='', encoding='utf-8')
+        if exists:
+            # Drop anything written after the last checkpoint
+            self.file.seek(resume_offset)
+            self.file.truncate()
+        self.csv_writer = csv.DictWriter(self.file, RESULT_FIELDS, extrasaction='ignore') if self.is_csv else None
+        if self.is_csv and not exists:
+            self.csv_writer.writeheader()
+
+    def write(self, result):
+        if self.is_csv:
+            self.csv_writer.writerow(dict(result, risk_factors='; '.join(result.get('risk_factors', []))))
+        else:
+            self.file.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+# ============================================
+# PROCESS POOL JOB
+# ============================================
+
+_worker_service = None
+_worker_registry_key = None
+
+
+def _init_worker(telecom_data_path, delta_dir=None, deltas=()):
+    """Build services once per worker (already inherited when forked), with the parent's registry deltas"""
+    global _worker_service, _worker_registry_key
+    key = (telecom_data_path, delta_dir, tuple(deltas))
+    if _worker_service is None or _worker_registry_key != key:
+        registry = TelecomRegistry.load(telecom_data_path, delta_dir, list(deltas))
+        _worker_service = BatchVerificationService(OwnershipService(registry), TelecomService(registry))
+        _worker_registry_key = key
+
+
+def _verify_chunk(start_row, rows):
+    return [_worker_service.verify_row(start_row + i, row) for i, row in enumerate(rows)]
+
+
+def _chunks(rows, chunk_size, start_row):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield start_row, chunk
+            start_row += len(chunk)
+            chunk = []
+    if chunk:
+        yield start_row, chunk
+
+
+def _load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def _save_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def run_batch_job(input_path, output_path, telecom_data_path, workers=None, chunk_size=1000,
+                  checkpoint_path=None, resume=False, progress=None, delta_dir=None):
+    """
+    Verify every row of input_path across a process pool and stream results
+    to output_path. At most 2 chunks per worker are in flight, so memory is
+    bounded regardless of input size. After each chunk is durably written
+    the checkpoint records rows done and the output offset; resume=True
+    continues from there. Workers score against the base registry plus the
+    delta files in delta_dir, like the live registry.
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+    state = _load_checkpoint(checkpoint_path) if resume else None
+    if resume and state is None:
+        raise ValueError(f'No checkpoint to resume from at {checkpoint_path}')
+    if state and state.get('input') != os.path.abspath(input_path):
+        raise ValueError('Checkpoint belongs to a different input file')
+    if state and (not os.path.exists(output_path) or os.path.getsize(output_path) < state['output_offset']):
+        raise ValueError(f'Output {output_path} is missing or shorter than its checkpoint; cannot resume')
+    # Fixed up front so a delta dropped in mid-run doesn't split the job across registry versions
+    deltas = TelecomRegistry.load(telecom_data_path, delta_dir).applied_deltas if delta_dir else []
+
+    rows_done = state['rows_done'] if state else 0
+    counts = dict(state['counts']) if state else {'verified': 0, 'review': 0, 'failed': 0, 'invalid': 0}
+    writer = ResultWriter(output_path, resume_offset=state['output_offset'] if state else None)
+
+    # Preload in the parent so forked workers share the registry pages
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    if context.get_start_method() == 'fork':
+        _init_worker(telecom_data_path, delta_dir, deltas)
+
+    start = time.perf_counter()
+    processed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(telecom_data_path, delta_dir, deltas)) as pool:
+            pending = deque()
+            chunks = _chunks(iter_input_rows(input_path, skip=rows_done), chunk_size, rows_done + 1)
+
+            def drain_one():
+                nonlocal rows_done, processed
+                results = pending.popleft().result()
+                for result in results:
+                    writer.write(result)
+                    counts[result['status']] += 1
+                rows_done += len(results)
+                processed += len(results)
+                _save_checkpoint(checkpoint_path, {
+                    'input': os.path.abspath(input_path),
+                    'rows_done': rows_done,
+                    'output_offset': writer.flush(),
+                    'counts': counts,
+                    'updated_at': datetime.now().isoformat()
+                })
+                if progress:
+                    progress(rows_done, processed / (time.perf_counter() - start))
+
+            for start_row, chunk in chunks:
+                pending.append(pool.submit(_verify_chunk, start_row, chunk))
+                if len(pending) >= workers * 2:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return {
+        'input': input_path,
+        'output': output_path,
+        'rows': rows_done,
+        'processed_this_run': processed,
+        'resumed_from': rows_done - processed,
+        'counts': counts,
+        'workers': workers,
+        'chunk_size': chunk_size,
+        'registry_deltas': deltas,
+        'elapsed_s': round(elapsed, 3),
+        'rows_per_second': round(processed / elapsed, 1) if elapsed else 0.0
+    }
+
+
+def decode_upload(stream):
+    """Wrap a binary upload stream for text row parsing"""
+    return io.TextIOWrapper(stream, encoding='utf-8', newline='')
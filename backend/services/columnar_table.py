@@ -0,0 +1,564 @@
+"""
+Append-only columnar tables for the tracking store's transactions and
+suspicious activity.
+
+A list of dicts pays for a hash table, a repeated copy of every key and a
+fresh ISO timestamp string per record. Here each field is a column:
+numbers and epoch-microsecond timestamps in typed arrays, low-cardinality
+strings (user, user_name, type, status, ...) dictionary-encoded into int32
+codes shared by both tables, per-record strings (session IDs, recipients,
+suspicious reasons) kept as plain objects, since a dictionary would hold on
+to every value ever appended, and a suspicious entry whose details are a
+ledger entry stores that entry's ID instead of a copy. Values a column
+can't hold exactly (a timestamp with an offset, an unhashable string
+field, a key outside the schema) are kept as-is on the side, so records
+read back unchanged.
+
+Iterating or indexing a table yields Row objects: read-only Mapping views
+that decode fields on access, so code written against the dicts
+(t['amount'], t.get('reason'), dict(t)) keeps working. Rows pickle and
+JSON-encode (to_builtin) as plain dicts.
+"""
+import bisect
+import sys
+from array import array
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+_ABSENT_INT = -2 ** 63
+_OVERFLOW_INT = -2 ** 63 + 1
+_MAX_EXACT_FLOAT = 2 ** 53
+
+# Number tags
+_FLOAT, _INT, _NUM_ABSENT, _NUM_OVERFLOW = 0, 1, 2, 3
+# String codes
+_STR_ABSENT, _STR_OVERFLOW = -1, -2
+
+_ABSENT = object()
+
+TRANSACTION_SCHEMA = {
+    'id': 'int', 'timestamp': 'time', 'user': 'str', 'user_name': 'str', 'type': 'str', 'amount': 'num',
+    'recipient': 'text', 'status': 'str', 'session_id': 'text', 'reason': 'str', 'balance_after': 'num'
+}
+# Suspicious reasons embed amounts and element names, so nearly every one is distinct
+SUSPICIOUS_SCHEMA = {
+    'user': 'str', 'user_name': 'str', 'timestamp': 'time', 'reason': 'text', 'details': 'ref'
+}
+
+
+def _encode_time(value):
+    """Naive ISO timestamp -> microseconds since the epoch, or None if it wouldn't read back identically"""
+    if type(value) is not str:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None or parsed.isoformat() != value:
+        return None
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+
+def _decode_time(micros):
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class StringDictionary:
+    """Value <-> int code; values are kept with their type so 1, '1' and True stay apart"""
+
+    __slots__ = ('codes', 'values')
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        key = (type(value), value)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def nbytes(self):
+        return (sys.getsizeof(self.codes) + sys.getsizeof(self.values) +
+                sum(sys.getsizeof(value) for value in self.values))
+
+
+# ============================================
+# COLUMNS
+# ============================================
+
+class _Column:
+    """Typed storage plus {row: value} for values the type can't hold"""
+
+    __slots__ = ('values', 'overflow')
+
+    def nbytes(self):
+        return self.values.itemsize * len(self.values) + sys.getsizeof(self.overflow)
+
+    def _take_overflow(self, rows):
+        if not self.overflow:
+            return {}
+        position = {row: i for i, row in enumerate(rows) if row in self.overflow}
+        return {i: self.overflow[row] for row, i in position.items()}
+
+
+class _IntColumn(_Column):
+    __slots__ = ()
+
+    def __init__(self):
+        self.values = array('q')
+        self.overflow = {}
+
+    def append(self, value):
+        if value is _ABSENT:
+            self.values.append(_ABSENT_INT)
+        elif type(value) is int and _OVERFLOW_INT < value < 2 ** 63:
+            self.values.append(value)
+        else:
+            self.overflow[len(self.values)] = value
+            self.values.append(_OVERFLOW_INT)
+
+    def get(self, row):
+        value = self.values[row]
+        if value == _ABSENT_INT:
+            return _ABSENT
+        if value == _OVERFLOW_INT:
+            return self.overflow[row]
+        return value
+
+    def take(self, rows):
+        column = type(self)()
+        column.values = array('q', (self.values[row] for row in rows))
+        column.overflow = self._take_overflow(rows)
+        return column
+
+
+class _TimeColumn(_IntColumn):
+    __slots__ = ()
+
+    def append(self, value):
+        micros = _encode_time(value) if value is not _ABSENT else None
+        if micros is not None:
+            self.values.append(micros)
+            return
+        if value is not _ABSENT:
+            self.overflow[len(self.values)] = value
+        self.values.append(_ABSENT_INT if value is _ABSENT else _OVERFLOW_INT)
+
+    def get(self, row):
+        value = self.values[row]
+        if value == _ABSENT_INT:
+            return _ABSENT
+        if value == _OVERFLOW_INT:
+            return self.overflow[row]
+        return _decode_time(value)
+
+
+class _NumberColumn(_Column):
+    """float64 with a tag per row, so ints come back as ints"""
+
+    __slots__ = ('tags',)
+
+    def __init__(self):
+        self.values = array('d')
+        self.tags = bytearray()
+        self.overflow = {}
+
+    def append(self, value):
+        kind = type(value)
+        if kind is float:
+            self.values.append(value)
+            self.tags.append(_FLOAT)
+        elif kind is int and -_MAX_EXACT_FLOAT <= value <= _MAX_EXACT_FLOAT:
+            self.values.append(value)
+            self.tags.append(_INT)
+        else:
+            if value is not _ABSENT:
+                self.overflow[len(self.values)] = value
+            self.values.append(0.0)
+            self.tags.append(_NUM_ABSENT if value is _ABSENT else _NUM_OVERFLOW)
+
+    def get(self, row):
+        tag = self.tags[row]
+        if tag == _FLOAT:
+            return self.values[row]
+        if tag == _INT:
+            return int(self.values[row])
+        return _ABSENT if tag == _NUM_ABSENT else self.overflow[row]
+
+    def take(self, rows):
+        column = _NumberColumn()
+        column.values = array('d', (self.values[row] for row in rows))
+        column.tags = bytearray(self.tags[row] for row in rows)
+        column.overflow = self._take_overflow(rows)
+        return column
+
+    def nbytes(self):
+        return super().nbytes() + len(self.tags)
+
+
+class _StringColumn(_Column):
+    __slots__ = ('strings',)
+
+    def __init__(self, strings):
+        self.values = array('i')
+        self.strings = strings
+        self.overflow = {}
+
+    def append(self, value):
+        if value is _ABSENT:
+            self.values.append(_STR_ABSENT)
+            return
+        try:
+            self.values.append(self.strings.encode(value))
+        except TypeError:  # unhashable
+            self.overflow[len(self.values)] = value
+            self.values.append(_STR_OVERFLOW)
+
+    def get(self, row):
+        code = self.values[row]
+        if code >= 0:
+            return self.strings.values[code]
+        return _ABSENT if code == _STR_ABSENT else self.overflow[row]
+
+    def take(self, rows):
+        column = _StringColumn(self.strings)
+        column.values = array('i', (self.values[row] for row in rows))
+        column.overflow = self._take_overflow(rows)
+        return column
+
+
+class _TextColumn(_Column):
+    """High-cardinality values as plain objects, so dropped rows free them"""
+
+    __slots__ = ()
+
+    def __init__(self):
+        self.values = []
+        self.overflow = {}
+
+    def append(self, value):
+        self.values.append(value)
+
+    def get(self, row):
+        return self.values[row]
+
+    def take(self, rows):
+        column = _TextColumn()
+        column.values = [self.values[row] for row in rows]
+        return column
+
+    def nbytes(self):
+        return sys.getsizeof(self.values) + sum(sys.getsizeof(value) for value in self.values if value is not _ABSENT)
+
+
+class _RefColumn(_Column):
+    """
+    A Row of the target table is stored as its key; anything else (action
+    dicts, rule match details) as the object itself.
+    """
+
+    __slots__ = ('target',)
+
+    def __init__(self, target):
+        self.values = array('q')
+        self.target = target
+        self.overflow = {}
+
+    def append(self, value):
+        if isinstance(value, Row) and value.table is self.target and value.key is not None:
+            self.values.append(value.key)
+            return
+        if isinstance(value, Mapping) and self.target is not None:
+            # A loaded copy of a ledger entry is replaced by a reference to it
+            row = self.target.row_for_key(value.get('id')) if type(value.get('id')) is int else None
+            if row is not None and dict(row) == dict(value):
+                self.values.append(row.key)
+                return
+        if value is not _ABSENT:
+            self.overflow[len(self.values)] = value
+        self.values.append(_ABSENT_INT if value is _ABSENT else _OVERFLOW_INT)
+
+    def get(self, row):
+        value = self.values[row]
+        if value == _ABSENT_INT:
+            return _ABSENT
+        if value == _OVERFLOW_INT:
+            return self.overflow[row]
+        return self.target.row_for_key(value)
+
+    def detach(self, keys):
+        """Replace references to keys (rows about to leave the target) with copies"""
+        for row, value in enumerate(self.values):
+            if value in keys:
+                self.overflow[row] = dict(self.target.row_for_key(value))
+                self.values[row] = _OVERFLOW_INT
+
+    def take(self, rows):
+        column = _RefColumn(self.target)
+        column.values = array('q', (self.values[row] for row in rows))
+        column.overflow = self._take_overflow(rows)
+        return column
+
+    def nbytes(self):
+        # Objects kept as-is are counted by their owner
+        return super().nbytes() + sum(sys.getsizeof(value) for value in self.overflow.values())
+
+
+# ============================================
+# TABLE
+# ============================================
+
+class Row(Mapping):
+    """Read-only dict view of one table row"""
+
+    __slots__ = ('table', 'key', '_row', '_generation')
+
+    def __init__(self, table, row, key=None):
+        self.table = table
+        self.key = key
+        self._row = row
+        self._generation = table.generation
+
+    def _index(self):
+        if self._generation != self.table.generation:
+            # The table was compacted; keyed rows are found again by key
+            row = self.table._find_key(self.key) if self.key is not None else None
+            if row is None:
+                raise LookupError('Row is no longer in the table')
+            self._row, self._generation = row, self.table.generation
+        return self._row
+
+    def __getitem__(self, name):
+        value = self.table._get(self._index(), name)
+        if value is _ABSENT:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self):
+        return self.table._keys(self._index())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        return dict, (to_builtin(self),)
+
+    def __repr__(self):
+        return f'Row({dict(self)!r})'
+
+
+class ColumnarTable:
+    """
+    Append-only table of records with a fixed schema (name -> 'int', 'num',
+    'time', 'str', 'text' or 'ref'). With key, rows are also found by that int
+    column (binary search while keys arrive in increasing order, as ledger
+    IDs do), and Rows survive retain() by looking their key up again.
+    """
+
+    def __init__(self, schema, key=None, strings=None, ref_target=None):
+        self.schema = dict(schema)
+        self.key = key
+        self.strings = strings if strings is not None else StringDictionary()
+        self.ref_target = ref_target
+        self.columns = {name: self._new_column(kind) for name, kind in self.schema.items()}
+        # Fields outside the schema, {row: {name: value}}
+        self.extras = {}
+        self.size = 0
+        self.generation = 0
+        self._keys_sorted = True
+        self._key_index = None
+        self._referrers = []
+        if ref_target is not None:
+            ref_target._referrers.append(self)
+
+    def _new_column(self, kind):
+        if kind == 'int':
+            return _IntColumn()
+        if kind == 'time':
+            return _TimeColumn()
+        if kind == 'num':
+            return _NumberColumn()
+        if kind == 'str':
+            return _StringColumn(self.strings)
+        if kind == 'text':
+            return _TextColumn()
+        if kind == 'ref':
+            return _RefColumn(self.ref_target)
+        raise ValueError(f'Unknown column kind: {kind}')
+
+    @classmethod
+    def from_records(cls, records, schema, key=None, strings=None, ref_target=None):
+        table = cls(schema, key, strings, ref_target)
+        table.extend(records)
+        return table
+
+    # ============================================
+    # WRITING
+    # ============================================
+
+    def append(self, record):
+        """Append a record (any mapping); returns its Row"""
+        row = self.size
+        for name, column in self.columns.items():
+            column.append(record.get(name, _ABSENT))
+        extra = {name: value for name, value in record.items() if name not in self.columns}
+        if extra:
+            self.extras[row] = extra
+        key = None
+        if self.key is not None:
+            key = self.columns[self.key].get(row)
+            if type(key) is not int:
+                key = None
+            else:
+                if row and self._keys_sorted and key <= self.columns[self.key].values[row - 1]:
+                    self._keys_sorted = False
+                if self._key_index is not None:
+                    self._key_index[key] = row
+        # Readers only see the row once every column has it
+        self.size = row + 1
+        return Row(self, row, key)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def retain(self, keep):
+        """Drop every row keep(row) is false for (a rewrite, O(rows)); rows left keep their order"""
+        rows = [row for row in range(self.size) if keep(self[row])]
+        if len(rows) == self.size:
+            return 0
+        removed = self.size - len(rows)
+        if self.key is not None and self._referrers:
+            kept = set(rows)
+            keys = {self.columns[self.key].values[row] for row in range(self.size) if row not in kept}
+            for table in self._referrers:
+                for column in table.columns.values():
+                    if isinstance(column, _RefColumn):
+                        column.detach(keys)
+        self.columns = {name: column.take(rows) for name, column in self.columns.items()}
+        position = {row: i for i, row in enumerate(rows)}
+        self.extras = {position[row]: extra for row, extra in self.extras.items() if row in position}
+        self.size = len(rows)
+        self._key_index = None
+        self.generation += 1
+        return removed
+
+    # ============================================
+    # READING
+    # ============================================
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for row in range(self.size):
+            yield self._row(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(row) for row in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('table index out of range')
+        return self._row(index)
+
+    def _row(self, row):
+        key = None
+        if self.key is not None:
+            key = self.columns[self.key].values[row]
+            if key in (_ABSENT_INT, _OVERFLOW_INT):
+                key = None
+        return Row(self, row, key)
+
+    def _get(self, row, name):
+        column = self.columns.get(name)
+        if column is not None:
+            return column.get(row)
+        extra = self.extras.get(row)
+        return extra.get(name, _ABSENT) if extra else _ABSENT
+
+    def _keys(self, row):
+        for name, column in self.columns.items():
+            if column.get(row) is not _ABSENT:
+                yield name
+        yield from self.extras.get(row, ())
+
+    def _find_key(self, key):
+        keys = self.columns[self.key].values
+        if self._keys_sorted:
+            row = bisect.bisect_left(keys, key, 0, self.size)
+            return row if row < self.size and keys[row] == key else None
+        if self._key_index is None:
+            self._key_index = {keys[row]: row for row in range(self.size)}
+        return self._key_index.get(key)
+
+    def row_for_key(self, key):
+        if self.key is None or key is None:
+            return None
+        row = self._find_key(key)
+        return Row(self, row, key) if row is not None else None
+
+    def latest(self, n, column='timestamp'):
+        """The n rows with the greatest value in a time/int column, newest first"""
+        count = self.size
+        if n <= 0 or not count:
+            return []
+        # Slicing copies under the GIL; a view of the live array would block appends
+        values = np.array(self.columns[column].values[:count], dtype=np.int64)
+        top = np.argpartition(values, count - n)[count - n:] if n < count else np.arange(count)
+        # Newest first, earlier rows first on ties (as sorted(..., reverse=True))
+        order = top[np.lexsort((top, -values[top]))]
+        return [self._row(int(row)) for row in order]
+
+    def to_records(self):
+        return [to_builtin(row) for row in self]
+
+    def nbytes(self, include_strings=True):
+        """Approximate memory held by the table (the shared string dictionary once, if asked)"""
+        total = sum(column.nbytes() for column in self.columns.values())
+        total += sys.getsizeof(self.extras) + sum(sys.getsizeof(extra) for extra in self.extras.values())
+        if include_strings:
+            total += self.strings.nbytes()
+        return total
+
+
+def to_builtin(obj):
+    """json 'default' hook: Rows become dicts (nested Rows too), tables lists"""
+    if isinstance(obj, Row):
+        return {name: to_builtin(value) if isinstance(value, Row) else value for name, value in obj.items()}
+    if isinstance(obj, ColumnarTable):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def retain(records, keep):
+    """Keep records keep(record) is true for, in place for tables; returns the collection to store"""
+    if isinstance(records, ColumnarTable):
+        records.retain(keep)
+        return records
+    return [record for record in records if keep(record)]
+
+
+def to_columnar(data):
+    """
+    Convert a tracking store's transactions and suspicious activity to
+    tables in place (no-op if they already are). Suspicious entries whose
+    details are one of the transactions become references to it.
+    """
+    if isinstance(data.get('transactions'), ColumnarTable):
+        return data
+    strings = StringDictionary()
+    transactions = ColumnarTable.from_records(data.get('transactions', []), TRANSACTION_SCHEMA, key='id',
+                                              strings=strings)
+    data['transactions'] = transactions
+    data['suspicious_activity'] = ColumnarTable.from_records(data.get('suspicious_activity', []),
+                                                             SUSPICIOUS_SCHEMA, strings=strings,
+                                                             ref_target=transactions)
+    return data
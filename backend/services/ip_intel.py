@@ -0,0 +1,273 @@
+import csv
+import ipaddress
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from utils.data_loader import open_text
+
+try:
+    import maxminddb
+except ImportError:  # optional dependency, .mmdb sources are skipped without it
+    maxminddb = None
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_LOCATION = 'Unknown Location'
+
+# Seconds a replaced snapshot's .mmdb readers stay open for lookups already using it
+READER_GRACE_SECONDS = 5.0
+
+# Always present, lower priority than any loaded range
+BUILTIN_RANGES = [
+    ('127.0.0.0/8', {'location': 'Localhost', 'is_private': True}),
+    ('::1/128', {'location': 'Localhost', 'is_private': True}),
+    ('10.0.0.0/8', {'location': 'Local Network', 'is_private': True}),
+    ('172.16.0.0/12', {'location': 'Local Network', 'is_private': True}),
+    ('192.168.0.0/16', {'location': 'Local Network', 'is_private': True}),
+    ('fc00::/7', {'location': 'Local Network', 'is_private': True}),
+]
+
+_FLAG_TRUE = ('1', 'true', 'yes', 'y')
+
+
+def _record(row):
+    """Normalize a range row (CSV dict or builtin) to the lookup result fields"""
+    def flag(name):
+        return str(row.get(name) or '').strip().lower() in _FLAG_TRUE or row.get(name) is True
+
+    asn = str(row.get('asn') or '').upper().lstrip('AS')
+    return (
+        int(asn) if asn.isdigit() else None,
+        row.get('as_org') or None,
+        (row.get('country') or '').upper() or None,
+        row.get('location') or None,
+        flag('is_vpn'),
+        flag('is_hosting'),
+        flag('is_private')
+    )
+
+
+def _parse_range(row):
+    """(version, first, last) from a 'network' CIDR or 'start_ip'/'end_ip' columns"""
+    if row.get('network'):
+        network = ipaddress.ip_network(row['network'].strip(), strict=False)
+        return network.version, int(network.network_address), int(network.broadcast_address)
+    start = ipaddress.ip_address(row['start_ip'].strip())
+    end = ipaddress.ip_address(row['end_ip'].strip())
+    if start.version != end.version or int(end) < int(start):
+        raise ValueError('invalid address range')
+    return start.version, int(start), int(end)
+
+
+def _flatten(ranges):
+    """
+    Turn possibly nested ranges into sorted, disjoint (first, last, record)
+    segments where the most specific range wins (loaded sources over
+    builtins for identical bounds). Partially overlapping ranges are
+    clipped to the enclosing one.
+    """
+    ranges.sort(key=lambda r: (r[0], -r[1], -r[3]))
+    segments = []
+    stack = []  # (last, record) of the ranges containing the cursor
+    cursor = None
+
+    def close_until(position):
+        nonlocal cursor
+        while stack and stack[-1][0] < position:
+            last, record = stack.pop()
+            if cursor <= last:
+                segments.append((cursor, last, record))
+                cursor = last + 1
+
+    for first, last, record, _ in ranges:
+        close_until(first)
+        if stack:
+            if cursor < first:
+                segments.append((cursor, first - 1, stack[-1][1]))
+            last = min(last, stack[-1][0])
+        cursor = first
+        stack.append((last, record))
+    if stack:
+        close_until(stack[0][0] + 1)
+    return segments
+
+
+class IPIntelSnapshot:
+    """
+    Immutable range tables for one load: per IP version, sorted segment
+    starts/ends plus a record index, searched with bisect (O(log n)).
+    Identical records are shared so the tables stay small.
+    """
+
+    def __init__(self, ranges, readers=(), cache_size=65536, sources=()):
+        self.readers = list(readers)
+        self.sources = list(sources)
+        self.loaded_at = time.time()
+        records, record_ids = [], {}
+        self.tables = {}
+        for version in (4, 6):
+            segments = _flatten([r[1:] for r in ranges if r[0] == version])
+            starts, ends, refs = [], [], []
+            for first, last, record in segments:
+                if record not in record_ids:
+                    record_ids[record] = len(records)
+                    records.append(record)
+                starts.append(first)
+                ends.append(last)
+                refs.append(record_ids[record])
+            self.tables[version] = (starts, ends, refs)
+        self.records = records
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _lookup(self, ip):
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        starts, ends, refs = self.tables[address.version]
+        value = int(address)
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return self._result(address, self.records[refs[i]])
+        for reader in self.readers:
+            found = reader.get(str(address))
+            if found:
+                return self._result(address, _mmdb_record(found))
+        return None
+
+    @staticmethod
+    def _result(address, record):
+        asn, as_org, country, location, is_vpn, is_hosting, is_private = record
+        return {
+            'ip': str(address),
+            'asn': asn,
+            'as_org': as_org,
+            'country': country,
+            'location': location or country or UNKNOWN_LOCATION,
+            'is_vpn': is_vpn,
+            'is_hosting': is_hosting,
+            'is_private': is_private
+        }
+
+    @property
+    def size(self):
+        return sum(len(table[0]) for table in self.tables.values())
+
+    def close(self):
+        """Close the .mmdb readers (their file handles / memory maps)"""
+        for reader in self.readers:
+            try:
+                reader.close()
+            except Exception as e:
+                logger.warning("Could not close IP intelligence reader: %s", e)
+
+
+def _mmdb_record(found):
+    traits = found.get('traits', {})
+    return (
+        found.get('autonomous_system_number') or traits.get('autonomous_system_number'),
+        found.get('autonomous_system_organization') or traits.get('autonomous_system_organization'),
+        (found.get('country') or {}).get('iso_code'),
+        ((found.get('city') or {}).get('names') or {}).get('en'),
+        bool(traits.get('is_anonymous_vpn') or traits.get('is_anonymous_proxy') or found.get('is_vpn')),
+        bool(traits.get('is_hosting_provider') or found.get('is_hosting')),
+        False
+    )
+
+
+class IPIntelIndex:
+    """
+    Local IP intelligence: CIDR/range -> ASN, country, location and
+    VPN/hosting flags, from CSV files (columns network or start_ip/end_ip,
+    asn, as_org, country, location, is_vpn, is_hosting; optionally .gz) and
+    MaxMind-style .mmdb databases when the maxminddb package is installed.
+    Reloads build a new snapshot and swap it in with one assignment, so
+    lookups never see a half-loaded table; the LRU belongs to the snapshot.
+    """
+
+    def __init__(self, paths=(), cache_size=65536):
+        self.paths = [p for p in paths if p]
+        self.cache_size = cache_size
+        self._reload_lock = threading.Lock()
+        self._snapshot = None
+        self.reload()
+
+    def reload(self):
+        """Re-read every source; returns load stats"""
+        with self._reload_lock:
+            start = time.perf_counter()
+            ranges, readers, sources = [], [], []
+            for network, fields in BUILTIN_RANGES:
+                version, first, last = _parse_range({'network': network})
+                # Builtins nest outside loaded ranges with the same bounds, so loaded data wins
+                ranges.append((version, first, last, _record(fields), 1))
+            try:
+                skipped = self._read_sources(ranges, readers, sources)
+                snapshot = IPIntelSnapshot(ranges, readers, self.cache_size, sources)
+            except Exception:
+                for reader in readers:
+                    reader.close()
+                raise
+            # In-flight lookups finish on the old snapshot; its readers are closed after a grace period
+            old, self._snapshot = self._snapshot, snapshot
+            if old is not None and old.readers:
+                timer = threading.Timer(READER_GRACE_SECONDS, old.close)
+                timer.daemon = True
+                timer.start()
+            stats = {'segments': snapshot.size, 'sources': sources, 'skipped_rows': skipped,
+                     'load_ms': round((time.perf_counter() - start) * 1000, 1)}
+            logger.info("IP intelligence loaded: %s", stats)
+            return stats
+
+    def _read_sources(self, ranges, readers, sources):
+        """Add every configured source to ranges/readers/sources; returns the skipped CSV rows"""
+        skipped = 0
+        for path in self.paths:
+            if not os.path.exists(path):
+                logger.warning("IP intelligence source not found: %s", path)
+                continue
+            if path.endswith('.mmdb'):
+                if maxminddb is None:
+                    logger.warning("Skipping %s: maxminddb is not installed", path)
+                    continue
+                readers.append(maxminddb.open_database(path))
+                sources.append({'path': path, 'type': 'mmdb'})
+                continue
+            count = 0
+            with open_text(path) as f:
+                for row in csv.DictReader(line for line in f if not line.startswith('#')):
+                    try:
+                        version, first, last = _parse_range(row)
+                    except (KeyError, ValueError, AttributeError):
+                        skipped += 1
+                        continue
+                    ranges.append((version, first, last, _record(row), 0))
+                    count += 1
+            sources.append({'path': path, 'type': 'csv', 'ranges': count})
+        return skipped
+
+    def lookup(self, ip):
+        """Intel for an IPv4/IPv6 address string, or None if nothing matches"""
+        if not ip:
+            return None
+        return self._snapshot.lookup(ip)
+
+    def close(self):
+        self._snapshot.close()
+
+    def get_status(self):
+        snapshot = self._snapshot
+        cache = snapshot.lookup.cache_info()
+        return {
+            'segments': snapshot.size,
+            'records': len(snapshot.records),
+            'sources': snapshot.sources,
+            'loaded_at': snapshot.loaded_at,
+            'cache': {'hits': cache.hits, 'misses': cache.misses, 'size': cache.currsize, 'max_size': cache.maxsize}
+        }
+
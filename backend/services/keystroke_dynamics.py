@@ -0,0 +1,159 @@
+import math
+
+# Log-spaced flight-time bins (ms) for the inter-key interval entropy
+FLIGHT_BINS_MS = [20, 40, 60, 80, 110, 150, 200, 270, 370, 500, 700, 1000]
+MAX_FIELDS = 8
+MAX_KEYS_PER_EVENT = 512
+MAX_INTERVAL_MS = 5000
+
+
+def new_stat():
+    """Welford accumulator: count, mean, sum of squared deviations"""
+    return [0, 0.0, 0.0]
+
+
+def add_value(stat, value):
+    stat[0] += 1
+    delta = value - stat[1]
+    stat[1] += delta / stat[0]
+    stat[2] += delta * (value - stat[1])
+
+
+def stat_std(stat):
+    return math.sqrt(stat[2] / (stat[0] - 1)) if stat[0] > 1 else 0.0
+
+
+def _flight_bin(value):
+    # Rollover overlaps (negative flights) bin by magnitude, so a fast
+    # typist's overlaps spread out like ordinary gaps do
+    value = abs(value)
+    for i, edge in enumerate(FLIGHT_BINS_MS):
+        if value < edge:
+            return i
+    return len(FLIGHT_BINS_MS)
+
+
+def entropy(histogram):
+    """Shannon entropy (bits) of a histogram"""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    return -sum(c / total * math.log2(c / total) for c in histogram if c)
+
+
+def decode_keystrokes(data):
+    """
+    Dwell (key held) and flight (key up to next key down) times from a
+    keystroke_timing event: either 'keys': [[down_ms, up_ms], ...] in
+    typing order, or precomputed 'dwell' and 'flight' lists. Key values
+    themselves are never sent.
+    """
+    if data.get('keys') is not None:
+        keys = data['keys']
+        if not isinstance(keys, list) or len(keys) > MAX_KEYS_PER_EVENT:
+            raise ValueError(f'keys must be a list of at most {MAX_KEYS_PER_EVENT} [down, up] pairs')
+        try:
+            keys = [(float(down), float(up)) for down, up in keys]
+        except (TypeError, ValueError):
+            raise ValueError('keys must be [down_ms, up_ms] pairs')
+        dwell = [up - down for down, up in keys]
+        flight = [keys[i + 1][0] - keys[i][1] for i in range(len(keys) - 1)]
+    else:
+        dwell = data.get('dwell') or []
+        flight = data.get('flight') or []
+        if not isinstance(dwell, list) or not isinstance(flight, list) \
+                or len(dwell) > MAX_KEYS_PER_EVENT or len(flight) > MAX_KEYS_PER_EVENT:
+            raise ValueError(f'dwell and flight must be lists of at most {MAX_KEYS_PER_EVENT} values')
+        try:
+            dwell, flight = [float(v) for v in dwell], [float(v) for v in flight]
+        except (TypeError, ValueError):
+            raise ValueError('dwell and flight must be numbers')
+    # Negative flights are rollover (next key pressed before release); keep them.
+    # Anything outside a few seconds is the user stopping, not typing.
+    dwell = [v for v in dwell if 0 <= v <= MAX_INTERVAL_MS]
+    flight = [v for v in flight if -MAX_INTERVAL_MS <= v <= MAX_INTERVAL_MS]
+    return dwell, flight
+
+
+def new_session_stats():
+    """Constant-size keystroke statistics for one session"""
+    return {
+        'dwell': new_stat(),
+        'flight': new_stat(),
+        'flight_hist': [0] * (len(FLIGHT_BINS_MS) + 1),
+        'fields': {}
+    }
+
+
+def update_session_stats(stats, field, dwell, flight):
+    """Fold one field's keystrokes into the session statistics"""
+    fields = stats['fields']
+    if field not in fields and len(fields) < MAX_FIELDS:
+        fields[field] = {'dwell': new_stat(), 'flight': new_stat()}
+    field_stats = fields.get(field)
+
+    for value in dwell:
+        add_value(stats['dwell'], value)
+        if field_stats:
+            add_value(field_stats['dwell'], value)
+    for value in flight:
+        add_value(stats['flight'], value)
+        if field_stats:
+            add_value(field_stats['flight'], value)
+        stats['flight_hist'][_flight_bin(value)] += 1
+    return stats
+
+
+def session_features(stats):
+    """
+    Derived features, O(number of bins). flight_cv is None when the mean
+    flight is not positive (heavy key rollover), where it is meaningless.
+    """
+    flight, dwell = stats['flight'], stats['dwell']
+    return {
+        'keys': dwell[0],
+        'intervals': flight[0],
+        'dwell_mean': dwell[1],
+        'dwell_std': stat_std(dwell),
+        'flight_mean': flight[1],
+        'flight_std': stat_std(flight),
+        'flight_cv': stat_std(flight) / flight[1] if flight[1] > 0 else None,
+        'flight_entropy': entropy(stats['flight_hist'])
+    }
+
+
+# ============================================
+# PER-USER BASELINE
+# ============================================
+
+def new_profile():
+    """
+    Per-user typing baseline kept in the tracking store: distribution of
+    per-session mean dwell and flight times over past genuine logins.
+    """
+    return {'sessions': 0, 'dwell_mean': new_stat(), 'flight_mean': new_stat()}
+
+
+def update_profile(profile, stats, min_intervals=10):
+    """Learn from a session (only call this for logins that were not flagged)"""
+    if stats['flight'][0] < min_intervals:
+        return profile
+    profile['sessions'] += 1
+    add_value(profile['dwell_mean'], stats['dwell'][1])
+    add_value(profile['flight_mean'], stats['flight'][1])
+    return profile
+
+
+def baseline_deviation(profile, stats):
+    """
+    Largest z-score of the session's mean dwell/flight time against the
+    user's baseline. Standard deviations are floored so a very consistent
+    user isn't flagged for a few milliseconds of difference.
+    """
+    deviations = []
+    for key, floor in (('dwell_mean', 10.0), ('flight_mean', 25.0)):
+        baseline = profile[key]
+        session_mean = stats['dwell' if key == 'dwell_mean' else 'flight'][1]
+        std = max(stat_std(baseline), floor)
+        deviations.append(abs(session_mean - baseline[1]) / std)
+    return max(deviations)
@@ -0,0 +1,250 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime
+from services.columnar_table import ColumnarTable, Row, retain
+
+STARTING_BALANCE = 50000
+# Retried requests with the same Idempotency-Key within this window get the
+# original result back instead of posting again
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+MAX_IDEMPOTENCY_KEYS = 100000
+TRANSACTION_TYPES = ('debit', 'credit')
+
+
+class IdempotencyConflict(ValueError):
+    """Idempotency key reused for a different transaction"""
+
+
+class InvalidTransaction(ValueError):
+    """Transaction without a known type or a finite, positive amount"""
+
+
+def validate_transaction(transaction_data):
+    """
+    Raise InvalidTransaction unless the transaction can be posted. A
+    negative debit would credit the account, so amounts must be > 0.
+    """
+    if not isinstance(transaction_data, dict):
+        raise InvalidTransaction('transaction must be an object')
+    if transaction_data.get('type') not in TRANSACTION_TYPES:
+        raise InvalidTransaction(f"type must be one of {', '.join(TRANSACTION_TYPES)}")
+    amount = transaction_data.get('amount')
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) \
+            or (isinstance(amount, float) and not math.isfinite(amount)) or amount <= 0:
+        raise InvalidTransaction('amount must be a finite number greater than 0')
+
+
+class _TableIndex:
+    """ID -> Row lookups on a ColumnarTable, without building a dict of every entry"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, entry_id, default=None):
+        row = self.table.row_for_key(entry_id) if type(entry_id) is int else None
+        return default if row is None else row
+
+    def __getitem__(self, entry_id):
+        row = self.get(entry_id)
+        if row is None:
+            raise KeyError(entry_id)
+        return row
+
+    def __contains__(self, entry_id):
+        return self.get(entry_id) is not None
+
+
+class Ledger:
+    """
+    Append-only transaction ledger over the tracking store.
+    data['transactions'] holds every entry once; per-session and per-user
+    views reference the same dicts in memory and are persisted as entry IDs.
+    IDs come from a persisted counter, so they stay unique after archiving
+    shrinks the entries list. Callers serialize posts (TrackingService lock).
+    data['transactions'] may be a ColumnarTable; views then hold its Rows.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        meta = data.setdefault('ledger', {})
+        entries = data.setdefault('transactions', [])
+        self.next_id = meta.get('next_id') or max((t.get('id', 0) for t in entries), default=0) + 1
+
+        # Resolve persisted ID references (and pre-ledger copies) to the entries
+        index = _TableIndex(entries) if isinstance(entries, ColumnarTable) else \
+            {t['id']: t for t in entries if 'id' in t}
+        for owner in list(data.get('users', {}).values()) + list(data.get('sessions', {}).values()):
+            if 'transactions' in owner:
+                owner['transactions'] = self._resolve_view(owner['transactions'], index)
+
+        self.idempotency = OrderedDict()
+        for key, record in meta.get('idempotency', {}).items():
+            entry = index.get(record['id'])
+            if entry is not None:
+                self.idempotency[key] = {'entry': entry, 'fingerprint': record['fingerprint'],
+                                         'created': record['created']}
+
+    @staticmethod
+    def _resolve_view(view, index):
+        resolved = []
+        for item in view:
+            if isinstance(item, dict):
+                entry = index.get(item.get('id'))
+                # Older files stored copies; share the entry when it is the same one
+                resolved.append(entry if entry is not None and entry.get('timestamp') == item.get('timestamp')
+                                else item)
+            elif item in index:
+                resolved.append(index[item])
+        return resolved
+
+    @staticmethod
+    def fingerprint(session_id, transaction_data):
+        payload = '|'.join(str(transaction_data.get(k, '')) for k in ('type', 'amount', 'recipient'))
+        return hashlib.sha256(f"{session_id}|{payload}".encode('utf-8')).hexdigest()[:32]
+
+    def lookup(self, session_id, key, transaction_data):
+        """
+        Entry previously posted with this key, or None.
+        Keys are scoped to the session so they can't reach another session's entries.
+        """
+        self._expire_keys()
+        record = self.idempotency.get(f"{session_id}:{key}")
+        if record is None:
+            return None
+        if record['fingerprint'] != self.fingerprint(session_id, transaction_data):
+            raise IdempotencyConflict('Idempotency-Key was already used for a different transaction')
+        return record['entry']
+
+    def _expire_keys(self):
+        cutoff = time.time() - IDEMPOTENCY_TTL_SECONDS
+        while self.idempotency:
+            key, record = next(iter(self.idempotency.items()))
+            if record['created'] >= cutoff and len(self.idempotency) <= MAX_IDEMPOTENCY_KEYS:
+                break
+            self.idempotency.popitem(last=False)
+
+    def allocate_id(self):
+        """Next entry ID, for records kept outside the entries table"""
+        entry_id = self.next_id
+        self.next_id += 1
+        return entry_id
+
+    def post(self, session, transaction_data, status='completed', reason=None,
+             session_id=None, idempotency_key=None):
+        """
+        Append an entry and update the session's running balance, O(1).
+        Failed entries are recorded but don't move the balance or appear in
+        the session/user views.
+        """
+        validate_transaction(transaction_data)
+        amount = transaction_data['amount']
+        balance = session.get('balance', STARTING_BALANCE)
+        if status == 'completed':
+            balance = balance - amount if transaction_data['type'] == 'debit' else balance + amount
+
+        entry = {
+            'id': self.allocate_id(),
+            'timestamp': datetime.now().isoformat(),
+            'user': session['user'],
+            'user_name': session['user_name'],
+            'type': transaction_data['type'],
+            'amount': amount,
+            'recipient': transaction_data.get('recipient', ''),
+            'status': status,
+            'session_id': session_id
+        }
+        if reason:
+            entry['reason'] = reason
+        else:
+            entry['balance_after'] = balance
+        entry = self.append(entry)
+
+        if status == 'completed':
+            session['balance'] = balance
+            session['transactions'].append(entry)
+            user = self.data['users'].get(session['user'])
+            if user is not None:
+                user['transactions'].append(entry)
+
+        if idempotency_key:
+            self.idempotency[f"{session_id}:{idempotency_key}"] = {
+                'entry': entry,
+                'fingerprint': self.fingerprint(session_id, transaction_data),
+                'created': time.time()
+            }
+        return entry
+
+    def append(self, entry):
+        """Store an entry; returns the object views should hold (the Row for a table)"""
+        entries = self.data['transactions']
+        if isinstance(entries, ColumnarTable):
+            return entries.append(entry)
+        entries.append(entry)
+        return entry
+
+    def retain(self, keep):
+        """
+        Drop entries keep(entry) is false for. In a table store, views and
+        idempotency records still holding a dropped Row get a plain copy of
+        it, as they keep the dict in a list store.
+        """
+        entries = self.data['transactions']
+        if isinstance(entries, ColumnarTable):
+            copies = {}
+
+            def plain(t):
+                if not isinstance(t, Row) or t.table is not entries or keep(t):
+                    return t
+                if t.key not in copies:
+                    copies[t.key] = dict(t)
+                return copies[t.key]
+
+            for owner in list(self.data['users'].values()) + list(self.data['sessions'].values()):
+                if 'transactions' in owner:
+                    owner['transactions'] = [plain(t) for t in owner['transactions']]
+            for record in self.idempotency.values():
+                record['entry'] = plain(record['entry'])
+        self.data['transactions'] = retain(entries, keep)
+
+    # ============================================
+    # PERSISTENCE
+    # ============================================
+
+    def persisted_view(self):
+        """
+        Copy of the tracking data for writing to disk with views as entry IDs.
+        Only the user/session dicts are copied (shallowly).
+        """
+        data = self.data
+        entries = data['transactions']
+        if isinstance(entries, ColumnarTable):
+            def is_entry(t):
+                return isinstance(t, Row) and t.table is entries
+        else:
+            canonical = {id(t) for t in entries}
+
+            def is_entry(t):
+                return id(t) in canonical
+
+        def view(items):
+            return [t['id'] if is_entry(t) else t for t in items]
+
+        def with_view(owner):
+            if 'transactions' not in owner:
+                return owner
+            return dict(owner, transactions=view(owner['transactions']))
+
+        self._expire_keys()
+        return dict(
+            data,
+            users={mobile: with_view(user) for mobile, user in data['users'].items()},
+            sessions={session_id: with_view(session) for session_id, session in data['sessions'].items()},
+            ledger={
+                'next_id': self.next_id,
+                'idempotency': {key: {'id': record['entry']['id'], 'fingerprint': record['fingerprint'],
+                                      'created': record['created']}
+                                for key, record in self.idempotency.items()}
+            }
+        )
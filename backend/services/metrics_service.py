@@ -0,0 +1,201 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from functools import wraps
+
+# Default latency buckets in seconds (Prometheus style, upper bounds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _ShardedSeries:
+    """
+    Base for metrics that are written from many threads.
+    Each thread gets its own preallocated slot list, so the hot path never
+    takes a lock and never allocates; scrapes merge the shards. When a
+    thread exits its shard is folded into the retired totals, so
+    thread-per-request servers don't accumulate shards.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._shards = {}
+        self._retired = [0] * size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.slots
+        except AttributeError:
+            return self._new_shard()
+
+    def _new_shard(self):
+        # The owner object lives in the thread's local storage and is
+        # collected when the thread exits, which retires the shard
+        owner = _ShardOwner()
+        slots = [0] * self._size
+        with self._lock:
+            self._shards[id(owner)] = slots
+        weakref.finalize(owner, self._retire, id(owner))
+        self._local.owner = owner
+        self._local.slots = slots
+        return slots
+
+    def _retire(self, key):
+        with self._lock:
+            slots = self._shards.pop(key, None)
+            if slots is not None:
+                for i, value in enumerate(slots):
+                    self._retired[i] += value
+
+    def _merged(self):
+        # Under the lock so a shard retiring mid-scrape isn't counted twice
+        with self._lock:
+            totals = list(self._retired)
+            for shard in self._shards.values():
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals
+
+
+class _ShardOwner:
+    __slots__ = ('__weakref__',)
+
+
+class Counter(_ShardedSeries):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        return self._merged()[0]
+
+
+class Histogram(_ShardedSeries):
+    # Slot layout: [bucket_0 .. bucket_n, +Inf bucket, sum, count]
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._inf = len(self.buckets)
+        super().__init__(len(self.buckets) + 3)
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count)"""
+        merged = self._merged()
+        cumulative = []
+        running = 0
+        for count in merged[:self._inf + 1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, merged[-2], merged[-1]
+
+
+class MetricsService:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}      # (name, labels) -> Counter
+        self.histograms = {}    # (name, labels) -> Histogram
+        self.gauges = {}        # (name, labels) -> callable
+        self.help = {}
+
+    # ============================================
+    # REGISTRATION (done once, off the hot path)
+    # ============================================
+
+    def counter(self, name, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.counters.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.counters.setdefault(key, Counter())
+                self.help.setdefault(name, help_text)
+        return metric
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.histograms.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.histograms.setdefault(key, Histogram(buckets))
+                self.help.setdefault(name, help_text)
+        return metric
+
+    def gauge(self, name, callback, help_text='', **labels):
+        """Register a gauge whose value is read from callback() at scrape time"""
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = callback
+            self.help.setdefault(name, help_text)
+
+    def timed(self, name, help_text=''):
+        """Decorator recording the wall time of each call into a histogram"""
+        def decorator(func):
+            histogram = self.histogram(name, help_text or f'Duration of {func.__qualname__}')
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    # ============================================
+    # EXPOSITION
+    # ============================================
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# HELP {name} {self.help.get(name, "")}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), counter in sorted(self.counters.items()):
+            header(name, 'counter')
+            lines.append(f'{name}{_format_labels(labels)} {counter.value}')
+
+        for (name, labels), callback in sorted(self.gauges.items(), key=lambda item: item[0]):
+            header(name, 'gauge')
+            try:
+                value = callback()
+            except Exception:
+                continue
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            header(name, 'histogram')
+            cumulative, total, count = histogram.snapshot()
+            bounds = [repr(b) for b in histogram.buckets] + ['+Inf']
+            for bound, value in zip(bounds, cumulative):
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {value}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = ','.join(f'{key}="{value}"' for key, value in labels)
+    return '{' + parts + '}'
+
+
+# Create global instance
+metrics_service = MetricsService()
@@ -1,17 +1,31 @@
-import json
 from datetime import datetime
 from utils.helpers import calculate_sim_risk, mask_sensitive_data
+from services.metrics_service import metrics_service
+from services.scoring_executor import InlineExecutor
+from services.telecom_registry import TelecomRegistry
+
+# Confidence needed to verify ownership outright, and to send it to manual review
+DEFAULT_THRESHOLDS = {'verified': 60, 'manual_review': 40}
 
 class OwnershipService:
-    def __init__(self):
-        with open('data/telecom_mock_data.json', 'r') as f:
-            self.telecom_data = json.load(f)
+    def __init__(self, registry=None, data_file='data/telecom_mock_data.json', executor=None, thresholds=None):
+        self.registry = registry if registry is not None else TelecomRegistry(data_file)
+        self.executor = executor if executor is not None else InlineExecutor()
+        unknown = set(thresholds or ()) - set(DEFAULT_THRESHOLDS)
+        if unknown:
+            raise ValueError(f"Unknown ownership thresholds: {', '.join(sorted(unknown))}")
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
     
+    @metrics_service.timed('honeykyc_ownership_lookup_seconds', 'Time spent in OwnershipService.verify_ownership')
     def verify_ownership(self, mobile_number, submitted_name, device_data=None):
         """
         Verify if the submitted name matches the real owner of the mobile number
         This is the core solution for Problem Statement 3
         """
+        return self.executor.run('ownership', (mobile_number, submitted_name, device_data),
+                                 inline=self._verify_ownership, fallback=self._quick_ownership)
+    
+    def _verify_ownership(self, mobile_number, submitted_name, device_data=None):
         result = {
             'verified': False,
             'confidence_score': 0,
@@ -22,12 +36,13 @@ class OwnershipService:
         }
         
         # Check if mobile number exists in telecom database
-        if mobile_number not in self.telecom_data:
+        telecom_data = self.registry.current()
+        if mobile_number not in telecom_data:
             result['risk_factors'].append('Mobile number not found in telecom database')
             result['confidence_score'] = 0
             return result
         
-        telecom_record = self.telecom_data[mobile_number]
+        telecom_record = telecom_data[mobile_number]
         telecom_owner = telecom_record['owner_name']
         result['owner_name'] = telecom_owner
         
@@ -129,9 +144,47 @@ class OwnershipService:
             result['confidence_score'] += device_score
         
         # Final verification decision
-        result['verified'] = result['confidence_score'] >= 60
-        result['requires_manual_review'] = 40 <= result['confidence_score'] < 60
+        verified_at = self.thresholds['verified']
+        result['verified'] = result['confidence_score'] >= verified_at
+        result['requires_manual_review'] = self.thresholds['manual_review'] <= result['confidence_score'] < verified_at
+        
+        return result
+    
+    def _quick_ownership(self, mobile_number, submitted_name, device_data=None):
+        """Direct name match only, used when full verification misses its deadline"""
+        result = {
+            'verified': False,
+            'confidence_score': 0,
+            'owner_name': None,
+            'risk_factors': [],
+            'verification_methods': [],
+            'degraded': True,
+            'requires_manual_review': True,
+            'timestamp': datetime.now().isoformat()
+        }
+        telecom_data = self.registry.current()
+        if mobile_number not in telecom_data:
+            result['risk_factors'].append('Mobile number not found in telecom database')
+            return result
         
+        telecom_owner = telecom_data[mobile_number]['owner_name']
+        result['owner_name'] = telecom_owner
+        name_match = self._compare_names(submitted_name, telecom_owner)
+        if name_match['exact_match']:
+            status, score = 'passed', 40
+        elif name_match['partial_match']:
+            status, score = 'partial', 20
+            result['risk_factors'].append('Name mismatch with telecom records')
+        else:
+            status, score = 'failed', 0
+            result['risk_factors'].append(f'Name mismatch: Should be "{telecom_owner}"')
+        result['verification_methods'].append({
+            'method': 'direct_name_match',
+            'status': status,
+            'score': score,
+            'details': 'Partial verification (full check timed out)'
+        })
+        result['confidence_score'] = score
         return result
     
     def _compare_names(self, submitted_name, telecom_owner):
@@ -178,10 +231,11 @@ class OwnershipService:
     
     def get_owner_details(self, mobile_number):
         """Get owner details from telecom database"""
-        if mobile_number not in self.telecom_data:
+        telecom_data = self.registry.current()
+        if mobile_number not in telecom_data:
             return None
         
-        record = self.telecom_data[mobile_number].copy()
+        record = telecom_data[mobile_number].copy()
         # Mask sensitive data for logging
         return mask_sensitive_data(record)
     
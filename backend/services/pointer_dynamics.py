@@ -0,0 +1,189 @@
+import base64
+import numpy as np
+
+# Gaps longer than this split the trajectory into separate strokes
+PAUSE_MS = 150
+PAUSE_BINS_MS = [300, 600, 1200, 2400]
+MAX_POINTS_PER_BATCH = 5000
+
+
+def decode_points(data):
+    """
+    Pointer samples from a pointer_trajectory event as an (n, 3) float array
+    of x, y, t_ms. Accepts 'points': [[x, y, t], ...] or 'packed': base64 of
+    little-endian int32 x, y, t triples (t relative to any origin).
+    """
+    if data.get('packed'):
+        raw = base64.b64decode(data['packed'], validate=True)
+        if len(raw) % 12:
+            raise ValueError('Packed points must be int32 x, y, t triples')
+        points = np.frombuffer(raw, dtype='<i4').reshape(-1, 3).astype(np.float64)
+    else:
+        points = np.asarray(data.get('points') or [], dtype=np.float64)
+        if points.size == 0:
+            points = points.reshape(0, 3)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError('Points must be [x, y, t] triples')
+    if len(points) > MAX_POINTS_PER_BATCH:
+        raise ValueError(f'At most {MAX_POINTS_PER_BATCH} points per batch')
+    if not np.isfinite(points).all():
+        raise ValueError('Points must be finite numbers')
+    return points
+
+
+def new_summary():
+    """Fixed-size running summary of a session's pointer movement"""
+    return {
+        'points': 0,
+        'segments': 0,
+        'moving_time_ms': 0.0,
+        'path_length': 0.0,
+        'speed_sum': 0.0,
+        'speed_sumsq': 0.0,
+        'speed_max': 0.0,
+        'accel_count': 0,
+        'accel_abs_sum': 0.0,
+        'accel_sumsq': 0.0,
+        'curvature_count': 0,
+        'curvature_sum': 0.0,
+        'pause_count': 0,
+        'pause_time_ms': 0.0,
+        'pause_hist': [0] * (len(PAUSE_BINS_MS) + 1),
+        'strokes': 0,
+        'stroke_path': 0.0,
+        'stroke_displacement': 0.0,
+        # Streaming state: last two samples and the stroke still in progress
+        'tail': [],
+        'open_stroke': None
+    }
+
+
+def update_summary(summary, points):
+    """Fold a batch of (x, y, t_ms) samples into the summary in place"""
+    if len(points) == 0:
+        return summary
+    points = points[np.argsort(points[:, 2], kind='stable')]
+    tail = summary['tail']
+    summary['points'] += len(points)
+    if tail and points[0, 2] >= tail[-1][2]:
+        # Continue from the previous batch: its last sample closes the gap and
+        # the one before it lets the first new segment get acceleration/curvature
+        points = np.vstack([tail, points])
+        skip = len(tail) - 1
+    else:
+        _close_stroke(summary, tail[-1] if tail else None)
+        skip = 0
+    summary['tail'] = points[-2:].tolist()
+    if len(points) - skip < 2:
+        return summary
+
+    dx, dy, dt = np.diff(points, axis=0).T
+    dist = np.hypot(dx, dy)
+    pause = dt > PAUSE_MS
+    moving = ~pause & (dt > 0)
+    speed = np.zeros_like(dist)
+    speed[moving] = dist[moving] / dt[moving] * 1000
+
+    # Acceleration (px/s^2) and curvature (heading change per pixel) need pairs
+    # of consecutive moving segments; only pairs ending in a new segment count
+    pairs = slice(max(skip - 1, 0), None)
+    both_moving = (moving[1:] & moving[:-1])[pairs]
+    accel = np.diff(speed)[pairs][both_moving] / (dt[1:][pairs][both_moving] / 1000)
+    summary['accel_count'] += int(accel.size)
+    summary['accel_abs_sum'] += float(np.abs(accel).sum())
+    summary['accel_sumsq'] += float((accel ** 2).sum())
+
+    heading = np.arctan2(dy, dx)
+    turning = both_moving & (dist[1:][pairs] > 0) & (dist[:-1][pairs] > 0)
+    dtheta = np.angle(np.exp(1j * np.diff(heading)[pairs]))[turning]
+    curvature = np.abs(dtheta) / dist[1:][pairs][turning]
+    summary['curvature_count'] += int(curvature.size)
+    summary['curvature_sum'] += float(curvature.sum())
+
+    # Everything below only looks at the new segments
+    points, dt, dist, pause, moving, speed = (points[skip:], dt[skip:], dist[skip:], pause[skip:],
+                                              moving[skip:], speed[skip:])
+
+    # Pauses
+    pause_times = dt[pause]
+    summary['pause_count'] += int(pause.sum())
+    summary['pause_time_ms'] += float(pause_times.sum())
+    hist = np.bincount(np.searchsorted(PAUSE_BINS_MS, pause_times), minlength=len(PAUSE_BINS_MS) + 1)
+    summary['pause_hist'] = [a + int(b) for a, b in zip(summary['pause_hist'], hist)]
+
+    # Velocity (px/s)
+    moving_speed = speed[moving]
+    summary['segments'] += int(moving.sum())
+    summary['moving_time_ms'] += float(dt[moving].sum())
+    summary['path_length'] += float(dist[moving].sum())
+    summary['speed_sum'] += float(moving_speed.sum())
+    summary['speed_sumsq'] += float((moving_speed ** 2).sum())
+    if moving_speed.size:
+        summary['speed_max'] = max(summary['speed_max'], float(moving_speed.max()))
+
+    # Strokes: runs of moving segments between pauses
+    stroke_id = np.cumsum(pause)
+    ids = stroke_id[moving]
+    if ids.size == 0:
+        _close_stroke(summary, points[0])
+        return summary
+    seg_index = np.flatnonzero(moving)
+    unique_ids, first = np.unique(ids, return_index=True)
+    last = np.r_[first[1:], ids.size] - 1
+    starts = points[seg_index[first], :2]
+    ends = points[seg_index[last] + 1, :2]
+    paths = np.bincount(ids - ids.min(), weights=dist[moving])[unique_ids - ids.min()]
+
+    # The first stroke continues the open one unless a pause came first
+    open_stroke = summary['open_stroke']
+    if open_stroke is not None and unique_ids[0] == 0:
+        starts[0] = open_stroke[:2]
+        paths[0] += open_stroke[2]
+    else:
+        _close_stroke(summary, points[0])
+
+    # The last stroke stays open unless the batch ends in a pause
+    closed = len(unique_ids) if pause[-1] else len(unique_ids) - 1
+    displacement = np.hypot(*(ends[:closed] - starts[:closed]).T)
+    summary['strokes'] += closed
+    summary['stroke_path'] += float(paths[:closed].sum())
+    summary['stroke_displacement'] += float(displacement.sum())
+    summary['open_stroke'] = None if pause[-1] else [float(starts[-1][0]), float(starts[-1][1]), float(paths[-1])]
+    return summary
+
+
+def _close_stroke(summary, end):
+    """Finish the stroke left open by the previous batch at point end"""
+    open_stroke = summary['open_stroke']
+    if open_stroke is not None and end is not None:
+        summary['strokes'] += 1
+        summary['stroke_path'] += open_stroke[2]
+        summary['stroke_displacement'] += float(np.hypot(end[0] - open_stroke[0], end[1] - open_stroke[1]))
+    summary['open_stroke'] = None
+
+
+def summary_features(summary):
+    """Derived features for risk scoring"""
+    segments = summary['segments']
+    mean_speed = summary['speed_sum'] / segments if segments else 0.0
+    speed_var = summary['speed_sumsq'] / segments - mean_speed ** 2 if segments else 0.0
+    stroke_path = summary['stroke_path'] + (summary['open_stroke'][2] if summary['open_stroke'] else 0.0)
+    stroke_displacement = summary['stroke_displacement']
+    if summary['open_stroke'] and summary['tail']:
+        last = summary['tail'][-1]
+        stroke_displacement += float(np.hypot(last[0] - summary['open_stroke'][0],
+                                              last[1] - summary['open_stroke'][1]))
+    total_time = summary['moving_time_ms'] + summary['pause_time_ms']
+    return {
+        'points': summary['points'],
+        'segments': segments,
+        'mean_speed': mean_speed,
+        'speed_cv': (max(speed_var, 0.0) ** 0.5) / mean_speed if mean_speed else 0.0,
+        'max_speed': summary['speed_max'],
+        'mean_abs_accel': summary['accel_abs_sum'] / summary['accel_count'] if summary['accel_count'] else 0.0,
+        'mean_curvature': summary['curvature_sum'] / summary['curvature_count'] if summary['curvature_count'] else 0.0,
+        'straightness': stroke_displacement / stroke_path if stroke_path else 0.0,
+        'pause_count': summary['pause_count'],
+        'pause_ratio': summary['pause_time_ms'] / total_time if total_time else 0.0,
+        'pause_hist': list(summary['pause_hist'])
+    }
@@ -0,0 +1,148 @@
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class ProfilingService:
+    """
+    Opt-in request profiling.
+    Requests are profiled only when profiling is enabled and the route is
+    selected (or the request falls in the sampled fraction). Profiles of
+    requests slower than the threshold are kept in a bounded ring.
+    Only one request is profiled at a time: the interpreter allows a single
+    active profiler (a second enable() raises on Python 3.12+), so requests
+    overlapping a profiled one run unprofiled.
+    """
+
+    def __init__(self, max_profiles=50):
+        self.enabled = False
+        self.routes = set()          # endpoints always profiled while enabled
+        self.sample_rate = 0.0       # fraction of other requests to profile
+        self.threshold_ms = 200
+        self._profiles = deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+        # Held from start() until finish()/abandon() of the active profiler
+        self._active = threading.Lock()
+        self.skipped_busy = 0
+        self._next_id = 1
+
+    def configure(self, enabled=None, routes=None, sample_rate=None,
+                  threshold_ms=None, max_profiles=None):
+        """Update profiling settings at runtime"""
+        with self._lock:
+            if routes is not None:
+                self.routes = set(routes)
+            if sample_rate is not None:
+                self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+            if threshold_ms is not None:
+                self.threshold_ms = max(float(threshold_ms), 0.0)
+            if max_profiles is not None and max_profiles != self._profiles.maxlen:
+                self._profiles = deque(self._profiles, maxlen=max(int(max_profiles), 1))
+            if enabled is not None:
+                self.enabled = bool(enabled)
+        return self.get_config()
+
+    def get_config(self):
+        return {
+            'enabled': self.enabled,
+            'routes': sorted(self.routes),
+            'sample_rate': self.sample_rate,
+            'threshold_ms': self.threshold_ms,
+            'max_profiles': self._profiles.maxlen,
+            'stored_profiles': len(self._profiles),
+            'skipped_busy': self.skipped_busy
+        }
+
+    def should_profile(self, endpoint):
+        """Decide whether the current request gets a profiler"""
+        if not self.enabled:
+            return False
+        if endpoint in self.routes:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        """Profiler enabled for the current request, or None while another one is active"""
+        if not self._active.acquire(blocking=False):
+            self.skipped_busy += 1
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool (not ours) is active in this interpreter
+            self._active.release()
+            self.skipped_busy += 1
+            return None
+        return profiler
+
+    def abandon(self, profiler):
+        """Stop a profiler without keeping its result"""
+        try:
+            profiler.disable()
+        finally:
+            self._active.release()
+
+    def finish(self, profiler, endpoint, method, path, duration_ms, status_code):
+        """Stop the profiler and keep the result if the request was slow"""
+        self.abandon(profiler)
+        if duration_ms < self.threshold_ms:
+            return None
+
+        profiler.create_stats()
+        with self._lock:
+            profile_id = self._next_id
+            self._next_id += 1
+            self._profiles.append({
+                'id': profile_id,
+                'endpoint': endpoint,
+                'method': method,
+                'path': path,
+                'status_code': status_code,
+                'duration_ms': round(duration_ms, 3),
+                'timestamp': datetime.now().isoformat(),
+                'stats': marshal.dumps(profiler.stats)
+            })
+        return profile_id
+
+    def list_profiles(self):
+        """Profile metadata, newest first"""
+        return [
+            {key: value for key, value in profile.items() if key != 'stats'}
+            for profile in reversed(list(self._profiles))
+        ]
+
+    def get_profile(self, profile_id):
+        for profile in list(self._profiles):
+            if profile['id'] == profile_id:
+                return profile
+        return None
+
+    def render_text(self, profile, sort_by='cumulative', limit=40):
+        """Human-readable pstats report for a stored profile"""
+        stats = pstats.Stats(_RawStats(profile['stats']), stream=io.StringIO())
+        stats.sort_stats(sort_by).print_stats(limit)
+        return stats.stream.getvalue()
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+class _RawStats:
+    """Adapter letting pstats.Stats load marshalled stats from memory"""
+
+    def __init__(self, raw):
+        self.stats = marshal.loads(raw)
+
+    def create_stats(self):
+        pass
+
+
+# Create global instance
+profiling_service = ProfilingService()
@@ -0,0 +1,327 @@
+import hashlib
+import logging
+import mmap
+import os
+import re
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+from flask import g, jsonify, request
+from utils.client_ip import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """'10 per minute' / '10/minute' -> (capacity, tokens per second)"""
+    match = re.match(r'^\s*(\d+)\s*(?:per|/)\s*(second|minute|hour|day)s?\s*$', rate or '')
+    if not match:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    count = int(match.group(1))
+    return count, count / PERIODS[match.group(2)]
+
+
+# ============================================
+# STORAGE BACKENDS
+# ============================================
+# Every backend implements take(key, capacity, rate, cost=1)
+# -> (allowed, remaining_tokens, retry_after_seconds)
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _decide(tokens, capacity, rate, cost):
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate if rate else float('inf')
+
+
+class MemoryBucketStore:
+    """Per-process buckets (single worker / development)"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed, tokens, retry_after = _decide(tokens, capacity, rate, cost)
+            if len(self._buckets) >= self.max_keys and key not in self._buckets:
+                # Drop an arbitrary old bucket; a missing bucket is simply full
+                self._buckets.pop(next(iter(self._buckets)))
+            self._buckets[key] = (tokens, now)
+        return allowed, tokens, retry_after
+
+
+class SharedFileBucketStore:
+    """
+    Buckets shared by all worker processes on one host through a
+    memory-mapped file. The file is a fixed table of 24-byte slots
+    (key hash, tokens, last update) grouped in sets of 8; a key lives in
+    one group, which is guarded by an fcntl byte-range lock (across
+    processes) plus a striped thread lock (within the process). Each check
+    is two syscalls and a few struct operations.
+    """
+
+    SLOT = struct.Struct('<Qdd')
+    GROUP_SIZE = 8
+
+    def __init__(self, path, slots=65536):
+        import fcntl
+        self._fcntl = fcntl
+        self.groups = max(1, slots // self.GROUP_SIZE)
+        size = self.groups * self.GROUP_SIZE * self.SLOT.size
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._thread_locks = [threading.Lock() for _ in range(64)]
+
+    def take(self, key, capacity, rate, cost=1):
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        group = key_hash % self.groups
+        group_offset = group * self.GROUP_SIZE * self.SLOT.size
+        group_length = self.GROUP_SIZE * self.SLOT.size
+
+        with self._thread_locks[group % 64]:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, group_length, group_offset)
+            try:
+                now = time.time()
+                target = None
+                oldest_offset, oldest_time = None, None
+                for i in range(self.GROUP_SIZE):
+                    offset = group_offset + i * self.SLOT.size
+                    slot_hash, tokens, updated = self.SLOT.unpack_from(self._map, offset)
+                    if slot_hash == key_hash:
+                        target = offset
+                        break
+                    if slot_hash == 0 or oldest_time is None or updated < oldest_time:
+                        oldest_offset, oldest_time = offset, (-1.0 if slot_hash == 0 else updated)
+
+                if target is None:
+                    # New key takes an empty slot or evicts the least recently used one
+                    target, tokens, updated = oldest_offset, capacity, now
+
+                tokens = _refill(tokens, updated, capacity, rate, now)
+                allowed, tokens, retry_after = _decide(tokens, capacity, rate, cost)
+                self.SLOT.pack_into(self._map, target, key_hash, tokens, now)
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, group_length, group_offset)
+        return allowed, tokens, retry_after
+
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """
+    Buckets in Redis (or anything speaking the Redis protocol), updated
+    atomically by a Lua script. client needs an eval(script, numkeys, *args)
+    method: redis-py, RespClient below, or the stand-in in tests/fake_redis.py.
+    """
+
+    def __init__(self, client, prefix='honeykyc:rl:'):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, tokens = self.client.eval(TOKEN_BUCKET_SCRIPT, 1, self.prefix + key,
+                                           capacity, rate, time.time(), cost)
+        tokens = float(tokens)
+        if int(allowed):
+            return True, tokens, 0.0
+        return False, tokens, (cost - tokens) / rate if rate else float('inf')
+
+
+class RespClient:
+    """Minimal Redis protocol (RESP2) client with one persistent connection"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=0.5):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        if self.password:
+            self._command('AUTH', self.password)
+        if self.db:
+            self._command('SELECT', self.db)
+
+    def _command(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        self._sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode()
+        if prefix == b'-':
+            raise RuntimeError(payload.decode())
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode()
+        if prefix == b'*':
+            count = int(payload)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RuntimeError(f'Unexpected reply: {line!r}')
+
+    def execute(self, *args):
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._command(*args)
+            except (OSError, ConnectionError):
+                self.close()
+                raise
+
+    def eval(self, script, numkeys, *args):
+        return self.execute('EVAL', script, numkeys, *args)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+
+def create_bucket_store(uri):
+    """memory://, file:///path/to/buckets, or redis://[:password@]host:port/db"""
+    parsed = urlparse(uri or 'memory://')
+    if parsed.scheme == 'memory':
+        return MemoryBucketStore()
+    if parsed.scheme == 'file':
+        return SharedFileBucketStore(parsed.path)
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.lstrip('/') or 0)
+        return RedisBucketStore(RespClient(parsed.hostname or 'localhost', parsed.port or 6379,
+                                           db=db, password=parsed.password))
+    raise ValueError(f"Unsupported rate limit storage: {uri}")
+
+
+# ============================================
+# LIMITER
+# ============================================
+
+class RateLimiter:
+    """
+    Token-bucket limits per endpoint class and client IP.
+    Storage errors fail open: a broken backend must not take the API down.
+    """
+
+    def __init__(self, store, limits, endpoint_classes, default_class='default', exempt=()):
+        self.store = store
+        self.limits = {name: parse_rate(rate) for name, rate in limits.items()}
+        self.endpoint_classes = dict(endpoint_classes)
+        self.default_class = default_class
+        self.exempt = set(exempt)
+
+    def classify(self, endpoint):
+        if endpoint in self.exempt:
+            return None
+        limit_class = self.endpoint_classes.get(endpoint)
+        if limit_class is None and endpoint:
+            # Blueprint-wide classes ('honeypot.*')
+            limit_class = self.endpoint_classes.get(endpoint.split('.', 1)[0] + '.*')
+        return limit_class or self.default_class
+
+    def check(self, endpoint, client_ip, cost=1):
+        """Returns (allowed, limit_class, capacity, remaining, retry_after) or None if exempt"""
+        limit_class = self.classify(endpoint)
+        if limit_class is None or limit_class not in self.limits:
+            return None
+        capacity, rate = self.limits[limit_class]
+        try:
+            allowed, remaining, retry_after = self.store.take(f"{limit_class}:{client_ip}", capacity, rate, cost)
+        except Exception as e:
+            logger.error("Rate limit storage error, allowing request: %s", e)
+            return None
+        return allowed, limit_class, capacity, remaining, retry_after
+
+
+def init_rate_limiter(app):
+    """Enforce RATELIMIT_LIMITS per client IP before every request"""
+    if not app.config.get('RATELIMIT_ENABLED', True):
+        return None
+
+    limiter = RateLimiter(
+        create_bucket_store(app.config.get('RATELIMIT_STORAGE_URI')),
+        app.config['RATELIMIT_LIMITS'],
+        app.config.get('RATELIMIT_ENDPOINT_CLASSES', {}),
+        exempt=app.config.get('RATELIMIT_EXEMPT', ())
+    )
+    app.extensions['honeykyc_rate_limiter'] = limiter
+
+    @app.before_request
+    def enforce_rate_limit():
+        result = limiter.check(request.endpoint, get_client_ip())
+        if result is None:
+            return None
+        allowed, limit_class, capacity, remaining, retry_after = result
+        g._rate_limit = (capacity, remaining)
+        if not allowed:
+            logger.warning("Rate limit exceeded: %s %s", limit_class, get_client_ip())
+            response = jsonify({'error': 'Rate limit exceeded', 'retry_after': round(retry_after, 1)})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+            return response
+        return None
+
+    @app.after_request
+    def add_rate_limit_headers(response):
+        state = g.pop('_rate_limit', None)
+        if state is not None:
+            response.headers['X-RateLimit-Limit'] = str(state[0])
+            response.headers['X-RateLimit-Remaining'] = str(int(state[1]))
+        return response
+
+    return limiter
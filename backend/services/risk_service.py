@@ -1,19 +1,150 @@
-import json
+import copy
 from datetime import datetime
+from functools import lru_cache
+from services.keystroke_dynamics import baseline_deviation, session_features
+from services.metrics_service import metrics_service
+from services.pointer_dynamics import summary_features
+from services.scoring_executor import InlineExecutor
+from services.telecom_registry import TelecomRegistry
+from utils.helpers import mask_sensitive_data
+
+# Risk factor messages (shared constants, not rebuilt per call)
+FACTOR_NAME_MATCH = "✅ Name matches telecom records"
+FACTOR_SIM_7_DAYS = "⚠️ SIM activated within last 7 days"
+FACTOR_SIM_30_DAYS = "⚠️ SIM activated within last 30 days"
+FACTOR_SIM_90_DAYS = "ℹ️ SIM less than 3 months old"
+FACTOR_SIM_ESTABLISHED = "✅ SIM is well-established"
+FACTOR_INCOMPLETE_KYC = "⚠️ Incomplete KYC on mobile number"
+FACTOR_MOBILE_NOT_FOUND = "❌ Mobile number not found in telecom database"
+FACTOR_EMULATOR = "❌ Emulator/virtual machine detected"
+FACTOR_NEW_DEVICE = "ℹ️ New device - first time seen"
+FACTOR_VPN = "⚠️ VPN/Proxy detected"
+FACTOR_HOSTING_IP = "⚠️ Connection from a datacenter/hosting network"
+FACTOR_FOREIGN_IP = "ℹ️ IP address located outside India"
+FACTOR_LOGIN_BOT_FAST = "❌ Abnormally fast login (bot-like)"
+FACTOR_LOGIN_VERY_FAST = "⚠️ Very fast login"
+FACTOR_LOGIN_FAST = "ℹ️ Slightly fast login"
+FACTOR_MINIMAL_MOUSE = "❌ Minimal mouse movement (automated)"
+FACTOR_LINEAR_POINTER = "❌ Perfectly straight pointer paths (scripted)"
+FACTOR_UNIFORM_POINTER_SPEED = "⚠️ Uniform pointer speed (scripted)"
+FACTOR_UNIFORM_TYPING = "❌ Machine-uniform typing rhythm"
+FACTOR_TYPING_MISMATCH = "⚠️ Typing rhythm differs from this user's history"
+FACTOR_COPY_PASTE = "ℹ️ Copied-pasted credentials"
+FACTOR_EXCESSIVE_PAGES = "⚠️ Excessive page navigation"
+FACTOR_HONEYPOT = "🚨 HONEYPOT TRIGGERED - Attempted to access hidden element"
+FACTOR_LEGITIMATE_DEMO_USER = "✅ Verified legitimate user"
+FACTOR_PARTIAL_ASSESSMENT = "ℹ️ Partial assessment (full scoring timed out)"
+# The only factor carrying personal data (the telecom owner's name)
+FACTOR_NAME_MISMATCH = "❌ Name mismatch: Telecom owner is '{}'"
+
+# Country expected for customers; IPs geolocated elsewhere add geo risk
+HOME_COUNTRY = 'IN'
+
+# Pointer trajectory features need this many moving segments to be meaningful
+MIN_POINTER_SEGMENTS = 30
+
+# Keystroke intervals needed before typing rhythm is scored, and past
+# profiled logins needed before a user's baseline is trusted
+MIN_KEYSTROKE_INTERVALS = 10
+MIN_BASELINE_SESSIONS = 3
+
+# Fields of device_data / behavior_data the score reads; scoring_features() keeps only these
+DEVICE_FEATURES = ('is_emulator', 'is_new_device', 'vpn_detected', 'ip_hosting', 'ip_country')
+BEHAVIOR_FEATURES = ('login_time_ms', 'pointer_summary', 'keystroke_stats', 'copied_pasted', 'honeypot_clicked')
+
+# Points each risk factor adds; a backtest candidate overrides some of them
+DEFAULT_WEIGHTS = {
+    'name_mismatch': 30, 'mobile_not_found': 40, 'incomplete_kyc': 10,
+    'sim_7_days': 25, 'sim_30_days': 15, 'sim_90_days': 5,
+    'emulator': 20, 'new_device': 5, 'vpn': 15, 'hosting_ip': 10, 'foreign_ip': 10,
+    'login_bot_fast': 25, 'login_very_fast': 15, 'login_fast': 5,
+    'minimal_mouse': 15, 'linear_pointer': 15, 'uniform_pointer_speed': 10,
+    'uniform_typing': 15, 'typing_mismatch': 10, 'copy_paste': 5, 'excessive_pages': 10,
+    'honeypot': 50
+}
+
+# is_fraud / needs_honeypot when the score is above these; levels start at these
+DEFAULT_THRESHOLDS = {'fraud': 60, 'honeypot': 50, 'medium': 30, 'high': 50, 'critical': 70}
+
+
+def _merge_overrides(defaults, overrides, kind):
+    unknown = set(overrides or ()) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown {kind}: {', '.join(sorted(unknown))}")
+    return dict(defaults, **(overrides or {}))
+
+
+def scoring_features(user_data, device_data, behavior_data, keystroke_profile=None):
+    """
+    Compact, detached copy of the risk scoring arguments (kept with sessions
+    for backtests and shadow scoring): only the fields the score reads, with
+    the visited page list reduced to its length. Scores the same as the originals.
+    """
+    device_data, behavior_data = device_data or {}, behavior_data or {}
+    device = {name: device_data[name] for name in DEVICE_FEATURES if name in device_data}
+    if device_data:
+        # Any device data at all makes an unknown device count as new
+        device.setdefault('is_new_device', True)
+    behavior = {name: copy.deepcopy(behavior_data[name]) for name in BEHAVIOR_FEATURES if name in behavior_data}
+    if behavior_data:
+        # Any behavior data at all runs the behavior checks, missing trajectory included
+        behavior.setdefault('pointer_summary', None)
+    if behavior_data.get('pages_visited'):
+        behavior['pages_visited_count'] = len(behavior_data['pages_visited'])
+    return {
+        'user_data': {'name': user_data.get('name', ''), 'mobile': user_data.get('mobile', '')},
+        'device_data': device,
+        'behavior_data': behavior,
+        'keystroke_profile': copy.deepcopy(keystroke_profile)
+    }
+
+
+@lru_cache(maxsize=4096)
+def name_mismatch_factor(telecom_owner):
+    return FACTOR_NAME_MISMATCH.format(telecom_owner)
+
+
+_NAME_MISMATCH_PREFIX, _NAME_MISMATCH_SUFFIX = FACTOR_NAME_MISMATCH.split('{}')
+
+
+def masked_risk_factors(risk_factors):
+    """risk_factors as they may be logged: a mismatching telecom owner's name is masked"""
+    masked = []
+    for factor in risk_factors or ():
+        if factor.startswith(_NAME_MISMATCH_PREFIX) and factor.endswith(_NAME_MISMATCH_SUFFIX):
+            owner = factor[len(_NAME_MISMATCH_PREFIX):len(factor) - len(_NAME_MISMATCH_SUFFIX)]
+            factor = FACTOR_NAME_MISMATCH.format(mask_sensitive_data({'name': owner})['name'])
+        masked.append(factor)
+    return masked
+
 
 class RiskService:
-    def __init__(self):
-        # Load telecom mock data
-        with open('data/telecom_mock_data.json', 'r') as f:
-            self.telecom_data = json.load(f)
+    def __init__(self, registry=None, data_file='data/telecom_mock_data.json', executor=None,
+                 weights=None, thresholds=None):
+        # Load telecom mock data (or share an already loaded registry)
+        self.registry = registry if registry is not None else TelecomRegistry(data_file)
+        # Scoring runs inline unless a thread/process executor is configured
+        self.executor = executor if executor is not None else InlineExecutor()
+        # Overrides of DEFAULT_WEIGHTS / DEFAULT_THRESHOLDS (see tools/backtest.py)
+        self.weights = _merge_overrides(DEFAULT_WEIGHTS, weights, 'risk weights')
+        self.thresholds = _merge_overrides(DEFAULT_THRESHOLDS, thresholds, 'risk thresholds')
     
-    def calculate_risk_score(self, user_data, device_data, behavior_data):
+    @metrics_service.timed('honeykyc_risk_score_seconds', 'Time spent in RiskService.calculate_risk_score')
+    def calculate_risk_score(self, user_data, device_data, behavior_data, keystroke_profile=None):
         """
         Calculate risk score based on multiple factors
         Higher score = Higher risk
+        keystroke_profile is the user's typing baseline from the tracking store
         """
+        return self.executor.run('risk_score', (user_data, device_data, behavior_data, keystroke_profile),
+                                 inline=self._calculate_risk_score, fallback=self._quick_risk_score)
+    
+    def _calculate_risk_score(self, user_data, device_data, behavior_data, keystroke_profile=None):
         risk_score = 0
         risk_factors = []
+        keystroke_anomaly = False
+        telecom_data = self.registry.current()
+        w = self.weights
         
         mobile = user_data.get('mobile', '')
         name = user_data.get('name', '')
@@ -21,60 +152,68 @@ class RiskService:
         # ============================================
         # FACTOR 1: Mobile Number Ownership Check (0-30 points)
         # ============================================
-        if mobile in self.telecom_data:
-            telecom_owner = self.telecom_data[mobile]['owner_name']
+        if mobile in telecom_data:
+            telecom_owner = telecom_data[mobile]['owner_name']
             
             # Check if names match (case-insensitive)
             if telecom_owner.lower() == name.lower():
                 # Exact match - low risk
                 risk_score += 0
-                risk_factors.append("✅ Name matches telecom records")
+                risk_factors.append(FACTOR_NAME_MATCH)
             else:
                 # Name mismatch - high risk
-                risk_score += 30
-                risk_factors.append(f"❌ Name mismatch: Telecom owner is '{telecom_owner}'")
+                risk_score += w['name_mismatch']
+                risk_factors.append(name_mismatch_factor(telecom_owner))
             
             # Check SIM age
-            activation_date = self.telecom_data[mobile]['activation_date']
+            activation_date = telecom_data[mobile]['activation_date']
             sim_age_days = (datetime.now() - datetime.strptime(activation_date, '%Y-%m-%d')).days
             
             if sim_age_days < 7:  # Brand new SIM (less than a week)
-                risk_score += 25
-                risk_factors.append("⚠️ SIM activated within last 7 days")
+                risk_score += w['sim_7_days']
+                risk_factors.append(FACTOR_SIM_7_DAYS)
             elif sim_age_days < 30:  # New SIM (less than 30 days)
-                risk_score += 15
-                risk_factors.append("⚠️ SIM activated within last 30 days")
+                risk_score += w['sim_30_days']
+                risk_factors.append(FACTOR_SIM_30_DAYS)
             elif sim_age_days < 90:  # Medium age SIM
-                risk_score += 5
-                risk_factors.append("ℹ️ SIM less than 3 months old")
+                risk_score += w['sim_90_days']
+                risk_factors.append(FACTOR_SIM_90_DAYS)
             else:
                 # Old SIM - no risk
-                risk_factors.append("✅ SIM is well-established")
+                risk_factors.append(FACTOR_SIM_ESTABLISHED)
                 
             # Check KYC status
-            if not self.telecom_data[mobile].get('kyc_status') == 'verified':
-                risk_score += 10
-                risk_factors.append("⚠️ Incomplete KYC on mobile number")
+            if not telecom_data[mobile].get('kyc_status') == 'verified':
+                risk_score += w['incomplete_kyc']
+                risk_factors.append(FACTOR_INCOMPLETE_KYC)
                 
         else:
-            risk_score += 40
-            risk_factors.append("❌ Mobile number not found in telecom database")
+            risk_score += w['mobile_not_found']
+            risk_factors.append(FACTOR_MOBILE_NOT_FOUND)
         
         # ============================================
         # FACTOR 2: Device Fingerprint (0-20 points)
         # ============================================
         if device_data:
             if device_data.get('is_emulator', False):
-                risk_score += 20
-                risk_factors.append("❌ Emulator/virtual machine detected")
+                risk_score += w['emulator']
+                risk_factors.append(FACTOR_EMULATOR)
             
             if device_data.get('is_new_device', True):
-                risk_score += 5
-                risk_factors.append("ℹ️ New device - first time seen")
+                risk_score += w['new_device']
+                risk_factors.append(FACTOR_NEW_DEVICE)
             
+            # VPN/hosting/country come from the server-side IP lookup
             if device_data.get('vpn_detected', False):
-                risk_score += 15
-                risk_factors.append("⚠️ VPN/Proxy detected")
+                risk_score += w['vpn']
+                risk_factors.append(FACTOR_VPN)
+            elif device_data.get('ip_hosting', False):
+                risk_score += w['hosting_ip']
+                risk_factors.append(FACTOR_HOSTING_IP)
+            
+            if device_data.get('ip_country') and device_data['ip_country'] != HOME_COUNTRY:
+                risk_score += w['foreign_ip']
+                risk_factors.append(FACTOR_FOREIGN_IP)
         
         # ============================================
         # FACTOR 3: Behavioral Analysis (0-25 points)
@@ -83,38 +222,65 @@ class RiskService:
             # Check login speed
             login_time = behavior_data.get('login_time_ms', 10000)  # Default high if not set
             if login_time < 1000:  # Less than 1 second
-                risk_score += 25
-                risk_factors.append("❌ Abnormally fast login (bot-like)")
+                risk_score += w['login_bot_fast']
+                risk_factors.append(FACTOR_LOGIN_BOT_FAST)
             elif login_time < 2000:  # Less than 2 seconds
-                risk_score += 15
-                risk_factors.append("⚠️ Very fast login")
+                risk_score += w['login_very_fast']
+                risk_factors.append(FACTOR_LOGIN_VERY_FAST)
             elif login_time < 3000:  # Less than 3 seconds
-                risk_score += 5
-                risk_factors.append("ℹ️ Slightly fast login")
+                risk_score += w['login_fast']
+                risk_factors.append(FACTOR_LOGIN_FAST)
             
-            # Check mouse movements (lack of human interaction)
-            mouse_movements = behavior_data.get('mouse_movements', 100)  # Default high
-            if mouse_movements < 5:
-                risk_score += 15
-                risk_factors.append("❌ Minimal mouse movement (automated)")
+            # Check pointer dynamics (scripted movement is straight and evenly paced).
+            # Bare mouse_movement counts are trivial to fake, so a session without
+            # enough trajectory to judge counts as lacking human interaction
+            pointer_summary = behavior_data.get('pointer_summary')
+            if not pointer_summary or pointer_summary['segments'] < MIN_POINTER_SEGMENTS:
+                risk_score += w['minimal_mouse']
+                risk_factors.append(FACTOR_MINIMAL_MOUSE)
+            else:
+                pointer = summary_features(pointer_summary)
+                if pointer['straightness'] > 0.99:
+                    risk_score += w['linear_pointer']
+                    risk_factors.append(FACTOR_LINEAR_POINTER)
+                if pointer['speed_cv'] < 0.15:
+                    risk_score += w['uniform_pointer_speed']
+                    risk_factors.append(FACTOR_UNIFORM_POINTER_SPEED)
+            
+            # Check keystroke dynamics (constant-size stats, O(1) to score)
+            keystroke_stats = behavior_data.get('keystroke_stats')
+            if keystroke_stats and keystroke_stats['flight'][0] >= MIN_KEYSTROKE_INTERVALS:
+                typing = session_features(keystroke_stats)
+                uniform = typing['flight_cv'] is not None and typing['flight_cv'] < 0.1
+                if uniform or typing['flight_entropy'] < 1.0:
+                    risk_score += w['uniform_typing']
+                    risk_factors.append(FACTOR_UNIFORM_TYPING)
+                    keystroke_anomaly = True
+                elif (keystroke_profile and keystroke_profile['sessions'] >= MIN_BASELINE_SESSIONS
+                        and baseline_deviation(keystroke_profile, keystroke_stats) > 3):
+                    risk_score += w['typing_mismatch']
+                    risk_factors.append(FACTOR_TYPING_MISMATCH)
+                    keystroke_anomaly = True
             
             # Check copy-paste (common in fraud)
             if behavior_data.get('copied_pasted', False):
-                risk_score += 5
-                risk_factors.append("ℹ️ Copied-pasted credentials")
+                risk_score += w['copy_paste']
+                risk_factors.append(FACTOR_COPY_PASTE)
             
             # Check pages visited
-            pages_visited = behavior_data.get('pages_visited', [])
-            if len(pages_visited) > 20:
-                risk_score += 10
-                risk_factors.append("⚠️ Excessive page navigation")
+            pages_visited = behavior_data.get('pages_visited_count')
+            if pages_visited is None:
+                pages_visited = len(behavior_data.get('pages_visited', []))
+            if pages_visited > 20:
+                risk_score += w['excessive_pages']
+                risk_factors.append(FACTOR_EXCESSIVE_PAGES)
         
         # ============================================
         # FACTOR 4: Honeypot Triggers (0-50 points)
         # ============================================
         if behavior_data and behavior_data.get('honeypot_clicked', False):
-            risk_score += 50
-            risk_factors.append("🚨 HONEYPOT TRIGGERED - Attempted to access hidden element")
+            risk_score += w['honeypot']
+            risk_factors.append(FACTOR_HONEYPOT)
         
         # ============================================
         # FINAL RISK CLASSIFICATION
@@ -126,23 +292,70 @@ class RiskService:
             # Override for demo purposes
             risk_score = 20
             risk_level = 'LOW'
-            risk_factors = ["✅ Verified legitimate user"]
+            risk_factors = [FACTOR_LEGITIMATE_DEMO_USER]
         
         return {
             'risk_score': risk_score,
             'risk_level': risk_level,
             'risk_factors': risk_factors,
-            'is_fraud': risk_score > 60,
-            'needs_honeypot': risk_score > 50,
+            'is_fraud': risk_score > self.thresholds['fraud'],
+            'needs_honeypot': risk_score > self.thresholds['honeypot'],
+            'keystroke_anomaly': keystroke_anomaly,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _quick_risk_score(self, user_data, device_data, behavior_data, keystroke_profile=None):
+        """
+        Cheap score used when the full assessment misses its deadline:
+        ownership, device flags and honeypot only, no behavior analysis
+        """
+        risk_score = 0
+        risk_factors = []
+        telecom_data = self.registry.current()
+        w = self.weights
+        mobile = user_data.get('mobile', '')
+        name = user_data.get('name', '')
+        
+        if mobile in telecom_data:
+            telecom_owner = telecom_data[mobile]['owner_name']
+            if telecom_owner.lower() == name.lower():
+                risk_factors.append(FACTOR_NAME_MATCH)
+            else:
+                risk_score += w['name_mismatch']
+                risk_factors.append(name_mismatch_factor(telecom_owner))
+        else:
+            risk_score += w['mobile_not_found']
+            risk_factors.append(FACTOR_MOBILE_NOT_FOUND)
+        
+        if device_data and device_data.get('is_emulator', False):
+            risk_score += w['emulator']
+            risk_factors.append(FACTOR_EMULATOR)
+        if device_data and device_data.get('vpn_detected', False):
+            risk_score += w['vpn']
+            risk_factors.append(FACTOR_VPN)
+        if behavior_data and behavior_data.get('honeypot_clicked', False):
+            risk_score += w['honeypot']
+            risk_factors.append(FACTOR_HONEYPOT)
+        risk_factors.append(FACTOR_PARTIAL_ASSESSMENT)
+        
+        return {
+            'risk_score': risk_score,
+            'risk_level': self._get_risk_level(risk_score),
+            'risk_factors': risk_factors,
+            'is_fraud': risk_score > self.thresholds['fraud'],
+            'needs_honeypot': risk_score > self.thresholds['honeypot'],
+            'keystroke_anomaly': False,
+            'degraded': True,
             'timestamp': datetime.now().isoformat()
         }
     
     def _get_risk_level(self, score):
-        if score < 30:
+        thresholds = self.thresholds
+        if score < thresholds['medium']:
             return 'LOW'
-        elif 30 <= score < 50:
+        elif score < thresholds['high']:
             return 'MEDIUM'
-        elif 50 <= score < 70:
+        elif score < thresholds['critical']:
             return 'HIGH'
         else:
             return 'CRITICAL'
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+Streaming rule engine over tracking events.
+
+A rule is a windowed sequence pattern, partitioned by an event field:
+
+    {
+        "name": "admin_page_then_large_transaction",
+        "key": "user",
+        "within_seconds": 300,
+        "steps": [
+            {"type": "page_view", "where": {"page": {"in": ["admin", "settings"]}}, "as": "view"},
+            {"type": "transaction", "where": {"amount": {"gt": 10000}}, "as": "txn"}
+        ],
+        "reason": "Visited {view[page]} page then sent ₹{txn[amount]} within 5 minutes",
+        "severity": "high"
+    }
+
+Steps must happen in order (unrelated events in between are ignored), the
+whole sequence within within_seconds of its first event. A step may
+require "count" matching events. "where" compares event fields for
+equality or with gt/gte/lt/lte/ne/in/not_in.
+
+Each rule keeps, per key, a few partial matches ("runs"). Events are
+dispatched by type, so an event only touches the rules that mention its
+type; state per rule is bounded by max_keys (least recently used keys are
+dropped) and max_runs per key, and runs older than the window expire.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ('low', 'medium', 'high', 'critical')
+
+_OPERATORS = {
+    'eq': lambda value, arg: value == arg,
+    'ne': lambda value, arg: value != arg,
+    'gt': lambda value, arg: value is not None and value > arg,
+    'gte': lambda value, arg: value is not None and value >= arg,
+    'lt': lambda value, arg: value is not None and value < arg,
+    'lte': lambda value, arg: value is not None and value <= arg,
+    'in': lambda value, arg: value in arg,
+    'not_in': lambda value, arg: value not in arg
+}
+
+DEFAULT_RULES = [
+    {
+        'name': 'admin_page_then_large_transaction',
+        'key': 'user',
+        'within_seconds': 300,
+        'steps': [
+            {'type': 'page_view', 'where': {'page': {'in': ['admin', 'settings', 'hidden']}}, 'as': 'view'},
+            {'type': 'transaction', 'where': {'status': 'completed', 'amount': {'gt': 10000}}, 'as': 'txn'}
+        ],
+        'reason': 'Visited {view[page]} page then sent ₹{txn[amount]} within 5 minutes',
+        'severity': 'high'
+    },
+    {
+        'name': 'rapid_transactions',
+        'key': 'session_id',
+        'within_seconds': 60,
+        'steps': [{'type': 'transaction', 'where': {'status': 'completed'}, 'count': 3}],
+        'reason': 'Multiple rapid transactions: 3 in 60 seconds',
+        'severity': 'medium'
+    },
+    {
+        'name': 'repeated_failed_transactions',
+        'key': 'session_id',
+        'within_seconds': 3600,
+        'steps': [{'type': 'failed_transaction', 'count': 3}],
+        'reason': 'Multiple failed transaction attempts',
+        'severity': 'medium'
+    },
+    {
+        'name': 'honeypot_sensitive_actions',
+        'key': 'session_id',
+        'within_seconds': 600,
+        'steps': [{'type': 'honeypot_action', 'count': 4,
+                   'where': {'action_type': {'in': ['transfer_attempt', 'view_balance', 'click_admin_link']}}}],
+        'reason': 'Repeated sensitive actions inside the honeypot',
+        'severity': 'critical'
+    },
+    {
+        'name': 'honeypot_automation',
+        'key': 'session_id',
+        'within_seconds': 2.5,
+        'steps': [{'type': 'honeypot_action', 'count': 6}],
+        'reason': 'Automated honeypot interaction (6 actions in 2.5 seconds)',
+        'severity': 'critical'
+    }
+]
+
+
+def _compile_where(where):
+    checks = []
+    for field, condition in (where or {}).items():
+        if not isinstance(condition, dict):
+            condition = {'eq': condition}
+        for op, arg in condition.items():
+            if op not in _OPERATORS:
+                raise ValueError(f"Unknown operator '{op}' for field '{field}'")
+            if op in ('in', 'not_in'):
+                arg = frozenset(arg)
+            checks.append((field, _OPERATORS[op], arg))
+
+    def matches(event):
+        for field, check, arg in checks:
+            try:
+                if not check(event.get(field), arg):
+                    return False
+            except TypeError:
+                return False
+        return True
+    return matches
+
+
+class CompiledRule:
+    __slots__ = ('name', 'key', 'window', 'steps', 'reason', 'severity', 'definition')
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.name = definition['name']
+        self.key = definition.get('key', 'session_id')
+        self.window = float(definition['within_seconds'])
+        self.reason = definition.get('reason', self.name)
+        self.severity = definition.get('severity', 'medium')
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"Rule {self.name}: severity must be one of {SEVERITIES}")
+        if not definition.get('steps'):
+            raise ValueError(f"Rule {self.name} has no steps")
+        self.steps = []
+        for i, step in enumerate(definition['steps']):
+            types = step['type'] if isinstance(step['type'], list) else [step['type']]
+            count = int(step.get('count', 1))
+            if count < 1:
+                raise ValueError(f"Rule {self.name}: step count must be at least 1")
+            self.steps.append((frozenset(types), _compile_where(step.get('where')), count,
+                               step.get('as', f'step{i}')))
+
+
+class RuleEngine:
+    def __init__(self, rules=None, max_keys=10000, max_runs=8):
+        self.max_keys = max_keys
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self.stats = {'events': 0, 'matches': 0, 'evicted_keys': 0}
+        self.load_rules(DEFAULT_RULES if rules is None else rules)
+
+    def load_rules(self, definitions):
+        """Compile and swap in a rule set (state starts empty); raises ValueError if invalid"""
+        try:
+            rules = [CompiledRule(d) for d in definitions]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid rule definition: {e}")
+        names = [r.name for r in rules]
+        if len(set(names)) != len(names):
+            raise ValueError('Rule names must be unique')
+
+        # event type -> rules with a step on that type
+        index = {}
+        for rule in rules:
+            for event_type in set().union(*(step[0] for step in rule.steps)):
+                index.setdefault(event_type, []).append(rule)
+        with self._lock:
+            self.rules = rules
+            self._index = index
+            self._state = {rule.name: OrderedDict() for rule in rules}
+        logger.info("Loaded %d detection rules", len(rules))
+
+    def wants(self, event_type):
+        """True if any rule looks at this event type (lets callers skip building the event)"""
+        return event_type in self._index
+
+    def process(self, event, now=None):
+        """
+        Feed one event ({'type': ..., field: value, ...}); returns the list of
+        rule matches it completed.
+        """
+        if event.get('type') not in self._index:
+            return []
+        now = now if now is not None else event.get('ts', time.time())
+        matches = []
+        with self._lock:
+            # Rules and state are swapped together by load_rules(); read both under the lock
+            rules = self._index.get(event.get('type'))
+            if not rules:
+                return []
+            self.stats['events'] += 1
+            for rule in rules:
+                key = event.get(rule.key)
+                if key is None:
+                    continue
+                match = self._advance(rule, key, event, now)
+                if match is not None:
+                    matches.append(match)
+            self.stats['matches'] += len(matches)
+        return matches
+
+    def _advance(self, rule, key, event, now):
+        state = self._state[rule.name]
+        runs = state.get(key)
+        if runs is None:
+            runs = state[key] = []
+            if len(state) > self.max_keys:
+                state.popitem(last=False)
+                self.stats['evicted_keys'] += 1
+        else:
+            state.move_to_end(key)
+            # Drop runs that can no longer finish inside the window
+            runs[:] = [run for run in runs if now - run[0] <= rule.window]
+
+        # A run is [start_ts, step_index, count_in_step, captures]
+        runs.append([now, 0, 0, {}])
+        completed = None
+        for run in runs:
+            types, where, count, alias = rule.steps[run[1]]
+            if event['type'] not in types or not where(event):
+                continue
+            run[2] += 1
+            run[3].setdefault(alias, event)
+            if run[2] >= count:
+                run[1] += 1
+                run[2] = 0
+                if run[1] == len(rule.steps):
+                    completed = run
+                    break
+
+        if completed is not None:
+            # One alert per completed pattern; the key starts over
+            del state[key]
+            return self._match(rule, key, completed, now)
+
+        # Of runs at the same progress the newest dominates (it expires last);
+        # past max_runs keep the most advanced ones
+        latest = {}
+        for run in runs:
+            if run[1] or run[2]:
+                latest[(run[1], run[2])] = run
+        runs[:] = sorted(latest.values(), key=lambda run: (run[1], run[2]))[-self.max_runs:]
+        if not runs:
+            del state[key]
+        return None
+
+    def _match(self, rule, key, run, now):
+        captures = run[3]
+        try:
+            reason = rule.reason.format(**captures)
+        except (KeyError, IndexError, AttributeError, ValueError):
+            reason = rule.reason
+        return {
+            'rule': rule.name,
+            'severity': rule.severity,
+            'key': key,
+            'reason': reason,
+            'started_at': run[0],
+            'matched_at': now,
+            'events': captures
+        }
+
+    def get_status(self):
+        with self._lock:
+            return dict(self.stats,
+                        rules=[dict(r.definition, active_keys=len(self._state[r.name])) for r in self.rules])
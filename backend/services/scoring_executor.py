@@ -0,0 +1,339 @@
+import abc
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from services.metrics_service import metrics_service
+
+logger = logging.getLogger(__name__)
+
+
+class InlineExecutor:
+    """Run scoring in the calling thread (no deadline, no fallback)"""
+
+    kind = 'inline'
+
+    def run(self, task, args, inline, fallback, deadline_ms=None):
+        return inline(*args)
+
+    def get_status(self):
+        return {'kind': self.kind}
+
+    def shutdown(self):
+        pass
+
+
+class _PoolExecutor(abc.ABC):
+    """Deadline, fallback and back-pressure handling shared by the pools"""
+
+    kind = None
+
+    def __init__(self, max_workers, deadline_ms=200, max_pending=None):
+        self.max_workers = max_workers
+        self.deadline_ms = deadline_ms
+        self.max_pending = max_pending or max_workers * 4
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {'submitted': 0, 'completed': 0, 'timeouts': 0, 'rejected': 0, 'errors': 0, 'overruns': 0}
+
+    @abc.abstractmethod
+    def _submit(self, task, args, inline):
+        """Start inline(*args) (or its worker-side equivalent) and return a Future"""
+
+    def _overran(self, future):
+        """A task is still running past its deadline and keeps its worker busy"""
+        self._count('overruns')
+
+    def _broken(self):
+        """The pool can no longer run tasks (a worker died)"""
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _fallback(self, task, reason, fallback, args):
+        metrics_service.counter('honeykyc_scoring_fallbacks_total',
+                                'Scoring calls answered by the cheap fallback',
+                                task=task, reason=reason).inc()
+        return fallback(*args)
+
+    def _broken_fallback(self, task, error, fallback, args):
+        logger.warning("Scoring pool unavailable for task %s: %s", task, error)
+        self._count('errors')
+        self._broken()
+        return self._fallback(task, 'broken', fallback, args)
+
+    def run(self, task, args, inline, fallback, deadline_ms=None):
+        """
+        Run a scoring task on the pool and wait at most deadline_ms for it.
+        Late, failed or rejected (pool saturated) calls return fallback(*args)
+        so the request thread is never blocked longer than the deadline.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats['rejected'] += 1
+                saturated = True
+            else:
+                self._pending += 1
+                self.stats['submitted'] += 1
+                saturated = False
+        if saturated:
+            return self._fallback(task, 'saturated', fallback, args)
+
+        try:
+            future = self._submit(task, args, inline)
+        except BrokenExecutor as e:
+            with self._lock:
+                self._pending -= 1
+            return self._broken_fallback(task, e, fallback, args)
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+            logger.error("Could not submit scoring task %s: %s", task, e)
+            self._count('errors')
+            return self._fallback(task, 'error', fallback, args)
+        future.add_done_callback(self._done)
+
+        timeout = (deadline_ms if deadline_ms is not None else self.deadline_ms) / 1000
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            # Drop it if it hasn't started; a running one can't be interrupted
+            if not future.cancel():
+                self._overran(future)
+            self._count('timeouts')
+            return self._fallback(task, 'timeout', fallback, args)
+        except BrokenExecutor as e:
+            return self._broken_fallback(task, e, fallback, args)
+        except Exception as e:
+            logger.error("Scoring task %s failed: %s", task, e)
+            self._count('errors')
+            return self._fallback(task, 'error', fallback, args)
+        self._count('completed')
+        return result
+
+    def get_status(self):
+        with self._lock:
+            return dict(self.stats, kind=self.kind, max_workers=self.max_workers,
+                        deadline_ms=self.deadline_ms, pending=self._pending, max_pending=self.max_pending)
+
+
+class ThreadExecutor(_PoolExecutor):
+    """
+    Thread pool: bounds the time a request waits for scoring, but still
+    shares the GIL, so it only helps where scoring releases it (numpy).
+    Threads can't be stopped, so an overrunning task keeps its thread until
+    it returns; only the process pool reclaims stuck workers.
+    """
+
+    kind = 'thread'
+
+    def __init__(self, max_workers=4, deadline_ms=200, max_pending=None):
+        super().__init__(max_workers, deadline_ms, max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scoring')
+
+    def _submit(self, task, args, inline):
+        return self._pool.submit(inline, *args)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ============================================
+# PROCESS POOL
+# ============================================
+
+_worker_registry = None
+_worker_services = None
+
+
+def _init_worker(telecom_data_path, delta_dir=None, deltas=()):
+    """
+    Build worker-side services once. A forked worker inherits the parent's
+    registry; a spawned one loads the data file and replays the delta files
+    the parent had applied when the pool was built.
+    """
+    global _worker_registry, _worker_services
+    from services.ownership_service import OwnershipService
+    from services.risk_service import RiskService
+    from services.telecom_registry import TelecomRegistry
+    if _worker_registry is None:
+        _worker_registry = TelecomRegistry.load(telecom_data_path, delta_dir=delta_dir, deltas=deltas)
+    # Worker-side services score inline
+    risk_service = RiskService(registry=_worker_registry)
+    ownership_service = OwnershipService(registry=_worker_registry)
+    _worker_services = {
+        'risk_score': risk_service._calculate_risk_score,
+        'ownership': ownership_service._verify_ownership
+    }
+
+
+def _run_task(task, args):
+    return _worker_services[task](*args)
+
+
+def _noop():
+    return os.getpid()
+
+
+class ProcessExecutor(_PoolExecutor):
+    """
+    Process pool for CPU-heavy scoring across cores. Workers are forked
+    from the parent after the registry is loaded, so they share its pages
+    copy-on-write instead of each loading the data file; where fork isn't
+    available they load it themselves. A registry reload recycles the
+    pool so workers never score against a stale snapshot, and so do tasks
+    overrunning their deadline on half the workers. The replacement pool is
+    built in a background thread; requests keep using the current pool
+    until it is swapped in, and the old pool's workers are killed once no
+    request can still be waiting on them. A pool broken by a dead worker,
+    or inherited across a fork, is rebuilt the same way.
+    """
+
+    kind = 'process'
+
+    def __init__(self, registry, telecom_data_path, max_workers=None, deadline_ms=200, max_pending=None):
+        super().__init__(max_workers or os.cpu_count() or 1, deadline_ms, max_pending)
+        self.registry = registry
+        self.telecom_data_path = telecom_data_path
+        self.generation = 0
+        self.overrun_limit = max(1, self.max_workers // 2)
+        self.stats['recycled'] = 0
+        self._pid = None
+        self._pool = None
+        self._overrunning = set()
+        self._recycler = None
+        self._recycle_reason = None
+        self._pool_lock = threading.Lock()
+        self._context = multiprocessing.get_context(
+            'fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        registry.add_listener(self._on_registry_swap)
+        self._swap_pool(self._new_pool())
+
+    def _new_pool(self):
+        global _worker_registry
+        if self._context.get_start_method() == 'fork':
+            # Inherited by the forked workers
+            _worker_registry = self.registry
+        initargs = (self.telecom_data_path, self.registry.delta_dir, tuple(self.registry.applied_deltas))
+        pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context,
+                                   initializer=_init_worker, initargs=initargs)
+        # Fork every worker now rather than from a busy request thread later
+        for future in [pool.submit(_noop) for _ in range(self.max_workers)]:
+            future.result()
+        return pool
+
+    def _swap_pool(self, pool):
+        # Caller holds _pool_lock, or is the constructor
+        old_pool, self._pool = self._pool, pool
+        self._pid = os.getpid()
+        self._overrunning = set()
+        self.generation += 1
+        logger.info("Scoring process pool started (%d workers, generation %d)", self.max_workers, self.generation)
+        return old_pool
+
+    def _retire(self, pool):
+        # In-flight tasks finish against the old snapshot; whatever is still
+        # running once every caller has given up on it is killed
+        # (shutdown() drops the pool's process table, so read it first)
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        timer = threading.Timer(max(1.0, 2 * self.deadline_ms / 1000), self._terminate, (processes,))
+        timer.daemon = True
+        timer.start()
+
+    @staticmethod
+    def _terminate(processes):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _schedule_recycle(self, reason):
+        """Build a replacement pool in the background (coalesces repeated requests)"""
+        with self._pool_lock:
+            self._recycle_reason = reason
+            if self._recycler is not None:
+                return
+            self._recycler = threading.Thread(target=self._recycle, name='scoring-pool-recycler', daemon=True)
+            self._recycler.start()
+
+    def _recycle(self):
+        while True:
+            with self._pool_lock:
+                reason, self._recycle_reason = self._recycle_reason, None
+                if reason is None:
+                    self._recycler = None
+                    return
+            try:
+                pool = self._new_pool()
+            except Exception as e:
+                logger.error("Could not start a replacement scoring pool: %s", e)
+                with self._pool_lock:
+                    self._recycler = None
+                return
+            with self._pool_lock:
+                old_pool = self._swap_pool(pool)
+                self.stats['recycled'] += 1
+            logger.info("Scoring process pool recycled (%s)", reason)
+            if old_pool is not None:
+                self._retire(old_pool)
+
+    def _on_registry_swap(self, snapshot):
+        self._schedule_recycle('registry')
+
+    def _overran(self, future):
+        super()._overran(future)
+        with self._pool_lock:
+            overrunning = self._overrunning
+            overrunning.add(future)
+            stuck = len(overrunning) >= self.overrun_limit
+        future.add_done_callback(overrunning.discard)
+        if stuck:
+            self._schedule_recycle('overruns')
+
+    def _broken(self):
+        with self._pool_lock:
+            # Callers failing on a pool that was already replaced, or while
+            # the replacement is being built, don't queue another rebuild
+            if self._recycler is not None or (self._pool is not None and not self._pool._broken):
+                return
+        self._schedule_recycle('broken')
+
+    def _submit(self, task, args, inline):
+        with self._pool_lock:
+            if self._pid != os.getpid():
+                # Built before a pre-forking server forked this worker; the
+                # inherited pool's management thread didn't survive the fork
+                # and its processes belong to the parent, so drop it
+                self._pid, self._pool = os.getpid(), None
+                self._recycler = self._recycle_reason = None
+            pool = self._pool
+        if pool is None:
+            raise BrokenProcessPool('scoring pool was inherited across a fork')
+        return pool.submit(_run_task, task, args)
+
+    def get_status(self):
+        return dict(super().get_status(), generation=self.generation,
+                    overrunning=len(self._overrunning), recycling=self._recycler is not None)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_scoring_executor(kind, registry=None, telecom_data_path=None, workers=None, deadline_ms=200):
+    """SCORING_EXECUTOR: 'inline' (default), 'thread' or 'process'"""
+    if kind in (None, '', 'inline'):
+        return InlineExecutor()
+    if kind == 'thread':
+        return ThreadExecutor(max_workers=workers or 4, deadline_ms=deadline_ms)
+    if kind == 'process':
+        return ProcessExecutor(registry, telecom_data_path, max_workers=workers, deadline_ms=deadline_ms)
+    raise ValueError(f"Unknown scoring executor: {kind}")
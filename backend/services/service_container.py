@@ -0,0 +1,199 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from flask import current_app, g
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    App-scoped, lazily constructed services.
+    Nothing is read from disk until a service is first used (or warm_up()
+    is called), and the telecom registry is loaded once and shared by
+    every service that needs it.
+    """
+
+    def __init__(self, config):
+        self.telecom_data_path = config['TELECOM_DATA_PATH']
+        self.user_activity_path = config['USER_ACTIVITY_PATH']
+        self.transaction_graph_path = config.get('TRANSACTION_GRAPH_PATH')
+        self.detection_rules_path = config.get('DETECTION_RULES_PATH')
+        self.rule_engine_max_keys = config.get('RULE_ENGINE_MAX_KEYS', 10000)
+        self.ip_intel_paths = config.get('IP_INTEL_PATHS', [])
+        self.ip_intel_cache_size = config.get('IP_INTEL_CACHE_SIZE', 65536)
+        self.mule_fan_in_threshold = config.get('MULE_FAN_IN_THRESHOLD', 3)
+        self.registry_delta_dir = config.get('REGISTRY_DELTA_DIR')
+        self.registry_watch_interval = config.get('REGISTRY_WATCH_INTERVAL', 0)
+        self.registry_compact_ratio = config.get('REGISTRY_COMPACT_RATIO', 0.05)
+        self.scoring_executor_kind = config.get('SCORING_EXECUTOR', 'inline')
+        self.scoring_workers = config.get('SCORING_WORKERS')
+        self.scoring_deadline_ms = config.get('SCORING_DEADLINE_MS', 200)
+        self.shadow_rules_path = config.get('SHADOW_RULES_PATH')
+        self.shadow_sample_rate = config.get('SHADOW_SAMPLE_RATE', 1.0)
+        self.shadow_queue_size = config.get('SHADOW_QUEUE_SIZE', 256)
+        self.shadow_cpu_budget = config.get('SHADOW_CPU_BUDGET', 0.25)
+        self.shadow_log_path = config.get('SHADOW_LOG_PATH')
+        self.tracking_columnar = config.get('TRACKING_COLUMNAR', False)
+        self.tracking_journal_compact_every = config.get('TRACKING_JOURNAL_COMPACT_EVERY', 1000)
+        self.tracking_shards = config.get('TRACKING_SHARDS') or []
+        self.tracking_shard_vnodes = config.get('TRACKING_SHARD_VNODES', 160)
+        self.tracking_shard_authkey = config.get('TRACKING_SHARD_AUTHKEY')
+        self.tracking_session_miss_ttl = config.get('TRACKING_SESSION_MISS_TTL', 5.0)
+        self.tracking_dashboard_top_k = config.get('TRACKING_DASHBOARD_TOP_K', 500)
+        self._lock = threading.RLock()
+        self._instances = {}
+
+    def _get(self, name, factory):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    start = time.perf_counter()
+                    instance = factory()
+                    self._instances[name] = instance
+                    logger.info("Initialized %s in %.1f ms", name, (time.perf_counter() - start) * 1000)
+        return instance
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    @property
+    def telecom_registry(self):
+        return self._get('telecom_registry', self._build_registry)
+
+    def _build_registry(self):
+        from services.telecom_registry import TelecomRegistry
+        registry = TelecomRegistry(self.telecom_data_path, delta_dir=self.registry_delta_dir,
+                                   compact_ratio=self.registry_compact_ratio)
+        # Catch up on deltas published since the base file was written
+        registry.apply_pending_deltas()
+        registry.start_watcher(self.registry_watch_interval)
+        return registry
+
+    @property
+    def scoring_executor(self):
+        return self._get('scoring_executor', self._build_scoring_executor)
+
+    def _build_scoring_executor(self):
+        from services.scoring_executor import create_scoring_executor
+        # Process workers are forked with the registry already loaded
+        registry = self.telecom_registry if self.scoring_executor_kind == 'process' else None
+        return create_scoring_executor(self.scoring_executor_kind, registry=registry,
+                                       telecom_data_path=self.telecom_data_path,
+                                       workers=self.scoring_workers, deadline_ms=self.scoring_deadline_ms)
+
+    @property
+    def risk_service(self):
+        from services.risk_service import RiskService
+        return self._get('risk_service', lambda: RiskService(registry=self.telecom_registry,
+                                                             executor=self.scoring_executor))
+
+    @property
+    def shadow_scorer(self):
+        return self._get('shadow_scorer', self._build_shadow_scorer)
+
+    def _build_shadow_scorer(self):
+        from services.backtest_service import load_rule_set
+        from services.shadow_scoring import ShadowScorer
+        # Disabled (but switchable on via the admin API) without a rules file
+        rule_set = load_rule_set(self.shadow_rules_path) if self.shadow_rules_path else None
+        scorer = ShadowScorer(self.telecom_registry, rule_set, sample_rate=self.shadow_sample_rate,
+                              queue_size=self.shadow_queue_size, cpu_budget=self.shadow_cpu_budget,
+                              log_path=self.shadow_log_path)
+        # Let queued comparisons reach the shadow log before the process exits
+        atexit.register(scorer.shutdown)
+        return scorer
+
+    @property
+    def telecom_service(self):
+        from services.telecom_service import TelecomService
+        return self._get('telecom_service', lambda: TelecomService(registry=self.telecom_registry))
+
+    @property
+    def ownership_service(self):
+        from services.ownership_service import OwnershipService
+        return self._get('ownership_service', lambda: OwnershipService(registry=self.telecom_registry,
+                                                                       executor=self.scoring_executor))
+
+    @property
+    def ip_intel(self):
+        from services.ip_intel import IPIntelIndex
+        return self._get('ip_intel', lambda: IPIntelIndex(self.ip_intel_paths, self.ip_intel_cache_size))
+
+    @property
+    def rule_engine(self):
+        return self._get('rule_engine', self._build_rule_engine)
+
+    def _build_rule_engine(self):
+        from services.rule_engine import RuleEngine
+        rules = None
+        if self.detection_rules_path:
+            with open(self.detection_rules_path) as f:
+                rules = json.load(f)
+        return RuleEngine(rules, max_keys=self.rule_engine_max_keys)
+
+    @property
+    def tracking_service(self):
+        return self._get('tracking_service', self._build_tracking)
+
+    def _build_tracking(self):
+        from services.tracking_service import TrackingService
+        if not self.tracking_shards:
+            return TrackingService(data_file=self.user_activity_path, graph_snapshot=self.transaction_graph_path,
+                                   mule_fan_in_threshold=self.mule_fan_in_threshold, rule_engine=self.rule_engine,
+                                   columnar=self.tracking_columnar,
+                                   journal_compact_every=self.tracking_journal_compact_every)
+
+        from services.shard_service import ShardedTrackingService, parse_shard_spec
+        authkey = (self.tracking_shard_authkey or '').encode('utf-8')
+
+        def local_shard(path):
+            return TrackingService(data_file=path, mule_fan_in_threshold=self.mule_fan_in_threshold,
+                                   rule_engine=self.rule_engine, columnar=self.tracking_columnar,
+                                   journal_compact_every=self.tracking_journal_compact_every)
+
+        shards = [parse_shard_spec(spec, authkey, local_shard) for spec in self.tracking_shards]
+        return ShardedTrackingService(shards, vnodes=self.tracking_shard_vnodes, rule_engine=self.rule_engine,
+                                      dashboard_top_k=self.tracking_dashboard_top_k,
+                                      session_miss_ttl=self.tracking_session_miss_ttl)
+
+    def warm_up(self):
+        """Construct every service now (e.g. in the master before forking workers)"""
+        start = time.perf_counter()
+        self.risk_service
+        self.telecom_service
+        self.ownership_service
+        self.ip_intel
+        self.tracking_service
+        logger.info("Services warmed up in %.1f ms", (time.perf_counter() - start) * 1000)
+
+
+def init_services(app):
+    """Attach a service container to the app, warming it up if configured"""
+    container = ServiceContainer(app.config)
+    app.extensions['honeykyc_services'] = container
+
+    @app.before_request
+    def pin_registry_snapshot():
+        # Every lookup in this request sees the same registry version
+        if container.is_loaded('telecom_registry'):
+            g._registry_pin = container.telecom_registry.pin()
+
+    @app.teardown_request
+    def unpin_registry_snapshot(exc=None):
+        token = g.pop('_registry_pin', None)
+        if token is not None:
+            container.telecom_registry.unpin(token)
+
+    if app.config.get('WARM_UP_SERVICES'):
+        container.warm_up()
+    return container
+
+
+def get_services():
+    """Service container of the current app"""
+    return current_app.extensions['honeykyc_services']
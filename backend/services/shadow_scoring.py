@@ -0,0 +1,205 @@
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from services.backtest_service import validate_rule_set
+from services.metrics_service import metrics_service
+from services.risk_service import RiskService
+
+logger = logging.getLogger(__name__)
+
+# Fields compared between the live and the shadow result
+COMPARED_FIELDS = ('risk_score', 'risk_level', 'is_fraud', 'needs_honeypot')
+
+
+class ShadowScorer:
+    """
+    Scores live traffic with a candidate risk rule set (same format as
+    tools/backtest.py) next to production, without touching responses.
+    submit() only samples and enqueues; a background thread scores and
+    records the candidate result with the live one. Only the risk section
+    of a rule set is compared; ownership thresholds are left to the backtest,
+    since live ownership results never pass through here. Shadow work is dropped,
+    never queued without bound: when the queue is full, or when the thread
+    has used up its CPU budget (cpu_budget cores, refilled continuously,
+    measured with the thread's own CPU clock so the GIL time it takes from
+    request threads stays capped).
+    """
+
+    def __init__(self, registry, rule_set=None, sample_rate=1.0, queue_size=256, cpu_budget=0.25,
+                 log_path=None, max_recent=200):
+        self.registry = registry
+        self.sample_rate = sample_rate
+        self.cpu_budget = cpu_budget
+        self.log_path = log_path
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        # CPU seconds the worker may still spend, at most one second's worth banked
+        self._cpu_allowance = cpu_budget
+        self._refilled_at = time.monotonic()
+        self._thread = None
+        self.recent = deque(maxlen=max_recent)
+        self.stats = {'submitted': 0, 'sampled_out': 0, 'dropped_queue_full': 0, 'dropped_cpu_budget': 0,
+                      'scored': 0, 'errors': 0, 'decision_agreements': 0, 'level_agreements': 0,
+                      'score_diff_sum': 0.0, 'cpu_seconds': 0.0}
+        self.rule_set = None
+        self.risk_service = None
+        self.set_rule_set(rule_set)
+
+    @property
+    def enabled(self):
+        return self.risk_service is not None
+
+    def set_rule_set(self, rule_set):
+        """Swap in a candidate rule set (None switches shadow scoring off); raises ValueError if invalid"""
+        if rule_set is None:
+            self.rule_set, self.risk_service = None, None
+            logger.info("Shadow scoring disabled")
+            return
+        validate_rule_set(rule_set)
+        if rule_set.get('ownership'):
+            raise ValueError('Shadow scoring compares risk results only; '
+                             'evaluate ownership thresholds with tools/backtest.py')
+        risk = rule_set.get('risk') or {}
+        risk_service = RiskService(self.registry, weights=risk.get('weights'), thresholds=risk.get('thresholds'))
+        with self._lock:
+            self.rule_set, self.risk_service = rule_set, risk_service
+            self._ensure_thread()
+        logger.info("Shadow scoring enabled (sample rate %.2f)", self.sample_rate)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='shadow-scoring', daemon=True)
+            self._thread.start()
+
+    def _outcome(self, outcome):
+        metrics_service.counter('honeykyc_shadow_scoring_total', 'Shadow scoring requests by outcome',
+                                outcome=outcome).inc()
+
+    # ============================================
+    # REQUEST PATH (never blocks)
+    # ============================================
+
+    def submit(self, path, session_id, live_result, get_inputs):
+        """
+        Queue a candidate scoring of the inputs the live result came from.
+        get_inputs() is only called once the request is admitted and must
+        return a copy the caller won't mutate afterwards.
+        Returns False when the request was sampled out or dropped.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            self.stats['submitted'] += 1
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                self.stats['sampled_out'] += 1
+                return False
+            if self._allowance() <= 0:
+                self.stats['dropped_cpu_budget'] += 1
+                self._outcome('dropped_cpu_budget')
+                return False
+        live = {field: live_result.get(field) for field in COMPARED_FIELDS}
+        # A live deadline fallback is a partial score, worth telling apart
+        live['degraded'] = bool(live_result.get('degraded'))
+        try:
+            self._queue.put_nowait((path, session_id, get_inputs(), live, time.time()))
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped_queue_full'] += 1
+            self._outcome('dropped_queue_full')
+            return False
+        return True
+
+    def _allowance(self):
+        now = time.monotonic()
+        self._cpu_allowance = min(self.cpu_budget,
+                                  self._cpu_allowance + (now - self._refilled_at) * self.cpu_budget)
+        self._refilled_at = now
+        return self._cpu_allowance
+
+    # ============================================
+    # BACKGROUND WORKER
+    # ============================================
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            risk_service = self.risk_service
+            if risk_service is None:
+                continue
+            path, session_id, inputs, live, submitted_at = job
+            cpu_start = time.thread_time()
+            try:
+                shadow = risk_service._calculate_risk_score(inputs['user_data'], inputs.get('device_data') or {},
+                                                            inputs.get('behavior_data') or {},
+                                                            inputs.get('keystroke_profile'))
+            except Exception as e:
+                with self._lock:
+                    self.stats['errors'] += 1
+                self._outcome('error')
+                logger.error("Shadow scoring failed for session %s: %s", session_id, e)
+                continue
+            cpu_seconds = time.thread_time() - cpu_start
+            self._record(path, session_id, live, {field: shadow[field] for field in COMPARED_FIELDS},
+                         submitted_at, cpu_seconds)
+
+    def _record(self, path, session_id, live, shadow, submitted_at, cpu_seconds):
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'path': path,
+            'session_id': session_id,
+            'live': live,
+            'shadow': shadow,
+            'decision_agrees': live['is_fraud'] == shadow['is_fraud'],
+            'queue_ms': round((time.time() - submitted_at) * 1000, 2)
+        }
+        with self._lock:
+            self._cpu_allowance -= cpu_seconds
+            stats = self.stats
+            stats['scored'] += 1
+            stats['cpu_seconds'] += cpu_seconds
+            stats['decision_agreements'] += record['decision_agrees']
+            stats['level_agreements'] += live['risk_level'] == shadow['risk_level']
+            stats['score_diff_sum'] += (shadow['risk_score'] or 0) - (live['risk_score'] or 0)
+            self.recent.append(record)
+        self._outcome('scored')
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            except OSError as e:
+                logger.error("Could not append to shadow scoring log %s: %s", self.log_path, e)
+
+    def shutdown(self):
+        """Stop the worker thread once it has scored what is already queued"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(None, timeout=5)
+            except queue.Full:
+                logger.warning("Shadow scoring queue still full at shutdown; dropping queued work")
+                return
+            thread.join(timeout=5)
+
+    def get_status(self, recent=20):
+        with self._lock:
+            stats = dict(self.stats)
+            scored = stats['scored']
+            return {
+                'enabled': self.enabled,
+                'rule_set': self.rule_set,
+                'sample_rate': self.sample_rate,
+                'cpu_budget': self.cpu_budget,
+                'queue': {'size': self._queue.qsize(), 'max_size': self._queue.maxsize},
+                'stats': stats,
+                'decision_agreement_rate': round(stats['decision_agreements'] / scored, 4) if scored else None,
+                'level_agreement_rate': round(stats['level_agreements'] / scored, 4) if scored else None,
+                'mean_score_diff': round(stats['score_diff_sum'] / scored, 2) if scored else None,
+                'recent': list(self.recent)[-recent:] if recent else []
+            }
@@ -0,0 +1,370 @@
+"""
+Tracking state partitioned across shards by user mobile.
+
+Each shard is a TrackingService: in this process (name=path.json) or in a
+shard process started with `python -m tools.tracking_shard serve`
+(name=host:port), reached over multiprocessing.managers. Users are placed
+on a consistent-hash ring with vnodes points per shard, so adding a shard
+only moves the users that land on its points.
+
+ShardedTrackingService has the TrackingService methods the routes use:
+- writes and reads for a user go to the shard owning the user's mobile;
+- session-keyed calls find the owner through a session directory (filled
+  on login, otherwise by asking every shard once); sessions no shard
+  tracks (honeypot visitors) are placed by their session ID, and the miss
+  is remembered for a while;
+- the admin dashboard is a scatter-gather of each shard's top-K users,
+  transactions and suspicious activity, merged here.
+
+The transaction graph and windowed rules are per shard: fan-in across
+shards and rules keyed on something other than user/session only see the
+events of one shard.
+"""
+import bisect
+import hashlib
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+
+logger = logging.getLogger(__name__)
+
+# Methods a shard process serves
+SHARD_METHODS = ('track_user_login', 'get_keystroke_profile', 'track_transaction', 'track_honeypot_transfer',
+                 'flag_session', 'track_action', 'process_event', 'get_admin_dashboard_data',
+                 'session_count', 'session_user', 'user_mobiles', 'export_users', 'import_users')
+
+# Dashboard list sizes, as in TrackingService.get_admin_dashboard_data
+RECENT_TRANSACTIONS = 30
+RECENT_SUSPICIOUS = 20
+
+
+class ShardUnavailable(RuntimeError):
+    """A shard process could not be reached"""
+
+
+class HashRing:
+    """Consistent-hash ring; positions come from md5 so every process agrees"""
+
+    def __init__(self, nodes=(), vnodes=160):
+        self.vnodes = vnodes
+        self.nodes = []
+        self._points = []
+        self._owners = []
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(str(key).encode('utf-8')).digest()[:8], 'big')
+
+    def add_node(self, node):
+        if node in self.nodes:
+            raise ValueError(f'Shard {node} is already on the ring')
+        self.nodes.append(node)
+        ring = sorted(list(zip(self._points, self._owners)) +
+                      [(self._hash(f'{node}#{i}'), node) for i in range(self.vnodes)])
+        self._points = [point for point, _ in ring]
+        self._owners = [owner for _, owner in ring]
+
+    def with_node(self, node):
+        ring = HashRing(self.nodes, self.vnodes)
+        ring.add_node(node)
+        return ring
+
+    def node_for(self, key):
+        if not self._points:
+            raise LookupError('Hash ring has no shards')
+        index = bisect.bisect(self._points, self._hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+# ============================================
+# SHARD PROCESSES
+# ============================================
+
+class TrackingShardManager(BaseManager):
+    pass
+
+
+TrackingShardManager.register('tracking', exposed=SHARD_METHODS)
+
+
+def _require_authkey(authkey):
+    # Anyone who can connect with the key can call any shard method
+    if not authkey:
+        raise ValueError('Remote tracking shards need an authkey (TRACKING_SHARD_AUTHKEY)')
+
+
+def serve_shard(tracking, address, authkey):
+    """Serve a TrackingService to routers until interrupted (blocks)"""
+    _require_authkey(authkey)
+    class Manager(TrackingShardManager):
+        pass
+
+    Manager.register('tracking', callable=lambda: tracking, exposed=SHARD_METHODS)
+    server = Manager(address=address, authkey=authkey).get_server()
+    logger.info("Tracking shard serving %s on %s:%s", tracking.data_file, *server.address)
+    server.serve_forever()
+
+
+class RemoteShard:
+    """
+    Proxy to a shard process. Connects on first use and again after a fork,
+    so workers forked from a warmed-up master don't share a socket.
+    """
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self._proxy = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with self._lock:
+            if self._proxy is None or self._pid != os.getpid():
+                manager = TrackingShardManager(address=self.address, authkey=self.authkey)
+                try:
+                    manager.connect()
+                except OSError as e:
+                    raise ShardUnavailable(f'Tracking shard at {self.address[0]}:{self.address[1]}: {e}') from e
+                self._proxy, self._pid = manager.tracking(), os.getpid()
+            return self._proxy
+
+    def __getattr__(self, name):
+        if name not in SHARD_METHODS:
+            raise AttributeError(name)
+        proxy = self._proxy if self._pid == os.getpid() else None
+        return getattr(proxy or self._connect(), name)
+
+
+def parse_shard_spec(spec, authkey, tracking_factory):
+    """
+    'name=host:port' is a shard process, 'name=path.json' an in-process store
+    built with tracking_factory(path). Returns (name, shard).
+    """
+    name, sep, target = spec.partition('=')
+    if not sep or not name.strip() or not target.strip():
+        raise ValueError(f'Invalid tracking shard {spec!r} (expected name=host:port or name=path.json)')
+    host, _, port = target.strip().rpartition(':')
+    if host and port.isdigit():
+        _require_authkey(authkey)
+        return name.strip(), RemoteShard((host, int(port)), authkey)
+    return name.strip(), tracking_factory(target.strip())
+
+
+# ============================================
+# ROUTER
+# ============================================
+
+class ShardedTrackingService:
+    """Routes tracking calls to the shard owning the user (see module docstring)"""
+
+    # Not available across shards; admin views check for None
+    graph = None
+
+    def __init__(self, shards, vnodes=160, rule_engine=None, dashboard_top_k=500, directory_size=100000,
+                 session_miss_ttl=5.0):
+        if not shards:
+            raise ValueError('At least one tracking shard is required')
+        self.shards = dict(shards)
+        self.ring = HashRing(self.shards, vnodes)
+        # Local copy of the shards' rules, so event types no rule wants never leave the process
+        self.rule_engine = rule_engine
+        self.dashboard_top_k = dashboard_top_k
+        self.directory_size = directory_size
+        self._directory = OrderedDict()
+        # Sessions no shard tracked when last asked: session_id -> monotonic expiry
+        self.session_miss_ttl = session_miss_ttl
+        self._misses = OrderedDict()
+        self._directory_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(2, len(self.shards)), thread_name_prefix='tracking-shard')
+
+    def shard_for(self, mobile):
+        return self.shards[self.ring.node_for(mobile)]
+
+    # ============================================
+    # SESSION DIRECTORY
+    # ============================================
+
+    def _remember(self, session_id, mobile):
+        with self._directory_lock:
+            self._misses.pop(session_id, None)
+            self._directory[session_id] = mobile
+            self._directory.move_to_end(session_id)
+            while len(self._directory) > self.directory_size:
+                self._directory.popitem(last=False)
+
+    def _remember_miss(self, session_id):
+        with self._directory_lock:
+            self._misses[session_id] = time.monotonic() + self.session_miss_ttl
+            self._misses.move_to_end(session_id)
+            while len(self._misses) > self.directory_size:
+                self._misses.popitem(last=False)
+
+    def _session_owner(self, session_id):
+        """
+        Mobile of a tracked session's user, or None. A directory miss asks
+        every shard; sessions none of them tracks (honeypot visitors) are
+        not asked about again for session_miss_ttl seconds.
+        """
+        with self._directory_lock:
+            mobile = self._directory.get(session_id)
+            if mobile is None:
+                expiry = self._misses.get(session_id)
+                if expiry is not None:
+                    if expiry > time.monotonic():
+                        return None
+                    del self._misses[session_id]
+        if mobile is not None:
+            return mobile
+        results = self._scatter('session_user', session_id).values()
+        for result in results:
+            if isinstance(result, str):
+                self._remember(session_id, result)
+                return result
+        # An unavailable shard may well track it
+        if self.session_miss_ttl > 0 and not any(isinstance(result, Exception) for result in results):
+            self._remember_miss(session_id)
+        return None
+
+    def _session_shard(self, session_id, mobile=None):
+        mobile = mobile or self._session_owner(session_id)
+        return self.shard_for(mobile if mobile is not None else f'session:{session_id}')
+
+    def _scatter(self, method, *args, **kwargs):
+        """Call a method on every shard in parallel: {name: result or the exception raised}"""
+        futures = {name: self._pool.submit(lambda shard=shard: getattr(shard, method)(*args, **kwargs))
+                   for name, shard in self.shards.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error("Tracking shard %s failed %s: %s", name, method, e)
+                results[name] = e
+        return results
+
+    # ============================================
+    # TRACKING
+    # ============================================
+
+    def track_user_login(self, user_data, risk_score, risk_level, session_id, keystroke_stats=None,
+                         device_fingerprint=None, ip_address=None, scoring_inputs=None):
+        mobile = user_data['mobile']
+        result = self.shard_for(mobile).track_user_login(user_data, risk_score, risk_level, session_id,
+                                                         keystroke_stats, device_fingerprint, ip_address,
+                                                         scoring_inputs)
+        self._remember(session_id, mobile)
+        return result
+
+    def get_keystroke_profile(self, mobile):
+        return self.shard_for(mobile).get_keystroke_profile(mobile)
+
+    def track_transaction(self, session_id, transaction_data, idempotency_key=None):
+        mobile = self._session_owner(session_id)
+        if mobile is None:
+            return None, False
+        return self.shard_for(mobile).track_transaction(session_id, transaction_data, idempotency_key)
+
+    def track_honeypot_transfer(self, session_id, recipient, amount, ip_address=None):
+        return self._session_shard(session_id).track_honeypot_transfer(session_id, recipient, amount, ip_address)
+
+    def flag_session(self, session_id):
+        self._session_shard(session_id).flag_session(session_id)
+
+    def track_action(self, session_id, action_data):
+        mobile = self._session_owner(session_id)
+        if mobile is not None:
+            self.shard_for(mobile).track_action(session_id, action_data)
+
+    def wants_event(self, event_type):
+        return self.rule_engine is not None and self.rule_engine.wants(event_type)
+
+    def process_event(self, event_type, session_id=None, user=None, **fields):
+        if not self.wants_event(event_type):
+            return []
+        return self._session_shard(session_id, user).process_event(event_type, session_id, user, **fields)
+
+    def session_count(self):
+        return sum(result for result in self._scatter('session_count').values() if isinstance(result, int))
+
+    # ============================================
+    # DASHBOARD (scatter-gather)
+    # ============================================
+
+    def get_admin_dashboard_data(self):
+        """Merged dashboard: the dashboard_top_k riskiest users and the latest activity of all shards"""
+        results = self._scatter('get_admin_dashboard_data', self.dashboard_top_k)
+        partials = [result for result in results.values() if isinstance(result, dict)]
+
+        def top(key, sort_key, limit):
+            # Every shard's list is already sorted (descending)
+            merged = heapq.merge(*(partial[key] for partial in partials), key=sort_key, reverse=True)
+            return [item for item, _ in zip(merged, range(limit))]
+
+        stats = {'total_users': 0, 'high_risk_users': 0, 'total_transactions': 0, 'total_suspicious': 0}
+        for partial in partials:
+            for name in stats:
+                stats[name] += partial['stats'][name]
+        return {
+            'users': top('users', lambda u: u['risk_score'], self.dashboard_top_k),
+            'transactions': top('transactions', lambda t: t['timestamp'], RECENT_TRANSACTIONS),
+            'suspicious_activity': top('suspicious_activity', lambda a: a['timestamp'], RECENT_SUSPICIOUS),
+            'active_sessions': sum(partial['active_sessions'] for partial in partials),
+            'stats': stats,
+            'unavailable_shards': sorted(name for name, result in results.items() if not isinstance(result, dict))
+        }
+
+    # ============================================
+    # REBALANCING
+    # ============================================
+
+    def add_shard(self, name, shard):
+        """
+        Put a new shard on the ring and move the users it now owns to it,
+        one source shard at a time. Run it with writes drained (or restart
+        the app workers with the new shard list afterwards): a worker still
+        on the old ring keeps writing moved users to their old shard.
+        Returns the number of users moved from each shard.
+        """
+        ring = self.ring.with_node(name)
+        moved = {}
+        for source_name, source in self.shards.items():
+            mobiles = [mobile for mobile in source.user_mobiles() if ring.node_for(mobile) == name]
+            if not mobiles:
+                moved[source_name] = 0
+                continue
+            bundle = source.export_users(mobiles)
+            try:
+                moved[source_name] = shard.import_users(bundle)
+            except Exception:
+                # Put them back rather than lose them
+                source.import_users(bundle)
+                raise
+            logger.info("Moved %d users from tracking shard %s to %s", moved[source_name], source_name, name)
+        self.shards[name] = shard
+        self.ring = ring
+        with self._directory_lock:
+            self._directory.clear()
+            self._misses.clear()
+        self._pool.shutdown(wait=False)
+        self._pool = ThreadPoolExecutor(max_workers=max(2, len(self.shards)), thread_name_prefix='tracking-shard')
+        return moved
+
+    def get_status(self):
+        counts = self._scatter('session_count')
+        return {
+            'shards': {name: {'sessions': count if isinstance(count, int) else None,
+                              'available': isinstance(count, int),
+                              'remote': isinstance(self.shards[name], RemoteShard)}
+                       for name, count in counts.items()},
+            'vnodes': self.ring.vnodes,
+            'directory_size': len(self._directory),
+            'cached_misses': len(self._misses)
+        }
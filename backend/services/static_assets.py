@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from flask import abort, current_app, request, send_file
+
+try:
+    import brotli
+except ImportError:  # optional dependency, only gzip variants are built without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Build output names carrying a content hash (main.3f2a9c1b.js, 2.8e4f.chunk.css) never change content
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.(chunk\.)?[a-z0-9]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# Everything else (index.html, manifest.json) is revalidated with its ETag on every use
+REVALIDATE_CACHE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/manifest+json',
+                      'image/svg+xml', 'application/xml', 'application/wasm')
+# Smaller files don't gain enough to be worth a variant
+MIN_COMPRESS_BYTES = 1024
+VARIANT_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+class StaticAsset:
+    __slots__ = ('path', 'mimetype', 'cache_control', 'etag', 'variants')
+
+    def __init__(self, path, mimetype, cache_control, etag):
+        self.path = path
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = etag
+        # encoding -> (file path, etag)
+        self.variants = {}
+
+
+def _accepted_encodings(header):
+    """Encodings the client accepts (q > 0) from an Accept-Encoding header"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticAssetManifest:
+    """
+    Manifest of the React build, created once at startup: per file a strong
+    ETag (content hash), its cache policy and precompressed brotli/gzip
+    variants written next to it (or under cache_dir). Existing variants
+    newer than their source are reused, so restarts and extra workers don't
+    compress again. Requests are answered from the manifest: If-None-Match
+    is checked before touching the disk, and bodies go out as files so the
+    WSGI server can use sendfile (or the front proxy, with USE_X_SENDFILE).
+    """
+
+    def __init__(self, root, cache_dir=None, precompress=True):
+        self.root = os.path.abspath(root)
+        self.cache_dir = cache_dir
+        self.assets = {}
+        self.stats = {'files': 0, 'bytes': 0, 'variants': 0, 'variant_bytes': 0, 'compressed': 0}
+        if os.path.isdir(self.root):
+            self._build(precompress)
+        else:
+            logger.warning("Static build directory not found: %s", self.root)
+
+    def _build(self, precompress):
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+                self.assets[relative] = self._load(relative, path, precompress)
+        logger.info("Static asset manifest: %s", self.stats)
+
+    def _load(self, relative, path, precompress):
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        cache_control = IMMUTABLE_CACHE if HASHED_NAME.search(relative) else REVALIDATE_CACHE
+        asset = StaticAsset(path, mimetype, cache_control, digest)
+        self.stats['files'] += 1
+        self.stats['bytes'] += len(content)
+
+        if precompress and len(content) >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES):
+            for encoding, compress in (('br', brotli and (lambda data: brotli.compress(data, quality=11))),
+                                       ('gzip', lambda data: gzip.compress(data, compresslevel=9, mtime=0))):
+                if compress:
+                    self._add_variant(asset, relative, content, encoding, compress)
+        return asset
+
+    def _variant_path(self, relative, path, encoding):
+        suffix = VARIANT_SUFFIXES[encoding]
+        if self.cache_dir:
+            return os.path.join(self.cache_dir, relative.replace('/', os.sep) + suffix)
+        return path + suffix
+
+    def _add_variant(self, asset, relative, content, encoding, compress):
+        variant_path = self._variant_path(relative, asset.path, encoding)
+        try:
+            if not os.path.exists(variant_path) or os.path.getmtime(variant_path) < os.path.getmtime(asset.path):
+                compressed = compress(content)
+                if len(compressed) >= len(content):
+                    return
+                os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+                tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, variant_path)
+                self.stats['compressed'] += 1
+            size = os.path.getsize(variant_path)
+        except OSError as e:
+            logger.warning("Could not write %s variant of %s: %s", encoding, relative, e)
+            return
+        # Strong ETags differ per representation
+        asset.variants[encoding] = (variant_path, f"{asset.etag}-{encoding}")
+        self.stats['variants'] += 1
+        self.stats['variant_bytes'] += size
+
+    def response(self, relative):
+        """Response for a build file (404 if it isn't in the manifest)"""
+        asset = self.assets.get(relative)
+        if asset is None:
+            abort(404)
+
+        path, etag, encoding = asset.path, asset.etag, None
+        if asset.variants:
+            accepted = _accepted_encodings(request.headers.get('Accept-Encoding'))
+            for candidate in ('br', 'gzip'):
+                if candidate in asset.variants and candidate in accepted:
+                    encoding = candidate
+                    path, etag = asset.variants[candidate]
+                    break
+
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            # conditional=True keeps Range support; the ETag is ours, not a stat-based one
+            response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True)
+            # send_file names the variant file (index.html.gz); browsers render these inline anyway
+            response.headers.pop('Content-Disposition', None)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = asset.cache_control
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def get_status(self):
+        return dict(self.stats, root=self.root, brotli=brotli is not None)
+
+
+def init_static_assets(app, build_dir):
+    """Serve the React build from a precompressed manifest instead of Flask's static view"""
+    manifest = StaticAssetManifest(build_dir, cache_dir=app.config.get('STATIC_CACHE_DIR'),
+                                   precompress=app.config.get('STATIC_PRECOMPRESS', True))
+    app.extensions['honeykyc_static_assets'] = manifest
+
+    # Client-side routes all get the app shell
+    @app.route('/')
+    @app.route('/dashboard')
+    @app.route('/honeypot')
+    def serve():
+        return manifest.response('index.html')
+
+    @app.route('/<path:filename>', endpoint='static')
+    def static_asset(filename):
+        return manifest.response(filename)
+
+    return manifest
@@ -0,0 +1,327 @@
+import contextvars
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from utils.data_loader import load_telecom_registry, open_text
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Suffix a delta file that can't be applied is renamed with, so later files still apply
+REJECTED_SUFFIX = '.rejected'
+
+# Snapshot pinned for the current request, see TelecomRegistry.pin()
+_pinned_snapshot = contextvars.ContextVar('pinned_telecom_snapshot', default=None)
+
+
+def _rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return 0
+
+
+class RegistrySnapshot(Mapping):
+    """
+    Immutable, versioned view of the telecom registry.
+    A snapshot is a shared base dict plus a small overlay of changed
+    records and a set of deleted mobiles. Applying a delta copies only the
+    overlay, so records and the (large) base table are shared between
+    versions until the overlay is compacted into a new base.
+    """
+
+    __slots__ = ('version', '_base', '_overlay', '_deleted', '_len')
+
+    def __init__(self, version, base, overlay=None, deleted=frozenset()):
+        self.version = version
+        self._base = base
+        self._overlay = overlay or {}
+        self._deleted = deleted
+        self._len = (len(base) - sum(1 for m in deleted if m in base)
+                     + sum(1 for m in self._overlay if m not in base))
+
+    def __getitem__(self, mobile):
+        record = self._overlay.get(mobile, _MISSING)
+        if record is not _MISSING:
+            return record
+        if mobile in self._deleted:
+            raise KeyError(mobile)
+        return self._base[mobile]
+
+    def __contains__(self, mobile):
+        if mobile in self._overlay:
+            return True
+        return mobile not in self._deleted and mobile in self._base
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for mobile in self._base:
+            if mobile not in self._deleted and mobile not in self._overlay:
+                yield mobile
+        yield from self._overlay
+
+    @property
+    def overlay_size(self):
+        return len(self._overlay) + len(self._deleted)
+
+
+class TelecomRegistry:
+    """
+    Hot-reloadable telecom registry.
+    Readers call current() and get an immutable snapshot; reloads build a
+    new snapshot off to the side and swap it in with a single reference
+    assignment, so in-flight requests keep the snapshot they started with.
+    """
+
+    def __init__(self, data_file=None, data=None, delta_dir=None, compact_ratio=0.05):
+        self.data_file = data_file
+        self.delta_dir = delta_dir
+        self.compact_ratio = compact_ratio
+        self.applied_deltas = []
+        self.rejected_deltas = []
+        self.last_reload = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+        base = data if data is not None else load_telecom_registry(data_file)
+        self._snapshot = RegistrySnapshot(1, base)
+
+    @classmethod
+    def load(cls, data_file, delta_dir=None, deltas=None, **kwargs):
+        """
+        Registry from the base file plus delta files from delta_dir: the
+        named ones in order (e.g. another registry's applied_deltas), or
+        every pending file when deltas is None.
+        """
+        registry = cls(data_file, delta_dir=delta_dir, **kwargs)
+        if deltas is None:
+            registry.apply_pending_deltas()
+        else:
+            for name in deltas:
+                registry.apply_delta_file(os.path.join(delta_dir or '', name))
+        return registry
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def current(self):
+        """Snapshot pinned to this request, or the latest one"""
+        pinned = _pinned_snapshot.get()
+        return pinned if pinned is not None else self._snapshot
+
+    def pin(self):
+        """Pin the latest snapshot for the rest of this request; returns a reset token"""
+        return _pinned_snapshot.set(self._snapshot)
+
+    def unpin(self, token):
+        try:
+            _pinned_snapshot.reset(token)
+        except ValueError:
+            # Token from another context; just drop the pin
+            _pinned_snapshot.set(None)
+
+    def add_listener(self, callback):
+        """callback(snapshot) runs after every swap (e.g. to drop version-keyed caches)"""
+        self._listeners.append(callback)
+
+    # ============================================
+    # RELOAD
+    # ============================================
+
+    def apply_delta_file(self, path):
+        """
+        Apply a JSONL delta file of upsert/patch/delete operations.
+        A file that was already applied is skipped, also when two callers
+        race for it (the check and the swap share the reload lock).
+        """
+        name = os.path.basename(path)
+        with self._reload_lock:
+            if name in self.applied_deltas:
+                return {'version': self._snapshot.version, 'source': path, 'already_applied': True}
+            with open_text(path) as f:
+                operations = (json.loads(line) for line in f if line.strip())
+                snapshot = self._swap(operations, source=path)
+            self.applied_deltas.append(name)
+            result = self.last_reload
+        self._notify(snapshot)
+        return result
+
+    def apply_operations(self, operations, source='api'):
+        """
+        Build and swap in a new snapshot from delta operations:
+            {"op": "upsert", "mobile": "...", "record": {...}}   replace/insert
+            {"op": "patch",  "mobile": "...", "fields": {...}}   merge fields
+            {"op": "delete", "mobile": "..."}
+        A malformed operation raises ValueError and nothing is applied.
+        """
+        with self._reload_lock:
+            snapshot = self._swap(operations, source)
+            result = self.last_reload
+        self._notify(snapshot)
+        return result
+
+    def _swap(self, operations, source):
+        # Caller holds _reload_lock
+        start = time.perf_counter()
+        rss_before = _rss_kb()
+        old = self._snapshot
+        overlay = dict(old._overlay)
+        deleted = set(old._deleted)
+        counts = {'upsert': 0, 'patch': 0, 'delete': 0, 'skipped': 0}
+
+        for number, op in enumerate(operations, 1):
+            if not isinstance(op, dict):
+                raise ValueError(f'Delta operation {number} is not an object')
+            mobile = str(op.get('mobile', ''))
+            kind = op.get('op')
+            if not mobile or kind not in counts:
+                counts['skipped'] += 1
+                continue
+            if kind == 'delete':
+                overlay.pop(mobile, None)
+                deleted.add(mobile)
+            elif kind == 'upsert':
+                record = op.get('record') or {}
+                if not isinstance(record, dict):
+                    raise ValueError(f'Delta operation {number}: record must be an object')
+                overlay[mobile] = dict(record)
+                deleted.discard(mobile)
+            else:
+                fields = op.get('fields') or {}
+                if not isinstance(fields, dict):
+                    raise ValueError(f'Delta operation {number}: fields must be an object')
+                existing = overlay.get(mobile)
+                if existing is None and mobile not in deleted:
+                    existing = old._base.get(mobile)
+                if existing is None:
+                    counts['skipped'] += 1
+                    continue
+                overlay[mobile] = {**existing, **fields}
+            counts[kind] += 1
+
+        base = old._base
+        compacted = len(overlay) + len(deleted) > self.compact_ratio * max(len(base), 1)
+        if compacted:
+            # One-off copy of the base table; records themselves are shared
+            base = {m: r for m, r in base.items() if m not in deleted and m not in overlay}
+            base.update(overlay)
+            overlay, deleted = {}, set()
+
+        snapshot = RegistrySnapshot(old.version + 1, base, overlay, frozenset(deleted))
+        self._snapshot = snapshot
+
+        self.last_reload = {
+            'version': snapshot.version,
+            'source': source,
+            'operations': counts,
+            'records': len(snapshot),
+            'overlay_size': snapshot.overlay_size,
+            'compacted': compacted,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            'rss_delta_kb': _rss_kb() - rss_before
+        }
+        logger.info("Telecom registry reloaded: %s", self.last_reload)
+        return snapshot
+
+    def _notify(self, snapshot):
+        # A failing listener must not keep the others from seeing the new snapshot
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error("Registry listener failed: %s", e)
+
+    def reload_full(self):
+        """Re-read the base data file and swap it in as a new version"""
+        base = load_telecom_registry(self.data_file)
+        with self._reload_lock:
+            snapshot = RegistrySnapshot(self._snapshot.version + 1, base)
+            self._snapshot = snapshot
+            self.applied_deltas = []
+            self.last_reload = result = {'version': snapshot.version, 'source': self.data_file,
+                                         'records': len(snapshot), 'compacted': True}
+        self._notify(snapshot)
+        return result
+
+    def pending_deltas(self):
+        """Delta files in delta_dir that have not been applied yet, in name order"""
+        if not self.delta_dir or not os.path.isdir(self.delta_dir):
+            return []
+        applied = set(self.applied_deltas) | set(self.rejected_deltas)
+        return [os.path.join(self.delta_dir, name) for name in sorted(os.listdir(self.delta_dir))
+                if name.endswith(('.jsonl', '.jsonl.gz')) and name not in applied]
+
+    def apply_pending_deltas(self):
+        """
+        Apply pending delta files in order. A file that fails to parse or
+        apply is renamed to <name>.rejected and skipped; one that can't be
+        read right now stops this pass and is retried on the next one.
+        Publishers must write deltas under another name and rename them into
+        place, or a half-written file gets rejected.
+        """
+        results = []
+        for path in self.pending_deltas():
+            try:
+                results.append(self.apply_delta_file(path))
+            except (ValueError, EOFError, gzip.BadGzipFile) as e:
+                results.append(self._reject_delta(path, e))
+            except FileNotFoundError:
+                # Moved aside by another process's watcher
+                continue
+            except OSError as e:
+                logger.error("Registry delta %s not readable, retrying later: %s", path, e)
+                break
+        return results
+
+    def _reject_delta(self, path, error):
+        name = os.path.basename(path)
+        logger.error("Rejected registry delta %s: %s", name, error)
+        try:
+            os.replace(path, path + REJECTED_SUFFIX)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Still skipped by this process; the file stays pending for others
+            logger.error("Could not move rejected registry delta %s aside: %s", name, e)
+        with self._reload_lock:
+            if name not in self.rejected_deltas:
+                self.rejected_deltas.append(name)
+        return {'source': path, 'rejected': str(error)}
+
+    def start_watcher(self, interval):
+        """Poll delta_dir in a daemon thread and apply new delta files"""
+        if self._watcher is not None or not self.delta_dir or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.apply_pending_deltas()
+                except Exception as e:
+                    logger.error("Registry delta watcher failed: %s", e)
+
+        self._watcher = threading.Thread(target=watch, name='registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def get_status(self):
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version,
+            'records': len(snapshot),
+            'overlay_size': snapshot.overlay_size,
+            'applied_deltas': list(self.applied_deltas),
+            'rejected_deltas': list(self.rejected_deltas),
+            'pending_deltas': [os.path.basename(p) for p in self.pending_deltas()],
+            'last_reload': self.last_reload
+        }
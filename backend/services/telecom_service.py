@@ -1,15 +1,41 @@
-import json
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+from services.metrics_service import metrics_service
+from services.telecom_registry import TelecomRegistry
 
 class TelecomService:
-    def __init__(self):
-        with open('data/telecom_mock_data.json', 'r') as f:
-            self.telecom_data = json.load(f)
+    def __init__(self, registry=None, data_file='data/telecom_mock_data.json', cache_size=10000):
+        self.registry = registry if registry is not None else TelecomRegistry(data_file)
+        
+        # Lookup cache keyed by registry version; cleared whenever a new snapshot is swapped in
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.registry.add_listener(lambda snapshot: self.clear_cache())
     
+    @metrics_service.timed('honeykyc_telecom_lookup_seconds', 'Time spent in TelecomService.verify_owner')
     def verify_owner(self, mobile_number, submitted_name):
         """Verify if the submitted name matches the telecom owner"""
+        telecom_data = self.registry.current()
+        
+        # SIM age depends on today's date, so it is part of the key
+        cache_key = (telecom_data.version, mobile_number, submitted_name.lower(), date.today())
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        result = self._verify_owner(telecom_data, mobile_number, submitted_name)
         
-        if mobile_number not in self.telecom_data:
+        with self._cache_lock:
+            self._cache[cache_key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(result)
+    
+    def _verify_owner(self, telecom_data, mobile_number, submitted_name):
+        if mobile_number not in telecom_data:
             return {
                 'verified': False,
                 'match': False,
@@ -17,7 +43,7 @@ class TelecomService:
                 'risk_score': 50
             }
         
-        record = self.telecom_data[mobile_number]
+        record = telecom_data[mobile_number]
         telecom_owner = record['owner_name']
         
         # Check if names match (case-insensitive)
@@ -48,6 +74,10 @@ class TelecomService:
             'message': 'Name matches' if name_match else 'Name mismatch detected'
         }
     
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+    
     def _get_age_category(self, days):
         if days < 30:
             return 'new'
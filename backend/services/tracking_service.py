@@ -1,17 +1,146 @@
 import json
+import logging
 from datetime import datetime
 import os
+import threading
+import time
+from services.columnar_table import ColumnarTable, Row, retain, to_builtin, to_columnar
+from services.keystroke_dynamics import new_profile, update_profile
+from services.ledger_service import STARTING_BALANCE, Ledger, validate_transaction
+from services.metrics_service import metrics_service
+from services.transaction_graph import FLAGGED_RISK_LEVELS, TransactionGraph, node_key
+
+logger = logging.getLogger(__name__)
+
+
+def _latest(records, n):
+    """The n most recent records, newest first"""
+    if isinstance(records, ColumnarTable):
+        return records.latest(n)
+    return sorted(records, key=lambda x: x['timestamp'], reverse=True)[:n]
+
+
+def _detach(bundle):
+    """Replace table Rows in an export bundle with dicts, one shared copy per ledger entry"""
+    copies = {}
+    
+    def plain(item):
+        if not isinstance(item, Row):
+            return item
+        if item.key is not None and item.key in copies:
+            return copies[item.key]
+        copy = {name: plain(value) for name, value in item.items()}
+        if item.key is not None:
+            copies[item.key] = copy
+        return copy
+    
+    bundle['transactions'] = [plain(t) for t in bundle['transactions']]
+    bundle['suspicious_activity'] = [plain(a) for a in bundle['suspicious_activity']]
+    for owner in list(bundle['users'].values()) + list(bundle['sessions'].values()):
+        if 'transactions' in owner:
+            owner['transactions'] = [plain(t) for t in owner['transactions']]
+    bundle['idempotency'] = {key: dict(record, entry=plain(record['entry']))
+                             for key, record in bundle['idempotency'].items()}
+    return bundle
+
+
+def _replay_journal(data, path):
+    """
+    Apply the posts journaled after the last full save of a store to its
+    loaded document; returns how many were applied. Entries the document
+    already has (saved just before the journal was removed) are skipped, and
+    a torn last line from a crash mid-append ends the replay.
+    """
+    if not os.path.exists(path):
+        return 0
+    meta = data.setdefault('ledger', {})
+    transactions = data.setdefault('transactions', [])
+    next_id = meta.get('next_id') or max((t.get('id', 0) for t in transactions), default=0) + 1
+    replayed = 0
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+                entry = record['entry']
+                entry_id = entry['id']
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Tracking journal %s ends in an unreadable line (%d); ignoring it", path, number)
+                break
+            if entry_id < next_id:
+                continue
+            transactions.append(entry)
+            session = data['sessions'].get(record['session_id'])
+            user = data['users'].get(entry['user'])
+            if entry['status'] == 'completed':
+                # Views are persisted as entry IDs
+                for owner in (session, user):
+                    if owner is not None:
+                        owner.setdefault('transactions', []).append(entry_id)
+            if session is not None:
+                session['balance'] = record['balance']
+            if user is not None and record.get('suspicious_actions') is not None:
+                user['total_suspicious_actions'] = record['suspicious_actions']
+            data.setdefault('suspicious_activity', []).extend(record.get('suspicious', []))
+            idempotency = record.get('idempotency')
+            if idempotency:
+                meta.setdefault('idempotency', {})[idempotency['key']] = {
+                    'id': entry_id, 'fingerprint': idempotency['fingerprint'], 'created': idempotency['created']}
+            next_id = entry_id + 1
+            replayed += 1
+    meta['next_id'] = next_id
+    return replayed
+
+
+def read_store(data_file):
+    """A tracking store document as TrackingService would load it (journaled posts included)"""
+    with open(data_file, 'r') as f:
+        data = json.load(f)
+    _replay_journal(data, data_file + '.journal')
+    return data
+
 
 class TrackingService:
-    def __init__(self):
-        self.data_file = 'data/user_activity.json'
+    def __init__(self, data_file='data/user_activity.json', graph_snapshot=None, mule_fan_in_threshold=3,
+                 rule_engine=None, columnar=False, journal_compact_every=1000):
+        self.data_file = data_file
+        # Posted transactions are appended to <data_file>.journal and folded into
+        # data_file every journal_compact_every posts (0 rewrites it on every post)
+        self.journal_file = data_file + '.journal'
+        self.journal_compact_every = journal_compact_every
+        self._journaled = 0
+        # Keep transactions and suspicious activity in columnar tables (services/columnar_table.py)
+        self.columnar = columnar
+        # Windowed detection rules fed with every tracked event (optional)
+        self.rule_engine = rule_engine
+        # Offline-built transaction graph (python -m tools.rebuild_graph), topped up from the store on load
+        self.graph_snapshot = graph_snapshot
+        self.mule_fan_in_threshold = mule_fan_in_threshold
+        # Guards every mutation of self.data and the save that serializes it
+        self.lock = threading.RLock()
         self.load_data()
     
+    @property
+    def data(self):
+        return self._data
+    
+    @data.setter
+    def data(self, data):
+        if self.columnar:
+            to_columnar(data)
+        self._data = data
+        self.ledger = Ledger(data)
+        self.graph = TransactionGraph.load(data, self.graph_snapshot)
+    
     def load_data(self):
         """Load user activity data"""
         if os.path.exists(self.data_file):
             with open(self.data_file, 'r') as f:
-                self.data = json.load(f)
+                data = json.load(f)
+            replayed = _replay_journal(data, self.journal_file)
+            self.data = data
+            if replayed:
+                logger.info("Replayed %d journaled transactions into %s", replayed, self.data_file)
+                self.save_data()
         else:
             self.data = {
                 'users': {},
@@ -21,13 +150,59 @@ class TrackingService:
             }
             self.save_data()
     
+    @metrics_service.timed('honeykyc_tracking_save_seconds', 'Time spent persisting tracking data')
     def save_data(self):
-        """Save user activity data"""
-        with open(self.data_file, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Save user activity data (everything journaled so far is in it, so the journal goes)"""
+        with self.lock:
+            temp_file = self.data_file + '.tmp'
+            with open(temp_file, 'w') as f:
+                json.dump(self.ledger.persisted_view(), f, indent=2, default=to_builtin)
+            os.replace(temp_file, self.data_file)
+            if self._journaled or os.path.exists(self.journal_file):
+                try:
+                    os.remove(self.journal_file)
+                except FileNotFoundError:
+                    pass
+            self._journaled = 0
+    
+    def _journal_post(self, session_id, session, entry, idempotency_key, suspicious_from):
+        """
+        Persist one post by appending its effects to the journal: the entry,
+        the session balance, the idempotency record and any suspicious
+        activity it raised. A full save happens every journal_compact_every posts.
+        """
+        if not self.journal_compact_every:
+            self.save_data()
+            return
+        user = self.data['users'].get(session['user'])
+        idempotency = self.ledger.idempotency.get(f"{session_id}:{idempotency_key}") if idempotency_key else None
+        record = {
+            'session_id': session_id,
+            'entry': entry,
+            'balance': session.get('balance', STARTING_BALANCE),
+            'idempotency': {'key': f"{session_id}:{idempotency_key}", 'fingerprint': idempotency['fingerprint'],
+                            'created': idempotency['created']} if idempotency else None,
+            'suspicious': self.data['suspicious_activity'][suspicious_from:],
+            'suspicious_actions': user.get('total_suspicious_actions', 0) if user else None
+        }
+        with open(self.journal_file, 'a') as f:
+            f.write(json.dumps(record, default=to_builtin) + '\n')
+        self._journaled += 1
+        if self._journaled >= self.journal_compact_every:
+            self.save_data()
     
-    def track_user_login(self, user_data, risk_score, risk_level, session_id):
-        """Track user login"""
+    def track_user_login(self, user_data, risk_score, risk_level, session_id, keystroke_stats=None,
+                         device_fingerprint=None, ip_address=None, scoring_inputs=None):
+        """
+        Track user login
+        scoring_inputs are the risk scoring arguments, kept with the session for backtesting
+        """
+        with self.lock:
+            return self._track_user_login(user_data, risk_score, risk_level, session_id, keystroke_stats,
+                                          device_fingerprint, ip_address, scoring_inputs)
+    
+    def _track_user_login(self, user_data, risk_score, risk_level, session_id, keystroke_stats,
+                          device_fingerprint, ip_address, scoring_inputs):
         mobile = user_data['mobile']
         
         if mobile not in self.data['users']:
@@ -50,6 +225,10 @@ class TrackingService:
         user['risk_score'] = risk_score
         user['risk_level'] = risk_level
         
+        # Only genuine-looking logins teach the typing baseline
+        if keystroke_stats and risk_level in ('LOW', 'MEDIUM'):
+            update_profile(user.setdefault('keystroke_profile', new_profile()), keystroke_stats)
+        
         # Create session
         self.data['sessions'][session_id] = {
             'user': mobile,
@@ -59,87 +238,116 @@ class TrackingService:
             'risk_level': risk_level,
             'actions': [],
             'transactions': [],
-            'balance': 50000  # Starting balance
+            'balance': STARTING_BALANCE,
+            'device': device_fingerprint,
+            'ip': ip_address
         }
+        if scoring_inputs:
+            self.data['sessions'][session_id]['scoring_inputs'] = scoring_inputs
+        self.graph.add_session(session_id, mobile, device_fingerprint, ip_address,
+                               flagged=risk_level in FLAGGED_RISK_LEVELS)
+        self.process_event('login', session_id, mobile, risk_level=risk_level, risk_score=risk_score,
+                           ip=ip_address, device=device_fingerprint)
         
         self.save_data()
         return session_id
     
-    def track_transaction(self, session_id, transaction_data):
-        """Track a transaction"""
-        if session_id not in self.data['sessions']:
-            return None
-        
-        session = self.data['sessions'][session_id]
-        mobile = session['user']
-        
-        # Check if sufficient balance
-        current_balance = session.get('balance', 50000)
-        transaction_amount = transaction_data.get('amount', 0)
-        
-        if transaction_data['type'] == 'debit' and transaction_amount > current_balance:
-            # Track failed transaction
-            failed_txn = {
-                'id': len(self.data['transactions']) + 1,
-                'timestamp': datetime.now().isoformat(),
-                'user': mobile,
-                'user_name': session['user_name'],
-                'type': 'debit',
-                'amount': transaction_amount,
-                'recipient': transaction_data.get('recipient', ''),
-                'status': 'failed',
-                'reason': 'insufficient_balance'
-            }
-            self.data['transactions'].append(failed_txn)
+    def get_keystroke_profile(self, mobile):
+        """Typing baseline of a user, or None before their first profiled login"""
+        user = self.data['users'].get(mobile)
+        return user.get('keystroke_profile') if user else None
+    
+    def track_transaction(self, session_id, transaction_data, idempotency_key=None):
+        """
+        Post a transaction to the ledger.
+        Returns (transaction, replayed); a retry with the same idempotency key
+        returns the original transaction with replayed=True instead of posting again.
+        Raises InvalidTransaction for an unknown type or a non-positive amount.
+        """
+        validate_transaction(transaction_data)
+        with self.lock:
+            if session_id not in self.data['sessions']:
+                return None, False
             
-            # Log suspicious activity
-            self.data['suspicious_activity'].append({
-                'user': mobile,
-                'user_name': session['user_name'],
-                'timestamp': datetime.now().isoformat(),
-                'reason': f'Failed transaction attempt: Insufficient balance for ₹{transaction_amount}',
-                'details': failed_txn
-            })
+            if idempotency_key:
+                existing = self.ledger.lookup(session_id, idempotency_key, transaction_data)
+                if existing is not None:
+                    return existing, True
+            
+            session = self.data['sessions'][session_id]
+            mobile = session['user']
+            suspicious_from = len(self.data['suspicious_activity'])
+            
+            # Check if sufficient balance
+            current_balance = session.get('balance', STARTING_BALANCE)
+            transaction_amount = transaction_data['amount']
+            
+            if transaction_data['type'] == 'debit' and transaction_amount > current_balance:
+                # Track failed transaction
+                failed_txn = self.ledger.post(session, transaction_data, status='failed',
+                                              reason='insufficient_balance', session_id=session_id,
+                                              idempotency_key=idempotency_key)
+                
+                # Log suspicious activity
+                self.data['suspicious_activity'].append({
+                    'user': mobile,
+                    'user_name': session['user_name'],
+                    'timestamp': datetime.now().isoformat(),
+                    'reason': f'Failed transaction attempt: Insufficient balance for ₹{transaction_amount}',
+                    'details': failed_txn
+                })
+                self._process_transaction_event(failed_txn)
+                
+                self._journal_post(session_id, session, failed_txn, idempotency_key, suspicious_from)
+                return failed_txn, False
+            
+            # Process successful transaction (updates the balance and the session/user views)
+            transaction = self.ledger.post(session, transaction_data, session_id=session_id,
+                                           idempotency_key=idempotency_key)
+            if transaction['recipient']:
+                self.graph.add_transfer(session_id, node_key('user', mobile), transaction['recipient'],
+                                        transaction['amount'], transaction['timestamp'], transaction['id'])
+            
+            # Check if this transaction is suspicious
+            self.check_suspicious_activity(mobile, session, transaction)
+            self._process_transaction_event(transaction)
             
+            self._journal_post(session_id, session, transaction, idempotency_key, suspicious_from)
+            return transaction, False
+    
+    def track_honeypot_transfer(self, session_id, recipient, amount, ip_address=None):
+        """
+        Record a transfer attempted inside the honeypot. The session is flagged,
+        so the recipient's fan-in shows it was targeted by a known fraudster.
+        """
+        with self.lock:
+            session = self.data['sessions'].get(session_id)
+            sender = node_key('user', session['user']) if session else node_key('ip', ip_address)
+            attempt = {
+                'id': self.ledger.allocate_id(),
+                'timestamp': datetime.now().isoformat(),
+                'session_id': session_id,
+                'sender': sender,
+                'recipient': recipient,
+                'amount': amount or 0
+            }
+            self.data.setdefault('honeypot_transfers', []).append(attempt)
+            self.graph.flag_session(session_id)
+            self.graph.add_transfer(session_id, sender, recipient, attempt['amount'],
+                                    attempt['timestamp'], attempt['id'])
             self.save_data()
-            return failed_txn
-        
-        # Process successful transaction
-        transaction = {
-            'id': len(self.data['transactions']) + 1,
-            'timestamp': datetime.now().isoformat(),
-            'user': mobile,
-            'user_name': session['user_name'],
-            'type': transaction_data['type'],
-            'amount': transaction_amount,
-            'recipient': transaction_data.get('recipient', ''),
-            'status': 'completed'
-        }
-        
-        # Update balance
-        if transaction_data['type'] == 'debit':
-            session['balance'] = current_balance - transaction_amount
-        else:
-            session['balance'] = current_balance + transaction_amount
-        
-        # Add to session
-        session['transactions'].append(transaction)
-        
-        # Add to user
-        if mobile in self.data['users']:
-            self.data['users'][mobile]['transactions'].append(transaction)
-        
-        # Add to global transactions
-        self.data['transactions'].append(transaction)
-        
-        # Check if this transaction is suspicious
-        self.check_suspicious_activity(mobile, session, transaction)
-        
-        self.save_data()
-        return transaction
+            return attempt
+    
+    def flag_session(self, session_id):
+        """Count a session as flagged in recipient fan-in (e.g. sent to the honeypot)"""
+        self.graph.flag_session(session_id)
     
     def track_action(self, session_id, action_data):
         """Track user action (clicks, navigation, etc.)"""
+        with self.lock:
+            self._track_action(session_id, action_data)
+    
+    def _track_action(self, session_id, action_data):
         if session_id not in self.data['sessions']:
             return
         
@@ -156,6 +364,7 @@ class TrackingService:
         
         # Check if action is suspicious
         self.check_suspicious_activity(session['user'], session, action)
+        self.process_event(action['action'], session_id, session['user'], page=action['page'])
         
         self.save_data()
     
@@ -171,20 +380,15 @@ class TrackingService:
                 suspicious = True
                 reason = f"New user making large transaction of ₹{item['amount']}"
         
-        # Check multiple failed attempts
-        if item.get('action') == 'failed_transaction':
-            recent_failures = [a for a in session['actions'] if a.get('action') == 'failed_transaction']
-            if len(recent_failures) > 2:
-                suspicious = True
-                reason = "Multiple failed transaction attempts"
+        # Windowed patterns (repeated failures, rapid transactions, ...) are rules
+        # in the rule engine, see process_event()
         
-        # Check rapid transactions
-        if item.get('type') == 'transaction':
-            recent_txns = [t for t in session['transactions'] 
-                          if (datetime.now() - datetime.fromisoformat(t['timestamp'])).total_seconds() < 60]
-            if len(recent_txns) > 2:
+        # Check if the recipient is collecting from many flagged sessions (mule account)
+        if item.get('recipient') and item.get('status') == 'completed':
+            fan_in = self.graph.recipient_fan_in(item['recipient'])
+            if fan_in and fan_in['flagged_sessions'] >= self.mule_fan_in_threshold:
                 suspicious = True
-                reason = f"Multiple rapid transactions: {len(recent_txns)} in 60 seconds"
+                reason = f"Recipient {item['recipient']} is receiving from {fan_in['flagged_sessions']} flagged sessions"
         
         # Check if accessing suspicious pages
         if item.get('action') == 'page_view' and item.get('page') in ['admin', 'settings', 'hidden']:
@@ -210,8 +414,158 @@ class TrackingService:
                 self.data['users'][mobile]['total_suspicious_actions'] = \
                     self.data['users'][mobile].get('total_suspicious_actions', 0) + 1
     
-    def get_admin_dashboard_data(self):
-        """Get all data for admin dashboard"""
+    # ============================================
+    # STREAMING DETECTION RULES
+    # ============================================
+    
+    def wants_event(self, event_type):
+        return self.rule_engine is not None and self.rule_engine.wants(event_type)
+    
+    def process_event(self, event_type, session_id=None, user=None, **fields):
+        """
+        Feed an event to the rule engine and record every completed pattern
+        as suspicious activity. Returns the matches. Events no rule looks at
+        cost a single dict lookup.
+        """
+        if not self.wants_event(event_type):
+            return []
+        if user is None and session_id in self.data['sessions']:
+            user = self.data['sessions'][session_id]['user']
+        event = dict(fields, type=event_type, session_id=session_id, user=user, ts=time.time())
+        matches = self.rule_engine.process(event)
+        if matches and (user or session_id):
+            with self.lock:
+                for match in matches:
+                    self._record_rule_match(user, session_id, match)
+        return matches
+    
+    def _process_transaction_event(self, transaction):
+        self.process_event('transaction', transaction['session_id'], transaction['user'],
+                           amount=transaction['amount'], status=transaction['status'],
+                           recipient=transaction['recipient'], txn_type=transaction['type'])
+    
+    def _record_rule_match(self, mobile, session_id, match):
+        # Sessions without a tracked user (honeypot visitors) are named by session
+        user = self.data['users'].get(mobile) if mobile else None
+        self.data['suspicious_activity'].append({
+            'user': mobile or node_key('session', session_id),
+            'user_name': user['name'] if user else None,
+            'timestamp': datetime.now().isoformat(),
+            'reason': match['reason'],
+            'details': {'rule': match['rule'], 'severity': match['severity'],
+                        'events': list(match['events'].values())}
+        })
+        if user is not None:
+            user['total_suspicious_actions'] = user.get('total_suspicious_actions', 0) + 1
+    
+    # ============================================
+    # SHARDING (see services/shard_service.py)
+    # ============================================
+    
+    def session_count(self):
+        return len(self.data['sessions'])
+    
+    def session_user(self, session_id):
+        """Mobile of the user a tracked session belongs to, or None"""
+        session = self.data['sessions'].get(session_id)
+        return session['user'] if session else None
+    
+    def user_mobiles(self):
+        with self.lock:
+            return list(self.data['users'])
+    
+    def export_users(self, mobiles):
+        """
+        Remove users with their sessions, ledger entries, idempotency keys and
+        suspicious activity from this store and return them as a bundle for
+        import_users() on another shard. Graph edges and rule engine windows
+        stay behind: the graph only ever grows and windows expire in minutes.
+        """
+        mobiles = set(mobiles)
+        with self.lock:
+            data = self.data
+            users = {mobile: data['users'].pop(mobile) for mobile in mobiles if mobile in data['users']}
+            sessions = {session_id: session for session_id, session in data['sessions'].items()
+                        if session.get('user') in mobiles}
+            for session_id in sessions:
+                del data['sessions'][session_id]
+            
+            def moves(item):
+                return item.get('user') in mobiles
+            
+            def stays(item):
+                return item.get('user') not in mobiles
+            
+            bundle = {
+                'users': users,
+                'sessions': sessions,
+                'transactions': [t for t in data['transactions'] if moves(t)],
+                'suspicious_activity': [a for a in data['suspicious_activity'] if moves(a)],
+                'honeypot_transfers': [h for h in data.get('honeypot_transfers', [])
+                                       if h.get('session_id') in sessions],
+                'idempotency': {key: self.ledger.idempotency.pop(key) for key in list(self.ledger.idempotency)
+                                if key.split(':', 1)[0] in sessions}
+            }
+            if not (users or sessions or bundle['transactions'] or bundle['suspicious_activity']):
+                return bundle
+            # Rows stop resolving once their table drops them, so copy first
+            if self.columnar:
+                _detach(bundle)
+            data['transactions'] = retain(data['transactions'], stays)
+            data['suspicious_activity'] = retain(data['suspicious_activity'], stays)
+            if bundle['honeypot_transfers']:
+                data['honeypot_transfers'] = [h for h in data['honeypot_transfers']
+                                              if h.get('session_id') not in sessions]
+            self.save_data()
+            return bundle
+    
+    def import_users(self, bundle):
+        """
+        Add a bundle from export_users(). Ledger entries and honeypot transfers
+        get IDs from this store's counter. Views, suspicious activity and
+        idempotency records are pointed at the stored entries by their ID on
+        the source shard, so it doesn't matter whether they arrive as the
+        same dicts as the bundle's ledger entries or as copies.
+        Users already here (written during the move) are merged.
+        """
+        with self.lock:
+            data = self.data
+            # Source shard entry ID -> stored entry, renumbered for this store
+            stored = {entry['id']: self.ledger.append(dict(entry, id=self.ledger.allocate_id()))
+                      for entry in bundle['transactions']}
+            transfers = [dict(transfer, id=self.ledger.allocate_id()) for transfer in bundle['honeypot_transfers']]
+            
+            def adopt(entry):
+                return stored.get(entry.get('id'), entry) if isinstance(entry, dict) else entry
+            
+            # Adopted before merging: IDs of entries already here are from another counter
+            for owner in list(bundle['users'].values()) + list(bundle['sessions'].values()):
+                if 'transactions' in owner:
+                    owner['transactions'] = [adopt(t) for t in owner['transactions']]
+            for mobile, user in bundle['users'].items():
+                existing = data['users'].get(mobile)
+                if existing is not None:
+                    user['transactions'] = user.get('transactions', []) + existing.get('transactions', [])
+                    for counter in ('total_logins', 'total_suspicious_actions'):
+                        user[counter] = user.get(counter, 0) + existing.get(counter, 0)
+                    for field in ('last_login', 'risk_score', 'risk_level', 'keystroke_profile'):
+                        if field in existing:
+                            user[field] = existing[field]
+                data['users'][mobile] = user
+            data['sessions'].update(bundle['sessions'])
+            for activity in bundle['suspicious_activity']:
+                details = activity.get('details')
+                data['suspicious_activity'].append(dict(activity, details=adopt(details))
+                                                   if isinstance(details, dict) else activity)
+            data.setdefault('honeypot_transfers', []).extend(transfers)
+            self.ledger.idempotency.update({key: dict(record, entry=adopt(record['entry']))
+                                            for key, record in bundle['idempotency'].items()})
+            self.graph.load_history({'honeypot_transfers': transfers}, list(stored.values()), bundle['sessions'])
+            self.save_data()
+            return len(bundle['users'])
+    
+    def get_admin_dashboard_data(self, top_users=None):
+        """Get all data for admin dashboard (only the top_users riskiest users when given)"""
         users_list = []
         for mobile, user in self.data['users'].items():
             # Get last session for this user
@@ -229,29 +583,27 @@ class TrackingService:
                 'risk_level': user.get('risk_level', 'MEDIUM'),
                 'total_logins': user.get('total_logins', 0),
                 'suspicious_actions': user.get('total_suspicious_actions', 0),
-                'transaction_count': len(user.get('transactions', [])),
-                'total_spent': sum(t.get('amount', 0) for t in user.get('transactions', []) if t.get('type') == 'debit'),
-                'current_balance': last_session.get('balance', 50000) if last_session else 50000,
+                'transaction_count': len(user.get('transactions', [])) + user.get('archived_transaction_count', 0),
+                'total_spent': sum(t.get('amount', 0) for t in user.get('transactions', []) if t.get('type') == 'debit')
+                               + user.get('archived_total_spent', 0),
+                'current_balance': last_session.get('balance', STARTING_BALANCE) if last_session else STARTING_BALANCE,
                 'created_at': user.get('created_at', ''),
                 'last_login': user.get('last_login', '')
             })
         
+        high_risk_users = len([u for u in users_list if u['risk_score'] >= 70])
+        total_users = len(users_list)
+        
         # Sort by risk score (highest first)
         users_list.sort(key=lambda x: x['risk_score'], reverse=True)
+        if top_users is not None:
+            del users_list[top_users:]
         
         # Get recent suspicious activity
-        recent_suspicious = sorted(
-            self.data['suspicious_activity'],
-            key=lambda x: x['timestamp'],
-            reverse=True
-        )[:20]
+        recent_suspicious = _latest(self.data['suspicious_activity'], 20)
         
         # Get recent transactions
-        recent_transactions = sorted(
-            self.data['transactions'],
-            key=lambda x: x['timestamp'],
-            reverse=True
-        )[:30]
+        recent_transactions = _latest(self.data['transactions'], 30)
         
         return {
             'users': users_list,
@@ -259,12 +611,9 @@ class TrackingService:
             'suspicious_activity': recent_suspicious,
             'active_sessions': len(self.data['sessions']),
             'stats': {
-                'total_users': len(users_list),
-                'high_risk_users': len([u for u in users_list if u['risk_score'] >= 70]),
+                'total_users': total_users,
+                'high_risk_users': high_risk_users,
                 'total_transactions': len(self.data['transactions']),
                 'total_suspicious': len(self.data['suspicious_activity'])
             }
         }
-
-# Create global instance
-tracking_service = TrackingService()
\ No newline at end of file
@@ -0,0 +1,377 @@
+import json
+import logging
+import numbers
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sessions at these risk levels count as flagged for recipient fan-in
+FLAGGED_RISK_LEVELS = ('HIGH', 'CRITICAL')
+
+# Sessions remembered for flagging (oldest forgotten first), and the size at which
+# a recipient's distinct sender / flagged session counts stop growing
+MAX_TRACKED_SESSIONS = 100000
+MAX_FAN_IN = 10000
+
+
+def node_key(kind, value):
+    return f"{kind}:{value}"
+
+
+def connected_components(node_count, src, dst):
+    """
+    Component label (smallest member index) per node for an edge list, using
+    vectorized hooking and pointer jumping: O(E log V) numpy work instead of
+    one Python-level union per edge.
+    """
+    labels = np.arange(node_count, dtype=np.int64)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    while src.size:
+        lu, lv = labels[src], labels[dst]
+        differ = lu != lv
+        if not differ.any():
+            break
+        lu, lv = lu[differ], lv[differ]
+        low, high = np.minimum(lu, lv), np.maximum(lu, lv)
+        # Hook the larger root under the smaller label, then flatten the trees
+        np.minimum.at(labels, high, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+
+def _is_transfer(row, sender_field):
+    """A stored transfer row the graph can use: a dict with a sender and a numeric amount and ID"""
+    if not isinstance(row, dict) or not row.get(sender_field):
+        return False
+    amount, row_id = row.get('amount') or 0, row.get('id', 0)
+    return (isinstance(amount, numbers.Real) and not isinstance(amount, bool)
+            and isinstance(row_id, int) and not isinstance(row_id, bool))
+
+
+class TransactionGraph:
+    """
+    Incrementally maintained graph linking users, transfer recipients,
+    devices and IPs. Union-find keeps connected components, so "which
+    accounts does this recipient tie together" is near O(1), and each
+    recipient keeps fan-in counters (distinct senders, flagged sessions,
+    amount) for mule-account checks during transaction tracking.
+    """
+
+    def __init__(self, max_sessions=MAX_TRACKED_SESSIONS, max_fan_in=MAX_FAN_IN):
+        self.max_sessions = max_sessions
+        self.max_fan_in = max_fan_in
+        self.lock = threading.RLock()
+        self._index = {}
+        self._nodes = []
+        self._parent = []
+        self._size = []
+        # (a, b) with a < b -> [amount, count, first_timestamp, last_timestamp]
+        self.edges = {}
+        # recipient node -> {'senders': set, 'flagged_sessions': set, 'amount': float, 'count': int}
+        self.recipients = {}
+        # Both keyed by session ID in insertion order, trimmed to max_sessions
+        self.session_recipients = OrderedDict()
+        self.flagged_sessions = OrderedDict()
+        self.last_transaction_id = 0
+        # Set while bulk loading; rebuild_components() then unions everything at once
+        self._defer_unions = False
+
+    # ============================================
+    # UNION-FIND
+    # ============================================
+
+    def _node(self, key):
+        node = self._index.get(key)
+        if node is None:
+            node = len(self._nodes)
+            self._index[key] = node
+            self._nodes.append(key)
+            self._parent.append(node)
+            self._size.append(1)
+        return node
+
+    def _find(self, node):
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return a
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._size[a] += self._size[b]
+        return a
+
+    def _link(self, a, b, amount=0, timestamp=None):
+        edge_key = (a, b) if a < b else (b, a)
+        edge = self.edges.get(edge_key)
+        if edge is None:
+            self.edges[edge_key] = [amount, 1, timestamp, timestamp]
+        else:
+            edge[0] += amount
+            edge[1] += 1
+            if timestamp and (edge[3] is None or timestamp > edge[3]):
+                edge[3] = timestamp
+        if not self._defer_unions:
+            self._union(a, b)
+
+    # ============================================
+    # UPDATES
+    # ============================================
+
+    def add_session(self, session_id, user, device=None, ip=None, flagged=False):
+        """Tie a login session's user to its device fingerprint and IP"""
+        with self.lock:
+            user_node = self._node(node_key('user', user))
+            for kind, value in (('device', device), ('ip', ip)):
+                if value and value != 'unknown':
+                    other = self._node(node_key(kind, value))
+                    edge_key = (user_node, other) if user_node < other else (other, user_node)
+                    # Repeat logins from the same device/IP don't add weight
+                    if edge_key not in self.edges:
+                        self._link(user_node, other)
+            if flagged:
+                self.flag_session(session_id)
+
+    def add_transfer(self, session_id, sender, recipient, amount, timestamp=None, transaction_id=None):
+        """
+        Record a transfer from sender (a node key such as 'user:<mobile>')
+        to a recipient account; returns the recipient's fan-in counters.
+        """
+        with self.lock:
+            sender_node = self._node(sender)
+            recipient_node = self._node(node_key('recipient', recipient))
+            self._link(sender_node, recipient_node, amount or 0, timestamp)
+
+            counters = self.recipients.get(recipient_node)
+            if counters is None:
+                counters = self.recipients[recipient_node] = {
+                    'senders': set(), 'flagged_sessions': set(), 'amount': 0.0, 'count': 0
+                }
+            self._bounded_add(counters['senders'], sender_node)
+            counters['amount'] += amount or 0
+            counters['count'] += 1
+            if session_id:
+                paid = self.session_recipients.get(session_id)
+                if paid is None:
+                    paid = self.session_recipients[session_id] = set()
+                    self._trim(self.session_recipients)
+                self._bounded_add(paid, recipient_node)
+                if session_id in self.flagged_sessions:
+                    self._bounded_add(counters['flagged_sessions'], session_id)
+            if transaction_id and transaction_id > self.last_transaction_id:
+                self.last_transaction_id = transaction_id
+            return self._fan_in(recipient_node)
+
+    def flag_session(self, session_id):
+        """Mark a session as flagged, including for recipients it already paid"""
+        with self.lock:
+            if session_id not in self.flagged_sessions:
+                self.flagged_sessions[session_id] = None
+                self._trim(self.flagged_sessions)
+            for recipient_node in self.session_recipients.get(session_id, ()):
+                self._bounded_add(self.recipients[recipient_node]['flagged_sessions'], session_id)
+    
+    def _bounded_add(self, members, member):
+        # Fan-in counts saturate at max_fan_in, far above any mule threshold
+        if len(members) < self.max_fan_in:
+            members.add(member)
+    
+    def _trim(self, sessions):
+        while len(sessions) > self.max_sessions:
+            sessions.popitem(last=False)
+
+    # ============================================
+    # QUERIES
+    # ============================================
+
+    def _fan_in(self, recipient_node):
+        counters = self.recipients[recipient_node]
+        return {
+            'recipient': self._nodes[recipient_node].split(':', 1)[1],
+            'senders': len(counters['senders']),
+            'flagged_sessions': len(counters['flagged_sessions']),
+            'transfers': counters['count'],
+            'amount': counters['amount'],
+            'component_size': self._size[self._find(recipient_node)]
+        }
+
+    def recipient_fan_in(self, recipient):
+        """Fan-in counters for a recipient account, or None if never paid"""
+        with self.lock:
+            node = self._index.get(node_key('recipient', recipient))
+            if node is None or node not in self.recipients:
+                return None
+            return self._fan_in(node)
+
+    def same_component(self, key_a, key_b):
+        with self.lock:
+            a, b = self._index.get(key_a), self._index.get(key_b)
+            return a is not None and b is not None and self._find(a) == self._find(b)
+
+    def components(self, min_size=2):
+        """Members of every component with at least min_size nodes, largest first (O(V))"""
+        with self.lock:
+            groups = {}
+            for node, key in enumerate(self._nodes):
+                root = self._find(node)
+                if self._size[root] >= min_size:
+                    groups.setdefault(root, []).append(key)
+            return sorted(groups.values(), key=len, reverse=True)
+
+    def top_recipients(self, limit=20):
+        """Recipients with the most flagged senders, then the most distinct senders"""
+        with self.lock:
+            ranked = sorted(self.recipients, key=lambda r: (len(self.recipients[r]['flagged_sessions']),
+                                                            len(self.recipients[r]['senders'])), reverse=True)
+            return [self._fan_in(r) for r in ranked[:limit]]
+
+    def get_status(self):
+        with self.lock:
+            roots = sum(1 for node in range(len(self._nodes)) if self._parent[node] == node)
+            return {
+                'nodes': len(self._nodes),
+                'edges': len(self.edges),
+                'components': roots,
+                'recipients': len(self.recipients),
+                'flagged_sessions': len(self.flagged_sessions),
+                'last_transaction_id': self.last_transaction_id
+            }
+
+    # ============================================
+    # BULK REBUILD AND SNAPSHOTS
+    # ============================================
+
+    def rebuild_components(self):
+        """Recompute union-find from the edge list in one vectorized pass"""
+        with self.lock:
+            if self.edges:
+                src, dst = np.array(list(self.edges), dtype=np.int64).T
+            else:
+                src = dst = np.array([], dtype=np.int64)
+            labels = connected_components(len(self._nodes), src, dst)
+            self._parent = labels.tolist()
+            sizes = np.bincount(labels, minlength=len(self._nodes))
+            self._size = sizes.tolist()
+
+    def load_history(self, data, transactions=None, sessions=None, after_id=0):
+        """
+        Add a tracking store's sessions and completed transfers, skipping
+        transactions with id <= after_id (already in a snapshot).
+        transactions/sessions override data's lists (e.g. archive + live store).
+        Malformed rows are skipped (and counted in the log), so one bad
+        record can't keep the store from loading.
+        """
+        skipped = 0
+        with self.lock:
+            sessions = data.get('sessions', {}) if sessions is None else sessions
+            for session_id, session in sessions.items():
+                if not isinstance(session, dict) or not session.get('user'):
+                    skipped += 1
+                    continue
+                self.add_session(session_id, session.get('user'), session.get('device'), session.get('ip'),
+                                 flagged=session.get('risk_level') in FLAGGED_RISK_LEVELS)
+            for t in (data.get('transactions', []) if transactions is None else transactions):
+                if not _is_transfer(t, 'user'):
+                    skipped += 1
+                    continue
+                if t.get('status') != 'completed' or not t.get('recipient') or t.get('id', 0) <= after_id:
+                    continue
+                self.add_transfer(t.get('session_id'), node_key('user', t['user']), t['recipient'],
+                                  t.get('amount', 0), t.get('timestamp'), t.get('id'))
+            # Honeypot transfers kept in the store
+            for h in data.get('honeypot_transfers', []):
+                if not _is_transfer(h, 'sender') or not h.get('recipient'):
+                    skipped += 1
+                    continue
+                if h.get('session_id'):
+                    self.flag_session(h['session_id'])
+                if h.get('id', 0) > after_id:
+                    self.add_transfer(h.get('session_id'), h['sender'], h['recipient'], h.get('amount', 0),
+                                      h.get('timestamp'), h.get('id'))
+        if skipped:
+            logger.warning("Skipped %d malformed rows while loading the transaction graph", skipped)
+
+    def to_snapshot(self):
+        with self.lock:
+            return {
+                'nodes': self._nodes,
+                'parent': [self._find(node) for node in range(len(self._nodes))],
+                'edges': [[a, b] + edge for (a, b), edge in self.edges.items()],
+                'recipients': {str(node): {'senders': sorted(c['senders']),
+                                           'flagged_sessions': sorted(c['flagged_sessions']),
+                                           'amount': c['amount'], 'count': c['count']}
+                               for node, c in self.recipients.items()},
+                'session_recipients': {sid: sorted(nodes) for sid, nodes in self.session_recipients.items()},
+                'flagged_sessions': list(self.flagged_sessions),
+                'last_transaction_id': self.last_transaction_id
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        graph = cls()
+        graph._nodes = list(snapshot['nodes'])
+        graph._index = {key: node for node, key in enumerate(graph._nodes)}
+        graph._parent = list(snapshot['parent'])
+        sizes = np.bincount(np.asarray(graph._parent, dtype=np.int64), minlength=len(graph._nodes))
+        graph._size = sizes.tolist()
+        graph.edges = {(e[0], e[1]): e[2:] for e in snapshot['edges']}
+        graph.recipients = {int(node): {'senders': set(c['senders']), 'flagged_sessions': set(c['flagged_sessions']),
+                                        'amount': c['amount'], 'count': c['count']}
+                            for node, c in snapshot['recipients'].items()}
+        graph.session_recipients = OrderedDict((sid, set(nodes))
+                                               for sid, nodes in snapshot['session_recipients'].items())
+        graph.flagged_sessions = OrderedDict.fromkeys(snapshot['flagged_sessions'])
+        graph._trim(graph.session_recipients)
+        graph._trim(graph.flagged_sessions)
+        graph.last_transaction_id = snapshot['last_transaction_id']
+        return graph
+
+    def save_snapshot(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_snapshot(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def build(cls, data, transactions=None, sessions=None):
+        """Bulk build: add all history without per-edge unions, then label components at once"""
+        graph = cls()
+        graph._defer_unions = True
+        graph.load_history(data, transactions, sessions)
+        graph._defer_unions = False
+        graph.rebuild_components()
+        return graph
+
+    @classmethod
+    def load(cls, data, snapshot_path=None):
+        """
+        Graph for a tracking store: the offline snapshot (if any) plus every
+        later transaction in the store, or a bulk build from the store alone.
+        """
+        graph = None
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                with open(snapshot_path) as f:
+                    graph = cls.from_snapshot(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error("Ignoring unreadable transaction graph snapshot %s: %s", snapshot_path, e)
+        if graph is None:
+            graph = cls.build(data)
+        else:
+            graph.load_history(data, after_id=graph.last_transaction_id)
+        return graph
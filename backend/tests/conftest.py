@@ -0,0 +1,37 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tests import modules the way the app does, from the backend directory
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """create_app() with every writable data file under tmp_path"""
+    from app import create_app
+
+    def factory(**overrides):
+        registry = tmp_path / 'telecom_mock_data.json'
+        if not registry.exists():
+            shutil.copy(os.path.join(BACKEND_DIR, 'data', 'telecom_mock_data.json'), registry)
+        config = {
+            'TESTING': True,
+            'DATA_DIR': str(tmp_path),
+            'TELECOM_DATA_PATH': str(registry),
+            'USER_ACTIVITY_PATH': str(tmp_path / 'user_activity.json'),
+            'TRANSACTION_GRAPH_PATH': str(tmp_path / 'transaction_graph.json'),
+            'REGISTRY_DELTA_DIR': str(tmp_path / 'registry_deltas'),
+            'ARCHIVE_DIR': str(tmp_path / 'archive'),
+            'SHADOW_LOG_PATH': str(tmp_path / 'shadow_scores.jsonl'),
+            'AUDIT_LOG_PATH': None,
+            'RATELIMIT_ENABLED': False,
+        }
+        config.update(overrides)
+        return create_app(config)
+
+    return factory
@@ -0,0 +1,109 @@
+"""
+Redis stand-in for the rate limiter tests.
+
+FakeRedis keeps hashes in a dict and runs the token-bucket script from
+services/rate_limiter.py natively (it has no Lua interpreter), like a
+fakeredis client would. FakeRedisServer serves one FakeRedis over the
+Redis protocol on a local port, so RespClient and the redis:// storage URI
+are exercised end to end.
+"""
+import socketserver
+import threading
+import time
+
+from services.rate_limiter import TOKEN_BUCKET_SCRIPT
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.expires = {}
+        self._lock = threading.Lock()
+
+    def _hash(self, key, now):
+        if key in self.expires and self.expires[key] <= now:
+            self.hashes.pop(key, None)
+            self.expires.pop(key, None)
+        return self.hashes.setdefault(key, {})
+
+    def eval(self, script, numkeys, *args):
+        if script != TOKEN_BUCKET_SCRIPT:
+            raise RuntimeError('ERR FakeRedis only runs the token bucket script')
+        keys, argv = args[:int(numkeys)], [float(a) for a in args[int(numkeys):]]
+        capacity, rate, now, cost = argv
+        with self._lock:
+            bucket = self._hash(keys[0], time.time())
+            tokens = float(bucket.get('tokens', capacity))
+            updated = float(bucket.get('updated', now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            allowed = 0
+            if tokens >= cost:
+                tokens -= cost
+                allowed = 1
+            bucket.update(tokens=tokens, updated=now)
+            self.expires[keys[0]] = time.time() + capacity / rate + 1
+        return [allowed, repr(tokens)]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            raise ValueError(f'Expected an array, got {line!r}')
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    def _encode(self, value):
+        if isinstance(value, list):
+            return b'*%d\r\n' % len(value) + b''.join(self._encode(v) for v in value)
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        data = str(value).encode()
+        return b'$%d\r\n%s\r\n' % (len(data), data)
+
+    def handle(self):
+        redis = self.server.redis
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            try:
+                if command == 'EVAL':
+                    reply = self._encode(redis.eval(*args[1:]))
+                elif command in ('AUTH', 'SELECT', 'PING'):
+                    reply = b'+OK\r\n'
+                else:
+                    raise RuntimeError(f'ERR unknown command {command}')
+            except RuntimeError as e:
+                reply = b'-%s\r\n' % str(e).encode()
+            self.wfile.write(reply)
+            self.wfile.flush()
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, redis=None):
+        self.redis = redis or FakeRedis()
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def uri(self):
+        host, port = self.server_address
+        return f'redis://{host}:{port}/0'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
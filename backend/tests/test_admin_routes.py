@@ -0,0 +1,11 @@
+def test_admin_routes_are_off_without_a_token(make_app):
+    client = make_app(ADMIN_API_TOKEN=None).test_client()
+    assert client.get('/api/admin/admission').status_code == 404
+    assert client.put('/api/admin/rules', json=[], headers={'Authorization': ''}).status_code == 404
+
+
+def test_admin_token_must_match(make_app):
+    client = make_app(ADMIN_API_TOKEN='t0ken').test_client()
+    assert client.get('/api/admin/admission').status_code == 401
+    assert client.get('/api/admin/admission', headers={'Authorization': 't0ke'}).status_code == 401
+    assert client.get('/api/admin/admission', headers={'Authorization': 't0ken'}).status_code == 200
@@ -0,0 +1,38 @@
+from services.admission_service import AdmissionController, DeferredBehavior
+
+
+def test_deferred_behavior_is_bounded():
+    deferred = DeferredBehavior(max_sessions=3)
+    for i in range(5):
+        deferred.add(f's{i}', 'clicks')
+    deferred.add('s4', 'clicks', 2)
+    assert len(deferred) == 3
+    assert deferred.dropped == 2
+
+    behavior = {'clicks': 1}
+    deferred.apply('s4', behavior)
+    assert behavior == {'clicks': 4}
+    deferred.apply('s0', behavior)
+    assert behavior == {'clicks': 4}
+
+
+def test_queue_delay_decays_without_the_header(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('services.admission_service.time.monotonic', lambda: clock[0])
+    controller = AdmissionController(capacity=10, queue_target_ms=50, ewma_alpha=0.5, delay_stale_s=1.0)
+    for _ in range(4):
+        controller.try_enter('low', queue_delay_ms=1000)
+        controller.leave('low', 1)
+    assert controller.overloaded()
+
+    # A fresh reading keeps the estimate for a while...
+    assert not controller.try_enter('low')
+    # ...then requests without the header let it decay
+    clock[0] += 5
+    admitted = []
+    for _ in range(10):
+        admitted.append(controller.try_enter('low'))
+        if admitted[-1]:
+            controller.leave('low', 1)
+    assert admitted[0] is False and admitted[-1] is True
+    assert not controller.overloaded()
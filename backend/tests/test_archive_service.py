@@ -0,0 +1,55 @@
+import threading
+
+from services.archive_service import ArchiveService
+from services.tracking_service import TrackingService
+
+
+def _tracking(tmp_path, sessions=2):
+    tracking = TrackingService(str(tmp_path / 'user_activity.json'))
+    for i in range(sessions):
+        tracking.track_user_login({'name': f'User {i}', 'mobile': f'900000000{i}'}, 10, 'LOW', f's{i}')
+        # Keep the sessions open, so only their transactions are archived
+        tracking.data['sessions'][f's{i}']['login_time'] = '9999-01-01T00:00:00'
+    return tracking
+
+
+def test_posts_wait_for_a_running_compaction(tmp_path):
+    tracking = _tracking(tmp_path)
+    tracking.track_transaction('s0', {'type': 'credit', 'amount': 5, 'recipient': 'r'})
+    archive = ArchiveService(str(tmp_path / 'archive'), 'npy')
+    writing, release = threading.Event(), threading.Event()
+    write_rows = archive.write_rows
+
+    def slow_write_rows(table, rows):
+        writing.set()
+        release.wait(5)
+        return write_rows(table, rows)
+
+    archive.write_rows = slow_write_rows
+    compaction = threading.Thread(target=archive.compact, args=(tracking,), kwargs={'older_than_days': 0})
+    compaction.start()
+    assert writing.wait(5)
+
+    posted = []
+    poster = threading.Thread(target=lambda: posted.append(
+        tracking.track_transaction('s1', {'type': 'credit', 'amount': 7, 'recipient': 'r'})[0]))
+    poster.start()
+    poster.join(0.2)
+    assert poster.is_alive(), 'post ran while compaction was rewriting the store'
+
+    release.set()
+    compaction.join(5)
+    poster.join(5)
+    live = [t['id'] for t in tracking.data['transactions']]
+    archived = [int(t['id']) for t in archive.scan_records('transactions')]
+    assert live == [posted[0]['id']]
+    assert len(archived) == 1
+
+
+def test_compactions_in_one_millisecond_keep_both_parts(tmp_path, monkeypatch):
+    archive = ArchiveService(str(tmp_path / 'archive'), 'npy')
+    monkeypatch.setattr('services.archive_service.time.time', lambda: 1767225600.0)
+    rows = [{'id': 1, 'timestamp': '2026-01-01T00:00:00', 'type': 'debit', 'amount': 1}]
+    archive.write_rows('transactions', rows)
+    archive.write_rows('transactions', [dict(rows[0], id=2)])
+    assert sorted(int(t['id']) for t in archive.scan_records('transactions')) == [1, 2]
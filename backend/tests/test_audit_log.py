@@ -0,0 +1,64 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from services import audit_log
+from services.risk_service import RiskService, masked_risk_factors
+from services.telecom_registry import TelecomRegistry
+
+
+@pytest.fixture
+def audit_app(make_app, tmp_path):
+    app = make_app(AUDIT_LOG_PATH=str(tmp_path / 'logs' / 'fraud_audit.jsonl'))
+    yield app
+    audit_log.stop_audit_log()
+
+
+def _events(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def _log_in_child():
+    audit_log.audit_event('child_event')
+    audit_log.stop_audit_log()
+
+
+def test_each_process_writes_its_own_file(audit_app, tmp_path):
+    audit_log.audit_event('parent_event')
+    child = multiprocessing.get_context('fork').Process(target=_log_in_child)
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+    audit_log.stop_audit_log()
+
+    logs = tmp_path / 'logs'
+    assert [e['event'] for e in _events(logs / f'fraud_audit.{os.getpid()}.jsonl')] == ['parent_event']
+    assert [e['event'] for e in _events(logs / f'fraud_audit.{child.pid}.jsonl')] == ['child_event']
+
+
+def test_risk_factors_mask_the_telecom_owner():
+    record = {'owner_name': 'Amit Kumar', 'provider': 'Airtel', 'activation_date': '2020-01-15',
+              'kyc_status': 'verified', 'aadhar_linked': True, 'pan_linked': True, 'risk_score': 10}
+    service = RiskService(registry=TelecomRegistry(data={'9123456789': record}))
+    result = service._calculate_risk_score({'name': 'Priya Verma', 'mobile': '9123456789'}, {}, {})
+
+    masked = masked_risk_factors(result['risk_factors'])
+    assert len(masked) == len(result['risk_factors'])
+    assert "❌ Name mismatch: Telecom owner is 'A*** K***'" in masked
+    assert not any('Amit' in factor or 'Kumar' in factor for factor in masked)
+
+
+def test_risk_assessment_audit_has_no_owner_name(audit_app, tmp_path):
+    client = audit_app.test_client()
+    session_id = client.post('/api/verify/start', json={'name': 'Priya Verma', 'mobile': '9123456789'}
+                             ).get_json()['session_id']
+    client.post('/api/verify/risk', json={'session_id': session_id})
+    audit_log.stop_audit_log()
+
+    text = (tmp_path / 'logs' / f'fraud_audit.{os.getpid()}.jsonl').read_text(encoding='utf-8')
+    assert 'risk_assessment' in text
+    assert 'A*** K***' in text
+    assert 'Amit Kumar' not in text
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from services.backtest_service import run_backtest
+from services.keystroke_dynamics import new_profile
+from services.risk_service import RiskService, scoring_features
+from services.telecom_registry import TelecomRegistry
+
+RECORD = {'owner_name': 'Amit Kumar', 'provider': 'Airtel', 'activation_date': '2020-01-15',
+          'kyc_status': 'verified', 'aadhar_linked': True, 'pan_linked': True, 'risk_score': 10}
+USER = {'name': 'Priya Verma', 'mobile': '9123456789', 'email': 'priya@example.com'}
+
+
+def test_backtest_workers_score_with_registry_deltas(tmp_path):
+    base = tmp_path / 'registry.json'
+    base.write_text(json.dumps({USER['mobile']: RECORD}))
+    deltas = tmp_path / 'deltas'
+    deltas.mkdir()
+    # Renames the owner, so the session's name only matches with the delta applied
+    (deltas / '0001.jsonl').write_text(json.dumps(
+        {'op': 'patch', 'mobile': USER['mobile'], 'fields': {'owner_name': 'Priya Verma'}}) + '\n')
+    sessions = [(f's{i}', {'user_data': USER}) for i in range(4)]
+
+    report = run_backtest(iter(sessions), set(), str(base), workers=2, chunk_size=1, delta_dir=str(deltas))
+    assert report['run']['registry_deltas'] == ['0001.jsonl']
+    assert report['baseline']['ownership']['verified'] == 4
+
+    report = run_backtest(iter(sessions), set(), str(base), workers=1)
+    assert report['baseline']['ownership']['verified'] == 0
+
+
+@pytest.mark.parametrize('device, behavior', [
+    ({}, {}),
+    ({'fingerprint': 'abc', 'userAgent': 'x' * 200}, {'scroll_count': 3}),
+    ({'fingerprint': 'abc', 'is_emulator': True, 'is_new_device': False, 'vpn_detected': True,
+      'ip_country': 'US', 'timezone': 'UTC'},
+     {'login_time_ms': 800, 'mouse_movements': 2, 'copied_pasted': True, 'honeypot_clicked': True,
+      'pages_visited': [{'page': f'p{i}', 'timestamp': '2026-01-01T00:00:00'} for i in range(25)]}),
+])
+def test_scoring_features_score_like_the_full_inputs(device, behavior):
+    service = RiskService(registry=TelecomRegistry(data={USER['mobile']: RECORD}))
+    profile = new_profile()
+    features = scoring_features(USER, device, behavior, profile)
+
+    full = service._calculate_risk_score(USER, device, behavior, profile)
+    compact = service._calculate_risk_score(features['user_data'], features['device_data'],
+                                            features['behavior_data'], features['keystroke_profile'])
+    assert (compact['risk_score'], compact['risk_factors']) == (full['risk_score'], full['risk_factors'])
+    assert 'pages_visited' not in features['behavior_data']
+    assert 'fingerprint' not in features['device_data']
+    assert features['keystroke_profile'] is not profile
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from services.batch_service import run_batch_job
+
+RECORD = {'owner_name': 'Rahul Sharma', 'provider': 'Jio', 'activation_date': '2020-01-15',
+          'kyc_status': 'verified', 'aadhar_linked': True, 'pan_linked': True, 'risk_score': 10}
+
+
+@pytest.fixture
+def registry_files(tmp_path):
+    base = tmp_path / 'registry.json'
+    base.write_text(json.dumps({'9876543210': RECORD}))
+    deltas = tmp_path / 'deltas'
+    deltas.mkdir()
+    # Changes the owner, so the pair below only verifies with the delta applied
+    (deltas / '0001.jsonl').write_text(json.dumps(
+        {'op': 'patch', 'mobile': '9876543210', 'fields': {'owner_name': 'Priya Verma'}}) + '\n')
+    return str(base), str(deltas)
+
+
+def _read(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_workers_score_with_registry_deltas(tmp_path, registry_files):
+    base, deltas = registry_files
+    source = tmp_path / 'input.jsonl'
+    source.write_text('\n'.join(json.dumps({'name': 'Priya Verma', 'mobile': '9876543210'}) for _ in range(6)))
+    output = str(tmp_path / 'out.jsonl')
+
+    summary = run_batch_job(str(source), output, base, workers=2, chunk_size=2, delta_dir=deltas)
+    assert summary['registry_deltas'] == ['0001.jsonl']
+    assert {r['telecom_owner'] for r in _read(output)} == {'Priya Verma'}
+
+
+def test_non_object_rows_are_rejected_not_fatal(tmp_path, registry_files):
+    base, _ = registry_files
+    source = tmp_path / 'input.jsonl'
+    source.write_text('[1, 2]\n"text"\n' + json.dumps({'name': 'Rahul Sharma', 'mobile': '9876543210'}) + '\n')
+    output = str(tmp_path / 'out.jsonl')
+
+    summary = run_batch_job(str(source), output, base, workers=1)
+    assert summary['counts']['invalid'] == 2
+    assert [r['status'] for r in _read(output)][:2] == ['invalid', 'invalid']
+
+
+def test_resume_without_output_fails(tmp_path, registry_files):
+    base, _ = registry_files
+    source = tmp_path / 'input.jsonl'
+    source.write_text(json.dumps({'name': 'Rahul Sharma', 'mobile': '9876543210'}) + '\n')
+    output = str(tmp_path / 'out.jsonl')
+    with open(output + '.checkpoint', 'w') as f:
+        json.dump({'input': os.path.abspath(source), 'rows_done': 1, 'output_offset': 120,
+                   'counts': {'verified': 1, 'review': 0, 'failed': 0, 'invalid': 0}}, f)
+
+    with pytest.raises(ValueError):
+        run_batch_job(str(source), output, base, workers=1, resume=True)
+    assert not os.path.exists(output)
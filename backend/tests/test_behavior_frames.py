@@ -0,0 +1,93 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from routes.verify_routes import user_sessions
+from utils import behavior_frames
+from utils.behavior_frames import EVENT, HEADER, MAGIC, VERSION, FrameError, decode_frame, encode_frame
+
+USER = {'name': 'Amit Kumar', 'mobile': '9123456789'}
+
+
+def _frame(events, count=None, strings=b'', magic=MAGIC, version=VERSION, base_ms=1000):
+    records = b''.join(EVENT.pack(*event) for event in events)
+    return HEADER.pack(magic, version, 7, base_ms, len(events) if count is None else count) + records + strings
+
+
+def test_encoded_frames_decode_to_the_same_events():
+    events = [('page_view', 1000, '/home'), ('mouse_movement', 1010, 3), ('page_view', 1500, '/home'),
+              ('honeypot_click', 100000, 'admin-link')]
+    handle, decoded = decode_frame(encode_frame(42, events))
+    # Deltas saturate at 65535 ms
+    assert handle == 42
+    assert list(decoded) == [('page_view', 1000, None, '/home'), ('mouse_movement', 1010, 3, None),
+                             ('page_view', 1500, None, '/home'), ('honeypot_click', 67035, None, 'admin-link')]
+
+
+@pytest.mark.parametrize('body, message', [
+    (b'HK\x01', 'Frame too short'),
+    (_frame([], magic=b'XX'), 'Unsupported frame format'),
+    (_frame([], version=VERSION + 1), 'Unsupported frame format'),
+    (_frame([], count=behavior_frames.MAX_EVENTS + 1), 'Too many events'),
+    (_frame([(4, 0, 1)], count=2), 'Truncated event block'),
+    (_frame([(4, 0, 1)])[:-1], 'Truncated event block'),
+    (_frame([(2, 0, 0)], strings=b'\x05/ho'), 'Truncated string table'),
+    (_frame([(2, 0, 0)], strings=b'\x02\xff\xfe'), 'Invalid string'),
+    (_frame([(99, 0, 0)]), 'Unknown event code'),
+    (_frame([(2, 0, 1)], strings=b'\x01/'), 'String index out of range'),
+])
+def test_malformed_frames_are_rejected(body, message):
+    with pytest.raises(FrameError, match=message):
+        decode_frame(body)
+
+
+def _post_frame(client, body):
+    return client.post('/api/verify/behavior', data=body, content_type=behavior_frames.MIMETYPE)
+
+
+def _start(client):
+    data = client.post('/api/verify/start', json=USER).get_json()
+    return data['session_id'], data['session_handle']
+
+
+def test_frame_routes_reject_bad_frames(make_app):
+    client = make_app().test_client()
+    _, handle = _start(client)
+    assert _post_frame(client, b'HK').status_code == 400
+    assert _post_frame(client, encode_frame(handle + 1, [('mouse_movement', 0, 1)])).status_code == 400
+    too_large = b'\x00' * (behavior_frames.MAX_FRAME_BYTES + 1)
+    assert _post_frame(client, too_large).status_code == 413
+
+
+def test_page_times_are_clamped_to_the_session(make_app):
+    client = make_app().test_client()
+    session_id, handle = _start(client)
+    started = datetime.fromisoformat(user_sessions[session_id]['timestamp'])
+    now_ms = int(time.time() * 1000)
+
+    # A day in the past and a day in the future
+    past = [('page_view', now_ms - 86400000 + i * 60000, f'/p{i}') for i in range(3)]
+    assert _post_frame(client, encode_frame(handle, past)).status_code == 200
+    assert _post_frame(client, encode_frame(handle, [('page_view', now_ms + 86400000, '/late')])).status_code == 200
+
+    behavior = user_sessions[session_id]['behavior_data']
+    times = [datetime.fromisoformat(p['timestamp']) for p in behavior['pages_visited']]
+    assert all(started <= t <= datetime.now() for t in times)
+    # Four pages within the few milliseconds this session has existed is a high rate, not a tiny one
+    assert behavior['pages_visited_per_minute'] >= 60
+
+
+def test_mixed_json_and_frame_page_views_never_go_back_in_time(make_app):
+    client = make_app().test_client()
+    session_id, handle = _start(client)
+    client.post('/api/verify/behavior', json={'session_id': session_id, 'type': 'page_view', 'page': '/a'})
+    # Stamped at session start, i.e. before the JSON event
+    frame = encode_frame(handle, [('page_view', 0, '/b'), ('page_view', 0, '/c')])
+    assert _post_frame(client, frame).status_code == 200
+
+    behavior = user_sessions[session_id]['behavior_data']
+    times = [p['timestamp'] for p in behavior['pages_visited']]
+    assert times == sorted(times)
+    assert behavior['pages_visited_per_minute'] > 0
+
@@ -0,0 +1,31 @@
+from services.columnar_table import to_builtin, to_columnar
+
+
+def _store(n, start=0):
+    transactions, suspicious = [], []
+    for i in range(start, start + n):
+        entry = {'id': i, 'timestamp': f'2026-01-01T00:00:{i % 60:02d}', 'user': '9123456789',
+                 'user_name': 'Amit Kumar', 'type': 'debit', 'amount': i + 1, 'recipient': f'acct-{i}',
+                 'status': 'completed', 'session_id': f'session-{i}', 'balance_after': 50000 - i}
+        transactions.append(entry)
+        suspicious.append({'user': '9123456789', 'user_name': 'Amit Kumar', 'timestamp': entry['timestamp'],
+                           'reason': f'Failed transaction attempt: Insufficient balance for ₹{i}',
+                           'details': entry})
+    return {'transactions': transactions, 'suspicious_activity': suspicious}
+
+
+def test_per_record_strings_are_not_dictionary_encoded():
+    plain = _store(500)
+    data = to_columnar(_store(500))
+    strings = data['transactions'].strings
+    # Only the shared, low-cardinality values (user, name, type, status)
+    assert len(strings.values) == 4
+
+    data['transactions'].retain(lambda t: t['id'] >= 490)
+    data['suspicious_activity'].retain(lambda a: a['details']['id'] >= 490)
+    for record in _store(500, start=500)['transactions']:
+        data['transactions'].append(record)
+    assert len(strings.values) == 4
+    assert [to_builtin(t) for t in data['transactions'][:10]] == plain['transactions'][490:]
+    assert [a['reason'] for a in data['suspicious_activity']] == [a['reason'] for a in plain['suspicious_activity'][490:]]
+    assert data['suspicious_activity'][0]['details']['session_id'] == 'session-490'
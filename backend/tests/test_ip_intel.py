@@ -0,0 +1,55 @@
+import threading
+
+import services.ip_intel as ip_intel
+from services.ip_intel import IPIntelIndex
+from utils.helpers import detect_vpn, get_location_from_ip
+
+
+class FakeReader:
+    def __init__(self, path):
+        self.path = path
+        self.closed = threading.Event()
+
+    def get(self, ip):
+        return None
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeMaxmind:
+    def __init__(self):
+        self.opened = []
+
+    def open_database(self, path):
+        self.opened.append(FakeReader(path))
+        return self.opened[-1]
+
+
+def test_reload_closes_replaced_mmdb_readers(tmp_path, monkeypatch):
+    path = tmp_path / 'ranges.mmdb'
+    path.write_bytes(b'')
+    maxmind = FakeMaxmind()
+    monkeypatch.setattr(ip_intel, 'maxminddb', maxmind)
+    monkeypatch.setattr(ip_intel, 'READER_GRACE_SECONDS', 0)
+
+    index = IPIntelIndex([str(path)])
+    index.reload()
+    first, second = maxmind.opened
+    assert first.closed.wait(5)
+    assert not second.closed.is_set()
+
+    index.close()
+    assert second.closed.is_set()
+
+
+def test_helpers_use_the_given_index(tmp_path):
+    path = tmp_path / 'ranges.csv'
+    path.write_text('network,asn,as_org,country,location,is_vpn,is_hosting\n'
+                    '203.0.113.0/24,64500,Example VPN,NL,Amsterdam,1,0\n')
+    index = IPIntelIndex([str(path)])
+
+    assert detect_vpn('203.0.113.9', index)
+    assert not detect_vpn('127.0.0.1', index)
+    assert get_location_from_ip('203.0.113.9', index) == 'Amsterdam'
+    assert get_location_from_ip('198.51.100.1', index) == 'Unknown Location'
@@ -0,0 +1,71 @@
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+
+import pytest
+from flask import Flask
+
+import utils.json_provider as json_provider
+from services.columnar_table import TRANSACTION_SCHEMA, ColumnarTable
+from utils.json_provider import OrjsonProvider, PreserializedPayload, StdlibProvider
+
+ENTRY = {'id': 1, 'timestamp': '2026-01-01T00:00:00', 'user': '9123456789', 'user_name': 'Amit Kumar',
+         'type': 'debit', 'amount': 100.5, 'recipient': 'shop', 'status': 'completed', 'session_id': 's1'}
+
+
+def _row():
+    return ColumnarTable.from_records([ENTRY], TRANSACTION_SCHEMA, key='id')[0]
+
+
+CASES = {
+    'row': lambda: {'transaction': _row(), 'transactions': [_row(), ENTRY]},
+    'datetimes': lambda: {'at': datetime(2026, 1, 2, 3, 4, 5), 'on': date(2026, 1, 2)},
+    'non_str_keys': lambda: {1: 'one', 2.5: 'two and a half', None: 'none', 'z': 'last'},
+    'large_ints': lambda: {'big': 2 ** 70, 'small': -2 ** 64, 'fits': 2 ** 62},
+    'stdlib_types': lambda: {'price': decimal.Decimal('1.10'), 'id': uuid.UUID(int=5)},
+    'unicode_and_order': lambda: {'b': '₹10,000', 'a': [1, 2.0, None, True]},
+}
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.mark.skipif(json_provider.orjson is None, reason='orjson not installed')
+@pytest.mark.parametrize('case', sorted(CASES))
+@pytest.mark.parametrize('debug', [False, True])
+def test_orjson_and_stdlib_responses_are_identical(app, case, debug):
+    app.debug = debug
+    with app.app_context():
+        fast = OrjsonProvider(app).response(CASES[case]()).get_data()
+        slow = StdlibProvider(app).response(CASES[case]()).get_data()
+    assert fast == slow
+    json.loads(fast)
+
+
+def test_row_serializes_like_its_dict(app):
+    with app.app_context():
+        body = StdlibProvider(app).response({'transaction': _row()}).get_data()
+    assert json.loads(body) == {'transaction': ENTRY}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_preserialized_payload_is_valid_json(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    elif json_provider.orjson is None:
+        pytest.skip('orjson not installed')
+    payload = PreserializedPayload({'status': 'processing', 'message': 'Transfer initiated', 'fake_success': True})
+
+    assert json.loads(payload.response().get_data()) == {
+        'status': 'processing', 'message': 'Transfer initiated', 'fake_success': True}
+    assert json.loads(payload.response(transaction_id='TXN1').get_data())['transaction_id'] == 'TXN1'
+
+    body = payload.response(status='done', transaction_id='TXN2').get_data()
+    assert body.count(b'"status"') == 1
+    assert json.loads(body) == {'status': 'done', 'transaction_id': 'TXN2', 'message': 'Transfer initiated',
+                                'fake_success': True}
+
+    assert json.loads(PreserializedPayload({}).response(session_id='s1').get_data()) == {'session_id': 's1'}
@@ -0,0 +1,49 @@
+import random
+
+from services.keystroke_dynamics import decode_keystrokes, new_session_stats, session_features, update_session_stats
+from services.risk_service import FACTOR_UNIFORM_TYPING, RiskService
+from services.telecom_registry import TelecomRegistry
+
+USER = {'name': 'Amit Kumar', 'mobile': '9123456789'}
+
+
+def _stats(flight, seed=3):
+    rng = random.Random(seed)
+    dwell = [rng.uniform(60, 140) for _ in range(len(flight) + 1)]
+    return update_session_stats(new_session_stats(), 'name', dwell, flight)
+
+
+def _uniform_typing(stats):
+    service = RiskService(registry=TelecomRegistry(data={}))
+    factors = service._calculate_risk_score(USER, {}, {'keystroke_stats': stats})['risk_factors']
+    return FACTOR_UNIFORM_TYPING in factors
+
+
+def test_key_rollover_is_not_machine_uniform_typing():
+    # Fast typist: most keys are pressed before the previous one is released
+    rng = random.Random(7)
+    keys, down = [], 0.0
+    for _ in range(40):
+        keys.append([down, down + rng.uniform(80, 160)])
+        down += rng.uniform(20, 140)
+    dwell, flight = decode_keystrokes({'keys': keys})
+    stats = update_session_stats(new_session_stats(), 'name', dwell, flight)
+
+    features = session_features(stats)
+    assert features['flight_mean'] < 0
+    assert features['flight_cv'] is None
+    assert features['flight_entropy'] >= 1.0
+    assert not _uniform_typing(stats)
+
+
+def test_evenly_spaced_keys_are_machine_uniform_typing():
+    stats = _stats([50.0 + (i % 2) for i in range(30)])
+    assert session_features(stats)['flight_cv'] < 0.1
+    assert _uniform_typing(stats)
+
+
+def test_human_gaps_are_not_machine_uniform_typing():
+    rng = random.Random(5)
+    stats = _stats([rng.uniform(30, 600) for _ in range(30)])
+    assert session_features(stats)['flight_cv'] > 0.1
+    assert not _uniform_typing(stats)
@@ -0,0 +1,45 @@
+import threading
+
+from services.metrics_service import Counter, Histogram
+
+
+def _run_in_threads(func, count):
+    threads = [threading.Thread(target=func) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_exited_threads_are_folded_into_retired_totals():
+    counter = Counter()
+    histogram = Histogram(buckets=(1.0,))
+
+    def work():
+        for _ in range(100):
+            counter.inc()
+            histogram.observe(0.5)
+
+    _run_in_threads(work, 50)
+    assert counter.value == 5000
+    assert len(counter._shards) == 0
+    assert histogram.snapshot() == ([5000, 5000], 2500.0, 5000)
+
+
+def test_live_thread_keeps_its_shard():
+    counter = Counter()
+    counter.inc(3)
+    _run_in_threads(counter.inc, 4)
+    assert counter.value == 7
+    assert len(counter._shards) == 1
+
+
+def test_metrics_endpoint_requires_token(make_app):
+    assert make_app(METRICS_TOKEN=None).test_client().get('/metrics').status_code == 404
+
+    client = make_app(METRICS_TOKEN='s3cret').test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert b'honeykyc_verify_sessions' in response.data
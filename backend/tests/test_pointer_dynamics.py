@@ -0,0 +1,98 @@
+import base64
+
+import numpy as np
+import pytest
+
+from services.pointer_dynamics import MAX_POINTS_PER_BATCH, decode_points, new_summary, summary_features, update_summary
+from services.risk_service import (FACTOR_LINEAR_POINTER, FACTOR_MINIMAL_MOUSE, FACTOR_UNIFORM_POINTER_SPEED,
+                                   RiskService)
+from services.telecom_registry import TelecomRegistry
+
+USER = {'name': 'Amit Kumar', 'mobile': '9123456789'}
+POINTER_FACTORS = {FACTOR_LINEAR_POINTER, FACTOR_MINIMAL_MOUSE, FACTOR_UNIFORM_POINTER_SPEED}
+
+
+def _scripted(n=60):
+    """Straight line at constant speed, one sample every 10 ms"""
+    t = np.arange(n) * 10.0
+    return np.column_stack([t * 2, t, t])
+
+
+def _human(n=60, seed=1):
+    """Curved path with uneven speed and a pause in the middle"""
+    rng = np.random.default_rng(seed)
+    dt = rng.uniform(5, 30, n)
+    dt[n // 2] = 400
+    t = np.cumsum(dt)
+    angle = np.linspace(0, 2.5, n) + rng.normal(0, 0.2, n)
+    step = rng.uniform(1, 12, n)
+    return np.column_stack([np.cumsum(step * np.cos(angle)), np.cumsum(step * np.sin(angle)), t])
+
+
+def _features(*batches):
+    summary = new_summary()
+    for batch in batches:
+        update_summary(summary, batch)
+    return summary, summary_features(summary)
+
+
+def test_decode_points_accepts_lists_and_packed_int32():
+    points = [[1, 2, 0], [3, 5, 10]]
+    packed = base64.b64encode(np.asarray(points, dtype='<i4').tobytes()).decode()
+    assert decode_points({'points': points}).tolist() == decode_points({'packed': packed}).tolist() == points
+    assert decode_points({}).shape == (0, 3)
+
+
+@pytest.mark.parametrize('data', [
+    {'points': [[1, 2]]},
+    {'points': [[1, 2, float('nan')]]},
+    {'points': [[0, 0, i] for i in range(MAX_POINTS_PER_BATCH + 1)]},
+    {'packed': base64.b64encode(b'\x00' * 10).decode()},
+])
+def test_decode_points_rejects_bad_input(data):
+    with pytest.raises(ValueError):
+        decode_points(data)
+
+
+def test_scripted_movement_is_straight_and_evenly_paced():
+    _, features = _features(_scripted())
+    assert features['segments'] == 59
+    assert features['straightness'] == pytest.approx(1.0)
+    assert features['speed_cv'] == pytest.approx(0.0, abs=1e-6)
+    assert features['pause_count'] == 0
+
+
+def test_human_movement_curves_varies_and_pauses():
+    _, features = _features(_human())
+    assert features['straightness'] < 0.99
+    assert features['speed_cv'] > 0.15
+    assert features['pause_count'] == 1
+    assert features['mean_curvature'] > 0
+
+
+def test_batches_summarize_like_one_trajectory():
+    points = _human(120)
+    whole, whole_features = _features(points)
+    split, split_features = _features(points[:37], points[37:80], points[80:])
+    for name in ('segments', 'pause_count', 'strokes'):
+        assert split[name] == whole[name]
+    for name in ('mean_speed', 'speed_cv', 'straightness', 'mean_abs_accel', 'mean_curvature', 'pause_ratio'):
+        assert split_features[name] == pytest.approx(whole_features[name])
+
+
+def _pointer_factors(behavior):
+    service = RiskService(registry=TelecomRegistry(data={}))
+    return POINTER_FACTORS & set(service._calculate_risk_score(USER, {}, behavior)['risk_factors'])
+
+
+def test_mouse_movement_counts_alone_are_not_human_interaction():
+    assert _pointer_factors({'mouse_movements': 5}) == {FACTOR_MINIMAL_MOUSE}
+    short, _ = _features(_human(10))
+    assert _pointer_factors({'mouse_movements': 500, 'pointer_summary': short}) == {FACTOR_MINIMAL_MOUSE}
+
+
+def test_pointer_trajectory_decides_the_pointer_factors():
+    scripted, _ = _features(_scripted())
+    human, _ = _features(_human())
+    assert _pointer_factors({'pointer_summary': scripted}) == {FACTOR_LINEAR_POINTER, FACTOR_UNIFORM_POINTER_SPEED}
+    assert _pointer_factors({'pointer_summary': human}) == set()
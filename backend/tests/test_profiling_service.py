@@ -0,0 +1,44 @@
+import services.profiling_service as profiling
+from services.profiling_service import ProfilingService
+
+
+def test_one_request_is_profiled_at_a_time():
+    service = ProfilingService()
+    first = service.start()
+    assert first is not None
+    assert service.start() is None
+    assert service.get_config()['skipped_busy'] == 1
+
+    service.finish(first, 'verify.start', 'POST', '/api/verify/start', 1.0, 200)
+    second = service.start()
+    assert second is not None
+    service.abandon(second)
+
+
+def test_a_foreign_active_profiler_skips_profiling(monkeypatch):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError('Another profiling tool is already active')
+
+    service = ProfilingService()
+    monkeypatch.setattr(profiling.cProfile, 'Profile', BusyProfile)
+    assert service.start() is None
+    monkeypatch.undo()
+    # The failed attempt didn't keep the slot
+    profiler = service.start()
+    assert profiler is not None
+    service.abandon(profiler)
+
+
+def test_profiled_requests_release_the_profiler(make_app):
+    app = make_app(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_THRESHOLD_MS=0)
+    client = app.test_client()
+    try:
+        for _ in range(3):
+            assert client.post('/api/verify/start', json={'name': 'Amit Kumar', 'mobile': '9123456789'}
+                               ).status_code == 200
+        assert profiling.profiling_service.get_config()['skipped_busy'] == 0
+        assert len(profiling.profiling_service.list_profiles()) == 3
+    finally:
+        profiling.profiling_service.configure(enabled=False)
+        profiling.profiling_service.clear()
@@ -0,0 +1,42 @@
+from fake_redis import FakeRedis, FakeRedisServer
+from services.rate_limiter import RateLimiter, RedisBucketStore, create_bucket_store
+
+LIMITS = {'verify_start': '5 per minute', 'default': '100 per minute'}
+CLASSES = {'verify.start_verification': 'verify_start'}
+
+
+def _limiter(store):
+    return RateLimiter(store, LIMITS, CLASSES)
+
+
+def _allowed(limiter, count, client_ip='203.0.113.7'):
+    return [limiter.check('verify.start_verification', client_ip)[0] for _ in range(count)]
+
+
+def test_two_limiters_share_one_budget_through_redis_protocol():
+    with FakeRedisServer() as server:
+        # Separate stores and connections, as in two worker processes
+        first = _limiter(create_bucket_store(server.uri))
+        second = _limiter(create_bucket_store(server.uri))
+        assert _allowed(first, 3) == [True, True, True]
+        assert _allowed(second, 3) == [True, True, False]
+        assert _allowed(first, 1) == [False]
+        # Other clients have their own bucket
+        assert _allowed(second, 1, client_ip='198.51.100.1') == [True]
+
+
+def test_redis_store_reports_retry_after():
+    store = RedisBucketStore(FakeRedis())
+    for _ in range(5):
+        assert store.take('verify_start:ip', 5, 5 / 60)[0]
+    allowed, remaining, retry_after = store.take('verify_start:ip', 5, 5 / 60)
+    assert not allowed
+    assert 0 < retry_after <= 12
+
+
+def test_storage_errors_fail_open():
+    class Broken:
+        def eval(self, *args):
+            raise ConnectionError('down')
+
+    assert _limiter(RedisBucketStore(Broken())).check('verify.start_verification', '203.0.113.7') is None
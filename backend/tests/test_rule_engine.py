@@ -0,0 +1,47 @@
+import threading
+
+from services.rule_engine import RuleEngine
+from services.tracking_service import TrackingService
+
+RAPID = {'name': 'rapid', 'key': 'session_id', 'within_seconds': 60,
+         'steps': [{'type': 'transaction', 'count': 2}], 'severity': 'medium'}
+
+
+class SwapOnAcquire:
+    """Engine lock that runs a rule reload right before its first acquisition"""
+
+    def __init__(self, engine, rules):
+        self.engine = engine
+        self.rules = rules
+        self.inner = threading.Lock()
+
+    def __enter__(self):
+        rules, self.rules = self.rules, None
+        if rules is not None:
+            self.engine.load_rules(rules)
+        self.inner.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.inner.release()
+
+
+def test_reload_between_dispatch_and_processing():
+    engine = RuleEngine([RAPID])
+    engine._lock = SwapOnAcquire(engine, [dict(RAPID, name='rapid_v2')])
+
+    event = {'type': 'transaction', 'session_id': 's1'}
+    assert engine.process(event, now=0) == []
+    assert [m['rule'] for m in engine.process(event, now=1)] == ['rapid_v2']
+
+
+def test_untracked_session_matches_are_attributed_to_the_session(tmp_path):
+    tracking = TrackingService(data_file=str(tmp_path / 'user_activity.json'), rule_engine=RuleEngine())
+    for _ in range(6):
+        tracking.process_event('honeypot_action', 'hp1', action_type='transfer_attempt')
+
+    users = {a['user'] for a in tracking.data['suspicious_activity']}
+    assert users == {'session:hp1'}
+
+    tracking.process_event('honeypot_action', None, action_type='transfer_attempt')
+    assert len(tracking.data['suspicious_activity']) == 2
@@ -0,0 +1,131 @@
+import json
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import services.scoring_executor as scoring_executor
+from services.risk_service import DEFAULT_WEIGHTS, RiskService
+from services.scoring_executor import ProcessExecutor, _PoolExecutor
+from services.telecom_registry import TelecomRegistry
+
+RECORD = {'owner_name': 'Amit Kumar', 'provider': 'Jio', 'activation_date': '2020-01-15',
+          'kyc_status': 'verified', 'aadhar_linked': True, 'pan_linked': True, 'risk_score': 10}
+USER = {'name': 'Amit Kumar', 'mobile': '9123456789'}
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.02)
+
+
+def _risk_args(user=USER):
+    return (user, {'is_new_device': False}, {}, None)
+
+
+def _run(executor, fallback=lambda *args: 'fallback'):
+    return executor.run('risk_score', _risk_args(), inline=None, fallback=fallback)
+
+
+def test_pool_executor_requires_submit():
+    with pytest.raises(TypeError):
+        _PoolExecutor(1)
+
+
+def test_registry_swap_recycles_pool_in_background():
+    registry = TelecomRegistry(data={})
+    executor = ProcessExecutor(registry, None, max_workers=1, deadline_ms=10000)
+    try:
+        assert _run(executor)['risk_factors'][0].startswith('❌ Mobile number not found')
+
+        start = time.perf_counter()
+        registry.apply_operations([{'op': 'upsert', 'mobile': USER['mobile'], 'record': RECORD}])
+        # The listener only schedules the rebuild
+        assert time.perf_counter() - start < 0.5
+        _wait_for(lambda: executor.generation == 2)
+
+        assert _run(executor)['risk_factors'][0].startswith('✅ Name matches')
+        assert executor.get_status()['recycled'] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_overrunning_tasks_recycle_the_pool(monkeypatch):
+    monkeypatch.setattr(RiskService, '_calculate_risk_score', lambda self, *args: time.sleep(30))
+    executor = ProcessExecutor(TelecomRegistry(data={}), None, max_workers=1, deadline_ms=50)
+    try:
+        stuck = list(executor._pool._processes.values())
+        assert _run(executor) == 'fallback'
+        _wait_for(lambda: executor.generation == 2)
+        # The worker stuck on the task is killed once nobody waits on it
+        _wait_for(lambda: not any(p.is_alive() for p in stuck))
+        assert executor.get_status()['overruns'] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_killed_worker_breaks_and_rebuilds_the_pool(monkeypatch):
+    monkeypatch.setattr(RiskService, '_calculate_risk_score', lambda self, *args: time.sleep(30))
+    registry = TelecomRegistry(data={USER['mobile']: RECORD})
+    executor = ProcessExecutor(registry, None, max_workers=1, deadline_ms=10000)
+    try:
+        results = []
+        caller = threading.Thread(target=lambda: results.append(_run(executor)))
+        caller.start()
+        _wait_for(lambda: executor.get_status()['pending'] == 1)
+        worker = next(iter(executor._pool._processes.values()))
+        os.kill(worker.pid, signal.SIGKILL)
+        caller.join(5)
+        # The waiting caller gets the fallback, not the full deadline
+        assert results == ['fallback']
+
+        _wait_for(lambda: executor.generation == 2)
+        result = executor.run('ownership', (USER['mobile'], USER['name']), inline=None, fallback=None)
+        assert result['owner_name'] == USER['name']
+        assert executor.get_status()['recycled'] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_pool_inherited_across_a_fork_is_rebuilt_in_background():
+    executor = ProcessExecutor(TelecomRegistry(data={}), None, max_workers=1, deadline_ms=10000)
+    inherited = executor._pool
+    try:
+        # As seen from a pre-forked server worker
+        executor._pid = -1
+        assert _run(executor) == 'fallback'
+        _wait_for(lambda: executor.generation == 2)
+        assert executor._pool is not inherited
+        assert _run(executor)['risk_factors'][0].startswith('❌ Mobile number not found')
+    finally:
+        inherited.shutdown()
+        executor.shutdown()
+
+
+def test_spawned_worker_replays_registry_deltas(tmp_path, monkeypatch):
+    base = tmp_path / 'registry.json'
+    base.write_text(json.dumps({USER['mobile']: RECORD}))
+    deltas = tmp_path / 'deltas'
+    deltas.mkdir()
+    (deltas / '0001.jsonl').write_text(json.dumps(
+        {'op': 'patch', 'mobile': USER['mobile'], 'fields': {'owner_name': 'Priya Verma'}}) + '\n')
+    monkeypatch.setattr(scoring_executor, '_worker_registry', None)
+    monkeypatch.setattr(scoring_executor, '_worker_services', None)
+
+    scoring_executor._init_worker(str(base), str(deltas), ('0001.jsonl',))
+    result = scoring_executor._run_task('ownership', (USER['mobile'], 'Priya Verma'))
+    assert result['owner_name'] == 'Priya Verma'
+
+
+def test_degraded_score_uses_full_score_weights():
+    service = RiskService(registry=TelecomRegistry(data={USER['mobile']: RECORD}))
+    emulator = {'is_emulator': True, 'is_new_device': False}
+    plain = {'is_emulator': False, 'is_new_device': False}
+
+    for score in (service._calculate_risk_score, service._quick_risk_score):
+        added = score(USER, emulator, {})['risk_score'] - score(USER, plain, {})['risk_score']
+        assert added == DEFAULT_WEIGHTS['emulator']
@@ -0,0 +1,41 @@
+import pytest
+
+from services.keystroke_dynamics import new_profile
+from services.shadow_scoring import ShadowScorer
+from services.telecom_registry import TelecomRegistry
+
+USER = {'name': 'Amit Kumar', 'mobile': '9123456789', 'email': 'amit@example.com'}
+
+
+def test_rule_sets_with_an_ownership_section_are_rejected():
+    scorer = ShadowScorer(TelecomRegistry(data={}))
+    with pytest.raises(ValueError):
+        scorer.set_rule_set({'risk': {'thresholds': {'high': 60}}, 'ownership': {'thresholds': {'verified': 65}}})
+    assert not scorer.enabled
+
+
+def test_shutdown_scores_what_is_queued():
+    scorer = ShadowScorer(TelecomRegistry(data={}), {'risk': {'thresholds': {'high': 60}}})
+    live = {'risk_score': 0, 'risk_level': 'LOW', 'is_fraud': False, 'needs_honeypot': False}
+    for i in range(5):
+        assert scorer.submit('risk', f's{i}', live, lambda: {'user_data': USER})
+
+    scorer.shutdown()
+    assert not scorer._thread.is_alive()
+    assert scorer.stats['scored'] == 5
+
+
+def test_honeypot_shadow_inputs_carry_the_keystroke_profile(make_app):
+    app = make_app()
+    services = app.extensions['honeykyc_services']
+    profile = new_profile()
+    services.tracking_service.data['users'][USER['mobile']] = {'keystroke_profile': profile}
+    submitted = []
+    services.shadow_scorer.submit = lambda path, session_id, live, get_inputs: submitted.append(get_inputs())
+
+    client = app.test_client()
+    session_id = client.post('/api/verify/start', json=USER).get_json()['session_id']
+    response = client.post('/api/verify/behavior',
+                           json={'session_id': session_id, 'type': 'honeypot_click', 'element': 'admin'})
+    assert response.get_json()['status'] == 'fraud_detected'
+    assert submitted[0]['keystroke_profile'] == profile
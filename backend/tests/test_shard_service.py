@@ -0,0 +1,108 @@
+import pytest
+
+from services.ledger_service import STARTING_BALANCE
+from services.shard_service import ShardedTrackingService, parse_shard_spec
+from services.tracking_service import TrackingService
+from tools import tracking_shard
+
+
+class CountingShard:
+    """In-process shard that counts session lookups"""
+
+    def __init__(self, tracking):
+        self.tracking = tracking
+        self.lookups = 0
+
+    def session_user(self, session_id):
+        self.lookups += 1
+        return self.tracking.session_user(session_id)
+
+    def __getattr__(self, name):
+        return getattr(self.tracking, name)
+
+
+def _shards(tmp_path, names, columnar=False):
+    return {name: TrackingService(data_file=str(tmp_path / f'{name}.json'), columnar=columnar) for name in names}
+
+
+def _user(i):
+    return {'name': f'User {i}', 'mobile': f'9{i:09d}'}
+
+
+def _view(tracking, mobile):
+    """What a user looks like on a shard, without the shard-assigned entry IDs"""
+    user = dict(tracking.data['users'][mobile])
+    user['transactions'] = [{k: v for k, v in t.items() if k != 'id'} for t in user['transactions']]
+    sessions = {sid: dict(s, transactions=[{k: v for k, v in t.items() if k != 'id'} for t in s['transactions']])
+                for sid, s in tracking.data['sessions'].items() if s['user'] == mobile}
+    suspicious = sorted(a['reason'] for a in tracking.data['suspicious_activity'] if a['user'] == mobile)
+    return user, sessions, suspicious
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_moved_users_round_trip(tmp_path, columnar):
+    shards = _shards(tmp_path, ['a', 'b'], columnar)
+    router = ShardedTrackingService(list(shards.items()), vnodes=16)
+    mobiles = []
+    for i in range(40):
+        user = _user(i)
+        mobiles.append(user['mobile'])
+        router.track_user_login(user, 20, 'LOW', f's{i}')
+        router.track_transaction(f's{i}', {'type': 'debit', 'amount': 100, 'recipient': 'shop'},
+                                 idempotency_key=f'k{i}')
+        # Over the balance: a failed entry plus suspicious activity pointing at it
+        router.track_transaction(f's{i}', {'type': 'debit', 'amount': STARTING_BALANCE * 2, 'recipient': 'mule'})
+    before = {mobile: _view(router.shard_for(mobile), mobile) for mobile in mobiles}
+
+    new = TrackingService(data_file=str(tmp_path / 'c.json'), columnar=columnar)
+    moved = router.add_shard('c', new)
+    assert sum(moved.values()) == len(new.data['users']) > 0
+
+    for i, mobile in enumerate(mobiles):
+        owner = router.shard_for(mobile)
+        assert mobile in owner.data['users']
+        assert sum(mobile in shard.data['users'] for shard in router.shards.values()) == 1
+        assert _view(owner, mobile) == before[mobile]
+        # Suspicious activity still points at the (renumbered) ledger entries
+        entries = owner.data['users'][mobile]['transactions']
+        ledger = {t['id']: t['status'] for t in owner.data['transactions'] if t['user'] == mobile}
+        details = [a['details'] for a in owner.data['suspicious_activity'] if a['user'] == mobile]
+        assert sorted(ledger.values()) == ['completed', 'failed']
+        assert [ledger[d['id']] for d in details] == ['failed']
+        # Retries of moved posts are still recognised
+        again, replayed = router.track_transaction(f's{i}', {'type': 'debit', 'amount': 100, 'recipient': 'shop'},
+                                                   idempotency_key=f'k{i}')
+        assert replayed and again['id'] == entries[0]['id']
+
+    reloaded = TrackingService(data_file=str(tmp_path / 'c.json'), columnar=columnar)
+    for mobile in new.data['users']:
+        assert _view(reloaded, mobile) == before[mobile]
+
+
+def test_session_misses_are_cached(tmp_path, monkeypatch):
+    shards = {name: CountingShard(tracking) for name, tracking in _shards(tmp_path, ['a', 'b']).items()}
+    router = ShardedTrackingService(list(shards.items()), vnodes=16, session_miss_ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr('services.shard_service.time.monotonic', lambda: clock[0])
+
+    for _ in range(5):
+        router.flag_session('hp1')
+    assert [shard.lookups for shard in shards.values()] == [1, 1]
+
+    clock[0] += 61
+    router.flag_session('hp1')
+    assert [shard.lookups for shard in shards.values()] == [2, 2]
+
+    # A login replaces the cached miss
+    router.track_user_login(_user(1), 20, 'LOW', 'hp1')
+    assert router._session_owner('hp1') == _user(1)['mobile']
+
+
+def test_remote_shards_need_an_authkey(tmp_path):
+    with pytest.raises(ValueError):
+        parse_shard_spec('a=127.0.0.1:7101', b'', None)
+    name, shard = parse_shard_spec(f'a={tmp_path / "a.json"}', b'', lambda path: path)
+    assert (name, shard) == ('a', str(tmp_path / 'a.json'))
+
+    with pytest.raises(SystemExit):
+        tracking_shard.main(['--authkey', '', 'serve', '--activity', str(tmp_path / 'a.json'), '--port', '7101'])
@@ -0,0 +1,126 @@
+import gzip
+import importlib
+import sys
+import types
+import zlib
+
+import pytest
+
+from services import static_assets
+
+INDEX = ('<!doctype html><html><body>' + '<div id="root"></div>' * 100 + '</body></html>').encode()
+SCRIPT = ('console.log("honeykyc");\n' * 200).encode()
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    build = tmp_path / 'build'
+    (build / 'static' / 'js').mkdir(parents=True)
+    (build / 'index.html').write_bytes(INDEX)
+    (build / 'static' / 'js' / 'main.3f2a9c1b.js').write_bytes(SCRIPT)
+    (build / 'manifest.json').write_text('{"short_name": "HoneyKYC"}')
+    return build
+
+
+@pytest.fixture
+def static_client(make_app, build_dir):
+    def factory():
+        return make_app(STATIC_BUILD_DIR=str(build_dir)).test_client()
+    return factory
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    """static_assets as imported where the brotli package is missing"""
+    monkeypatch.setitem(sys.modules, 'brotli', None)
+    yield importlib.reload(static_assets)
+    monkeypatch.undo()
+    importlib.reload(static_assets)
+
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+    monkeypatch.setattr(static_assets, 'brotli', types.SimpleNamespace(
+        compress=lambda data, quality: zlib.compress(data, 9)))
+
+
+def _decoded(response):
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(response.data)
+    if encoding == 'br':
+        return zlib.decompress(response.data)
+    return response.data
+
+
+def test_if_none_match_returns_304(static_client):
+    client = static_client()
+    first = client.get('/dashboard')
+    assert first.status_code == 200 and first.data == INDEX
+    assert first.headers['Cache-Control'] == static_assets.REVALIDATE_CACHE
+
+    again = client.get('/dashboard', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert again.headers['Cache-Control'] == static_assets.REVALIDATE_CACHE
+
+    hashed = client.get('/static/js/main.3f2a9c1b.js')
+    assert hashed.headers['Cache-Control'] == static_assets.IMMUTABLE_CACHE
+    assert client.get('/static/js/main.3f2a9c1b.js', headers={'If-None-Match': 'W/"other", ' + hashed.headers['ETag']}
+                      ).status_code == 304
+    assert client.get('/missing.js').status_code == 404
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('gzip, deflate', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('gzip;q=0', None),
+    ('identity', None),
+    ('', None),
+])
+def test_precompressed_variant_negotiation(static_client, accept, encoding):
+    response = static_client().get('/static/js/main.3f2a9c1b.js', headers={'Accept-Encoding': accept})
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding') == encoding
+    assert 'Accept-Encoding' in response.vary
+    assert 'Content-Disposition' not in response.headers
+    assert response.mimetype in ('application/javascript', 'text/javascript')
+    assert _decoded(response) == SCRIPT
+
+
+def test_each_representation_has_its_own_etag(static_client):
+    client = static_client()
+    identity = client.get('/', headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+    # A cached identity body doesn't satisfy a request that now gets gzip
+    response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': identity.headers['ETag']})
+    assert response.status_code == 200 and gzip.decompress(response.data) == INDEX
+    assert client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']}
+                      ).status_code == 304
+
+
+def test_small_files_have_no_variants(static_client):
+    response = static_client().get('/manifest.json', headers={'Accept-Encoding': 'br, gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' not in response.vary
+
+
+def test_brotli_is_preferred_when_installed(static_client, fake_brotli, build_dir):
+    response = static_client().get('/', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert _decoded(response) == INDEX
+    assert (build_dir / 'index.html.br').exists()
+
+
+def test_without_brotli_only_gzip_variants_are_served(without_brotli, static_client, build_dir):
+    assert without_brotli.brotli is None
+    client = static_client()
+    assert not list(build_dir.rglob('*.br'))
+
+    only_br = client.get('/', headers={'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in only_br.headers
+    assert only_br.data == INDEX
+    assert client.get('/', headers={'Accept-Encoding': 'br, gzip'}).headers['Content-Encoding'] == 'gzip'
+    assert client.application.extensions['honeykyc_static_assets'].get_status()['brotli'] is False
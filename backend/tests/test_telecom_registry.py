@@ -0,0 +1,78 @@
+import json
+import threading
+
+import pytest
+
+from services.telecom_registry import TelecomRegistry
+
+
+def _registry(tmp_path):
+    return TelecomRegistry(data={'9000000001': {'name': 'A'}, '9000000002': {'name': 'B'}},
+                           delta_dir=str(tmp_path))
+
+
+def test_concurrent_apply_of_one_delta_file_applies_it_once(tmp_path):
+    path = tmp_path / '0001.jsonl'
+    path.write_text(json.dumps({'op': 'upsert', 'mobile': '9000000003', 'record': {'name': 'C'}}) + '\n')
+    registry = _registry(tmp_path)
+    barrier = threading.Barrier(8)
+
+    def apply():
+        barrier.wait()
+        registry.apply_delta_file(str(path))
+
+    threads = [threading.Thread(target=apply) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.applied_deltas == ['0001.jsonl']
+    assert registry.version == 2
+
+
+def test_malformed_operation_raises_value_error_and_applies_nothing(tmp_path):
+    registry = _registry(tmp_path)
+    with pytest.raises(ValueError):
+        registry.apply_operations([{'op': 'delete', 'mobile': '9000000001'}, 'not an object'])
+    with pytest.raises(ValueError):
+        registry.apply_operations([{'op': 'patch', 'mobile': '9000000001', 'fields': ['x']}])
+    assert registry.version == 1
+    assert '9000000001' in registry.current()
+
+
+def test_failing_listener_does_not_abort_full_reload(tmp_path):
+    data_file = tmp_path / 'registry.json'
+    data_file.write_text(json.dumps({'9000000001': {'name': 'A'}}))
+    registry = TelecomRegistry(data_file=str(data_file))
+    seen = []
+    registry.add_listener(lambda snapshot: 1 / 0)
+    registry.add_listener(lambda snapshot: seen.append(snapshot.version))
+    assert registry.reload_full()['version'] == 2
+    assert seen == [2]
+
+
+def test_reload_route_rejects_malformed_operations(make_app):
+    client = make_app(ADMIN_API_TOKEN='t').test_client()
+    headers = {'Authorization': 't'}
+    assert client.post('/api/admin/registry/reload', json={'operations': [1]}, headers=headers).status_code == 400
+    assert client.post('/api/admin/registry/reload', json={'operations': 'x'}, headers=headers).status_code == 400
+    assert client.post('/api/admin/registry/reload', json=[1], headers=headers).status_code == 400
+
+
+def test_bad_delta_file_is_moved_aside_and_later_ones_apply(tmp_path):
+    (tmp_path / '0001.jsonl').write_text('{"op": "upsert", "mobile": "9000000003", "rec\n')
+    (tmp_path / '0002.jsonl').write_text(json.dumps({'op': 'patch', 'mobile': '9000000001', 'fields': ['x']}) + '\n')
+    (tmp_path / '0003.jsonl').write_text(
+        json.dumps({'op': 'upsert', 'mobile': '9000000003', 'record': {'name': 'C'}}) + '\n')
+    registry = _registry(tmp_path)
+
+    results = registry.apply_pending_deltas()
+    assert [bool(r.get('rejected')) for r in results] == [True, True, False]
+    assert registry.applied_deltas == ['0003.jsonl']
+    assert registry.rejected_deltas == ['0001.jsonl', '0002.jsonl']
+    assert registry.current()['9000000003'] == {'name': 'C'}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['0001.jsonl.rejected', '0002.jsonl.rejected', '0003.jsonl']
+
+    # Nothing is retried on the next poll
+    assert registry.apply_pending_deltas() == []
+    assert registry.get_status()['pending_deltas'] == []
@@ -0,0 +1,191 @@
+import json
+import os
+
+import pytest
+
+from services.columnar_table import to_builtin, to_columnar
+from services.ledger_service import STARTING_BALANCE, IdempotencyConflict, InvalidTransaction
+from services.tracking_service import TrackingService, read_store
+
+USER = {'name': 'Amit Kumar', 'mobile': '9123456789'}
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / 'user_activity.json')
+
+
+def _tracking(path, **kwargs):
+    tracking = TrackingService(data_file=path, **kwargs)
+    if 's1' not in tracking.data['sessions']:
+        tracking.track_user_login(USER, 20, 'LOW', 's1')
+    return tracking
+
+
+def _debit(amount, recipient='shop'):
+    return {'type': 'debit', 'amount': amount, 'recipient': recipient}
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_idempotent_retry_returns_the_original_entry(store_path, columnar):
+    tracking = _tracking(store_path, columnar=columnar)
+    first, replayed = tracking.track_transaction('s1', _debit(100), idempotency_key='k1')
+    again, replayed_again = tracking.track_transaction('s1', _debit(100), idempotency_key='k1')
+
+    assert (replayed, replayed_again) == (False, True)
+    assert again['id'] == first['id']
+    assert tracking.data['sessions']['s1']['balance'] == STARTING_BALANCE - 100
+    with pytest.raises(IdempotencyConflict):
+        tracking.track_transaction('s1', _debit(200), idempotency_key='k1')
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_posts_are_journaled_and_replayed_on_load(store_path, columnar):
+    tracking = _tracking(store_path, columnar=columnar)
+    saved = os.path.getmtime(store_path)
+    first, _ = tracking.track_transaction('s1', _debit(100), idempotency_key='k1')
+    tracking.track_transaction('s1', _debit(10 ** 6))
+    tracking.track_transaction('s1', {'type': 'credit', 'amount': 50, 'recipient': ''})
+
+    # Posts only append to the journal
+    assert os.path.getmtime(store_path) == saved
+    with open(tracking.journal_file) as f:
+        assert len(f.readlines()) == 3
+
+    reloaded = TrackingService(data_file=store_path, columnar=columnar)
+    session = reloaded.data['sessions']['s1']
+    assert session['balance'] == STARTING_BALANCE - 100 + 50
+    assert [t['amount'] for t in session['transactions']] == [100, 50]
+    assert [t['status'] for t in reloaded.data['transactions']] == ['completed', 'failed', 'completed']
+    assert len(reloaded.data['suspicious_activity']) == 1
+    # Replay folds the journal into the store
+    assert not os.path.exists(reloaded.journal_file)
+
+    again, replayed = reloaded.track_transaction('s1', _debit(100), idempotency_key='k1')
+    assert replayed and again['id'] == first['id']
+    assert reloaded.track_transaction('s1', _debit(1))[0]['id'] == first['id'] + 3
+
+
+def test_replay_skips_entries_already_saved(store_path):
+    tracking = _tracking(store_path)
+    tracking.track_transaction('s1', _debit(100))
+    with open(tracking.journal_file) as f:
+        journal = f.read()
+    tracking.save_data()
+    # As if the process died between writing the store and removing the journal
+    with open(tracking.journal_file, 'w') as f:
+        f.write(journal)
+
+    data = read_store(store_path)
+    assert len(data['transactions']) == 1
+    assert data['sessions']['s1']['balance'] == STARTING_BALANCE - 100
+
+
+def test_torn_journal_line_is_ignored(store_path):
+    tracking = _tracking(store_path)
+    tracking.track_transaction('s1', _debit(100))
+    with open(tracking.journal_file, 'a') as f:
+        f.write('{"session_id": "s1", "entr')
+
+    reloaded = TrackingService(data_file=store_path)
+    assert len(reloaded.data['transactions']) == 1
+
+
+def test_store_is_rewritten_every_n_posts(store_path):
+    tracking = _tracking(store_path, journal_compact_every=2)
+    tracking.track_transaction('s1', _debit(1))
+    assert os.path.exists(tracking.journal_file)
+    tracking.track_transaction('s1', _debit(2))
+    assert not os.path.exists(tracking.journal_file)
+    with open(store_path) as f:
+        assert len(json.load(f)['transactions']) == 2
+
+
+def _populated(path, columnar=False):
+    tracking = _tracking(path, columnar=columnar)
+    tracking.track_transaction('s1', _debit(100), idempotency_key='k1')
+    tracking.track_transaction('s1', _debit(10 ** 6))
+    tracking.track_action('s1', {'action': 'honeypot_trigger', 'page': '/admin'})
+    tracking.save_data()
+    return tracking
+
+
+def _plain(data):
+    return json.loads(json.dumps(data, default=to_builtin))
+
+
+def test_columnar_and_dict_stores_round_trip(store_path):
+    _populated(store_path)
+    assert _plain(to_columnar(read_store(store_path))) == _plain(read_store(store_path))
+
+    original = _plain(TrackingService(data_file=store_path).data)
+    columnar = TrackingService(data_file=store_path, columnar=True)
+    assert _plain(columnar.data) == original
+    columnar.save_data()
+    assert _plain(TrackingService(data_file=store_path).data) == original
+    # The failed entry is referenced by its suspicious activity, not copied
+    details = [a['details'] for a in columnar.data['suspicious_activity'] if 'id' in a['details']]
+    assert [d['id'] for d in details] == [columnar.data['transactions'][1]['id']]
+
+
+@pytest.mark.parametrize('source_columnar, target_columnar', [(False, True), (True, False)])
+def test_moved_entries_are_matched_by_ledger_id(tmp_path, source_columnar, target_columnar):
+    source = _populated(str(tmp_path / 'a.json'), columnar=source_columnar)
+    before = _plain(source.data)
+    target = TrackingService(data_file=str(tmp_path / 'b.json'), columnar=target_columnar)
+    target.track_user_login({'name': 'Priya Verma', 'mobile': '9988776655'}, 20, 'LOW', 's2')
+    target.track_transaction('s2', _debit(5))
+
+    # A serialized bundle (as from a shard process) holds copies, not shared entries
+    bundle = json.loads(json.dumps(source.export_users([USER['mobile']]), default=to_builtin))
+    assert target.import_users(bundle) == 1
+
+    ledger = {t['id']: t for t in target.data['transactions']}
+    assert len(ledger) == 3
+    user = target.data['users'][USER['mobile']]
+    assert [t['amount'] for t in user['transactions']] == [100]
+    assert user['transactions'][0] is target.data['sessions']['s1']['transactions'][0]
+    assert ledger[user['transactions'][0]['id']]['session_id'] == 's1'
+    failed = [a['details'] for a in target.data['suspicious_activity'] if a['details'].get('status') == 'failed']
+    assert [ledger[d['id']]['amount'] for d in failed] == [10 ** 6]
+    # The other user's entries keep theirs, even where IDs overlap the source shard's
+    assert [t['amount'] for t in target.data['users']['9988776655']['transactions']] == [5]
+
+    again, replayed = target.track_transaction('s1', _debit(100), idempotency_key='k1')
+    assert replayed and again['id'] == user['transactions'][0]['id']
+    assert _plain(target.data)['sessions']['s1']['balance'] == before['sessions']['s1']['balance']
+
+
+INVALID_TRANSACTIONS = [
+    _debit(-500),
+    _debit(0),
+    _debit('100'),
+    _debit(None),
+    _debit(True),
+    _debit(float('nan')),
+    _debit(float('inf')),
+    {'type': 'refund', 'amount': 100, 'recipient': 'shop'},
+    {'amount': 100},
+    'debit 100',
+]
+
+
+@pytest.mark.parametrize('transaction', INVALID_TRANSACTIONS)
+def test_invalid_transactions_are_not_posted(store_path, transaction):
+    tracking = _tracking(store_path)
+    with pytest.raises(InvalidTransaction):
+        tracking.track_transaction('s1', transaction)
+    assert tracking.data['transactions'] == []
+    assert tracking.data['sessions']['s1']['balance'] == STARTING_BALANCE
+
+
+@pytest.mark.parametrize('transaction', INVALID_TRANSACTIONS + [None])
+def test_invalid_transactions_are_rejected_by_the_route(make_app, transaction):
+    app = make_app()
+    tracking = app.extensions['honeykyc_services'].tracking_service
+    tracking.track_user_login(USER, 20, 'LOW', 's1')
+
+    response = app.test_client().post('/api/track/transaction', json={'session_id': 's1', 'transaction': transaction})
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid transaction')
+    assert tracking.data['sessions']['s1']['balance'] == STARTING_BALANCE
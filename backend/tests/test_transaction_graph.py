@@ -0,0 +1,70 @@
+import json
+
+from services.tracking_service import TrackingService
+from services.transaction_graph import TransactionGraph, node_key
+
+
+def _transfer(entry_id, amount, user='9123456789', recipient='mule-1'):
+    return {'id': entry_id, 'timestamp': '2026-01-01T00:00:00', 'user': user, 'type': 'debit',
+            'amount': amount, 'recipient': recipient, 'status': 'completed', 'session_id': f's{entry_id}'}
+
+
+def test_load_skips_malformed_rows():
+    data = {
+        'sessions': {'s1': {'user': '9123456789', 'risk_level': 'HIGH'}, 's2': 'not a session'},
+        'transactions': [_transfer(1, 100), _transfer(2, 'lots'), ['not', 'a', 'row'], _transfer(3, None)],
+        'honeypot_transfers': [
+            {'id': 4, 'session_id': 'hp1', 'sender': 'ip:10.0.0.1', 'recipient': 'mule-1', 'amount': '5000'},
+            {'id': 5, 'session_id': 'hp2', 'sender': 'ip:10.0.0.2', 'recipient': 'mule-1', 'amount': 5000},
+        ]
+    }
+    graph = TransactionGraph.build(data)
+
+    fan_in = graph.recipient_fan_in('mule-1')
+    assert fan_in['transfers'] == 3
+    assert fan_in['amount'] == 5100
+    # s1 (HIGH risk login) and hp2; hp1's row was dropped
+    assert fan_in['flagged_sessions'] == 2
+
+
+def test_store_with_a_bad_honeypot_row_still_loads(tmp_path):
+    path = tmp_path / 'user_activity.json'
+    path.write_text(json.dumps({
+        'users': {}, 'sessions': {}, 'transactions': [], 'suspicious_activity': [],
+        'honeypot_transfers': [{'id': 1, 'session_id': 'hp1', 'sender': 'ip:10.0.0.1',
+                                'recipient': 'mule-1', 'amount': 'abc'}]
+    }))
+    tracking = TrackingService(data_file=str(path))
+    assert tracking.graph.recipient_fan_in('mule-1') is None
+
+
+def test_session_and_fan_in_sets_are_bounded():
+    graph = TransactionGraph(max_sessions=3, max_fan_in=2)
+    for i in range(10):
+        graph.flag_session(f's{i}')
+        graph.add_transfer(f's{i}', node_key('user', i), 'mule-1', 10)
+
+    assert list(graph.flagged_sessions) == ['s7', 's8', 's9']
+    assert list(graph.session_recipients) == ['s7', 's8', 's9']
+    fan_in = graph.recipient_fan_in('mule-1')
+    assert (fan_in['senders'], fan_in['flagged_sessions'], fan_in['transfers']) == (2, 2, 10)
+
+    restored = TransactionGraph.from_snapshot(json.loads(json.dumps(graph.to_snapshot())))
+    assert list(restored.flagged_sessions) == ['s7', 's8', 's9']
+
+
+def test_fake_transfer_rejects_a_non_numeric_amount(make_app):
+    app = make_app()
+    client = app.test_client()
+    session_id = client.post('/api/honeypot/enter', json={'session_id': 'hp1'}).get_json()['session_id']
+
+    response = client.post('/api/honeypot/fake-transfer',
+                           json={'session_id': session_id, 'amount': 'lots', 'to_account': 'mule-1'})
+    assert response.status_code == 400
+    tracking = app.extensions['honeykyc_services'].tracking_service
+    assert tracking.data.get('honeypot_transfers', []) == []
+
+    response = client.post('/api/honeypot/fake-transfer',
+                           json={'session_id': session_id, 'amount': '5000', 'to_account': 'mule-1'})
+    assert response.status_code == 200
+    assert tracking.graph.recipient_fan_in('mule-1')['amount'] == 5000
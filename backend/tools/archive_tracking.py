@@ -0,0 +1,61 @@
+"""
+Compact tracking history into the columnar archive and query it.
+
+Run from the backend directory (compact while the API server is stopped,
+or use POST /api/admin/archive/compact on a running server):
+    python -m tools.archive_tracking compact --older-than-days 30
+    python -m tools.archive_tracking scan transactions --start 2026-01-01 --end 2026-02-01
+    python -m tools.archive_tracking scan suspicious_activity --user 8888888888 --limit 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from services.archive_service import ArchiveService, SCHEMAS  # noqa: E402
+from services.tracking_service import TrackingService  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tracking history archive')
+    parser.add_argument('--archive-dir', default=Config.ARCHIVE_DIR)
+    parser.add_argument('--format', choices=['parquet', 'arrow', 'npy'], default=Config.ARCHIVE_FORMAT)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compact = commands.add_parser('compact', help='Move archivable history out of the live store')
+    compact.add_argument('--activity', default=Config.USER_ACTIVITY_PATH)
+    compact.add_argument('--older-than-days', type=int, default=Config.ARCHIVE_AFTER_DAYS)
+
+    scan = commands.add_parser('scan', help='Time-range scan of an archived table')
+    scan.add_argument('table', choices=sorted(SCHEMAS))
+    scan.add_argument('--start', help='ISO date/time (inclusive)')
+    scan.add_argument('--end', help='ISO date/time (exclusive)')
+    scan.add_argument('--user', help='Only rows for this mobile number')
+    scan.add_argument('--limit', type=int, default=50, help='Rows to print (0 = only count)')
+    args = parser.parse_args(argv)
+
+    archive = ArchiveService(args.archive_dir, args.format)
+
+    if args.command == 'compact':
+        tracking = TrackingService(data_file=args.activity)
+        start = time.perf_counter()
+        written = archive.compact(tracking, older_than_days=args.older_than_days)
+        print(f"Archived {written} in {time.perf_counter() - start:.2f}s ({archive.file_format})")
+        return 0
+
+    start = time.perf_counter()
+    count = 0
+    for record in archive.scan_records(args.table, args.start, args.end, user=args.user):
+        if count < args.limit:
+            print(json.dumps(record, ensure_ascii=False))
+        count += 1
+    print(f"{count} rows in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Backtest a risk rule change against recorded traffic.
+
+Replays every session with captured scoring inputs (live tracking store,
+columnar archive and any JSONL exports) through the current rules and a
+candidate rule set, and reports confusion-matrix deltas against known
+fraud outcomes plus how the risk score distribution shifts. See
+services/backtest_service.py for the rule set format.
+
+Run from the backend directory:
+    python -m tools.backtest candidate_rules.json
+    python -m tools.backtest candidate_rules.json --input sessions.jsonl.gz --no-store --workers 16
+    python -m tools.backtest candidate_rules.json --labels chargebacks.csv --changes changed_sessions.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from services.archive_service import ArchiveService  # noqa: E402
+from services.backtest_service import (DECISIONS, collect_outcomes, iter_sessions,  # noqa: E402
+                                       load_rule_set, run_backtest)
+from services.tracking_service import read_store  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtest a candidate risk rule set')
+    parser.add_argument('candidate', help='Candidate rule set (JSON)')
+    parser.add_argument('--baseline', help='Baseline rule set (default: the current rules)')
+    parser.add_argument('--activity', default=Config.USER_ACTIVITY_PATH)
+    parser.add_argument('--no-store', action='store_true', help="Don't replay sessions from the live tracking store")
+    parser.add_argument('--archive-dir', default=Config.ARCHIVE_DIR)
+    parser.add_argument('--format', choices=['parquet', 'arrow', 'npy'], default=Config.ARCHIVE_FORMAT)
+    parser.add_argument('--no-archive', action='store_true', help="Don't replay archived sessions")
+    parser.add_argument('--input', action='append', default=[],
+                        help='JSONL file of sessions with scoring_inputs (repeatable, optionally .gz)')
+    parser.add_argument('--labels', help='CSV of session_id,label outcomes (label 1/fraud or 0/legit)')
+    parser.add_argument('--decision', choices=DECISIONS, default='is_fraud',
+                        help='Decision scored against the fraud labels')
+    parser.add_argument('--telecom-data', default=Config.TELECOM_DATA_PATH)
+    parser.add_argument('--registry-deltas', default=Config.REGISTRY_DELTA_DIR,
+                        help='Registry delta directory applied on top of --telecom-data')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--changes', help='Write sessions whose decision, level or ownership changed (JSONL)')
+    parser.add_argument('--output', help='Write the report here as well as to stdout')
+    args = parser.parse_args(argv)
+
+    try:
+        baseline = load_rule_set(args.baseline)
+        candidate = load_rule_set(args.candidate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    data = None
+    if not args.no_store and os.path.exists(args.activity):
+        data = read_store(args.activity)
+    archive = None
+    if not args.no_archive and os.path.isdir(args.archive_dir):
+        archive = ArchiveService(args.archive_dir, args.format)
+
+    fraud = collect_outcomes(data, archive, args.labels)
+    print(f"{len(fraud)} sessions labelled as fraud", file=sys.stderr)
+
+    def progress(sessions, rate):
+        print(f"  {sessions} sessions ({rate:,.0f}/s)", file=sys.stderr)
+
+    stats = {}
+    sessions = iter_sessions(data, archive, args.input, stats)
+    try:
+        report = run_backtest(sessions, fraud, args.telecom_data, baseline, candidate, decision=args.decision,
+                              workers=args.workers, chunk_size=args.chunk_size, changes_path=args.changes,
+                              progress=progress, delta_dir=args.registry_deltas)
+    except ValueError as e:
+        parser.error(str(e))
+    report['skipped_without_inputs'] = stats['no_inputs']
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
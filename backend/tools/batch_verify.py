@@ -0,0 +1,51 @@
+"""
+Bulk KYC re-verification of (name, mobile) pairs.
+
+Run from the backend directory:
+    python -m tools.batch_verify bank_batch.csv results.jsonl --workers 8
+    python -m tools.batch_verify bank_batch.csv results.csv --resume
+
+Input is CSV with a name,mobile header or JSONL with name/mobile fields
+(optionally .gz). Output is JSONL, or CSV when the path ends in .csv.
+Progress is checkpointed after every chunk; --resume continues an
+interrupted run from the last checkpoint.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from services.batch_service import run_batch_job  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch KYC verification')
+    parser.add_argument('input', help='CSV or JSONL file of name,mobile rows')
+    parser.add_argument('output', help='Results file (.jsonl or .csv)')
+    parser.add_argument('--telecom-data', default=Config.TELECOM_DATA_PATH)
+    parser.add_argument('--registry-deltas', default=Config.REGISTRY_DELTA_DIR,
+                        help='Registry delta directory applied on top of --telecom-data')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint)')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    args = parser.parse_args(argv)
+
+    def progress(rows_done, rate):
+        print(f"  {rows_done} rows ({rate:,.0f}/s)", file=sys.stderr)
+
+    try:
+        summary = run_batch_job(args.input, args.output, args.telecom_data, workers=args.workers,
+                                chunk_size=args.chunk_size, checkpoint_path=args.checkpoint,
+                                resume=args.resume, progress=progress, delta_dir=args.registry_deltas)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
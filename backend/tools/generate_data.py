@@ -0,0 +1,84 @@
+"""
+Generate production-sized synthetic telecom registries and tracking histories.
+
+Run from the backend directory:
+    python -m tools.generate_data --registry-size 5000000 --registry-out /data/telecom.jsonl.gz
+    python -m tools.generate_data --users 200000 --fraud-rate 0.08 --activity-out /data/user_activity.json
+
+Output format follows the file extension: .json (the layout the services
+load), .jsonl (one record per line), with an optional .gz suffix.
+The same seed and --reference-date always produce identical files.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.synthetic_data import (  # noqa: E402
+    iter_telecom_registry, iter_user_histories, write_telecom_registry, write_user_activity
+)
+
+
+def _progress(iterable, total, label, every=100000):
+    start = time.perf_counter()
+    for i, item in enumerate(iterable, 1):
+        if i % every == 0:
+            rate = i / (time.perf_counter() - start)
+            print(f"  {label}: {i}/{total} ({rate:,.0f}/s)", file=sys.stderr)
+        yield item
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic HoneyKYC data')
+    parser.add_argument('--registry-size', type=int, default=0,
+                        help='Number of telecom records to generate')
+    parser.add_argument('--registry-out', default='data/telecom_synthetic.json')
+    parser.add_argument('--users', type=int, default=0,
+                        help='Number of users with tracking history to generate')
+    parser.add_argument('--activity-out', default='data/user_activity_synthetic.json')
+    parser.add_argument('--sessions-per-user', type=int, default=2)
+    parser.add_argument('--fraud-rate', type=float, default=0.05,
+                        help='Fraction of users with fraudulent behaviour')
+    parser.add_argument('--burner-rate', type=float, default=0.03,
+                        help='Fraction of SIMs activated in the last 30 days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reference-date', default=datetime.now().strftime('%Y-%m-%d'),
+                        help='Date SIM ages and history are relative to (YYYY-MM-DD)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    reference_date = datetime.strptime(args.reference_date, '%Y-%m-%d')
+
+    if not args.registry_size and not args.users:
+        print('Nothing to do: pass --registry-size and/or --users', file=sys.stderr)
+        return 1
+
+    if args.registry_size:
+        start = time.perf_counter()
+        records = iter_telecom_registry(args.registry_size, args.seed, reference_date, args.burner_rate)
+        count = write_telecom_registry(args.registry_out,
+                                       _progress(records, args.registry_size, 'registry'))
+        print(f"Wrote {count} telecom records to {args.registry_out} "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    if args.users:
+        # Users map onto the first registry records so names can match telecom owners
+        if args.registry_size and args.users > args.registry_size:
+            print('--users cannot exceed --registry-size', file=sys.stderr)
+            return 1
+        start = time.perf_counter()
+        histories = iter_user_histories(args.users, args.seed, reference_date,
+                                        args.sessions_per_user, args.fraud_rate, args.burner_rate)
+        counts = write_user_activity(args.activity_out, _progress(histories, args.users, 'users'))
+        print(f"Wrote {counts} to {args.activity_out} in {time.perf_counter() - start:.1f}s")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Run and rebalance tracking shards (see services/shard_service.py).
+
+Run from the backend directory:
+    python -m tools.tracking_shard serve --port 7101 --activity data/shards/a.json
+    python -m tools.tracking_shard local --count 3 --data-dir data/shards
+    python -m tools.tracking_shard rebalance --shards a=127.0.0.1:7101,b=127.0.0.1:7102 --add c=127.0.0.1:7103
+
+`local` starts one shard process per store on consecutive ports and prints
+the TRACKING_SHARDS value for the API server. Shard processes need an
+authkey (--authkey or TRACKING_SHARD_AUTHKEY) shared with the API server. After a rebalance, restart
+the API workers with the new shard list.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from services.rule_engine import RuleEngine  # noqa: E402
+from services.shard_service import ShardedTrackingService, parse_shard_spec, serve_shard  # noqa: E402
+from services.tracking_service import TrackingService  # noqa: E402
+
+
+def _serve(activity, host, port, authkey, detection_rules=None):
+    logging.basicConfig(level=logging.INFO)
+    rules = None
+    if detection_rules:
+        with open(detection_rules) as f:
+            rules = json.load(f)
+    tracking = TrackingService(data_file=activity, mule_fan_in_threshold=Config.MULE_FAN_IN_THRESHOLD,
+                               rule_engine=RuleEngine(rules, max_keys=Config.RULE_ENGINE_MAX_KEYS),
+                               columnar=Config.TRACKING_COLUMNAR,
+                               journal_compact_every=Config.TRACKING_JOURNAL_COMPACT_EVERY)
+    try:
+        serve_shard(tracking, (host, port), authkey)
+    except KeyboardInterrupt:
+        pass
+
+
+def _local_store(path):
+    return TrackingService(data_file=path, mule_fan_in_threshold=Config.MULE_FAN_IN_THRESHOLD,
+                           columnar=Config.TRACKING_COLUMNAR,
+                           journal_compact_every=Config.TRACKING_JOURNAL_COMPACT_EVERY)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tracking shards')
+    parser.add_argument('--authkey', default=Config.TRACKING_SHARD_AUTHKEY,
+                        help='Shared secret of shards and routers (default: TRACKING_SHARD_AUTHKEY)')
+    parser.add_argument('--detection-rules', default=Config.DETECTION_RULES_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Serve one shard store')
+    serve.add_argument('--activity', required=True, help='Tracking store of this shard (JSON)')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, required=True)
+
+    local = commands.add_parser('local', help='Start several shard processes on this host')
+    local.add_argument('--count', type=int, default=3)
+    local.add_argument('--data-dir', default=os.path.join(Config.DATA_DIR, 'shards'))
+    local.add_argument('--host', default='127.0.0.1')
+    local.add_argument('--base-port', type=int, default=7101)
+
+    rebalance = commands.add_parser('rebalance', help='Add a shard and move the users it now owns to it')
+    rebalance.add_argument('--shards', required=True, help='Current shards: name=host:port or name=path.json, ...')
+    rebalance.add_argument('--add', required=True, help='New shard: name=host:port or name=path.json')
+    rebalance.add_argument('--vnodes', type=int, default=Config.TRACKING_SHARD_VNODES)
+    args = parser.parse_args(argv)
+    authkey = (args.authkey or '').encode('utf-8')
+    if args.command in ('serve', 'local') and not authkey:
+        parser.error('shard processes need --authkey or TRACKING_SHARD_AUTHKEY')
+
+    if args.command == 'serve':
+        _serve(args.activity, args.host, args.port, authkey, args.detection_rules)
+        return 0
+
+    if args.command == 'local':
+        os.makedirs(args.data_dir, exist_ok=True)
+        processes, specs = [], []
+        for i in range(args.count):
+            name, port = f'shard{i}', args.base_port + i
+            activity = os.path.join(args.data_dir, f'{name}.json')
+            process = multiprocessing.Process(target=_serve, name=name,
+                                              args=(activity, args.host, port, authkey, args.detection_rules))
+            process.start()
+            processes.append(process)
+            specs.append(f'{name}={args.host}:{port}')
+        print(f"TRACKING_SHARDS={','.join(specs)}", flush=True)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+        return 0
+
+    try:
+        shards = [parse_shard_spec(spec, authkey, _local_store) for spec in args.shards.split(',') if spec.strip()]
+        name, shard = parse_shard_spec(args.add, authkey, _local_store)
+    except ValueError as e:
+        parser.error(str(e))
+    tracking = ShardedTrackingService(shards, vnodes=args.vnodes)
+    moved = tracking.add_shard(name, shard)
+    print(json.dumps({'added': name, 'moved_users': moved, 'shards': tracking.get_status()['shards']}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
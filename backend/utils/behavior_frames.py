@@ -0,0 +1,123 @@
+"""
+Compact binary frames for behavior telemetry.
+
+Clients POST to /api/verify/behavior with
+Content-Type: application/x-honeykyc-behavior and a body of
+
+    header   '<2sBQQH'   magic b'HK', version, session handle (from
+                         /api/verify/start), base timestamp (epoch ms),
+                         event count
+    events   '<BHI' * n  event code, ms since the previous event
+                         (saturates at 65535), numeric value
+    strings  (u8 length + UTF-8 bytes) * k, referenced by events whose
+             code carries text (value is the string index)
+
+so a batch of 100 mouse events is ~720 bytes instead of ~7 KB of JSON.
+For counter events (mouse_movement, scroll_behavior, ...) the value is
+how many events were coalesced into one record.
+"""
+import struct
+
+MIMETYPE = 'application/x-honeykyc-behavior'
+MAGIC = b'HK'
+VERSION = 1
+
+HEADER = struct.Struct('<2sBQQH')
+EVENT = struct.Struct('<BHI')
+MAX_EVENTS = 4096
+MAX_FRAME_BYTES = 64 * 1024
+
+EVENT_CODES = {
+    1: 'login_speed',
+    2: 'page_view',
+    3: 'honeypot_click',
+    4: 'mouse_movement',
+    5: 'copy_paste',
+    6: 'login_attempt',
+    7: 'tab_switch',
+    8: 'dev_tools_detected',
+    9: 'automation_detected',
+    10: 'scroll_behavior'
+}
+EVENT_TYPES = {name: code for code, name in EVENT_CODES.items()}
+
+# Events whose value indexes the frame's string table
+TEXT_EVENTS = frozenset((EVENT_TYPES['page_view'], EVENT_TYPES['honeypot_click']))
+
+
+class FrameError(ValueError):
+    """Malformed behavior frame"""
+
+
+def decode_frame(body):
+    """
+    Returns (session_handle, events) where events yields
+    (event_type, timestamp_ms, value, text) tuples straight off the buffer.
+    """
+    view = memoryview(body)
+    if len(view) < HEADER.size:
+        raise FrameError('Frame too short')
+    magic, version, handle, base_ms, count = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise FrameError('Unsupported frame format')
+    if count > MAX_EVENTS:
+        raise FrameError('Too many events in frame')
+
+    events_end = HEADER.size + count * EVENT.size
+    if len(view) < events_end:
+        raise FrameError('Truncated event block')
+
+    strings = []
+    offset = events_end
+    while offset < len(view):
+        length = view[offset]
+        offset += 1
+        if offset + length > len(view):
+            raise FrameError('Truncated string table')
+        try:
+            strings.append(str(view[offset:offset + length], 'utf-8'))
+        except UnicodeDecodeError:
+            raise FrameError('Invalid string in frame')
+        offset += length
+
+    for code, _, value in EVENT.iter_unpack(view[HEADER.size:events_end]):
+        if code not in EVENT_CODES:
+            raise FrameError(f'Unknown event code {code}')
+        if code in TEXT_EVENTS and value >= len(strings):
+            raise FrameError('String index out of range')
+
+    def events():
+        timestamp = base_ms
+        for code, delta, value in EVENT.iter_unpack(view[HEADER.size:events_end]):
+            timestamp += delta
+            if code in TEXT_EVENTS:
+                yield EVENT_CODES[code], timestamp, None, strings[value]
+            else:
+                yield EVENT_CODES[code], timestamp, value, None
+
+    return handle, events()
+
+
+def encode_frame(handle, events, base_ms=None):
+    """
+    Build a frame from (event_type, timestamp_ms, value_or_text) tuples.
+    Used by benchmarks and non-browser clients.
+    """
+    events = list(events)
+    if base_ms is None:
+        base_ms = events[0][1] if events else 0
+    strings, string_index, records = [], {}, []
+    previous = base_ms
+    for event_type, timestamp, value in events:
+        code = EVENT_TYPES[event_type]
+        if code in TEXT_EVENTS:
+            text = str(value or '')
+            if text not in string_index:
+                string_index[text] = len(strings)
+                strings.append(text.encode('utf-8')[:255].decode('utf-8', 'ignore').encode('utf-8'))
+            value = string_index[text]
+        delta = min(max(0, timestamp - previous), 0xFFFF)
+        records.append(EVENT.pack(code, delta, int(value or 0)))
+        previous += delta
+    table = b''.join(bytes((len(s),)) + s for s in strings)
+    return HEADER.pack(MAGIC, VERSION, handle, base_ms, len(records)) + b''.join(records) + table
@@ -0,0 +1,52 @@
+import ipaddress
+from flask import current_app, g, request
+
+
+def parse_networks(entries):
+    """Parse trusted proxy entries ('10.0.0.0/8', '127.0.0.1') into networks"""
+    networks = []
+    for entry in entries or []:
+        try:
+            networks.append(ipaddress.ip_network(entry.strip(), strict=False))
+        except ValueError:
+            continue
+    return networks
+
+
+def _is_trusted(address, networks):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def resolve_client_ip(remote_addr, forwarded_for, trusted_networks):
+    """
+    Real client address behind trusted proxies.
+    X-Forwarded-For is only honoured when the direct peer is a trusted
+    proxy; it is walked right to left, skipping trusted hops, and the
+    first untrusted address is the client. Anything further left is
+    client-supplied and ignored.
+    """
+    if not trusted_networks or not forwarded_for or not _is_trusted(remote_addr, trusted_networks):
+        return remote_addr
+
+    hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_networks):
+            return hop
+    return hops[0] if hops else remote_addr
+
+
+def get_client_ip():
+    """Client IP of the current request (cached per request)"""
+    client_ip = g.get('client_ip')
+    if client_ip is None:
+        networks = current_app.extensions.get('honeykyc_trusted_proxies')
+        if networks is None:
+            networks = parse_networks(current_app.config.get('TRUSTED_PROXIES'))
+            current_app.extensions['honeykyc_trusted_proxies'] = networks
+        client_ip = resolve_client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'), networks)
+        g.client_ip = client_ip
+    return client_ip
@@ -0,0 +1,30 @@
+import gzip
+import json
+
+
+def open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def load_telecom_registry(path):
+    """
+    Load a telecom registry keyed by mobile number.
+    Accepts the telecom_mock_data.json layout or JSONL with one record per
+    line carrying a 'mobile' field (as written by tools/generate_data.py),
+    optionally gzip-compressed.
+    """
+    base = path[:-3] if path.endswith('.gz') else path
+
+    with open_text(path) as f:
+        if not base.endswith('.jsonl'):
+            return json.load(f)
+
+        registry = {}
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            registry[record.pop('mobile')] = record
+        return registry
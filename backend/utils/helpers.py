@@ -1,5 +1,6 @@
 import hashlib
 import json
+import logging
 import re
 from datetime import datetime
 import random
@@ -51,14 +52,15 @@ def mask_sensitive_data(data):
     masked = data.copy()
     
     if 'mobile' in masked:
-        masked['mobile'] = masked['mobile'][:2] + '****' + masked['mobile'][-2:]
+        mobile = str(masked['mobile'] or '')
+        masked['mobile'] = mobile[:2] + '****' + mobile[-2:]
     
-    if 'email' in masked:
+    if masked.get('email'):
         email_parts = masked['email'].split('@')
         if len(email_parts) == 2:
             masked['email'] = email_parts[0][:2] + '***@' + email_parts[1]
     
-    if 'name' in masked:
+    if masked.get('name'):
         name_parts = masked['name'].split()
         masked['name'] = ' '.join([p[0] + '***' for p in name_parts])
     
@@ -86,39 +88,24 @@ def format_currency(amount):
     else:
         return f"₹{s}"
 
-def detect_vpn(ip_address):
-    """Simplified VPN detection"""
-    # In production, use VPN detection APIs
-    # This is a mock function for demo
-    vpn_ips = ['103.0.0.0', '104.0.0.0', '105.0.0.0']
-    return ip_address.startswith(tuple(vpn_ips[:2]))
+def detect_vpn(ip_address, intel_index):
+    """VPN/proxy or hosting-provider address, per an IP intelligence index (services.ip_intel)"""
+    intel = intel_index.lookup(ip_address)
+    return bool(intel and (intel['is_vpn'] or intel['is_hosting']))
 
-def get_location_from_ip(ip_address):
-    """Get location from IP (mock)"""
-    # In production, use IP geolocation API
-    locations = {
-        '127.0.0.1': 'Localhost',
-        '192.168.': 'Local Network',
-    }
-    
-    for ip_prefix, location in locations.items():
-        if ip_address.startswith(ip_prefix):
-            return location
-    
-    return 'Unknown Location'
+def get_location_from_ip(ip_address, intel_index):
+    """Location label for an IP from an IP intelligence index (services.ip_intel)"""
+    intel = intel_index.lookup(ip_address)
+    return intel['location'] if intel else 'Unknown Location'
 
 def log_fraud_attempt(user_data, risk_score, reason):
-    """Log fraud attempt for analysis"""
-    log_entry = {
+    """Log fraud attempt for analysis (to the audit log, masked and written off-thread)"""
+    from services.audit_log import audit_event
+    audit_event('fraud_attempt', pii=user_data, level=logging.WARNING, risk_score=risk_score,
+                reason=reason, action='BLOCKED')
+    return {
         'timestamp': datetime.now().isoformat(),
-        'user_data': mask_sensitive_data(user_data),
         'risk_score': risk_score,
         'reason': reason,
         'action': 'BLOCKED'
-    }
-    
-    # In production, write to database or log file
-    with open('fraud_logs.json', 'a') as f:
-        f.write(json.dumps(log_entry) + '\n')
-    
-    return log_entry
\ No newline at end of file
+    }
\ No newline at end of file
@@ -0,0 +1,364 @@
+"""
+Deterministic synthetic data for benchmarks and capacity tests.
+
+Every telecom record and every user history is derived from its own
+seeded RNG (seed + index), so any record can be regenerated on its own
+and output is identical for the same seed and reference date no matter
+how it is chunked. Writers stream records to disk with bounded memory.
+"""
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+FIRST_NAMES = ['Rahul', 'Amit', 'Priya', 'Sneha', 'Vikram', 'Anjali', 'Rohan', 'Pooja',
+               'Arjun', 'Kavya', 'Sanjay', 'Neha', 'Karan', 'Divya', 'Manish', 'Ritu',
+               'Aditya', 'Meera', 'Suresh', 'Lakshmi', 'Farhan', 'Simran', 'Deepak', 'Ananya']
+LAST_NAMES = ['Sharma', 'Kumar', 'Singh', 'Reddy', 'Patel', 'Gupta', 'Iyer', 'Nair',
+              'Das', 'Mehta', 'Joshi', 'Verma', 'Rao', 'Khan', 'Bose', 'Yadav',
+              'Chatterjee', 'Pillai', 'Menon', 'Agarwal', 'Mishra', 'Shah', 'Sethi', 'Gill']
+CITIES = ['Mumbai, Maharashtra', 'Delhi, NCR', 'Bangalore, Karnataka', 'Chennai, Tamil Nadu',
+          'Kolkata, West Bengal', 'Hyderabad, Telangana', 'Pune, Maharashtra',
+          'Ahmedabad, Gujarat', 'Jaipur, Rajasthan', 'Lucknow, Uttar Pradesh']
+
+# Approximate subscriber market share
+PROVIDERS = (('Jio', 0.40), ('Airtel', 0.33), ('VI', 0.19), ('BSNL', 0.08))
+
+# KYC status weights (verified, pending, unverified) by SIM age bucket
+KYC_WEIGHTS = {
+    'burner': (0.2, 0.3, 0.5),
+    'new': (0.7, 0.2, 0.1),
+    'established': (0.95, 0.04, 0.01)
+}
+
+SUSPICIOUS_PAGES = ['admin', 'settings', 'hidden']
+
+
+def synthetic_mobile(index):
+    """Deterministic, valid-looking Indian mobile number for a record index"""
+    return f"{6 + index % 4}{index // 4:09d}"
+
+
+def _rng(seed, kind, index):
+    return random.Random(f"{seed}:{kind}:{index}")
+
+
+def _weighted(rng, options):
+    threshold = rng.random()
+    cumulative = 0.0
+    for value, weight in options:
+        cumulative += weight
+        if threshold < cumulative:
+            return value
+    return options[-1][0]
+
+
+def _random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+# ============================================
+# TELECOM REGISTRY
+# ============================================
+
+def make_telecom_record(index, seed=42, reference_date=None, burner_rate=0.03):
+    """Build the registry record at index (same layout as telecom_mock_data.json)"""
+    rng = _rng(seed, 'telecom', index)
+    reference_date = reference_date or datetime.now()
+    name = _random_name(rng)
+
+    # Mostly established SIMs, a tail of recent activations and a few burners
+    bucket = rng.random()
+    if bucket < burner_rate:
+        age_bucket, age_days = 'burner', rng.randint(0, 29)
+    elif bucket < burner_rate + 0.12:
+        age_bucket, age_days = 'new', rng.randint(30, 364)
+    else:
+        age_bucket, age_days = 'established', 365 + int(rng.expovariate(1 / 900))
+
+    kyc_status = _weighted(rng, list(zip(('verified', 'pending', 'unverified'),
+                                         KYC_WEIGHTS[age_bucket])))
+    if kyc_status == 'verified':
+        aadhar_linked, pan_linked = rng.random() < 0.92, rng.random() < 0.75
+    else:
+        aadhar_linked, pan_linked = rng.random() < 0.4, rng.random() < 0.3
+
+    risk_score = {'burner': 60, 'new': 25, 'established': 5}[age_bucket]
+    risk_score += 0 if kyc_status == 'verified' else 15
+    risk_score += rng.randint(0, 10)
+
+    return {
+        'owner_name': name,
+        'provider': _weighted(rng, PROVIDERS),
+        'activation_date': (reference_date - timedelta(days=age_days)).strftime('%Y-%m-%d'),
+        'kyc_status': kyc_status,
+        'aadhar_linked': aadhar_linked,
+        'pan_linked': pan_linked,
+        'address': rng.choice(CITIES),
+        'email': f"{name.lower().replace(' ', '.')}{index}@email.com",
+        'risk_score': min(risk_score, 100)
+    }
+
+
+def iter_telecom_registry(size, seed=42, reference_date=None, burner_rate=0.03, start=0):
+    """Yield (mobile, record) pairs for records start..size-1"""
+    reference_date = reference_date or datetime.now()
+    for i in range(start, size):
+        yield synthetic_mobile(i), make_telecom_record(i, seed, reference_date, burner_rate)
+
+
+def generate_telecom_registry(size, seed=42, reference_date=None, burner_rate=0.03):
+    """Build a synthetic telecom registry in memory (for small sizes)"""
+    return dict(iter_telecom_registry(size, seed, reference_date, burner_rate))
+
+
+# ============================================
+# TRACKING HISTORY
+# ============================================
+
+def make_user_history(index, seed=42, reference_date=None, sessions_per_user=2,
+                      fraud_rate=0.05, burner_rate=0.03, first_txn_id=1):
+    """
+    Build one user's tracking history: the user record, their sessions,
+    transactions and suspicious activity (user_activity.json layout).
+    Fraudulent users submit someone else's name, transact rapidly and
+    probe hidden pages.
+    """
+    rng = _rng(seed, 'activity', index)
+    reference_date = reference_date or datetime.now()
+    mobile = synthetic_mobile(index)
+    owner = make_telecom_record(index, seed, reference_date, burner_rate)['owner_name']
+
+    is_fraud = rng.random() < fraud_rate
+    name = _random_name(rng) if is_fraud else owner
+    if is_fraud:
+        risk_score, risk_level = rng.randint(60, 105), 'CRITICAL'
+    else:
+        risk_score = rng.randint(0, 45)
+        risk_level = 'LOW' if risk_score < 30 else 'MEDIUM'
+
+    created_at = reference_date - timedelta(days=rng.randint(1, 365), seconds=rng.randint(0, 86399))
+    user = {
+        'name': name,
+        'mobile': mobile,
+        'email': '',
+        'created_at': created_at.isoformat(),
+        'total_logins': sessions_per_user,
+        'total_suspicious_actions': 0,
+        'risk_score': risk_score,
+        'risk_level': risk_level,
+        'transactions': [],
+        'sessions': []
+    }
+    sessions = {}
+    transactions = []
+    suspicious = []
+    next_id = first_txn_id
+
+    account_age_minutes = int((reference_date - created_at).total_seconds() // 60)
+    for s in range(sessions_per_user):
+        login_time = created_at + timedelta(minutes=rng.randint(0, account_age_minutes))
+        session = {
+            'user': mobile,
+            'user_name': name,
+            'login_time': login_time.isoformat(),
+            'risk_score': risk_score,
+            'risk_level': risk_level,
+            'actions': [{
+                'timestamp': login_time.isoformat(),
+                'action': 'login',
+                'page': 'login',
+                'details': {'method': 'password'}
+            }],
+            'transactions': [],
+            'balance': 50000
+        }
+        clock = login_time
+
+        if is_fraud:
+            page = rng.choice(SUSPICIOUS_PAGES)
+            clock += timedelta(seconds=rng.randint(1, 20))
+            action = {'timestamp': clock.isoformat(), 'action': 'page_view', 'page': page, 'details': {}}
+            session['actions'].append(action)
+            suspicious.append({'user': mobile, 'user_name': name, 'timestamp': clock.isoformat(),
+                               'reason': f'Attempted to access {page} page', 'details': action})
+            txn_count, gap, amounts = rng.randint(3, 6), (1, 15), (8000, 45000)
+        else:
+            txn_count, gap, amounts = rng.choice((0, 1, 1, 2)), (60, 3600), (100, 12000)
+
+        for t in range(txn_count):
+            clock += timedelta(seconds=rng.randint(*gap))
+            amount = rng.randint(*amounts)
+            failed = amount > session['balance']
+            transaction = {
+                'id': next_id,
+                'timestamp': clock.isoformat(),
+                'user': mobile,
+                'user_name': name,
+                'type': 'debit',
+                'amount': amount,
+                'recipient': (f"mule{rng.randint(1, 300)}@okicici" if is_fraud
+                              else f"user{rng.randint(1, 100000)}@okaxis"),
+                'status': 'failed' if failed else 'completed'
+            }
+            next_id += 1
+            transactions.append(transaction)
+            if failed:
+                transaction['reason'] = 'insufficient_balance'
+                suspicious.append({
+                    'user': mobile, 'user_name': name, 'timestamp': clock.isoformat(),
+                    'reason': f'Failed transaction attempt: Insufficient balance for ₹{amount}',
+                    'details': transaction
+                })
+                continue
+            session['balance'] -= amount
+            session['transactions'].append(transaction)
+            user['transactions'].append(transaction)
+            if is_fraud and t == 2:
+                suspicious.append({
+                    'user': mobile, 'user_name': name, 'timestamp': clock.isoformat(),
+                    'reason': 'Multiple rapid transactions: 3 in 60 seconds',
+                    'details': transaction
+                })
+
+        session['actions'].append({'timestamp': (clock + timedelta(seconds=5)).isoformat(),
+                                   'action': 'logout', 'page': 'real_wallet', 'details': {}})
+        sessions[f"synthetic-{index}-{s}"] = session
+
+    user['total_suspicious_actions'] = len(suspicious)
+    return {
+        'user': user,
+        'sessions': sessions,
+        'transactions': transactions,
+        'suspicious_activity': suspicious,
+        'is_fraud': is_fraud
+    }
+
+
+def iter_user_histories(users, seed=42, reference_date=None, sessions_per_user=2,
+                        fraud_rate=0.05, burner_rate=0.03):
+    """Yield per-user histories with globally increasing transaction IDs"""
+    reference_date = reference_date or datetime.now()
+    next_id = 1
+    for i in range(users):
+        history = make_user_history(i, seed, reference_date, sessions_per_user,
+                                    fraud_rate, burner_rate, first_txn_id=next_id)
+        next_id += len(history['transactions'])
+        yield history
+
+
+def generate_user_activity(registry, users, sessions_per_user=2, seed=42,
+                           reference_date=None, fraud_rate=0.05, burner_rate=0.03):
+    """Build a synthetic tracking store in memory (for small sizes)"""
+    data = {'users': {}, 'sessions': {}, 'transactions': [], 'suspicious_activity': []}
+    for history in iter_user_histories(min(users, len(registry)), seed, reference_date,
+                                       sessions_per_user, fraud_rate, burner_rate):
+        data['users'][history['user']['mobile']] = history['user']
+        data['sessions'].update(history['sessions'])
+        data['transactions'].extend(history['transactions'])
+        data['suspicious_activity'].extend(history['suspicious_activity'])
+    return data
+
+
+# ============================================
+# STREAMING WRITERS
+# ============================================
+
+def _open_output(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def _format(path):
+    base = path[:-3] if path.endswith('.gz') else path
+    return 'jsonl' if base.endswith('.jsonl') else 'json'
+
+
+def write_telecom_registry(path, records):
+    """
+    Stream (mobile, record) pairs to .json (one object keyed by mobile,
+    like telecom_mock_data.json) or .jsonl (one record per line with a
+    'mobile' field). A .gz suffix compresses the output.
+    """
+    count = 0
+    with _open_output(path) as f:
+        if _format(path) == 'jsonl':
+            for mobile, record in records:
+                f.write(json.dumps(dict(record, mobile=mobile), ensure_ascii=False))
+                f.write('\n')
+                count += 1
+        else:
+            f.write('{')
+            for mobile, record in records:
+                f.write(',\n' if count else '\n')
+                f.write(f'{json.dumps(mobile)}: {json.dumps(record, ensure_ascii=False)}')
+                count += 1
+            f.write('\n}\n')
+    return count
+
+
+def write_user_activity(path, histories):
+    """
+    Stream user histories to .json (the user_activity.json document) or
+    .jsonl (one line per record, tagged with 'kind'). For .json each
+    section is spooled to a temporary file so memory stays bounded by a
+    single user's history.
+    """
+    counts = {'users': 0, 'sessions': 0, 'transactions': 0, 'suspicious_activity': 0}
+
+    if _format(path) == 'jsonl':
+        with _open_output(path) as f:
+            for history in histories:
+                f.write(json.dumps(dict(history['user'], kind='user'), ensure_ascii=False) + '\n')
+                for session_id, session in history['sessions'].items():
+                    f.write(json.dumps(dict(session, kind='session', session_id=session_id),
+                                       ensure_ascii=False) + '\n')
+                for transaction in history['transactions']:
+                    f.write(json.dumps(dict(transaction, kind='transaction'), ensure_ascii=False) + '\n')
+                for entry in history['suspicious_activity']:
+                    f.write(json.dumps(dict(entry, kind='suspicious_activity'), ensure_ascii=False) + '\n')
+                counts['users'] += 1
+                counts['sessions'] += len(history['sessions'])
+                counts['transactions'] += len(history['transactions'])
+                counts['suspicious_activity'] += len(history['suspicious_activity'])
+        return counts
+
+    spool_dir = tempfile.mkdtemp(prefix='honeykyc-gen-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        spools = {section: open(os.path.join(spool_dir, section), 'w+', encoding='utf-8')
+                  for section in counts}
+        for history in histories:
+            mobile = history['user']['mobile']
+            items = {
+                'users': [f'{json.dumps(mobile)}: {json.dumps(history["user"], ensure_ascii=False)}'],
+                'sessions': [f'{json.dumps(sid)}: {json.dumps(s, ensure_ascii=False)}'
+                             for sid, s in history['sessions'].items()],
+                'transactions': [json.dumps(t, ensure_ascii=False) for t in history['transactions']],
+                'suspicious_activity': [json.dumps(e, ensure_ascii=False)
+                                        for e in history['suspicious_activity']]
+            }
+            for section, lines in items.items():
+                for line in lines:
+                    spools[section].write(',\n' if counts[section] else '\n')
+                    spools[section].write(line)
+                    counts[section] += 1
+
+        with _open_output(path) as out:
+            out.write('{')
+            for i, (section, spool) in enumerate(spools.items()):
+                brackets = '{}' if section in ('users', 'sessions') else '[]'
+                out.write(f'{"," if i else ""}\n"{section}": {brackets[0]}')
+                spool.seek(0)
+                shutil.copyfileobj(spool, out)
+                out.write(f'\n{brackets[1]}')
+            out.write('\n}\n')
+        for spool in spools.values():
+            spool.close()
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    return counts